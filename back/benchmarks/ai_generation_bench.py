@@ -0,0 +1,92 @@
+# 마인드맵 생성/추천 경로 오프라인 벤치마크
+#
+# 기본적으로 fake LLM 제공자를 사용하므로 Vertex AI 자격 증명 없이 재현 가능하게 실행됩니다.
+# 실제 응답으로 측정하려면 한 번 --provider record로 녹화한 뒤 --provider replay로 다시 실행하세요.
+#
+# 실행 (저장소 루트에서):
+#   python -m back.benchmarks.ai_generation_bench --iterations 50 --latency 0.2 --nodes 40
+#   python -m back.benchmarks.ai_generation_bench --provider record --iterations 1
+#   python -m back.benchmarks.ai_generation_bench --provider replay
+import argparse
+import os
+import statistics
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+
+def _chats(count: int, start_id: int = 1):
+    base = datetime(2025, 1, 1, 9, 0)
+    topics = ["일정", "디자인 시안", "API 설계", "배포 방식", "테스트 범위", "회의록"]
+    return [
+        SimpleNamespace(
+            id=start_id + index,
+            user_id=(index % 4) + 1,
+            content=f"{topics[index % len(topics)]}에 대해 논의합시다. 의견 #{index}",
+            timestamp=base + timedelta(minutes=index)
+        )
+        for index in range(count)
+    ]
+
+
+def _report(name: str, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(
+        f"{name:<24} n={len(samples):<4} mean={statistics.mean(samples) * 1000:8.2f}ms "
+        f"p50={statistics.median(samples) * 1000:8.2f}ms p95={p95 * 1000:8.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI generation/recommendation benchmark")
+    parser.add_argument("--provider", default="fake", help="fake | replay | record | vertex")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake 제공자 응답 지연(초)")
+    parser.add_argument("--nodes", type=int, default=12, help="fake 제공자 응답 노드 수")
+    parser.add_argument("--cache", action="store_true", help="LLM 응답 캐시 사용")
+    args = parser.parse_args()
+
+    # 설정은 처음 로드될 때 고정되므로 모듈을 임포트하기 전에 환경 변수를 지정합니다.
+    os.environ["LLM_PROVIDER"] = args.provider
+    os.environ["LLM_FAKE_LATENCY_SECONDS"] = str(args.latency)
+    os.environ["LLM_FAKE_NODE_COUNT"] = str(args.nodes)
+    os.environ["LLM_CACHE_ENABLED"] = "true" if args.cache else "false"
+
+    from ..services.ai_analyzer import _generate_full, _generate_incremental, recommend_map_improvements
+
+    chats = _chats(args.chats)
+    project_id = 1
+
+    full_samples, incremental_samples, recommend_samples = [], [], []
+    for _ in range(args.iterations):
+        started = time.perf_counter()
+        result = _generate_full(project_id, chats, [], chats[-1].id)
+        full_samples.append(time.perf_counter() - started)
+        assert result.is_success, "full generation failed"
+
+        # 생성된 노드 ID에는 타임스탬프가 들어가므로, 녹화/재생 시 프롬프트가 같아지도록 고정 ID로 바꿉니다.
+        existing_nodes = [
+            SimpleNamespace(**{**node.model_dump(), "id": f"node-{index}"})
+            for index, node in enumerate(result.mind_map_data.nodes)
+        ]
+        new_chats = _chats(20, start_id=chats[-1].id + 1)
+        started = time.perf_counter()
+        incremental = _generate_incremental(project_id, new_chats, existing_nodes, new_chats[-1].id)
+        incremental_samples.append(time.perf_counter() - started)
+        assert incremental.is_success, "incremental generation failed"
+
+        map_data = {"nodes": [vars(node) for node in existing_nodes]}
+        started = time.perf_counter()
+        recommend_map_improvements(map_data, chats)
+        recommend_samples.append(time.perf_counter() - started)
+
+    print(f"provider={args.provider} chats={args.chats} latency={args.latency}s nodes={args.nodes} cache={args.cache}")
+    _report("full generation", full_samples)
+    _report("incremental generation", incremental_samples)
+    _report("recommendation", recommend_samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# 콜드 스타트 벤치마크
+#
+# 매 실행마다 새 파이썬 프로세스를 띄워
+#   1) import back.main 시간
+#   2) 앱 startup 이벤트(warm-up 포함) 시간
+#   3) 첫 /health 응답 시간
+# 을 측정하고 중앙값/p95를 출력합니다. 오프라인 재현을 위해 기본으로 fake LLM 제공자와 임시 SQLite DB를 사용합니다.
+#
+# 실행 (저장소 루트에서):
+#   python -m back.benchmarks.cold_start_bench --runs 10
+#   python -m back.benchmarks.cold_start_bench --runs 10 --json cold_start.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+_CHILD = r"""
+import json, time
+started = time.perf_counter()
+import back.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(back.main.app) as client:
+    ready = time.perf_counter()
+    response = client.get("/health")
+    first = time.perf_counter()
+print("COLD_START " + json.dumps({
+    "import": imported - started,
+    "startup": ready - imported,
+    "first_request": first - ready,
+    "total": first - started,
+    "status": response.status_code,
+}))
+"""
+
+
+def _run_once(env):
+    result = subprocess.run([sys.executable, "-c", _CHILD], capture_output=True, text=True, env=env)
+    for line in result.stdout.splitlines():
+        if line.startswith("COLD_START "):
+            return json.loads(line[len("COLD_START "):])
+    raise RuntimeError(f"cold start run failed:\n{result.stderr[-2000:]}")
+
+
+def _summary(samples):
+    samples = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(samples) * 1000, 1),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+        "max_ms": round(samples[-1] * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark of the API server")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--provider", default="fake", help="LLM_PROVIDER (fake | vertex ...)")
+    parser.add_argument("--database-url", default=None, help="기본값: 임시 SQLite 파일")
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ)
+        env["LLM_PROVIDER"] = args.provider
+        env["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'cold_start.db')}"
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+        env.setdefault("PYTHONDONTWRITEBYTECODE", "")
+
+        runs = [_run_once(env) for _ in range(args.runs)]
+
+    report = {
+        "runs": args.runs,
+        "provider": args.provider,
+        **{phase: _summary([run[phase] for run in runs]) for phase in ("import", "startup", "first_request", "total")},
+    }
+    for phase in ("import", "startup", "first_request", "total"):
+        stats = report[phase]
+        print(f"{phase:<14} p50={stats['p50_ms']:8.1f}ms p95={stats['p95_ms']:8.1f}ms max={stats['max_ms']:8.1f}ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# 생성 lease 동시성 스트레스 체크
+#
+# 여러 스레드가 같은 프로젝트에 동시에 생성 요청(lease 획득)을 보내 정확히 하나만 성공하는지,
+# 워커가 죽어 만료된 lease를 다음 요청이 회수하는지, 회수된 뒤 이전 소유자의 연장/해제가 무시되는지 확인합니다.
+# 같은 동작과 동시 POST /projects/{id}/generate(작업 하나, 종료 후 lease 해제), 대기 작업의 lease 연장은
+# back/tests/test_generation_lease.py가 매 테스트 실행마다 확인합니다. 이 스크립트는 큰 스레드 수/반복 횟수나
+# PostgreSQL에서 같은 체크를 돌릴 때 사용합니다.
+#
+# 실행 (저장소 루트에서):
+#   DATABASE_URL=sqlite:///./lease_stress.db python -m back.benchmarks.generation_lease_stress
+#   DATABASE_URL=postgresql+psycopg2://... python -m back.benchmarks.generation_lease_stress --threads 64 --rounds 50
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from ..database import Base, SessionLocal, engine
+from ..models import Project as ORMProject
+from ..services.generation_lock import (
+    acquire_generation_lease,
+    renew_generation_lease,
+    release_generation_lease,
+)
+
+
+def _race(project_id: int, threads: int) -> list:
+    """threads개의 스레드가 동시에 lease 획득을 시도하고, 획득한 토큰 목록을 반환합니다."""
+    barrier = threading.Barrier(threads)
+
+    def attempt():
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            return acquire_generation_lease(db, project_id)
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda _: attempt(), range(threads)))
+    return [token for token in results if token is not None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generation lease stress check")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    project = ORMProject(title="lease-stress")
+    db.add(project)
+    db.commit()
+    project_id = project.id
+
+    try:
+        for round_no in range(args.rounds):
+            # 1. 동시 요청 중 정확히 하나만 lease를 획득해야 함
+            winners = _race(project_id, args.threads)
+            assert len(winners) == 1, f"round {round_no}: {len(winners)} winners"
+            owner = winners[0]
+
+            # 2. 워커 crash 시뮬레이션: 해제 없이 lease 만료
+            db.query(ORMProject).filter(ORMProject.id == project_id).update({
+                ORMProject.generation_lease_expires_at: datetime.utcnow() - timedelta(seconds=1)
+            }, synchronize_session=False)
+            db.commit()
+
+            # 3. 만료된 lease는 다음 동시 요청 중 하나가 회수
+            reclaimed = _race(project_id, args.threads)
+            assert len(reclaimed) == 1, f"round {round_no}: {len(reclaimed)} reclaimers"
+            new_owner = reclaimed[0]
+
+            # 4. 이전 소유자는 더 이상 연장/해제할 수 없음
+            assert not renew_generation_lease(db, project_id, owner)
+            assert not release_generation_lease(db, project_id, owner)
+            assert renew_generation_lease(db, project_id, new_owner)
+            assert release_generation_lease(db, project_id, new_owner)
+
+        print(f"✅ {args.rounds} rounds x {args.threads} threads: exactly one lease holder per round")
+    finally:
+        db.query(ORMProject).filter(ORMProject.id == project_id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# 서버 모듈 import 시간 프로파일
+#
+# 새 파이썬 프로세스에서 `python -X importtime -c "import back.main"`을 실행하고,
+# 누적(cumulative) import 시간이 큰 모듈 순으로 보여줍니다. 콜드 스타트 회귀를 찾을 때 사용합니다.
+#
+# 실행 (저장소 루트에서):
+#   python -m back.benchmarks.import_profile --top 25
+#   python -m back.benchmarks.import_profile --module back.routers.project
+import argparse
+import os
+import subprocess
+import sys
+
+
+def profile_imports(module: str):
+    """(모듈 이름, self 마이크로초, cumulative 마이크로초, 깊이) 목록을 반환합니다."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=os.getcwd(),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # 형식: "import time:   self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip())) // 2
+            entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time profile of the API server")
+    parser.add_argument("--module", default="back.main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    entries = profile_imports(args.module)
+    total = next((cumulative for name, _, cumulative, _ in entries if name == args.module), None)
+
+    print(f"{'cumulative':>12} {'self':>10}  module")
+    for name, self_us, cumulative_us, _ in sorted(entries, key=lambda entry: -entry[2])[:args.top]:
+        print(f"{cumulative_us / 1000:10.1f}ms {self_us / 1000:8.1f}ms  {name}")
+    if total is not None:
+        print(f"\nimport {args.module}: {total / 1000:.1f}ms ({len(entries)} modules)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# 서버 측 마인드맵 배치 벤치마크 (처음부터 계산 vs 증분 계산)
+#
+# 임의의 트리형 마인드맵(여러 부모/순환 간선 일부 포함)을 만들고, 알고리즘별로
+#   1) 처음부터 계산하는 시간
+#   2) 노드 몇 개를 추가/삭제한 다음 버전을 이전 배치 기준으로 증분 계산하는 시간과 재배치 노드 수
+# 를 측정합니다. tree/radial은 항상 처음부터 계산하므로(O(노드 수)) 두 시간이 같아야 하며, recomputed는
+# 이전 버전 대비 좌표가 바뀐 노드 수입니다. 이전 배치를 넘겨도 결과가 처음부터 계산한 결과와 같은지도 확인합니다.
+#
+# 실행 (저장소 루트에서):
+#   python -m back.benchmarks.layout_bench --nodes 1000 3000 --changes 10 --runs 3
+import argparse
+import random
+import statistics
+import time
+
+
+def _graph(count: int, rng: random.Random):
+    node_ids = [f"n{index:06d}" for index in range(count)]
+    edges = [(node_ids[rng.randrange(index)], node_ids[index]) for index in range(1, count)]
+    # 마인드맵에도 가끔 있는 여러 부모 간선과 순환 간선
+    for _ in range(max(1, count // 200)):
+        edges.append((node_ids[rng.randrange(count)], node_ids[rng.randrange(1, count)]))
+    return node_ids, edges
+
+
+def _mutate(node_ids, edges, changes: int, rng: random.Random):
+    """잎 노드 changes개 추가, changes개 삭제"""
+    sources = {source for source, _ in edges}
+    leaves = [node_id for node_id in node_ids if node_id not in sources]
+    removed = set(rng.sample(leaves, min(changes, len(leaves))))
+    added = [f"new{index:04d}" for index in range(changes)]
+    new_ids = [node_id for node_id in node_ids if node_id not in removed] + added
+    new_edges = [(source, target) for source, target in edges if source not in removed and target not in removed]
+    new_edges += [(node_ids[rng.randrange(len(node_ids))], node_id) for node_id in added]
+    new_edges = [(source, target) for source, target in new_edges if source not in removed]
+    return new_ids, new_edges
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mind map layout benchmark")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1000, 3000])
+    parser.add_argument("--changes", type=int, default=10, help="증분 계산 시 추가/삭제할 노드 수")
+    parser.add_argument("--algorithms", nargs="+", default=["radial", "tree", "force"])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    from ..services.mindmap_layout import compute_layout
+
+    for count in args.nodes:
+        rng = random.Random(count)
+        node_ids, edges = _graph(count, rng)
+        new_ids, new_edges = _mutate(node_ids, edges, args.changes, rng)
+        print(f"nodes={count} (+{args.changes} / -{args.changes}):")
+        for algorithm in args.algorithms:
+            full_samples, incremental_samples = [], []
+            for _ in range(args.runs):
+                elapsed, (positions, tree, _) = _timed(lambda: compute_layout(algorithm, node_ids, edges))
+                full_samples.append(elapsed)
+                elapsed, (new_positions, new_tree, recomputed) = _timed(
+                    lambda: compute_layout(algorithm, new_ids, new_edges, positions, tree)
+                )
+                incremental_samples.append(elapsed)
+
+            note = ""
+            if algorithm != "force":
+                expected, expected_tree, _ = compute_layout(algorithm, new_ids, new_edges)
+                assert expected == new_positions and expected_tree == new_tree, f"{algorithm}: incremental layout differs"
+                note = " (same as full)"
+            print(
+                f"  {algorithm:<7} full p50={statistics.median(full_samples) * 1000:9.1f}ms  "
+                f"incremental p50={statistics.median(incremental_samples) * 1000:9.1f}ms  "
+                f"recomputed={recomputed}/{len(new_ids)}{note}"
+            )
+
+
+if __name__ == "__main__":
+    main()
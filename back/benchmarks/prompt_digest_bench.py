@@ -0,0 +1,114 @@
+# 큰 맵의 프롬프트 크기/그래프 분석 시간 벤치마크
+#
+# 트리 모양(노드마다 자식 --fanout개, 일부 교차 연결)의 맵을 만들어 다음을 측정합니다.
+#   - analytics cold: 희소 행렬 지표 계산 (services/mindmap_analytics.compute_metrics)
+#   - analytics warm: 같은 버전의 캐시 조회 (get_metrics)
+#   - 추천/증분 생성 프롬프트 길이: 맵 전체 vs 중요 노드 요약 (MINDMAP_PROMPT_NODE_BUDGET)
+#
+# 실행 (저장소 루트에서):
+#   python -m back.benchmarks.prompt_digest_bench --nodes 200 1000 5000 --runs 5
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+
+def _map(size: int, fanout: int, cross_links: float):
+    rng = random.Random(size)
+    nodes = []
+    for index in range(size):
+        node_type = "core" if index == 0 else ("major" if index <= fanout else "minor")
+        children = range(index * fanout + 1, min(index * fanout + fanout + 1, size))
+        connections = [{"target_id": f"node-{child}"} for child in children]
+        if index and rng.random() < cross_links:
+            connections.append({"target_id": f"node-{rng.randrange(size)}"})
+        nodes.append({
+            "id": f"node-{index}",
+            "node_type": node_type,
+            "title": f"주제 {index}",
+            "description": f"주제 {index}에 대한 설명입니다. 논의된 세부 사항을 정리합니다.",
+            "connections": connections,
+        })
+    return nodes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt digest benchmark")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--fanout", type=int, default=4)
+    parser.add_argument("--cross-links", type=float, default=0.05, help="노드당 교차 연결 확률")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    os.environ.setdefault("LLM_PROVIDER", "fake")
+
+    from ..config import get_settings
+    from ..services import mindmap_analytics
+    from ..services.ai_analyzer import (
+        _recommendation_request, build_map_digest, summarize_map_compact, summarize_map_digest
+    )
+    from ..services.mindmap_graph import collect_edges
+
+    chats = [
+        SimpleNamespace(id=index, user_id=1, timestamp=datetime(2025, 1, 1, 9, index % 60),
+                        content=f"주제 {index * 7}의 일정과 담당자를 정해 봅시다.")
+        for index in range(1, 21)
+    ]
+    settings = get_settings()
+    report = {"budget": settings.MINDMAP_PROMPT_NODE_BUDGET, "maps": []}
+    print(f"budget={report['budget']} fanout={args.fanout} cross_links={args.cross_links}")
+
+    for size in args.nodes:
+        nodes = _map(size, args.fanout, args.cross_links)
+        node_ids = [node["id"] for node in nodes]
+        edges = collect_edges(nodes, [])
+
+        cold = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            mindmap_analytics.compute_metrics(node_ids, edges)
+            cold.append(time.perf_counter() - started)
+        mindmap_analytics.get_metrics(size, 1, node_ids, edges)
+        warm = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            mindmap_analytics.get_metrics(size, 1, node_ids, edges)
+            warm.append(time.perf_counter() - started)
+
+        # 기준값: 예산을 없애 맵 전체를 넣은 프롬프트
+        settings.MINDMAP_PROMPT_NODE_BUDGET = 0
+        full_prompt, _ = _recommendation_request("bench", {"nodes": nodes}, chats, None)
+        settings.MINDMAP_PROMPT_NODE_BUDGET = report["budget"]
+        digest_prompt, _ = _recommendation_request("bench", {"project_id": size, "version": 1, "nodes": nodes}, chats, None)
+        ordered = [SimpleNamespace(**node) for node in nodes]
+        digest = build_map_digest(size, 1, nodes, "\n".join(chat.content for chat in chats))
+        full_summary = summarize_map_compact(ordered)
+        digest_summary = summarize_map_digest(digest) if digest else full_summary
+
+        result = {
+            "nodes": size,
+            "edges": len(edges),
+            "analytics_cold_ms": round(statistics.median(cold) * 1000, 2),
+            "analytics_warm_ms": round(statistics.median(warm) * 1000, 3),
+            "recommend_prompt_chars": [len(full_prompt), len(digest_prompt)],
+            "incremental_map_chars": [len(full_summary), len(digest_summary)],
+        }
+        report["maps"].append(result)
+        print(
+            f"  nodes={size:<6} edges={len(edges):<6} analytics cold={result['analytics_cold_ms']:8.2f}ms "
+            f"warm={result['analytics_warm_ms']:6.3f}ms | recommend prompt {len(full_prompt):>8} -> {len(digest_prompt):>6} chars "
+            f"| incremental map {len(full_summary):>7} -> {len(digest_summary):>6} chars"
+        )
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# 통합 검색 벤치마크 (FTS5 색인 vs 원본 테이블 LIKE 스캔)
+#
+# 임시 SQLite DB에 채팅 메시지를 만들고 (색인 포함, services/search_index.py), 같은 검색어로 다음을 측정합니다.
+#   - like:   chat_messages.content LIKE '%검색어%' (색인 도입 전 방식, 전체 스캔)
+#   - search: search_index.search (FTS5 + bm25 순위, 멤버 프로젝트 범위)
+# 쓰기 비용으로 색인 포함 채팅 저장 처리량도 함께 보고합니다.
+#
+# 실행 (저장소 루트에서):
+#   python -m back.benchmarks.search_bench --chats 100000 --runs 20
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 어휘: 2~4음절 임의 단어 --vocabulary개, Zipf 분포(순위 r의 빈도 ∝ 1/r)로 뽑습니다.
+# 검색어는 빈도 순위별 단어 (흔한 단어 / 중간 / 드문 단어, 두 단어 AND, 단어의 일부)
+QUERY_RANKS = {"common": [5], "mid": [300], "rare": [3000], "two_words": [20, 200], "partial": [100]}
+
+
+def _vocabulary(rng, size: int):
+    syllables = [chr(0xAC00 + rng.randrange(11172)) for _ in range(400)]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(words, key=lambda word: rng.random())
+
+
+def _report(name: str, samples):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"    {name:<7} p50={statistics.median(samples) * 1000:8.2f}ms p95={p95 * 1000:8.2f}ms")
+    return round(statistics.median(samples) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search benchmark")
+    parser.add_argument("--chats", type=int, default=100000)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--vocabulary", type=int, default=5000)
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # 설정/엔진은 처음 로드될 때 고정되므로 모듈을 임포트하기 전에 환경 변수를 지정합니다.
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'search.db')}"
+        os.environ["LLM_PROVIDER"] = "fake"
+
+        from .. import models
+        from ..database import SessionLocal
+        from ..migrate import run_migrations
+        from ..services import search_index
+
+        run_migrations()
+        db = SessionLocal()
+        db.add(models.User(id=1, name="user1", email="user1@example.com", hashed_password="x", friend_code="F000001"))
+        for project_id in range(1, args.projects + 1):
+            db.add(models.Project(id=project_id, title=f"프로젝트 {project_id}"))
+            # 사용자 1은 절반의 프로젝트에만 속합니다. (검색 범위 필터 포함)
+            if project_id % 2:
+                db.add(models.ProjectMember(project_id=project_id, user_id=1))
+        db.commit()
+
+        rng = random.Random(0)
+        vocabulary = _vocabulary(rng, args.vocabulary)
+        weights = [1.0 / rank for rank in range(1, len(vocabulary) + 1)]
+        base = datetime(2025, 1, 1)
+        started = time.perf_counter()
+        batch_size = 1000
+        for start in range(0, args.chats, batch_size):
+            rows = [
+                {
+                    "id": index + 1,
+                    "project_id": rng.randint(1, args.projects),
+                    "user_id": 1,
+                    "content": " ".join(word + rng.choice(["을", "를", "에", "", "은"])
+                                        for word in rng.choices(vocabulary, weights, k=12)),
+                    "timestamp": base + timedelta(seconds=index),
+                }
+                for index in range(start, min(start + batch_size, args.chats))
+            ]
+            db.bulk_insert_mappings(models.ChatMessage, rows)
+            search_index.upsert_documents(db, [
+                {"kind": search_index.KIND_CHAT, "ref_id": str(row["id"]), "project_id": row["project_id"],
+                 "owner_id": None, "title": None, "body": row["content"]}
+                for row in rows
+            ])
+            db.commit()
+        write_seconds = time.perf_counter() - started
+        print(f"chats={args.chats} projects={args.projects}: 저장+색인 {args.chats / write_seconds:,.0f} rows/s")
+
+        report = {"chats": args.chats, "rows_per_second": round(args.chats / write_seconds), "queries": {}}
+        queries = {
+            name: " ".join(vocabulary[rank] for rank in ranks) if name != "partial" else vocabulary[ranks[0]][:2]
+            for name, ranks in QUERY_RANKS.items()
+        }
+        for name, query in queries.items():
+            print(f"  {name} '{query}':")
+            like_samples, search_samples = [], []
+            for _ in range(args.runs):
+                begin = time.perf_counter()
+                like_query = db.query(models.ChatMessage).filter(
+                    models.ChatMessage.project_id.in_(
+                        db.query(models.ProjectMember.project_id).filter(models.ProjectMember.user_id == 1).scalar_subquery()
+                    ),
+                    *[models.ChatMessage.content.like(f"%{word}%") for word in query.split()]
+                ).order_by(models.ChatMessage.id.desc()).limit(20).all()
+                like_samples.append(time.perf_counter() - begin)
+
+                begin = time.perf_counter()
+                results, _ = search_index.search(db, 1, query, limit=20)
+                search_samples.append(time.perf_counter() - begin)
+            report["queries"][name] = {
+                "query": query,
+                "like_p50_ms": _report("like", like_samples),
+                "search_p50_ms": _report("search", search_samples),
+                "like_hits": len(like_query),
+                "search_hits": len(results),
+            }
+        db.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# 큰 목록 응답 직렬화 벤치마크 (기존 경로 vs 빠른 경로)
+#
+# 임시 SQLite DB에 큰 마인드맵/채팅/프로젝트 목록을 만들고, 엔드포인트 본문과 같은 작업을 두 경로로 측정합니다.
+#   - current: ORM 객체 조회 -> response_model 검증(from_attributes) -> JSON 모드 덤프 -> 표준 json 인코딩
+#              (FastAPI serialize_response + JSONResponse.render와 같은 단계)
+#   - fast:    컬럼 조회(services/projections.py) -> orjson 인코딩 (fast_response.dumps)
+#   - fast+gzip / fast+br: 빠른 경로 + 압축 (brotli는 패키지가 있을 때만)
+# 두 경로의 JSON 결과가 같은지도 확인합니다.
+#
+# 실행 (저장소 루트에서):
+#   python -m back.benchmarks.serialization_bench --nodes 5000 --chats 200 --projects 50 --runs 20
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+
+def _report(name: str, samples, size: int):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(
+        f"  {name:<12} mean={statistics.mean(samples) * 1000:8.2f}ms "
+        f"p50={statistics.median(samples) * 1000:8.2f}ms p95={p95 * 1000:8.2f}ms  body={size / 1024:9.1f}KB"
+    )
+    return statistics.median(samples)
+
+
+def _measure(runs: int, func):
+    samples, body = [], b""
+    for _ in range(runs):
+        started = time.perf_counter()
+        body = func()
+        samples.append(time.perf_counter() - started)
+    return samples, body
+
+
+def _seed(db, models, args):
+    base = datetime(2025, 1, 1, 9, 0)
+    users = [
+        models.User(id=index, name=f"user{index}", email=f"user{index}@example.com",
+                    hashed_password="x", friend_code=f"F{index:06d}")
+        for index in range(1, 6)
+    ]
+    db.add_all(users)
+    for project_id in range(1, args.projects + 1):
+        db.add(models.Project(id=project_id, title=f"프로젝트 {project_id}", created_at=base + timedelta(hours=project_id)))
+        for user in users:
+            db.add(models.ProjectMember(project_id=project_id, user_id=user.id, is_admin=user.id == 1))
+    db.flush()
+
+    # 프로젝트 1: 큰 마인드맵 (트리, 노드마다 자식 연결)과 채팅
+    db.bulk_insert_mappings(models.MindMapNode, [
+        {
+            "id": f"p1_node{index:06d}",
+            "project_id": 1,
+            "node_type": "core" if index == 0 else ("major" if index < 20 else "minor"),
+            "title": f"노드 {index} 제목",
+            "description": f"노드 {index}에 대한 설명입니다. " * 4,
+            "connections": [
+                {"target_id": f"p1_node{child:06d}"}
+                for child in range(index * 3 + 1, min(index * 3 + 4, args.nodes))
+            ],
+            "version": 1,
+        }
+        for index in range(args.nodes)
+    ])
+    db.bulk_insert_mappings(models.ChatMessage, [
+        {
+            "project_id": 1,
+            "user_id": (index % 5) + 1,
+            "content": f"API 설계와 배포 일정에 대해 논의합시다. 메시지 #{index}",
+            "timestamp": base + timedelta(seconds=index, microseconds=index * 7),
+        }
+        for index in range(args.chats)
+    ])
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Large list response serialization benchmark")
+    parser.add_argument("--nodes", type=int, default=5000)
+    parser.add_argument("--chats", type=int, default=200, help="채팅 메시지 수 (응답은 최대 200개)")
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--json", default=None, help="결과를 저장할 JSON 파일 경로")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # 설정/엔진은 처음 로드될 때 고정되므로 모듈을 임포트하기 전에 환경 변수를 지정합니다.
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'serialization.db')}"
+        os.environ["LLM_PROVIDER"] = "fake"
+
+        from pydantic import TypeAdapter
+        from sqlalchemy import desc
+        from sqlalchemy.orm import joinedload
+
+        from .. import models
+        from ..database import SessionLocal
+        from ..fast_response import brotli, compress, dumps
+        from ..migrate import run_migrations
+        from ..schemas import ChatMessage, MindMapNode, Project
+        from ..services import projections
+
+        run_migrations()
+        db = SessionLocal()
+        _seed(db, models, args)
+
+        def current(schema, load):
+            adapter = TypeAdapter(List[schema])
+
+            def run():
+                db.expunge_all()
+                value = adapter.validate_python(load(), from_attributes=True)
+                content = adapter.dump_python(value, mode="json")
+                return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+            return run
+
+        def fast(load):
+            def run():
+                return dumps(load())
+            return run
+
+        chat_limit = min(args.chats, 200)
+        cases = {
+            "mindmap": (
+                current(MindMapNode, lambda: db.query(models.MindMapNode).filter(models.MindMapNode.project_id == 1).all()),
+                fast(lambda: projections.mindmap_node_rows(db, 1)),
+            ),
+            "chat": (
+                current(ChatMessage, lambda: db.query(models.ChatMessage).filter(models.ChatMessage.project_id == 1)
+                        .order_by(desc(models.ChatMessage.id)).limit(chat_limit).all()),
+                fast(lambda: projections.chat_message_rows(
+                    db.query(models.ChatMessage).filter(models.ChatMessage.project_id == 1)
+                    .order_by(desc(models.ChatMessage.id)).limit(chat_limit))),
+            ),
+            "projects": (
+                current(Project, lambda: db.query(models.Project).join(models.ProjectMember).filter(
+                    models.ProjectMember.user_id == 1
+                ).order_by(desc(models.Project.created_at)).options(
+                    joinedload(models.Project.members).joinedload(models.ProjectMember.user)
+                ).all()),
+                fast(lambda: projections.project_rows(db, 1)),
+            ),
+        }
+
+        report = {"nodes": args.nodes, "chats": chat_limit, "projects": args.projects, "runs": args.runs}
+        for name, (current_run, fast_run) in cases.items():
+            print(f"{name}:")
+            current_samples, current_body = _measure(args.runs, current_run)
+            fast_samples, fast_body = _measure(args.runs, fast_run)
+            assert json.loads(current_body) == json.loads(fast_body), f"{name}: fast path output differs"
+
+            result = {
+                "current_p50_ms": round(_report("current", current_samples, len(current_body)) * 1000, 2),
+                "fast_p50_ms": round(_report("fast", fast_samples, len(fast_body)) * 1000, 2),
+                "body_bytes": len(fast_body),
+            }
+            for encoding in (["gzip", "br"] if brotli is not None else ["gzip"]):
+                samples, body = _measure(args.runs, lambda: compress(fast_run(), encoding))
+                result[f"fast_{encoding}_p50_ms"] = round(_report(f"fast+{encoding}", samples, len(body)) * 1000, 2)
+                result[f"{encoding}_bytes"] = len(body)
+            result["speedup"] = round(result["current_p50_ms"] / max(result["fast_p50_ms"], 1e-6), 2)
+            print(f"  speedup x{result['speedup']}")
+            report[name] = result
+
+        db.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
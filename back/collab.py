@@ -0,0 +1,391 @@
+"""
+프로젝트 웹소켓 공동 편집 (노드 단위 op).
+
+클라이언트는 프로젝트 웹소켓으로 세밀한 노드 편집 op(제목/설명/유형 변경, 연결 추가/삭제)를 보냅니다.
+서버는 프로젝트별로
+1) op에 순번(seq)을 매겨 순서를 정하고,
+2) 메모리의 작업 사본(working copy)에 적용한 뒤,
+3) 프로젝트 룸에 seq와 함께 브로드캐스트하고,
+4) 바뀐 필드를 모아 주기적으로(또는 op가 많이 쌓이면) 한 트랜잭션으로 저장합니다. (mindmap_store.patch_nodes)
+
+모든 클라이언트가 seq 순서대로 op를 적용하면 같은 상태로 수렴합니다.
+(set_* op는 결과 값을 담고 있어 마지막 op가 이기고, 연결 추가/삭제는 멱등입니다.)
+seq가 건너뛰면(전송 큐 초과 등) sync_request로 놓친 op를 다시 받거나, 로그 범위를 벗어났으면 전체를 다시 조회합니다.
+
+저장 시 노드 버전(낙관적 동시성)으로 REST 수정이나 AI 생성과의 충돌을 감지하며, 충돌한 노드는 DB 값을 다시 읽어
+아직 저장되지 않은 편집 필드만 그 위에 덮어쓴 뒤 node_sync 이벤트로 알리고 다음 주기에 다시 저장합니다.
+
+작업 사본과 seq는 프로세스(워커)별입니다. 그래서 seq는 스트림(stream, 인스턴스와 세션마다 고유한 ID)과 함께 보냅니다.
+브로커를 통해 다른 인스턴스의 op도 받지만, seq 순서/누락 검사와 sync_request 재전송은 collab_hello로 받은
+자신이 접속한 스트림의 이벤트에만 적용됩니다. (다른 스트림의 이벤트는 받은 순서대로 적용)
+sync_request의 stream이 현재 스트림과 다르면(세션이 비워진 뒤 다시 만들어짐 등) 전체를 다시 조회해야 합니다.
+인스턴스 간 충돌은 위의 노드 버전 검사와 node_sync로 수렴합니다.
+
+프로젝트 룸에 이 인스턴스의 연결이 남아 있지 않고 저장할 변경도 없으면 세션을 제거합니다.
+"""
+import asyncio
+import copy
+import itertools
+import json
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from pydantic import ValidationError
+
+from .config import get_settings
+from .database import SessionLocal
+from .models import Project as ORMProject, MindMapNode as ORMMindMapNode
+from .realtime import Connection, manager, project_room
+from .schemas import CollabSyncRequest, MindMapNodeOperation, MindMapNodePatch
+from .services.mindmap_history import record_version, SOURCE_EDIT
+from .services.mindmap_store import node_row, patch_nodes
+
+# op -> 바뀌는 노드 필드
+OP_FIELDS = {
+    "set_title": "title",
+    "set_description": "description",
+    "set_node_type": "node_type",
+    "add_connection": "connections",
+    "remove_connection": "connections",
+}
+
+
+# 이 프로세스의 ID와 세션 번호: 스트림 ID = "{프로세스 ID}-{세션 번호}"
+_INSTANCE_ID = uuid.uuid4().hex[:12]
+_session_numbers = itertools.count(1)
+
+
+class CollabError(Exception):
+    """op를 적용할 수 없는 경우 (reason은 클라이언트에 그대로 전달)"""
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _load_nodes(project_id: int, node_ids: List[str]) -> Dict[str, Tuple[Dict[str, Any], int]]:
+    """DB에서 노드 내용과 버전을 읽습니다. (스레드에서 실행)"""
+    db = SessionLocal()
+    try:
+        return {
+            node.id: (node_row(node), node.version or 1)
+            for node in db.query(ORMMindMapNode).filter(
+                ORMMindMapNode.project_id == project_id,
+                ORMMindMapNode.id.in_(node_ids)
+            )
+        }
+    finally:
+        db.close()
+
+
+def _persist_batch(
+    project_id: int,
+    batch: Dict[str, Tuple[int, Dict[str, Any]]],
+    editors: Set[int]
+) -> Optional[Tuple[List[str], List[Dict[str, Any]], Dict[str, Tuple[Dict[str, Any], int]], Optional[int]]]:
+    """
+    모은 편집을 한 트랜잭션으로 저장합니다. (스레드에서 실행)
+    생성 중이면 저장하지 않고 None을 반환합니다. (생성이 끝난 뒤 다시 시도)
+    반환: (저장된 노드 ID, 충돌 목록, 버전 충돌 노드의 현재 DB 값, 마인드맵 버전)
+    """
+    db = SessionLocal()
+    try:
+        db_project = db.query(ORMProject).filter(ORMProject.id == project_id).first()
+        if db_project is None:
+            return [], [{"id": node_id, "reason": "not_found"} for node_id in batch], {}, None
+        if db_project.is_generating:
+            return None
+
+        patches = [
+            MindMapNodePatch(id=node_id, version=version, **fields)
+            for node_id, (version, fields) in batch.items()
+        ]
+        updated_ids, conflicts, diff = patch_nodes(db, project_id, patches)
+        version = record_version(
+            db, project_id, diff, SOURCE_EDIT,
+            user_id=next(iter(editors)) if len(editors) == 1 else None
+        )
+        db.commit()
+
+        conflict_ids = [conflict["id"] for conflict in conflicts if conflict["reason"] == "version_mismatch"]
+        current = _load_nodes(project_id, conflict_ids) if conflict_ids else {}
+        return updated_ids, conflicts, current, version
+    finally:
+        db.close()
+
+
+class ProjectCollabSession:
+    """한 프로젝트의 op 순서, 작업 사본, 저장 대기 중인 변경을 관리합니다."""
+    def __init__(self, project_id: int, flush_seconds: float, flush_max_ops: int, log_size: int):
+        self.project_id = project_id
+        self.flush_seconds = flush_seconds
+        self.flush_max_ops = flush_max_ops
+
+        # seq는 이 스트림 안에서만 순서를 가집니다. (인스턴스별, 세션을 다시 만들면 새 스트림)
+        self.stream = f"{_INSTANCE_ID}-{next(_session_numbers)}"
+        self.seq = 0
+        # 작업 사본: 편집 중인 노드만 필요할 때 DB에서 읽어 둡니다. (모두 저장되면 비워서 다음 편집 때 새로 읽음)
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.versions: Dict[str, int] = {}
+        # 저장 대기 중인 노드별 변경 필드
+        self.dirty: Dict[str, Set[str]] = {}
+        self.editors: Set[int] = set()
+        self.pending_ops = 0
+        # 재전송용 최근 이벤트 (seq 오름차순)
+        self.log: Deque[Dict[str, Any]] = deque(maxlen=log_size)
+
+        self._lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        # 저장 후 대기 중인 변경이 없을 때 호출 (CollabManager가 세션 제거 여부를 판단)
+        self.on_idle: Optional[Callable[["ProjectCollabSession"], None]] = None
+
+    async def _ensure_loaded(self, node_ids: List[str]):
+        missing = [node_id for node_id in dict.fromkeys(node_ids) if node_id and node_id not in self.nodes]
+        if not missing:
+            return
+        for node_id, (row, version) in (await asyncio.to_thread(_load_nodes, self.project_id, missing)).items():
+            self.nodes[node_id] = row
+            self.versions[node_id] = version
+
+    async def _emit(self, event: Dict[str, Any]):
+        """seq를 매겨 로그에 남기고 프로젝트 룸에 발행합니다. (self._lock 안에서 호출)"""
+        self.seq += 1
+        event = {**event, "project_id": self.project_id, "stream": self.stream, "seq": self.seq}
+        self.log.append(event)
+        await manager.publish(project_room(self.project_id), event)
+        return event
+
+    async def apply(self, op: MindMapNodeOperation, user_id: int) -> Dict[str, Any]:
+        """op를 작업 사본에 적용하고 브로드캐스트합니다. 적용할 수 없으면 CollabError를 발생시킵니다."""
+        field = OP_FIELDS[op.op]
+        if op.op in ("add_connection", "remove_connection"):
+            if not op.target_id:
+                raise CollabError("target_required")
+        elif op.op in ("set_title", "set_node_type") and not op.value:
+            raise CollabError("value_required")
+
+        async with self._lock:
+            await self._ensure_loaded([op.node_id, op.target_id if op.op == "add_connection" else None])
+            row = self.nodes.get(op.node_id)
+            if row is None:
+                raise CollabError("node_not_found")
+
+            if op.op == "add_connection":
+                if op.target_id == op.node_id:
+                    raise CollabError("invalid_target")
+                if op.target_id not in self.nodes:
+                    raise CollabError("target_not_found")
+                if all(conn["target_id"] != op.target_id for conn in row["connections"]):
+                    row["connections"] = row["connections"] + [{"target_id": op.target_id}]
+            elif op.op == "remove_connection":
+                row["connections"] = [conn for conn in row["connections"] if conn["target_id"] != op.target_id]
+            else:
+                # 설명은 빈 문자열로 지울 수 있습니다. (None은 일괄 수정에서 "변경 없음"을 뜻함)
+                row[field] = op.value if op.value is not None else ""
+
+            self.dirty.setdefault(op.node_id, set()).add(field)
+            self.editors.add(user_id)
+            self.pending_ops += 1
+
+            event = await self._emit({
+                "type": "node_op",
+                "op_id": op.op_id,
+                "user_id": user_id,
+                "node_id": op.node_id,
+                "op": op.op,
+                "value": op.value,
+                "target_id": op.target_id,
+            })
+
+        self._schedule_flush()
+        return event
+
+    def replay_since(self, since_seq: int) -> Optional[List[Dict[str, Any]]]:
+        """since_seq 이후의 이벤트를 반환합니다. 로그 범위를 벗어났으면 None (전체 재조회 필요)"""
+        if since_seq >= self.seq:
+            return []
+        if not self.log or self.log[0]["seq"] > since_seq + 1:
+            return None
+        return [event for event in self.log if event["seq"] > since_seq]
+
+    def _schedule_flush(self):
+        if self.pending_ops >= self.flush_max_ops:
+            asyncio.create_task(self.flush())
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_seconds)
+        await self.flush()
+
+    def _mark_dirty(self, node_id: str, fields: Set[str]):
+        if node_id in self.nodes:
+            self.dirty.setdefault(node_id, set()).update(fields)
+
+    async def flush(self):
+        """저장 대기 중인 변경을 한 트랜잭션으로 저장합니다."""
+        async with self._flush_lock:
+            async with self._lock:
+                if not self.dirty:
+                    return
+                batch = {
+                    node_id: (self.versions[node_id], {field: copy.deepcopy(self.nodes[node_id][field]) for field in fields})
+                    for node_id, fields in self.dirty.items()
+                }
+                editors = self.editors
+                self.dirty, self.editors, self.pending_ops = {}, set(), 0
+
+            try:
+                result = await asyncio.to_thread(_persist_batch, self.project_id, batch, editors)
+            except Exception as e:
+                print(f"🚨 Project {self.project_id} 공동 편집 저장 오류: {e}")
+                result = None
+
+            async with self._lock:
+                if result is None:
+                    # 생성 중이거나 오류: 다음 주기에 다시 저장
+                    for node_id, (_, fields) in batch.items():
+                        self._mark_dirty(node_id, set(fields))
+                    self.editors |= editors
+                else:
+                    await self._apply_flush_result(batch, *result)
+
+                if not self.dirty:
+                    # 모두 저장되었으면 작업 사본을 비워 다음 편집 때 최신 DB 값을 읽도록 합니다.
+                    self.nodes, self.versions = {}, {}
+
+            if self.dirty:
+                # 충돌/재시도 대상이나 저장 중에 들어온 op: 다음 주기에 저장
+                # (지금 실행 중인 작업이 _flush_task일 수 있으므로 _schedule_flush 대신 새 작업을 만듭니다.)
+                self._flush_task = asyncio.create_task(self._flush_later())
+            elif self.on_idle is not None:
+                self.on_idle(self)
+
+    async def _apply_flush_result(self, batch, updated_ids, conflicts, current, version):
+        for node_id in updated_ids:
+            if node_id in self.versions:
+                self.versions[node_id] += 1
+
+        removed_ids, synced_rows = [], []
+        for conflict in conflicts:
+            node_id = conflict["id"]
+            if node_id not in current:
+                # 다른 곳(AI 재생성 등)에서 삭제된 노드
+                self.nodes.pop(node_id, None)
+                self.versions.pop(node_id, None)
+                self.dirty.pop(node_id, None)
+                removed_ids.append(node_id)
+                continue
+
+            # DB의 최신 값 위에 아직 저장되지 않은 편집 필드만 덮어쓰고 다음 주기에 다시 저장합니다.
+            db_row, db_version = current[node_id]
+            fields = set(batch[node_id][1]) | self.dirty.get(node_id, set())
+            merged = {**db_row, **{field: self.nodes[node_id][field] for field in fields}}
+            self.nodes[node_id] = merged
+            self.versions[node_id] = db_version
+            self.dirty[node_id] = fields
+            synced_rows.append(merged)
+
+        if removed_ids or synced_rows:
+            await self._emit({"type": "node_sync", "nodes": synced_rows, "removed_node_ids": removed_ids})
+        if version is not None:
+            await manager.publish(project_room(self.project_id), {
+                "type": "collab_saved", "project_id": self.project_id, "stream": self.stream, "seq": self.seq, "version": version
+            })
+
+
+class CollabManager:
+    """프로젝트별 공동 편집 세션과 웹소켓 메시지 처리"""
+    def __init__(self, flush_seconds: float = 1.0, flush_max_ops: int = 200, log_size: int = 500):
+        self.flush_seconds = flush_seconds
+        self.flush_max_ops = flush_max_ops
+        self.log_size = log_size
+        self.sessions: Dict[int, ProjectCollabSession] = {}
+
+    def session(self, project_id: int) -> ProjectCollabSession:
+        session = self.sessions.get(project_id)
+        if session is None:
+            session = ProjectCollabSession(project_id, self.flush_seconds, self.flush_max_ops, self.log_size)
+            session.on_idle = self._evict_if_idle
+            self.sessions[project_id] = session
+        return session
+
+    def hello(self, connection: Connection, project_id: int):
+        """연결 직후 현재 스트림과 seq를 알려줍니다. (이후 이 스트림의 이벤트는 seq+1부터)"""
+        session = self.session(project_id)
+        connection.enqueue(json.dumps({
+            "type": "collab_hello", "project_id": project_id, "stream": session.stream, "seq": session.seq
+        }))
+
+    def _evict_if_idle(self, session: ProjectCollabSession):
+        """저장할 변경이 없고 이 인스턴스에 프로젝트 룸 연결이 없으면 세션(작업 사본, op 로그)을 제거합니다."""
+        if session.dirty or manager.rooms.get(project_room(session.project_id)):
+            return
+        if self.sessions.get(session.project_id) is session:
+            del self.sessions[session.project_id]
+
+    def release(self, project_id: int):
+        """프로젝트 웹소켓 연결이 끊긴 뒤 호출합니다. 마지막 연결이었다면 남은 편집을 저장한 뒤 세션을 제거합니다."""
+        session = self.sessions.get(project_id)
+        if session is None:
+            return
+        if session.dirty:
+            # 저장이 끝나면 on_idle에서 다시 확인합니다.
+            asyncio.create_task(session.flush())
+        else:
+            self._evict_if_idle(session)
+
+    async def handle_message(self, connection: Connection, project_id: int, user_id: int, text: str):
+        """프로젝트 웹소켓으로 받은 클라이언트 메시지를 처리합니다. 응답은 보낸 연결에만 전송합니다."""
+        try:
+            message = json.loads(text)
+            message_type = message.get("type")
+        except (ValueError, AttributeError):
+            connection.enqueue(json.dumps({"type": "collab_error", "reason": "invalid_message"}))
+            return
+
+        session = self.session(project_id)
+        if message_type == "node_op":
+            try:
+                await session.apply(MindMapNodeOperation.model_validate(message), user_id)
+            except ValidationError:
+                connection.enqueue(json.dumps({"type": "node_op_rejected", "op_id": message.get("op_id"), "reason": "invalid_op"}))
+            except CollabError as e:
+                connection.enqueue(json.dumps({"type": "node_op_rejected", "op_id": message.get("op_id"), "reason": e.reason}))
+
+        elif message_type == "sync_request":
+            try:
+                request = CollabSyncRequest.model_validate(message)
+            except ValidationError:
+                connection.enqueue(json.dumps({"type": "collab_error", "reason": "invalid_sync_request"}))
+                return
+
+            # 다른 스트림(다른 인스턴스나 이전 세션)의 seq는 이 세션의 로그로 재전송할 수 없습니다.
+            same_stream = request.stream is None or request.stream == session.stream
+            events = session.replay_since(request.since_seq) if same_stream else None
+            if events is None:
+                # 로그 범위를 벗어남: 저장을 마친 뒤 현재 seq를 알려주면 클라이언트가 GET /mindmap으로 다시 조회합니다.
+                await session.flush()
+                connection.enqueue(json.dumps({
+                    "type": "collab_resync_required", "project_id": project_id, "stream": session.stream, "seq": session.seq
+                }))
+            else:
+                for event in events:
+                    connection.enqueue(json.dumps(event))
+
+    async def flush_all(self):
+        """앱 종료 시 저장 대기 중인 편집을 모두 저장합니다."""
+        for session in list(self.sessions.values()):
+            try:
+                await session.flush()
+            except Exception as e:
+                print(f"🚨 Project {session.project_id} 공동 편집 저장 오류: {e}")
+
+
+_settings = get_settings()
+collab = CollabManager(
+    flush_seconds=_settings.COLLAB_FLUSH_SECONDS,
+    flush_max_ops=_settings.COLLAB_FLUSH_MAX_OPS,
+    log_size=_settings.COLLAB_OP_LOG_SIZE,
+)
@@ -24,6 +24,83 @@ class Settings(BaseSettings):
     GCP_PROJECT_ID: str = ""
     GCP_REGION: str = "us-central1"
     GCP_CREDENTIALS_JSON: str = ""
+
+    # 웹소켓 전송 큐 설정 (연결별 최대 대기 메시지 수, 큐 초과 정책, 전송 타임아웃)
+    WS_SEND_QUEUE_SIZE: int = 100
+    WS_OVERFLOW_POLICY: str = "drop_oldest" # drop_oldest | coalesce | disconnect
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
+
+    # 실시간 이벤트 브로커 (memory | postgres | redis | fakeredis). 여러 워커/인스턴스 운영 시 postgres 또는 redis 사용
+    REALTIME_BROKER: str = "memory"
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # 접속 상태(presence) 전달: 변경 사항을 모아 보내는 주기와 친구 목록 캐시 유효 시간
+    PRESENCE_TICK_SECONDS: float = 0.5
+    FRIEND_CACHE_TTL_SECONDS: float = 60.0
+    # 노드마다 상태 소켓이 열린 사용자 목록을 다른 노드에 다시 알리는 주기 (3주기 동안 소식이 없는 노드의 목록은 버림)
+    PRESENCE_SYNC_SECONDS: float = 30.0
+    # 프로젝트 웹소켓 공동 편집 (collab.py): 작업 사본의 변경을 모아 저장하는 주기/최대 대기 op 수, 재전송용 op 로그 크기
+    COLLAB_FLUSH_SECONDS: float = 1.0
+    COLLAB_FLUSH_MAX_OPS: int = 200
+    COLLAB_OP_LOG_SIZE: int = 500
+
+    # 큰 목록 응답(fast_response.py): 이 크기(bytes) 이상이면 압축하고, gzip 레벨/brotli 품질은 속도 위주로 설정
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 5
+    RESPONSE_BROTLI_QUALITY: int = 4
+
+    # 마인드맵 생성 작업 전용 워커 수 (요청 스레드풀과 분리)
+    GENERATION_WORKERS: int = 4
+    # 생성 lease 유효 시간. 작업 중에는 heartbeat로 갱신되고, 작업이 죽으면 이 시간 후 다른 요청이 회수합니다.
+    GENERATION_LEASE_SECONDS: int = 60
+    # 생성 중 완성된 노드를 프로젝트 웹소켓(mindmap_node 이벤트)으로 바로 전달 (모델 스트리밍 API 사용)
+    GENERATION_STREAM_NODES: bool = True
+    # 그래프 조회(하위 트리/조상/탐색) API의 최대 깊이 (순환이 있는 맵에서도 재귀 CTE가 끝나도록 제한)
+    MINDMAP_MAX_TRAVERSAL_DEPTH: int = 32
+    # 버전 이력: 이 간격(버전 수)마다 전체 스냅샷을 저장하고, 그 사이에는 변경 사항(delta)만 저장합니다.
+    MINDMAP_SNAPSHOT_INTERVAL: int = 20
+    # 서버 측 배치(레이아웃): 알고리즘별로 최근 몇 개 버전의 좌표를 보관할지, force 배치 반복 횟수(처음/증분)
+    MINDMAP_LAYOUT_KEEP_VERSIONS: int = 5
+    MINDMAP_LAYOUT_FORCE_ITERATIONS: int = 60
+    MINDMAP_LAYOUT_FORCE_REFINE_ITERATIONS: int = 20
+    # 생성 작업이 끝나면 기본 알고리즘 배치를 미리 계산합니다. (빈 값이면 요청 시에만 계산)
+    MINDMAP_LAYOUT_PRECOMPUTE: str = "radial"
+    # AI 프롬프트용 그래프 분석 (services/mindmap_analytics.py): 버전별 지표 캐시 크기, 매개 중심성 표본 출발 노드 수 (0이면 전체)
+    MINDMAP_ANALYTICS_CACHE_SIZE: int = 128
+    MINDMAP_ANALYTICS_BETWEENNESS_SAMPLES: int = 64
+    # 프롬프트에 자세히 넣을 최대 노드 수 (맵이 더 크면 나머지는 가까운 중요 노드 아래에 묶어 요약)와 요약 그룹당 나열할 제목 수
+    MINDMAP_PROMPT_NODE_BUDGET: int = 60
+    MINDMAP_PROMPT_GROUP_TITLES: int = 5
+
+    # 통합 검색 (services/search_index.py): PostgreSQL에서 pg_trgm 제목 유사도 사용 여부, 결과 미리보기 길이(글자)
+    SEARCH_PG_TRIGRAM: bool = True
+    SEARCH_SNIPPET_CHARS: int = 120
+
+    # LLM 제공자 (vertex | fake | record | replay, services/llm_provider.py)
+    LLM_PROVIDER: str = "vertex"
+    LLM_MODEL: str = "gemini-2.5-flash"
+    # 프로세스 전체 동시 LLM 호출 수 제한과 비동기 호출 타임아웃(초, 슬롯 대기 시간 포함)
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    # fake 제공자: 응답 지연 시간, 마인드맵 노드 수, 텍스트 응답 길이
+    LLM_FAKE_LATENCY_SECONDS: float = 0.0
+    LLM_FAKE_NODE_COUNT: int = 12
+    LLM_FAKE_TEXT_CHARS: int = 400
+    # record/replay 제공자가 응답을 저장하는 디렉토리
+    LLM_RECORDINGS_DIR: str = "llm_recordings"
+
+    # LLM 응답 캐시: 동일한 입력(모델/설정/프롬프트 버전/채팅 범위/노드 집합)이면 모델을 다시 호출하지 않습니다.
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 256
+    LLM_CACHE_TTL_SECONDS: int = 3600
+    LLM_CACHE_PERSISTENT: bool = False # True이면 DB(llm_cache_entries)에도 저장하여 재시작/인스턴스 간 공유
+
+    # 시작(startup) 설정: 테이블 생성은 기본적으로 마이그레이션 단계(python -m back.migrate)에서만 수행합니다.
+    DB_AUTO_CREATE_TABLES: bool = False
+    # True이면 시작 직후 백그라운드에서 Vertex AI 클라이언트를 미리 초기화합니다. (첫 AI 요청 지연 감소)
+    WARMUP_LLM: bool = False
+    # 운영 지표 디버그 엔드포인트(/debug-realtime, /debug-llm-cache, /debug-llm-limiter) 노출 여부. 꺼져 있으면 404
+    DEBUG_ENDPOINTS_ENABLED: bool = False
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -31,8 +108,33 @@ class Settings(BaseSettings):
         case_sensitive=False
     )
 
+_gcp_credentials_path = None
+_gcp_credentials_checked = False
+
+
 def setup_gcp_credentials():
-    """GCP 인증 파일 설정"""
+    """
+    GCP 인증 파일 설정.
+    import 시점이 아니라 Vertex AI를 처음 사용할 때(또는 시작 후 warm-up에서) 호출되며, 여러 번 호출해도 한 번만 수행합니다.
+    """
+    global _gcp_credentials_path, _gcp_credentials_checked
+    if _gcp_credentials_checked:
+        return _gcp_credentials_path
+    _gcp_credentials_checked = True
+    _gcp_credentials_path = _setup_gcp_credentials()
+    return _gcp_credentials_path
+
+
+def gcp_credentials_configured() -> bool:
+    """파일을 만들지 않고 GCP 인증 정보가 설정되어 있는지만 확인합니다."""
+    return bool(
+        os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+        or os.getenv("GCP_CREDENTIALS_JSON")
+        or os.path.exists("gcp-key.json")
+    )
+
+
+def _setup_gcp_credentials():
     gcp_creds_json = os.getenv("GCP_CREDENTIALS_JSON")
     
     if gcp_creds_json:
@@ -65,9 +167,6 @@ def get_settings() -> Settings:
     """
     Settings 객체를 한 번만 생성하고 캐시하여 애플리케이션 전반에서 효율적으로 사용합니다.
     """
-    # GCP 인증 설정
-    setup_gcp_credentials()
-    
     settings = Settings()
     
     # 개발 환경에서 경고 출력
@@ -38,42 +38,39 @@ DATABASE_URL = get_database_url()
 print(f"🔌 Database URL configured: {DATABASE_URL.split('@')[-1] if '@' in DATABASE_URL else 'SQLite'}")
 
 # 2. SQLAlchemy Engine 생성
-try:
-    # SQLite인 경우 추가 설정 필요
-    connect_args = {}
-    engine_args = {
-        "pool_pre_ping": True,
-    }
-    
-    if DATABASE_URL.startswith("sqlite"):
-        connect_args = {"check_same_thread": False}
-        print("⚠️  SQLite mode - for development only!")
-    else:
-        # PostgreSQL/MySQL인 경우 풀 설정
-        engine_args.update({
-            "pool_size": 20,
-            "max_overflow": 30
-        })
-    
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args=connect_args,
-        **engine_args
-    )
-    
-    # 연결 테스트
-    with engine.connect() as conn:
-        print("✅ Database connection successful!")
-        
-except Exception as e:
-    print(f"❌ Database connection failed: {e}")
-    print("⚠️  Application will start but database features may not work.")
-    # 기본 SQLite 엔진으로 폴백
-    DATABASE_URL = "sqlite:///./mindmap.db"
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
+# 💡 엔진 생성은 실제로 연결하지 않습니다. 연결 확인은 시작 후 warm-up(check_database_connection)에서 수행하여
+#    import 시점(콜드 스타트)에 DB 왕복이 생기지 않도록 합니다.
+connect_args = {}
+engine_args = {
+    "pool_pre_ping": True,
+}
+
+if DATABASE_URL.startswith("sqlite"):
+    connect_args = {"check_same_thread": False}
+    print("⚠️  SQLite mode - for development only!")
+else:
+    # PostgreSQL/MySQL인 경우 풀 설정
+    engine_args.update({
+        "pool_size": 20,
+        "max_overflow": 30
+    })
+
+engine = create_engine(
+    DATABASE_URL,
+    connect_args=connect_args,
+    **engine_args
+)
+
+
+def check_database_connection() -> bool:
+    """DB 연결을 확인합니다. (시작 warm-up, 헬스체크용)"""
+    try:
+        with engine.connect():
+            print("✅ Database connection successful!")
+            return True
+    except Exception as e:
+        print(f"❌ Database connection failed: {e}")
+        return False
 
 # 3. 데이터베이스 세션 클래스 생성
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -7,6 +7,7 @@ from .security import oauth2_scheme, verify_token, credentials_exception
 # DB 및 모델 관련 임포트
 from .database import get_db 
 from .models import User 
+from .config import get_settings
 # TokenData는 verify_token의 반환 타입으로 사용되므로, 직접 임포트할 필요는 없습니다.
 
 
@@ -54,3 +55,12 @@ def get_current_active_user(
     #     )
         
     return current_user
+
+
+def require_debug_endpoints() -> None:
+    """
+    디버그(운영 지표) 엔드포인트 보호용 의존성 함수입니다.
+    DEBUG_ENDPOINTS_ENABLED 설정이 켜져 있지 않으면 엔드포인트가 없는 것처럼 404를 반환합니다.
+    """
+    if not get_settings().DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
@@ -0,0 +1,108 @@
+"""
+큰 목록 응답을 위한 빠른 직렬화 경로
+
+response_model이 있는 엔드포인트가 ORM 객체 목록을 반환하면 FastAPI는 객체마다 Pydantic 검증(from_attributes)을 거친 뒤
+표준 json으로 인코딩합니다. 노드가 수천 개인 마인드맵이나 긴 채팅에서는 이 과정이 CPU 시간의 대부분을 차지합니다.
+
+서버가 직접 만든(신뢰할 수 있는) 데이터는 검증이 필요 없으므로,
+1) 필요한 컬럼만 조회한 dict 행(services/projections.py)을
+2) orjson으로 바로 bytes로 인코딩하고
+3) 응답이 크면 클라이언트가 허용하는 방식(br > gzip)으로 압축하여 반환합니다.
+response_model은 OpenAPI 문서용으로 그대로 두며, 반환하는 dict의 모양은 해당 스키마의 출력과 같아야 합니다.
+
+orjson이 없으면 표준 json으로, brotli 패키지가 없으면 gzip으로 대체합니다.
+"""
+import gzip
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+from .config import get_settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - requirements.txt에 포함
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 압축 시 ETag 뒤에 붙이는 접미사 (인코딩이 다르면 강한 ETag도 달라야 함, services/project_versions.py에서 비교 시 제거)
+ENCODING_ETAG_SUFFIXES = {"br": "+br", "gzip": "+gzip"}
+
+
+def _default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes로 인코딩합니다. (datetime은 Pydantic과 같은 ISO 8601 형식)"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _accepted_encodings(request: Request) -> Dict[str, float]:
+    """Accept-Encoding 헤더를 {인코딩: q} 로 파싱합니다."""
+    accepted = {}
+    for part in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(request: Request) -> Optional[str]:
+    """클라이언트가 허용하는 압축 방식 (br > gzip, 불가능하면 None)"""
+    accepted = _accepted_encodings(request)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    settings = get_settings()
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+
+
+def fast_json_response(
+    request: Request,
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    검증 없이 content를 인코딩하여 응답합니다. (content는 JSON으로 바로 인코딩 가능한 dict/list여야 함)
+    RESPONSE_COMPRESSION_MIN_BYTES 이상이면 압축하며, 압축한 응답의 ETag에는 인코딩 접미사를 붙입니다.
+    """
+    body = dumps(content)
+    headers = dict(headers or {})
+
+    encoding = choose_encoding(request) if len(body) >= get_settings().RESPONSE_COMPRESSION_MIN_BYTES else None
+    if encoding is not None:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+        etag = headers.get("ETag")
+        if etag and etag.endswith('"'):
+            headers["ETag"] = etag[:-1] + ENCODING_ETAG_SUFFIXES[encoding] + '"'
+    # 같은 URL이라도 Accept-Encoding에 따라 본문이 다르므로 캐시에 알립니다.
+    headers["Vary"] = "Accept-Encoding"
+
+    return Response(content=body, status_code=status_code, headers=headers, media_type="application/json")
@@ -1,20 +1,21 @@
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import os
-import vertexai
 from dotenv import load_dotenv 
 
-from .database import engine, Base
-from .routers import auth, project, user, memo, ai 
+from .database import engine, check_database_connection
+from .routers import auth, project, user, memo, ai, ws_router, jobs, search
 from .utils import UPLOAD_FOLDER
-from .config import setup_gcp_credentials  # ✅ 추가
+from .config import get_settings, setup_gcp_credentials, gcp_credentials_configured
+from .dependencies import require_debug_endpoints
 
 load_dotenv()
 
-# ✅ 앱 시작 전에 GCP 인증 설정
-setup_gcp_credentials()
+# 💡 [콜드 스타트] import 시점에는 무거운 작업(DB 연결, 테이블 생성, Vertex AI 초기화, 인증 파일 작성)을 하지 않습니다.
+#    테이블 생성은 마이그레이션 단계(python -m back.migrate), 나머지는 시작 후 warm-up 또는 첫 사용 시점에 수행합니다.
 
 app = FastAPI(
     title="MindMap Collaboration API",
@@ -22,9 +23,6 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# DB 테이블 생성
-Base.metadata.create_all(bind=engine)
-
 # ✅ uploaded_images 디렉토리가 없으면 생성
 os.makedirs("uploaded_images", exist_ok=True)
 
@@ -35,28 +33,50 @@ app.mount(
     name="uploaded_images"
 )
 
+@app.on_event("startup")
+async def start_realtime_broker():
+    """실시간 이벤트 브로커 수신 시작 (여러 워커/인스턴스 간 이벤트 전달)"""
+    from .realtime import manager
+
+    try:
+        await manager.start()
+    except Exception as e:
+        print(f"❌ Realtime broker 시작 오류: {e}")
+
+@app.on_event("shutdown")
+async def stop_realtime_broker():
+    from .realtime import manager
+    from .presence import presence
+    from .collab import collab
+    from .services.generation_jobs import shutdown_generation_workers
+
+    shutdown_generation_workers()
+    # 저장 대기 중인 공동 편집 op를 브로커 종료 전에 저장합니다.
+    await collab.flush_all()
+    await presence.stop()
+    await manager.stop()
+
+def _warm_up():
+    """시작 후 준비 작업: (설정 시) 테이블 생성, DB 연결 확인, GCP 인증 설정, (설정 시) Vertex AI 초기화"""
+    settings = get_settings()
+    if settings.DB_AUTO_CREATE_TABLES:
+        from .migrate import run_migrations
+        run_migrations()
+
+    check_database_connection()
+    setup_gcp_credentials()
+
+    if settings.WARMUP_LLM:
+        from .services.llm_provider import get_llm_provider
+        get_llm_provider().available
+
 @app.on_event("startup")
 async def startup_event():
-    """애플리케이션 시작 시 Vertex AI 초기화"""
+    """warm-up은 이벤트 루프를 막지 않도록 스레드에서 실행합니다."""
     try:
-        project_id = os.getenv("GCP_PROJECT_ID")
-        location = os.getenv("GCP_REGION", "us-central1") 
-        
-        if not project_id:
-            print("⚠️  경고: GCP_PROJECT_ID 환경 변수가 설정되지 않았습니다.")
-            return
-        
-        # ✅ GOOGLE_APPLICATION_CREDENTIALS가 설정되었는지 확인
-        creds_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-        if creds_path and os.path.exists(creds_path):
-            print(f"✅ Using GCP credentials from: {creds_path}")
-        else:
-            print("⚠️  GOOGLE_APPLICATION_CREDENTIALS not found")
-        
-        vertexai.init(project=project_id, location=location)
-        print(f"✅ Vertex AI 초기화 성공! (Project: {project_id}, Location: {location})")
+        await asyncio.to_thread(_warm_up)
     except Exception as e:
-        print(f"❌ Vertex AI 초기화 오류: {e}")
+        print(f"❌ Warm-up 오류: {e}")
 
 # ✅ 수정: Vercel 배포 주소도 추가
 origins = [
@@ -83,14 +103,17 @@ app.include_router(auth.auth_router_protected, prefix="/api/v1", tags=["1. 사
 app.include_router(user.router, prefix="/api/v1/user", tags=["2. 사용자 및 친구"])
 app.include_router(memo.router, prefix="/api/v1/memo", tags=["3. 메모 관리"])
 app.include_router(project.router, prefix="/api/v1", tags=["4. 프로젝트 및 마인드맵"])
+app.include_router(jobs.router, prefix="/api/v1", tags=["4. 프로젝트 및 마인드맵"])
 app.include_router(ai.router, prefix="/api/v1", tags=["5. AI 마인드맵 생성"])
+app.include_router(ws_router.router, prefix="/api/v1", tags=["6. 실시간 (WebSocket)"])
+app.include_router(search.router, prefix="/api/v1", tags=["7. 검색"])
 
 @app.get("/", tags=["Root"])
 def read_root():
     return {
         "message": "MindMap Collaboration API is running.",
         "version": "1.0.0",
-        "gcp_credentials": "✅" if os.getenv("GOOGLE_APPLICATION_CREDENTIALS") else "❌"
+        "gcp_credentials": "✅" if gcp_credentials_configured() else "❌"
     }
 
 # ✅ 수정: 헬스체크 엔드포인트 추가 (Cloud Run용)
@@ -99,7 +122,7 @@ def health_check():
     return {
         "status": "healthy",
         "database": "connected" if engine else "disconnected",
-        "gcp_auth": "configured" if os.getenv("GOOGLE_APPLICATION_CREDENTIALS") else "missing"
+        "gcp_auth": "configured" if gcp_credentials_configured() else "missing"
     }
 
 if __name__ == "__main__":
@@ -127,6 +150,27 @@ def debug_env():
         "GCP_CREDENTIALS_JSON_length": len(os.getenv("GCP_CREDENTIALS_JSON", ""))
     }
 
+@app.get("/debug-realtime", tags=["Debug"], dependencies=[Depends(require_debug_endpoints)])
+def debug_realtime():
+    """웹소켓 연결별 전송 큐 깊이 및 지연 지표"""
+    from .realtime import manager
+
+    return manager.metrics()
+
+@app.get("/debug-llm-cache", tags=["Debug"], dependencies=[Depends(require_debug_endpoints)])
+def debug_llm_cache():
+    """LLM 응답 캐시 적중/미스 통계"""
+    from .services.llm_cache import llm_cache
+
+    return llm_cache.stats() if llm_cache is not None else {"enabled": False}
+
+@app.get("/debug-llm-limiter", tags=["Debug"], dependencies=[Depends(require_debug_endpoints)])
+def debug_llm_limiter():
+    """진행/대기 중인 LLM 호출 수"""
+    from .services.llm_provider import llm_limiter_stats
+
+    return llm_limiter_stats()
+
 @app.post("/debug-generate", tags=["Debug"])
 async def debug_generate():
     """마인드맵 생성 디버그"""
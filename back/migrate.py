@@ -0,0 +1,154 @@
+# DB 스키마 마이그레이션 단계
+#
+# 예전에는 main.py를 import할 때마다 Base.metadata.create_all()을 실행하여
+# 모든 워커/인스턴스의 콜드 스타트에 DB 왕복이 추가되었습니다.
+# 이제는 배포 시 서버를 띄우기 전에 한 번만 실행합니다:
+#   python -m back.migrate
+# (로컬 개발에서는 DB_AUTO_CREATE_TABLES=true로 시작 warm-up 중에 실행할 수도 있습니다.)
+#
+# create_all()은 없는 테이블만 만들고 기존 테이블은 바꾸지 않으므로, 기존 테이블에 추가된 컬럼/인덱스는
+# 아래 MIGRATIONS에 번호를 붙인 단계로 적용합니다. 적용한 번호는 schema_migrations 테이블에 기록하며,
+# 각 단계는 컬럼/인덱스가 이미 있으면 건너뛰므로 (create_all로 새로 만든 DB 포함) 여러 번 실행해도 안전합니다.
+from datetime import datetime, timedelta
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from .database import Base, engine
+
+# 기존 is_generating=True였던 프로젝트에 넣는 lease 소유자 (진행 중이던 생성 작업은 lease 만료 후 자동 회수)
+MIGRATED_LEASE_OWNER = "migrated:is_generating"
+
+
+def _has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(info["name"] == column for info in inspect(conn).get_columns(table))
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str) -> bool:
+    """컬럼이 없을 때만 추가합니다. ddl은 타입과 제약 (예: "INTEGER NOT NULL DEFAULT 0")"""
+    if _has_column(conn, table, column):
+        return False
+    conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    print(f"  + {table}.{column}")
+    return True
+
+
+def _create_index(conn: Connection, name: str, table: str, columns: str):
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+def _timestamp_type(conn: Connection) -> str:
+    return "TIMESTAMP WITHOUT TIME ZONE" if conn.dialect.name == "postgresql" else "DATETIME"
+
+
+def _chat_keyset_index(conn: Connection):
+    """user-001: 프로젝트별 id 커서 페이지네이션용 (project_id, id) 인덱스"""
+    _create_index(conn, "ix_chat_messages_project_id_id", "chat_messages", "project_id, id")
+
+
+def _generation_lease(conn: Connection):
+    """
+    user-009: is_generating 플래그를 만료 시간이 있는 생성 lease로 대체합니다.
+    is_generating=True였던 프로젝트는 lease 시간 동안 생성 중으로 유지하고, 이후 다음 요청이 회수합니다.
+    (is_generating 컬럼은 배포 중 이전 버전이 계속 동작하도록 남겨 두며, 더 이상 읽거나 쓰지 않습니다.)
+    """
+    from .config import get_settings
+
+    _add_column(conn, "projects", "generation_lease_owner", "VARCHAR")
+    _add_column(conn, "projects", "generation_lease_expires_at", _timestamp_type(conn))
+
+    if _has_column(conn, "projects", "is_generating"):
+        expires_at = datetime.utcnow() + timedelta(seconds=get_settings().GENERATION_LEASE_SECONDS)
+        migrated = conn.execute(text(
+            "UPDATE projects SET generation_lease_owner = :owner, generation_lease_expires_at = :expires_at "
+            "WHERE is_generating = :generating AND generation_lease_owner IS NULL"
+        ), {"owner": MIGRATED_LEASE_OWNER, "expires_at": expires_at, "generating": True}).rowcount
+        if migrated:
+            print(f"  ~ projects: {migrated} in-progress generation(s) moved to leases")
+
+
+def _mindmap_version(conn: Connection):
+    """user-018: 프로젝트 마인드맵 버전 (기존 맵은 이력 없이 버전 0에서 시작)"""
+    _add_column(conn, "projects", "mindmap_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _node_version(conn: Connection):
+    """user-019: 노드별 낙관적 동시성 버전"""
+    _add_column(conn, "mindmap_nodes", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def _resource_versions(conn: Connection):
+    """user-021: ETag용 프로젝트 리소스 버전"""
+    for column in ("version", "members_version", "chat_version"):
+        _add_column(conn, "projects", column, "INTEGER NOT NULL DEFAULT 0")
+
+
+# (번호, 이름, 단계) - 이미 배포된 단계의 번호/내용은 바꾸지 말고 새 단계를 뒤에 추가합니다.
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "chat_messages_keyset_index", _chat_keyset_index),
+    (2, "projects_generation_lease", _generation_lease),
+    (3, "projects_mindmap_version", _mindmap_version),
+    (4, "mindmap_nodes_version", _node_version),
+    (5, "projects_resource_versions", _resource_versions),
+]
+
+
+def _applied_versions(conn: Connection) -> set:
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, name VARCHAR NOT NULL, applied_at " + _timestamp_type(conn) + " NOT NULL)"
+    ))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def apply_schema_migrations() -> int:
+    """
+    아직 적용하지 않은 단계를 번호 순서대로 적용합니다. (단계마다 한 트랜잭션, 적용 기록 포함)
+    적용한 단계 수를 반환합니다.
+    """
+    with engine.begin() as conn:
+        applied = _applied_versions(conn)
+
+    count = 0
+    for version, name, step in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # 여러 인스턴스가 동시에 실행해도 한 단계는 한 번만 적용되도록 트랜잭션 advisory lock
+                conn.execute(text("SELECT pg_advisory_xact_lock(hashtext('back.migrate'))"))
+                if conn.execute(text("SELECT 1 FROM schema_migrations WHERE version = :v"), {"v": version}).first():
+                    continue
+            print(f"🔧 Migration {version:03d} {name}")
+            step(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :name, :at)"),
+                {"v": version, "name": name, "at": datetime.utcnow()}
+            )
+        count += 1
+    return count
+
+
+def run_migrations():
+    """
+    모든 ORM 모델의 테이블을 생성하고 (이미 있는 테이블은 건너뜀), 기존 테이블에 번호가 붙은 변경 단계를 적용합니다.
+    이어서 전문 검색 인덱스(SQLite FTS5 / PostgreSQL tsvector, trigram)를 만들고, 색인이 비어 있으면 기존 데이터를 색인합니다.
+    """
+    from . import models  # noqa: F401 - 모델을 Base.metadata에 등록
+    from .database import SessionLocal
+    from .services import search_index
+
+    Base.metadata.create_all(bind=engine)
+    apply_schema_migrations()
+    search_index.create_search_indexes(engine)
+    db = SessionLocal()
+    try:
+        search_index.backfill_if_empty(db)
+    finally:
+        db.close()
+    print("✅ Database tables are up to date")
+
+
+if __name__ == "__main__":
+    run_migrations()
@@ -1,7 +1,9 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, JSON, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, JSON, UniqueConstraint, Index
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.sql import func
 from .database import Base
+from datetime import datetime
+from typing import Optional
 
 # --- 사용자 및 인증 관련 모델 ---
 
@@ -92,14 +94,31 @@ class Project(Base):
     title = Column(String, index=True)
     created_at = Column(DateTime, default=func.now())
     
-    # 마인드맵 생성 상태 관리
-    is_generating = Column(Boolean, default=False) 
+    # 마인드맵 생성 상태 관리 (만료 시간이 있는 lease, services/generation_lock.py 참고)
+    generation_lease_owner = Column(String, nullable=True)
+    generation_lease_expires_at = Column(DateTime, nullable=True)
     last_chat_id_processed = Column(Integer, default=0) 
+    # 마인드맵 버전 (생성/수정으로 맵이 바뀔 때마다 1씩 증가, mindmap_versions 참고)
+    mindmap_version = Column(Integer, default=0, nullable=False)
+    # 리소스별 버전 (쓰기마다 1씩 증가, ETag에 사용 - services/project_versions.py 참고)
+    version = Column(Integer, default=0, nullable=False)
+    members_version = Column(Integer, default=0, nullable=False)
+    chat_version = Column(Integer, default=0, nullable=False)
     
     members = relationship("ProjectMember", back_populates="project")
     chats = relationship("ChatMessage", back_populates="project")
     nodes = relationship("MindMapNode", back_populates="project")
 
+    @property
+    def is_generating(self) -> bool:
+        """만료되지 않은 생성 lease가 있으면 True (작업이 죽어도 lease 만료 후 자동으로 False)"""
+        return Project.lease_active(self.generation_lease_owner, self.generation_lease_expires_at)
+
+    @staticmethod
+    def lease_active(owner: Optional[str], expires_at: Optional[datetime]) -> bool:
+        """컬럼만 조회한 행에서도 is_generating을 계산할 수 있도록 분리한 판정"""
+        return owner is not None and expires_at is not None and expires_at > datetime.utcnow()
+
 
 class ProjectMember(Base):
     __tablename__ = "project_members"
@@ -127,6 +146,11 @@ class ChatMessage(Base):
     
     project = relationship("Project", back_populates="chats")
     user = relationship("User") # 채팅 작성자 정보
+
+    # 프로젝트별 id 커서 페이지네이션(keyset)을 위한 복합 인덱스
+    __table_args__ = (
+        Index('ix_chat_messages_project_id_id', 'project_id', 'id'),
+    )
     
     
 class MindMapNode(Base):
@@ -139,7 +163,156 @@ class MindMapNode(Base):
     title = Column(String)
     description = Column(Text)
     
-    # 연결 정보 (JSON 형태로 저장)
+    # 연결 정보 (JSON 형태로 저장, 응답 호환용. 구조 조회는 mindmap_edges를 사용합니다.)
     connections = Column(JSON, default=lambda: []) 
+    # 낙관적 동시성 제어용 버전 (노드 내용이 바뀔 때마다 1씩 증가)
+    version = Column(Integer, default=1, nullable=False)
 
     project = relationship("Project", back_populates="nodes")
+
+
+class MindMapEdge(Base):
+    """
+    마인드맵 노드 간 방향 간선 (source -> target, 상위 -> 하위).
+    생성 시 노드와 함께 저장되며, 하위 트리/조상/이웃 조회를 재귀 CTE로 처리합니다. (services/mindmap_graph.py)
+    """
+    __tablename__ = "mindmap_edges"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    source_id = Column(String, ForeignKey("mindmap_nodes.id", ondelete="CASCADE"), nullable=False)
+    target_id = Column(String, ForeignKey("mindmap_nodes.id", ondelete="CASCADE"), nullable=False)
+
+    # (project_id, source_id)로 시작하는 고유 제약이 하위 방향 탐색 인덱스를 겸하고,
+    # 상위 방향(조상) 탐색을 위해 (project_id, target_id) 인덱스를 추가합니다.
+    __table_args__ = (
+        UniqueConstraint('project_id', 'source_id', 'target_id', name='_mindmap_edge_uc'),
+        Index('ix_mindmap_edges_project_target', 'project_id', 'target_id'),
+    )
+
+
+class MindMapVersion(Base):
+    """
+    마인드맵 버전 이력 (services/mindmap_history.py).
+    kind가 snapshot이면 data에 전체 맵({"nodes", "links"})을, delta이면 이전 버전 대비 변경 사항(MindMapDiff)을 저장합니다.
+    버전 N의 맵은 N 이하의 가장 가까운 snapshot에서 시작해 delta를 순서대로 적용하여 복원합니다.
+    """
+    __tablename__ = "mindmap_versions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)   # snapshot | delta
+    source = Column(String, nullable=False) # generation | edit
+    data = Column(JSON, nullable=False)
+    stats = Column(JSON, default=lambda: {}) # 이 버전의 변경 규모 {"added", "updated", "removed", "links_added", "links_removed"}
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('project_id', 'version', name='_mindmap_version_uc'),
+    )
+
+
+class MindMapLayout(Base):
+    """
+    마인드맵 버전별 노드 배치 좌표 (services/mindmap_layout.py).
+    positions는 {node_id: [x, y]}, tree는 증분 재계산용 신장 트리 정보 {node_id: [parent_id, width, offset]}입니다.
+    """
+    __tablename__ = "mindmap_layouts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    algorithm = Column(String, nullable=False) # radial | tree | force
+    positions = Column(JSON, nullable=False)
+    tree = Column(JSON, nullable=False)
+    base_version = Column(Integer, nullable=True) # 증분 계산의 기준이 된 버전 (처음부터 계산했으면 None)
+    recomputed = Column(Integer, default=0)       # 새로 배치한 노드 수
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('project_id', 'version', 'algorithm', name='_mindmap_layout_uc'),
+    )
+
+
+class SearchDocument(Base):
+    """
+    통합 검색 색인 문서 (services/search_index.py). 채팅 메시지/메모/마인드맵 노드/프로젝트마다 한 행이며, 원본을 쓸 때 같은 트랜잭션에서 갱신됩니다.
+    *_tokens는 검색용으로 정규화하고 한글을 2-gram으로 나눈 텍스트입니다. SQLite에서는 FTS5 테이블(search_fts),
+    PostgreSQL에서는 tsvector/trigram 식 인덱스가 이 테이블을 색인합니다. (python -m back.migrate에서 생성)
+    """
+    __tablename__ = "search_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)   # chat | memo | node | project
+    ref_id = Column(String, nullable=False) # 원본 행 ID (노드 ID는 문자열)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True, index=True) # 메모는 None
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)     # 메모 소유자 (그 외 None)
+    title = Column(String, nullable=True)
+    body = Column(Text, nullable=True)
+    title_tokens = Column(Text, nullable=False, default="")
+    body_tokens = Column(Text, nullable=False, default="")
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('kind', 'ref_id', name='_search_document_uc'),
+    )
+
+
+class ChatSummary(Base):
+    """
+    채팅 요약 (계층형).
+    level 0은 원본 채팅 고정 크기 구간의 요약, level N은 level N-1 요약 여러 개를 묶은 상위 요약입니다.
+    [start_chat_id, end_chat_id] 구간의 채팅을 대표합니다.
+    """
+    __tablename__ = "chat_summaries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"))
+    level = Column(Integer, default=0)
+    start_chat_id = Column(Integer)
+    end_chat_id = Column(Integer)
+    message_count = Column(Integer, default=0)
+    content = Column(Text)
+    created_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        Index('ix_chat_summaries_project_level_end', 'project_id', 'level', 'end_chat_id'),
+    )
+
+
+class GenerationJob(Base):
+    """
+    비동기 마인드맵 생성 작업.
+    status: queued -> running -> succeeded | failed
+    """
+    __tablename__ = "generation_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), index=True)
+    requested_by = Column(Integer, ForeignKey("users.id"))
+    status = Column(String, default="queued")
+    lease_token = Column(String, nullable=True) # 작업이 보유한 프로젝트 생성 lease
+    full_regeneration = Column(Boolean, default=False)
+
+    result = Column(JSON, nullable=True) # 성공 시 AIAnalysisResult
+    error = Column(Text, nullable=True)  # 실패 시 오류 메시지
+
+    created_at = Column(DateTime, default=func.now())
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class LLMCacheEntry(Base):
+    """
+    LLM 응답 캐시의 영구 저장 계층 (services/llm_cache.py, LLM_CACHE_PERSISTENT=True일 때 사용).
+    key는 모델/생성 설정/프롬프트 버전/정규화된 입력의 해시입니다.
+    """
+    __tablename__ = "llm_cache_entries"
+
+    key = Column(String, primary_key=True)
+    kind = Column(String, index=True) # 호출 종류 (mindmap_full, mindmap_incremental, recommendation)
+    value = Column(JSON)
+    created_at = Column(DateTime, default=func.now())
+    expires_at = Column(DateTime, index=True)
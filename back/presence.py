@@ -0,0 +1,227 @@
+"""
+친구 범위 접속 상태(presence) 전달.
+
+접속/종료 이벤트를 즉시 모든 사용자에게 브로드캐스트하지 않고,
+1) 수락된 친구에게만 전달하고 (친구 목록은 캐시된 인접 리스트 사용)
+2) 짧은 주기(tick)마다 변경 사항을 모아 수신자별로 하나의 diff 메시지로 보냅니다.
+
+tick 안에서 접속 → 종료처럼 상태가 되돌아간 경우(flap)는 아예 전송하지 않습니다.
+
+접속 상태는 상태 소켓(/ws/status) 수로만 판단합니다. (ConnectionManager.status_counts)
+여러 노드로 운영할 때는 노드마다 상태 소켓이 열린 사용자를 브로커의 제어용 룸으로 주고받아,
+다른 노드에 아직 탭이 열려 있는 사용자는 오프라인으로 알리지 않고 (이미 알린 온라인도 다시 알리지 않음)
+마지막 상태 소켓이 닫힌 노드만 오프라인을 알립니다.
+"""
+import asyncio
+import time
+import uuid
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy import or_
+
+from .config import get_settings
+from .database import SessionLocal
+from .models import Friendship, User
+from .realtime import manager, user_room
+
+# 노드 간 상태 소켓 현황을 주고받는 제어용 룸
+PRESENCE_NODES_ROOM = "presence:nodes"
+
+
+class FriendGraphCache:
+    """
+    사용자 ID -> 수락된 친구 이메일 집합 캐시.
+    친구 관계가 바뀌면 invalidate()로 즉시 무효화하고, 다른 노드에서의 변경은 TTL로 반영됩니다.
+    """
+    def __init__(self, ttl_seconds: float = 60.0):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[int, Tuple[float, Set[str]]] = {}
+
+    def _load(self, user_id: int) -> Set[str]:
+        db = SessionLocal()
+        try:
+            # 친구 요청 수락 방식에 따라 한 방향 레코드만 있을 수 있으므로 양방향 모두 조회합니다.
+            rows = db.query(Friendship.user_id, Friendship.friend_id).filter(
+                Friendship.status == "accepted",
+                or_(Friendship.user_id == user_id, Friendship.friend_id == user_id)
+            ).all()
+            friend_ids = {
+                friend_id if requester_id == user_id else requester_id
+                for requester_id, friend_id in rows
+            }
+            if not friend_ids:
+                return set()
+            return {email for (email,) in db.query(User.email).filter(User.id.in_(friend_ids)).all()}
+        finally:
+            db.close()
+
+    def get_friend_emails(self, user_id: int) -> Set[str]:
+        """캐시된 친구 이메일 집합을 반환합니다. 만료되었으면 DB에서 다시 로드합니다."""
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and now - entry[0] < self.ttl_seconds:
+            return entry[1]
+
+        friend_emails = self._load(user_id)
+        self._entries[user_id] = (now, friend_emails)
+        return friend_emails
+
+    def invalidate(self, *user_ids: int):
+        """친구 관계가 바뀐 사용자들의 캐시를 제거합니다."""
+        for user_id in user_ids:
+            self._entries.pop(user_id, None)
+
+
+class PresenceAggregator:
+    """
+    접속 상태 변경을 모았다가 tick마다 친구별 diff로 전송합니다.
+    """
+    def __init__(self, friend_graph: FriendGraphCache, tick_seconds: float = 0.5, sync_seconds: float = 30.0):
+        self.friend_graph = friend_graph
+        self.tick_seconds = tick_seconds
+        self.sync_seconds = sync_seconds
+        self.node_id = uuid.uuid4().hex
+
+        # 이번 tick에 바뀐 사용자 {email: (user_id, is_online, friend_code)}
+        self._pending: Dict[str, Tuple[int, bool, Optional[str]]] = {}
+        # 마지막으로 친구들에게 알린 상태 {email: is_online}
+        self._announced: Dict[str, bool] = {}
+        # 다른 노드에 상태 소켓이 열린 사용자 {email: {node_id: 마지막으로 소식을 받은 시각}}
+        self._remote: Dict[str, Dict[str, float]] = {}
+        # 다른 노드에 알릴 이 노드의 변경 {email: is_online}
+        self._node_changes: Dict[str, bool] = {}
+        self._last_sync = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def mark(self, user_id: int, user_email: str, is_online: bool, friend_code: Optional[str] = None):
+        """
+        이 노드에서 사용자의 접속 상태 변경(첫 상태 소켓 열림 / 마지막 상태 소켓 닫힘)을 기록합니다.
+        실제 전송은 다음 tick에 이루어집니다.
+        """
+        self._pending[user_email] = (user_id, is_online, friend_code)
+        self._node_changes[user_email] = is_online
+        self._ensure_running()
+
+    def on_node_message(self, message: dict):
+        """다른 노드의 상태 소켓 현황을 반영합니다. (sync는 해당 노드의 전체 목록, 아니면 변경분)"""
+        node_id = message.get("node")
+        if node_id == self.node_id:
+            return
+
+        now = time.monotonic()
+        online = set(message.get("online", ()))
+        offline = set(message.get("offline", ()))
+        if message.get("sync"):
+            offline = {email for email, nodes in self._remote.items() if node_id in nodes} - online
+
+        for email in online:
+            self._remote.setdefault(email, {})[node_id] = now
+        for email in offline:
+            nodes = self._remote.get(email)
+            if nodes is not None:
+                nodes.pop(node_id, None)
+                if not nodes:
+                    del self._remote[email]
+
+    def _online_elsewhere(self, user_email: str) -> bool:
+        """다른 노드에 사용자의 상태 소켓이 열려 있는지 확인합니다. (오래 소식이 없는 노드는 버림)"""
+        nodes = self._remote.get(user_email)
+        if not nodes:
+            return False
+        deadline = time.monotonic() - self.sync_seconds * 3
+        for node_id, seen_at in list(nodes.items()):
+            if seen_at < deadline:
+                del nodes[node_id]
+        if not nodes:
+            del self._remote[user_email]
+            return False
+        return True
+
+    async def _publish_node_state(self):
+        """이 노드의 변경분을, sync 주기마다는 전체 상태 소켓 사용자 목록을 다른 노드에 알립니다."""
+        now = time.monotonic()
+        if now - self._last_sync >= self.sync_seconds:
+            self._last_sync = now
+            self._node_changes = {}
+            message = {"node": self.node_id, "sync": True, "online": list(manager.status_counts)}
+        elif self._node_changes:
+            changes, self._node_changes = self._node_changes, {}
+            message = {
+                "node": self.node_id,
+                "online": [email for email, is_online in changes.items() if is_online],
+                "offline": [email for email, is_online in changes.items() if not is_online],
+            }
+        else:
+            return
+        await manager.publish_control(PRESENCE_NODES_ROOM, message)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick_seconds)
+            try:
+                await self._publish_node_state()
+                if self._pending:
+                    await self.flush()
+            except Exception as e:
+                print(f"🚨 Presence flush error: {e}")
+
+    async def flush(self):
+        """대기 중인 변경 사항을 수신자별 diff로 묶어 전송합니다."""
+        pending, self._pending = self._pending, {}
+
+        changes = {}
+        for user_email, (user_id, is_online, friend_code) in pending.items():
+            # 다른 노드에 상태 소켓이 남아 있으면 친구에게 보이는 상태는 온라인 그대로입니다.
+            if self._online_elsewhere(user_email):
+                if is_online:
+                    self._announced[user_email] = True
+                else:
+                    self._announced.pop(user_email, None)
+                continue
+            # tick 안에서 상태가 되돌아간 경우(flap)는 전송하지 않음
+            if self._announced.get(user_email, False) == is_online:
+                continue
+            changes[user_email] = (user_id, is_online, friend_code)
+            if is_online:
+                self._announced[user_email] = True
+            else:
+                self._announced.pop(user_email, None)
+
+        if not changes:
+            return
+
+        # 친구 목록 조회(캐시 미스 시 DB)는 이벤트 루프를 막지 않도록 스레드에서 수행합니다.
+        friend_lists = await asyncio.to_thread(
+            lambda: {email: self.friend_graph.get_friend_emails(user_id) for email, (user_id, _, _) in changes.items()}
+        )
+
+        per_recipient: Dict[str, list] = {}
+        for user_email, (_, is_online, friend_code) in changes.items():
+            update = {"user_email": user_email, "is_online": is_online, "friend_code": friend_code}
+            for friend_email in friend_lists[user_email]:
+                per_recipient.setdefault(friend_email, []).append(update)
+
+        for recipient_email, updates in per_recipient.items():
+            await manager.publish(
+                user_room(recipient_email),
+                {"type": "presence_diff", "changes": updates},
+            )
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+_settings = get_settings()
+friend_graph = FriendGraphCache(ttl_seconds=_settings.FRIEND_CACHE_TTL_SECONDS)
+presence = PresenceAggregator(
+    friend_graph,
+    tick_seconds=_settings.PRESENCE_TICK_SECONDS,
+    sync_seconds=_settings.PRESENCE_SYNC_SECONDS,
+)
+manager.on_control(PRESENCE_NODES_ROOM, presence.on_node_message)
@@ -1,50 +1,446 @@
 from fastapi import WebSocket
-from typing import Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from collections import deque
+import asyncio
 import json
+import time
+
+from .config import get_settings
+from .realtime_broker import Broker, InProcessBroker, create_broker
+
+
+def project_room(project_id: int) -> str:
+    """프로젝트 멤버들이 구독하는 룸 이름"""
+    return f"project:{project_id}"
+
+
+def user_room(user_email: str) -> str:
+    """사용자 개인 채널 룸 이름 (해당 사용자의 모든 탭이 자동 구독)"""
+    return f"user:{user_email}"
+
+
+# 전송 큐가 가득 찼을 때의 처리 정책
+OVERFLOW_DROP_OLDEST = "drop_oldest" # 가장 오래된 메시지를 버림
+OVERFLOW_COALESCE = "coalesce"       # 같은 coalesce_key의 대기 메시지를 최신 메시지로 교체 (없으면 drop_oldest)
+OVERFLOW_DISCONNECT = "disconnect"   # 느린 클라이언트로 간주하고 연결을 끊음
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE, OVERFLOW_DISCONNECT)
+
+# broadcast()가 브로커를 통해 전달될 때 사용하는 특수 룸 이름 (모든 연결 대상)
+BROADCAST_ROOM = "*"
+
+# 느린 클라이언트 연결 종료 시 사용하는 close code (1013: Try Again Later)
+WS_CLOSE_SLOW_CONSUMER = 1013
+
+
+class Connection:
+    """
+    하나의 웹소켓(브라우저 탭) 연결.
+    같은 사용자가 여러 탭을 열면 사용자당 여러 Connection이 존재합니다.
+
+    메시지는 제한된 크기의 전송 큐에 쌓이고, 연결마다 하나의 writer 태스크가
+    순서대로 전송합니다. 따라서 한 클라이언트가 느려도 다른 연결의 전송이 지연되지 않습니다.
+    """
+    def __init__(
+        self,
+        websocket: WebSocket,
+        user_email: str,
+        max_queue_size: int,
+        overflow_policy: str,
+        send_timeout: float,
+        on_close: Callable[["Connection"], None],
+    ):
+        self.websocket = websocket
+        self.user_email = user_email
+        # 이 연결이 구독 중인 룸 목록 (연결 해제 시 룸 인덱스 정리에 사용)
+        self.rooms: Set[str] = set()
+
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self._on_close = on_close
+
+        # (coalesce_key, json_message, enqueued_at)
+        self._queue: Deque[Tuple[Optional[str], str, float]] = deque()
+        self._wakeup = asyncio.Event()
+        self._writer_task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        # 연결별 지연 지표
+        self.connected_at = time.monotonic()
+        self.sent_count = 0
+        self.dropped_count = 0
+        self.coalesced_count = 0
+        self.last_send_lag = 0.0 # 마지막 메시지의 큐 대기 + 전송 시간 (초)
+        self.max_send_lag = 0.0
+
+    def start(self):
+        """전송 writer 태스크를 시작합니다."""
+        self._writer_task = asyncio.create_task(self._writer())
+
+    def enqueue(self, json_message: str, coalesce_key: Optional[str] = None) -> bool:
+        """
+        메시지를 전송 큐에 넣습니다. 대기하지 않고 즉시 반환합니다.
+        큐 초과 정책에 의해 연결이 끊기면 False를 반환합니다.
+        """
+        if self.closed:
+            return False
+
+        now = time.monotonic()
+
+        if len(self._queue) >= self.max_queue_size:
+            if self.overflow_policy == OVERFLOW_DISCONNECT:
+                print(f"⚠️ Slow consumer evicted: {self.user_email} (queue={len(self._queue)})")
+                self.close(code=WS_CLOSE_SLOW_CONSUMER)
+                return False
+
+            if self.overflow_policy == OVERFLOW_COALESCE and coalesce_key is not None:
+                for index, (queued_key, _, queued_at) in enumerate(self._queue):
+                    if queued_key == coalesce_key:
+                        # 대기 순서(과 대기 시작 시각)는 유지하고 내용만 최신으로 교체
+                        self._queue[index] = (coalesce_key, json_message, queued_at)
+                        self.coalesced_count += 1
+                        return True
+
+            self._queue.popleft()
+            self.dropped_count += 1
+
+        self._queue.append((coalesce_key, json_message, now))
+        self._wakeup.set()
+        return True
+
+    async def _writer(self):
+        """큐의 메시지를 순서대로 전송합니다. 전송 실패/타임아웃 시 연결을 정리합니다."""
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                _, json_message, enqueued_at = self._queue.popleft()
+                await asyncio.wait_for(self.websocket.send_text(json_message), timeout=self.send_timeout)
+
+                lag = time.monotonic() - enqueued_at
+                self.sent_count += 1
+                self.last_send_lag = lag
+                self.max_send_lag = max(self.max_send_lag, lag)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            print(f"⚠️ Slow consumer evicted: {self.user_email} (send timeout {self.send_timeout}s)")
+            self.close(code=WS_CLOSE_SLOW_CONSUMER)
+        except Exception as e:
+            # 연결이 이미 닫혔거나 오류가 발생한 경우 처리
+            print(f"Error sending to {self.user_email}: {e}")
+            self.close()
+
+    def close(self, code: Optional[int] = None):
+        """
+        연결을 닫고 매니저에서 제거합니다. 여러 번 호출해도 안전합니다.
+        code가 주어지면 클라이언트 소켓도 해당 close code로 닫습니다.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+
+        task = self._writer_task
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+
+        if code is not None:
+            asyncio.ensure_future(self._close_socket(code))
+
+        self._on_close(self)
+
+    async def _close_socket(self, code: int):
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            # 이미 닫힌 소켓
+            pass
+
+    def metrics(self) -> Dict[str, Any]:
+        """연결별 전송 큐/지연 지표 (사용자 식별 정보는 포함하지 않음)"""
+        now = time.monotonic()
+        oldest_wait = now - self._queue[0][2] if self._queue else 0.0
+        return {
+            "rooms": len(self.rooms),
+            "connected_seconds": round(now - self.connected_at, 3),
+            "queue_depth": len(self._queue),
+            "queue_capacity": self.max_queue_size,
+            "oldest_queued_seconds": round(oldest_wait, 3),
+            "last_send_lag_seconds": round(self.last_send_lag, 3),
+            "max_send_lag_seconds": round(self.max_send_lag, 3),
+            "sent": self.sent_count,
+            "dropped": self.dropped_count,
+            "coalesced": self.coalesced_count,
+        }
+
 
 class ConnectionManager:
     """
-    활성 웹소켓 연결을 관리하는 클래스.
-    {user_email: WebSocket} 형태로 저장됩니다.
+    활성 웹소켓 연결과 룸(토픽) 구독을 관리하는 클래스.
+
+    - active_connections: {user_email: {Connection, ...}} (사용자당 여러 탭 허용)
+    - rooms: {room: {Connection, ...}} (룸 멤버십 인덱스)
+    - status_counts: {user_email: 상태(/ws/status) 소켓 수} (접속 상태 판단용, 프로젝트 소켓은 세지 않음)
+
+    룸으로 발행하는 비용은 전체 접속자 수가 아니라 룸 크기에 비례하며,
+    발행은 각 연결의 전송 큐에 넣기만 하므로 느린 클라이언트에 의해 막히지 않습니다.
+
+    publish/broadcast는 브로커를 거쳐 모든 노드에 전달되고, 각 노드는 자신에게 연결된
+    소켓에만 전송합니다 (realtime_broker.py 참고).
     """
-    def __init__(self):
-        # 활성 연결을 저장하는 딕셔너리
-        self.active_connections: Dict[str, WebSocket] = {}
+    def __init__(
+        self,
+        max_queue_size: int = 100,
+        overflow_policy: str = OVERFLOW_DROP_OLDEST,
+        send_timeout: float = 10.0,
+        broker: Optional[Broker] = None,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}. Must be one of {OVERFLOW_POLICIES}")
+
+        self.active_connections: Dict[str, Set[Connection]] = {}
+        self.rooms: Dict[str, Set[Connection]] = {}
+        self.status_counts: Dict[str, int] = {}
+        # 소켓으로 보내지 않고 이 노드의 콜백이 처리하는 제어용 룸 {room: handler(message)}
+        self._control_handlers: Dict[str, Callable[[dict], None]] = {}
 
-    async def connect(self, websocket: WebSocket, user_email: str):
-        """새로운 웹소켓 연결을 수락하고 활성 연결에 추가합니다."""
+        self.max_queue_size = max_queue_size
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+
+        self.broker: Broker = broker or InProcessBroker()
+        self._broker_started = False
+        # 워커 스레드에서 발행할 때 사용하는 이벤트 루프 (start()에서 설정)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """브로커 수신을 시작합니다. (앱 startup 이벤트에서 호출)"""
+        self._loop = asyncio.get_running_loop()
+        if not self._broker_started:
+            await self.broker.start(self._on_broker_message)
+            self._broker_started = True
+
+    async def stop(self):
+        """브로커 수신을 중지합니다. (앱 shutdown 이벤트에서 호출)"""
+        if self._broker_started:
+            await self.broker.stop()
+            self._broker_started = False
+
+    async def connect(self, websocket: WebSocket, user_email: str) -> Connection:
+        """새로운 웹소켓 연결을 수락하고, 사용자 개인 채널에 구독시킵니다."""
         await websocket.accept()
-        self.active_connections[user_email] = websocket
+        connection = Connection(
+            websocket,
+            user_email,
+            max_queue_size=self.max_queue_size,
+            overflow_policy=self.overflow_policy,
+            send_timeout=self.send_timeout,
+            on_close=self._remove,
+        )
+        connection.start()
+        self.active_connections.setdefault(user_email, set()).add(connection)
+        self.subscribe(connection, user_room(user_email))
+        return connection
+
+    def disconnect(self, connection: Connection):
+        """연결의 writer를 중지하고 목록과 모든 룸에서 제거합니다."""
+        connection.close()
+
+    def _remove(self, connection: Connection):
+        """Connection.close()에서 호출되어 인덱스를 정리합니다."""
+        for room in list(connection.rooms):
+            self.unsubscribe(connection, room)
+
+        connections = self.active_connections.get(connection.user_email)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.active_connections[connection.user_email]
+
+    def is_online(self, user_email: str) -> bool:
+        """이 노드에 사용자의 상태 소켓이 하나라도 열려 있는지 확인합니다."""
+        return user_email in self.status_counts
+
+    def open_status(self, user_email: str) -> bool:
+        """
+        상태 소켓 수를 늘립니다. 이 노드의 첫 상태 소켓이면 True를 반환합니다.
+        💡 프로젝트 소켓도 connect()로 active_connections에 들어가므로, 접속 상태는 이 수로만 판단합니다.
+        """
+        count = self.status_counts.get(user_email, 0) + 1
+        self.status_counts[user_email] = count
+        return count == 1
+
+    def close_status(self, user_email: str) -> bool:
+        """상태 소켓 수를 줄입니다. 이 노드의 마지막 상태 소켓이었으면 True를 반환합니다."""
+        count = self.status_counts.get(user_email, 0) - 1
+        if count > 0:
+            self.status_counts[user_email] = count
+            return False
+        self.status_counts.pop(user_email, None)
+        return count == 0
+
+    def on_control(self, room: str, handler: Callable[[dict], None]):
+        """제어용 룸에 발행된 메시지를 처리할 콜백을 등록합니다. (presence.py의 노드 간 접속 현황 등)"""
+        self._control_handlers[room] = handler
+
+    def subscribe(self, connection: Connection, room: str):
+        """연결을 룸에 구독시킵니다."""
+        if connection.closed:
+            return
+        self.rooms.setdefault(room, set()).add(connection)
+        connection.rooms.add(room)
 
-    def disconnect(self, user_email: str):
-        """연결이 끊어진 사용자를 목록에서 제거합니다."""
-        if user_email in self.active_connections:
-            del self.active_connections[user_email]
+    def unsubscribe(self, connection: Connection, room: str):
+        """연결의 룸 구독을 해제합니다. 비어 있는 룸은 삭제합니다."""
+        members = self.rooms.get(room)
+        if members is not None:
+            members.discard(connection)
+            if not members:
+                del self.rooms[room]
+        connection.rooms.discard(room)
+
+    def _send_to(
+        self,
+        connections: List[Connection],
+        json_message: str,
+        exclude_email: Optional[str] = None,
+        coalesce_key: Optional[str] = None,
+    ):
+        """연결 목록의 전송 큐에 메시지를 넣습니다. 실제 전송은 각 연결의 writer가 동시에 수행합니다."""
+        for connection in connections:
+            if connection.user_email == exclude_email:
+                continue
+            connection.enqueue(json_message, coalesce_key)
+
+    async def _dispatch(
+        self,
+        room: str,
+        json_message: str,
+        exclude_email: Optional[str] = None,
+        coalesce_key: Optional[str] = None,
+    ):
+        """이벤트를 브로커로 발행합니다. 브로커가 시작되지 않았다면 이 노드에만 전달합니다."""
+        if not self._broker_started:
+            self._deliver_local(room, json_message, exclude_email, coalesce_key)
+            return
+
+        payload = json.dumps({
+            "text": json_message,
+            "exclude_email": exclude_email,
+            "coalesce_key": coalesce_key,
+        })
+        await self.broker.publish(room, payload)
+
+    async def _on_broker_message(self, room: str, payload: str):
+        """브로커에서 수신한 이벤트를 이 노드의 연결에 전달합니다."""
+        envelope = json.loads(payload)
+        self._deliver_local(room, envelope["text"], envelope.get("exclude_email"), envelope.get("coalesce_key"))
+
+    def _deliver_local(
+        self,
+        room: str,
+        json_message: str,
+        exclude_email: Optional[str] = None,
+        coalesce_key: Optional[str] = None,
+    ):
+        """이 노드에 연결된 룸 구독자(또는 전체 연결)의 전송 큐에 메시지를 넣습니다."""
+        control_handler = self._control_handlers.get(room)
+        if control_handler is not None:
+            control_handler(json.loads(json_message))
+            return
+
+        if room == BROADCAST_ROOM:
+            connections = [
+                connection
+                for user_connections in self.active_connections.values()
+                for connection in user_connections
+            ]
+        else:
+            members = self.rooms.get(room)
+            if not members:
+                return
+            # 큐 초과로 연결이 끊기면 집합이 바뀔 수 있으므로 스냅샷을 순회합니다.
+            connections = list(members)
+        self._send_to(connections, json_message, exclude_email, coalesce_key)
+
+    async def publish(
+        self,
+        room: str,
+        message: dict,
+        exclude_email: Optional[str] = None,
+        coalesce_key: Optional[str] = None,
+    ):
+        """
+        특정 룸을 구독 중인 연결에게만 JSON 메시지를 전송합니다. (모든 노드 대상)
+
+        Args:
+            room (str): 대상 룸 (project_room(...), user_room(...) 등)
+            message (dict): 전송할 데이터 (JSON 직렬화됨)
+            exclude_email (str): 메시지 수신에서 제외할 사용자 (선택 사항)
+            coalesce_key (str): coalesce 정책에서 같은 키의 대기 메시지를 대체할 때 사용 (선택 사항)
+        """
+        await self._dispatch(room, json.dumps(message), exclude_email, coalesce_key)
+
+    def publish_threadsafe(self, room: str, message: dict, exclude_email: Optional[str] = None):
+        """
+        이벤트 루프 밖(워커 스레드)에서 룸으로 메시지를 발행합니다. 완료를 기다리지 않습니다.
+        """
+        if self._loop is None or self._loop.is_closed():
+            print(f"⚠️ Realtime manager not started; dropping event for {room}")
+            return
+        asyncio.run_coroutine_threadsafe(self.publish(room, message, exclude_email), self._loop)
+
+    async def publish_control(self, room: str, message: dict):
+        """모든 노드(자기 자신 포함)의 제어용 룸 콜백에 메시지를 전달합니다. 소켓으로는 전송되지 않습니다."""
+        await self._dispatch(room, json.dumps(message))
 
     async def send_personal_message(self, message: str, user_email: str):
-        """특정 사용자에게 메시지를 전송합니다."""
-        if user_email in self.active_connections:
-            await self.active_connections[user_email].send_text(message)
+        """특정 사용자의 모든 탭에 메시지를 전송합니다. (모든 노드 대상)"""
+        await self._dispatch(user_room(user_email), message)
 
-    async def broadcast(self, message: dict, exclude_email: Optional[str] = None):
+    async def broadcast(
+        self,
+        message: dict,
+        exclude_email: Optional[str] = None,
+        coalesce_key: Optional[str] = None,
+    ):
         """
-        모든 활성 연결된 클라이언트에게 JSON 메시지를 브로드캐스트합니다.
-        
+        모든 활성 연결된 클라이언트에게 JSON 메시지를 브로드캐스트합니다. (모든 노드 대상)
+
         Args:
             message (dict): 브로드캐스트할 데이터 (JSON 직렬화됨)
             exclude_email (str): 메시지 수신에서 제외할 사용자 (선택 사항)
+            coalesce_key (str): coalesce 정책에서 같은 키의 대기 메시지를 대체할 때 사용 (선택 사항)
         """
-        json_message = json.dumps(message)
-        
-        # 모든 활성 연결에 비동기적으로 메시지 전송
-        for email, connection in self.active_connections.items():
-            if email != exclude_email:
-                try:
-                    await connection.send_text(json_message)
-                except RuntimeError as e:
-                    # 연결이 이미 닫혔거나 오류가 발생한 경우 처리
-                    print(f"Error broadcasting to {email}: {e}")
-                    self.disconnect(email)
+        await self._dispatch(BROADCAST_ROOM, json.dumps(message), exclude_email, coalesce_key)
+
+    def metrics(self) -> Dict[str, Any]:
+        """전체 및 연결별 전송 지연 지표"""
+        connections = [
+            connection.metrics()
+            for user_connections in self.active_connections.values()
+            for connection in user_connections
+        ]
+        return {
+            "broker": type(self.broker).__name__,
+            "overflow_policy": self.overflow_policy,
+            "users": len(self.active_connections),
+            "status_users": len(self.status_counts),
+            "connections": len(connections),
+            "rooms": len(self.rooms),
+            "max_queue_depth": max((c["queue_depth"] for c in connections), default=0),
+            "connection_metrics": connections,
+        }
 
 
-manager = ConnectionManager()
+_settings = get_settings()
+manager = ConnectionManager(
+    max_queue_size=_settings.WS_SEND_QUEUE_SIZE,
+    overflow_policy=_settings.WS_OVERFLOW_POLICY,
+    send_timeout=_settings.WS_SEND_TIMEOUT_SECONDS,
+    broker=create_broker(_settings.REALTIME_BROKER, _settings.REDIS_URL),
+)
@@ -0,0 +1,382 @@
+"""
+실시간 이벤트 브로커.
+
+ConnectionManager는 룸으로 발행된 이벤트를 직접 소켓에 보내지 않고 브로커에 넘깁니다.
+브로커는 이벤트를 모든 노드(프로세스/인스턴스)에 전달하고, 각 노드의 ConnectionManager가
+자신에게 연결된 소켓에만 전송합니다. 따라서 uvicorn 워커나 Cloud Run 인스턴스를 늘려도
+다른 노드에 접속한 사용자끼리 채팅/상태 이벤트를 주고받을 수 있습니다.
+
+- InProcessBroker: 단일 프로세스 (기본값)
+- PostgresBroker: Postgres LISTEN/NOTIFY (기존 database.engine 사용)
+- RedisBroker: Redis Pub/Sub (redis 패키지 필요) / FakeRedis로 로컬 테스트 가능
+"""
+import asyncio
+import base64
+import json
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# (room, payload) -> None
+MessageHandler = Callable[[str, str], Awaitable[None]]
+
+# 모든 노드가 구독하는 단일 채널 이름
+REALTIME_CHANNEL = "mindmap_realtime"
+
+
+class Broker:
+    """브로커 인터페이스"""
+
+    async def start(self, handler: MessageHandler):
+        """수신을 시작합니다. 다른 노드(자기 자신 포함)에서 발행된 이벤트마다 handler가 호출됩니다."""
+        raise NotImplementedError
+
+    async def publish(self, room: str, payload: str):
+        """이벤트를 모든 노드에 발행합니다."""
+        raise NotImplementedError
+
+    async def stop(self):
+        """수신을 중지하고 리소스를 정리합니다."""
+        pass
+
+
+class InProcessBroker(Broker):
+    """단일 프로세스용 브로커. 발행 즉시 로컬 handler로 전달합니다."""
+
+    def __init__(self):
+        self._handler: Optional[MessageHandler] = None
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+
+    async def publish(self, room: str, payload: str):
+        if self._handler is not None:
+            await self._handler(room, payload)
+
+    async def stop(self):
+        self._handler = None
+
+
+class PostgresBroker(Broker):
+    """
+    Postgres LISTEN/NOTIFY 기반 브로커.
+
+    NOTIFY payload는 8000 bytes 미만이어야 합니다. 크기는 최종 frame의 UTF-8 바이트 길이로 계산하고,
+    넘치는 이벤트(예: 마인드맵 전체)는 UTF-8 바이트를 base64 조각으로 나눠 보낸 뒤 수신 측에서 다시 합칩니다.
+    (한글처럼 여러 바이트인 문자도 조각 frame 크기가 정확히 정해지고, 다시 이스케이프되어 커지지 않음)
+    """
+    MAX_PAYLOAD_BYTES = 7900
+    # 조각 일부가 유실된 메시지를 재조립 버퍼에서 버리기까지의 시간(초)
+    PARTIAL_TTL_SECONDS = 30.0
+    # LISTEN 연결 상태 확인 주기(초). 조용히 끊긴 연결은 읽기 이벤트가 오지 않으므로 주기적으로 확인합니다.
+    LISTEN_CHECK_SECONDS = 15.0
+    # 재연결 대기 시간(초). 실패할 때마다 두 배로 늘리며 최대값까지만 기다립니다.
+    RECONNECT_MIN_SECONDS = 1.0
+    RECONNECT_MAX_SECONDS = 30.0
+
+    def __init__(self, engine, channel: str = REALTIME_CHANNEL):
+        self.engine = engine
+        self.channel = channel
+        self._handler: Optional[MessageHandler] = None
+        self._listen_connection = None
+        self._listen_fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._watch_task: Optional[asyncio.Task] = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        # 조각 재조립 버퍼 {message_id: (첫 조각 수신 시각, [chunk, ...])} (먼저 받은 순서로 정렬됨)
+        self._partials: Dict[str, Tuple[float, List[Optional[str]]]] = {}
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+        self._loop = asyncio.get_running_loop()
+        await self._listen()
+        self._watch_task = asyncio.create_task(self._watch())
+        print(f"✅ Realtime broker listening on Postgres channel '{self.channel}'")
+
+    def _open_listen_connection(self):
+        """풀에서 분리한 전용 연결을 열고 채널을 LISTEN합니다. (풀 연결을 계속 점유하지 않도록)"""
+        import psycopg2.extensions
+
+        pooled = self.engine.raw_connection()
+        pooled.detach()
+        connection = pooled.driver_connection
+        connection.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}";')
+        return connection
+
+    async def _listen(self):
+        connection = await asyncio.to_thread(self._open_listen_connection)
+        self._listen_connection = connection
+        self._listen_fd = connection.fileno()
+        self._loop.add_reader(self._listen_fd, self._on_readable)
+
+    def _on_readable(self):
+        connection = self._listen_connection
+        if connection is None:
+            return
+        try:
+            connection.poll()
+        except Exception as e:
+            self._connection_lost(e)
+            return
+        self._drain()
+
+    def _drain(self):
+        connection = self._listen_connection
+        while connection is not None and connection.notifies:
+            notify = connection.notifies.pop(0)
+            self._on_notify(notify.payload)
+
+    def _close_listen_connection(self):
+        connection, self._listen_connection = self._listen_connection, None
+        if connection is None:
+            return
+        self._loop.remove_reader(self._listen_fd)
+        self._listen_fd = None
+        try:
+            connection.close()
+        except Exception:
+            # 이미 끊긴 연결
+            pass
+
+    def _connection_lost(self, error: Exception):
+        """🚨 LISTEN 연결이 끊기면 다른 노드의 이벤트를 받을 수 없으므로, 연결을 정리하고 다시 LISTEN합니다."""
+        if self._listen_connection is None:
+            return
+        print(f"🚨 Realtime broker: Postgres listen connection lost ({error}); reconnecting")
+        self._close_listen_connection()
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    async def _reconnect(self):
+        delay = self.RECONNECT_MIN_SECONDS
+        while self._handler is not None:
+            await asyncio.sleep(delay)
+            try:
+                await self._listen()
+            except Exception as e:
+                delay = min(delay * 2, self.RECONNECT_MAX_SECONDS)
+                print(f"🚨 Realtime broker: reconnect failed ({e}); retrying in {delay:.0f}s")
+                continue
+            # ⚠️ 끊겨 있던 동안 발행된 이벤트는 받지 못했습니다. (클라이언트는 since 파라미터/재동기화로 복구)
+            print(f"✅ Realtime broker re-subscribed to Postgres channel '{self.channel}'")
+            return
+
+    @staticmethod
+    def _ping(connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.LISTEN_CHECK_SECONDS)
+            connection = self._listen_connection
+            if connection is None:
+                continue
+            try:
+                await asyncio.to_thread(self._ping, connection)
+            except Exception as e:
+                if connection is self._listen_connection:
+                    self._connection_lost(e)
+                continue
+            # 확인 쿼리 중에 도착한 알림은 소켓에서 이미 읽혔으므로 여기서 처리합니다.
+            self._drain()
+
+    def _on_notify(self, raw: str):
+        # 🚨 잘못된 frame 하나가 수신 콜백에서 예외를 내지 않도록, 해석 실패는 기록하고 버립니다.
+        try:
+            frame = json.loads(raw)
+            if frame.get("n", 1) > 1:
+                data = self._reassemble(frame)
+                if data is None:
+                    return
+            else:
+                data = frame["d"]
+            envelope = json.loads(data)
+            room, payload = envelope["room"], envelope["payload"]
+        except Exception as e:
+            print(f"🚨 Realtime broker: dropped malformed NOTIFY payload ({len(raw)} bytes): {e!r}")
+            return
+
+        asyncio.ensure_future(self._deliver(room, payload))
+
+    async def _deliver(self, room: str, payload: str):
+        try:
+            await self._handler(room, payload)
+        except Exception as e:
+            print(f"🚨 Realtime broker: failed to handle Postgres message: {e}")
+
+    def _reassemble(self, frame: dict) -> Optional[str]:
+        """조각을 버퍼에 모으고, 모두 도착하면 원래 JSON 문자열을 반환합니다."""
+        now = time.monotonic()
+        self._evict_partials(now)
+
+        _, parts = self._partials.setdefault(frame["id"], (now, [None] * frame["n"]))
+        parts[frame["i"]] = frame["d"]
+        if any(part is None for part in parts):
+            return None
+        del self._partials[frame["id"]]
+        return b"".join(base64.b64decode(part) for part in parts).decode("utf-8")
+
+    def _evict_partials(self, now: float):
+        """⚠️ 조각이 유실되면 나머지가 영원히 남으므로, 오래된 재조립 버퍼를 버립니다."""
+        while self._partials:
+            message_id, (received_at, _) = next(iter(self._partials.items()))
+            if now - received_at < self.PARTIAL_TTL_SECONDS:
+                break
+            del self._partials[message_id]
+            print(f"⚠️ Realtime broker: dropped incomplete message {message_id} (missing NOTIFY frames)")
+
+    def build_frames(self, room: str, payload: str) -> List[str]:
+        """이벤트를 NOTIFY frame 목록으로 만듭니다. 각 frame의 UTF-8 길이는 MAX_PAYLOAD_BYTES 이하입니다."""
+        data = json.dumps({"room": room, "payload": payload}, ensure_ascii=False)
+        message_id = uuid.uuid4().hex
+        frame = json.dumps({"id": message_id, "i": 0, "n": 1, "d": data}, ensure_ascii=False)
+        if len(frame.encode("utf-8")) <= self.MAX_PAYLOAD_BYTES:
+            return [frame]
+
+        # 조각 frame은 ASCII(base64)만 담으므로 frame 크기 = 고정 헤더 + base64 길이
+        raw = data.encode("utf-8")
+        header = len(json.dumps({"id": message_id, "i": len(raw), "n": len(raw), "d": ""}))
+        chunk_bytes = (self.MAX_PAYLOAD_BYTES - header) // 4 * 3
+        chunks = [raw[i:i + chunk_bytes] for i in range(0, len(raw), chunk_bytes)]
+        return [
+            json.dumps({"id": message_id, "i": index, "n": len(chunks), "d": base64.b64encode(chunk).decode("ascii")})
+            for index, chunk in enumerate(chunks)
+        ]
+
+    def _notify(self, frames: List[str]):
+        from sqlalchemy import text
+
+        with self.engine.begin() as conn:
+            for frame in frames:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": frame})
+
+    async def publish(self, room: str, payload: str):
+        # 한 트랜잭션에서 NOTIFY하면 조각 순서가 유지되고 커밋 시 한 번에 전달됩니다.
+        await asyncio.to_thread(self._notify, self.build_frames(room, payload))
+
+    async def stop(self):
+        self._handler = None
+        for task in (self._watch_task, self._reconnect_task):
+            if task is not None:
+                task.cancel()
+        self._watch_task = self._reconnect_task = None
+        self._close_listen_connection()
+
+
+class RedisBroker(Broker):
+    """
+    Redis Pub/Sub 기반 브로커.
+    client는 redis.asyncio.Redis 또는 FakeRedis처럼 publish()/pubsub()를 제공하는 객체입니다.
+    """
+
+    def __init__(self, client, channel: str = REALTIME_CHANNEL):
+        self.client = client
+        self.channel = channel
+        self._handler: Optional[MessageHandler] = None
+        self._pubsub = None
+        self._reader_task: Optional[asyncio.Task] = None
+
+    async def start(self, handler: MessageHandler):
+        self._handler = handler
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(self.channel)
+        self._reader_task = asyncio.create_task(self._reader())
+        print(f"✅ Realtime broker subscribed to Redis channel '{self.channel}'")
+
+    async def _reader(self):
+        async for message in self._pubsub.listen():
+            if message.get("type") != "message":
+                continue
+            data = message["data"]
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            try:
+                envelope = json.loads(data)
+                await self._handler(envelope["room"], envelope["payload"])
+            except Exception as e:
+                print(f"🚨 Realtime broker: failed to handle Redis message: {e}")
+
+    async def publish(self, room: str, payload: str):
+        await self.client.publish(self.channel, json.dumps({"room": room, "payload": payload}))
+
+    async def stop(self):
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe(self.channel)
+            self._pubsub = None
+        self._handler = None
+
+
+class FakeRedis:
+    """
+    테스트/로컬 개발용 인메모리 Redis Pub/Sub.
+    같은 FakeRedis 인스턴스를 공유하는 RedisBroker들은 서로 다른 노드처럼 동작합니다.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List["FakePubSub"]] = {}
+
+    def pubsub(self) -> "FakePubSub":
+        return FakePubSub(self)
+
+    async def publish(self, channel: str, data: str) -> int:
+        subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber._queue.put_nowait({"type": "message", "channel": channel, "data": data})
+        return len(subscribers)
+
+
+class FakePubSub:
+    def __init__(self, server: FakeRedis):
+        self._server = server
+        self._channels: List[str] = []
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel: str):
+        self._server._subscribers.setdefault(channel, []).append(self)
+        self._channels.append(channel)
+        self._queue.put_nowait({"type": "subscribe", "channel": channel, "data": 1})
+
+    async def unsubscribe(self, channel: str):
+        subscribers = self._server._subscribers.get(channel, [])
+        if self in subscribers:
+            subscribers.remove(self)
+        if channel in self._channels:
+            self._channels.remove(channel)
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+
+def create_broker(kind: str, redis_url: str = "") -> Broker:
+    """설정(REALTIME_BROKER)에 맞는 브로커를 생성합니다."""
+    kind = (kind or "memory").lower()
+
+    if kind == "memory":
+        return InProcessBroker()
+
+    if kind == "postgres":
+        from .database import engine
+
+        if engine.dialect.name != "postgresql":
+            print("⚠️ REALTIME_BROKER=postgres requires PostgreSQL. Falling back to in-process broker.")
+            return InProcessBroker()
+        return PostgresBroker(engine)
+
+    if kind == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError:
+            raise RuntimeError("REALTIME_BROKER=redis requires the 'redis' package (pip install redis).")
+        return RedisBroker(redis_asyncio.from_url(redis_url))
+
+    if kind == "fakeredis":
+        return RedisBroker(FakeRedis())
+
+    raise ValueError(f"Unknown realtime broker: {kind}. Must be one of memory, postgres, redis, fakeredis")
@@ -1,10 +1,13 @@
+import asyncio
 import json
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import BaseModel, Field
-import vertexai
-from vertexai.generative_models import GenerativeModel, GenerationConfig
 from typing import List
 
+from ..services.ai_analyzer import build_response_schema
+from ..services.llm_provider import get_llm_provider
+from ..utils import run_until_disconnect
+
 # 임시 인증 확인 함수 (실제 앱에서는 JWT 토큰 검증 로직으로 대체해야 합니다)
 def get_authenticated_user():
     return True 
@@ -33,10 +36,12 @@ class MindMapResponse(BaseModel):
 )
 async def generate_mindmap(
     chat_history: str, # 프론트엔드에서 전체 대화 기록을 문자열로 받음
+    request: Request,
     # security_check: bool = Depends(get_authenticated_user) # 🚨 실제 구현 시 인증 확인
 ):
     """
     제공된 채팅 기록을 분석하여 구조화된 마인드맵 JSON을 반환합니다.
+    모델 호출은 이벤트 루프를 막지 않는 비동기 호출이며, 클라이언트가 연결을 끊으면 취소됩니다.
     """
     if not chat_history or len(chat_history.strip()) < 10:
         raise HTTPException(
@@ -45,7 +50,7 @@ async def generate_mindmap(
         )
 
     try:
-        model = GenerativeModel("gemini-2.5-flash") # Vertex AI 모델 사용
+        provider = get_llm_provider() # 공유 LLM 제공자 사용 (요청마다 모델을 만들지 않음)
 
         system_instruction = (
             "당신은 대화 내용을 마인드맵 구조로 변환하는 AI 비서입니다. "
@@ -55,22 +60,24 @@ async def generate_mindmap(
         )
 
         user_prompt = f"다음은 사용자 간의 대화 기록입니다. 이 대화를 기반으로 마인드맵 JSON을 생성해주세요:\n---\n{chat_history}"
-        
-        config = GenerationConfig(
-            system_instruction=system_instruction,
-            response_mime_type="application/json",
-            response_schema=MindMapResponse, # Pydantic 스키마를 JSON 스키마로 사용
-        )
 
-        response = model.generate_content(
-            contents=user_prompt,
-            config=config,
-        )
+        response = await run_until_disconnect(request, provider.agenerate(
+            f"{system_instruction}\n\n{user_prompt}",
+            {},
+            response_schema=build_response_schema(MindMapResponse), # Pydantic 스키마를 JSON 스키마로 사용
+        ))
         
         json_data = json.loads(response.text)
         
         return MindMapResponse(**json_data) 
 
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="마인드맵 생성 시간이 초과되었습니다. 잠시 후 다시 시도해 주세요."
+        )
     except Exception as e:
         print(f"Vertex AI 호출 중 오류 발생: {e}")
         raise HTTPException(
@@ -9,6 +9,7 @@ from ..utils import create_friend_code, save_profile_image, UPLOAD_FOLDER, DEFAU
 from ..security import get_password_hash, verify_password, create_access_token
 from ..dependencies import get_current_active_user
 from ..models import User 
+from ..services.project_versions import bump_user_projects
 from ..schemas import UserCreate, UserLogin, User as UserSchema, Token, UserUpdateName, UserUpdatePassword # 🚨 스키마 추가 임포트
 
 # 🎯 라우터 1: 기본 인증 기능 (접두사 없음: /signup, /login)
@@ -141,6 +142,8 @@ async def update_user_name(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found in database.")
 
     db_user.name = user_update.name
+    # 프로젝트 멤버 목록에 이름이 포함되므로 멤버 버전(ETag)을 갱신합니다.
+    bump_user_projects(db, db_user.id)
     db.commit()
     db.refresh(db_user)
 
@@ -208,6 +211,7 @@ async def upload_profile_image(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found.")
 
     db_user.profile_image_url = image_url
+    bump_user_projects(db, db_user.id)
     db.commit()
     db.refresh(db_user)
 
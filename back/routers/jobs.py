@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models import GenerationJob as ORMGenerationJob, User as ORMUser
+from ..schemas import GenerationJob as GenerationJobSchema
+from ..dependencies import get_current_active_user
+from ..services.generation_jobs import fail_orphaned_job
+from .project import get_project_member
+
+router = APIRouter(
+    prefix="/jobs",
+    tags=["4. Project and MindMap"]
+)
+
+@router.get("/{job_id}", response_model=GenerationJobSchema)
+def get_generation_job(
+    job_id: str,
+    current_user: ORMUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """마인드맵 생성 작업 상태 조회 (queued, running, succeeded, failed)"""
+    job = db.query(ORMGenerationJob).filter(ORMGenerationJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    # 작업이 속한 프로젝트의 멤버만 조회 가능
+    if not get_project_member(db, current_user.id, job.project_id):
+        raise HTTPException(status_code=403, detail="User is not a member of this project.")
+
+    # 작업을 맡은 프로세스가 죽어 끝나지 않을 작업은 실패로 보고합니다. (폴링이 끝나도록)
+    return fail_orphaned_job(db, job)
@@ -8,6 +8,7 @@ from ..database import get_db
 from ..models import Memo as DBMemo, User
 from ..schemas import Memo, MemoCreate, MemoBase # Pydantic 스키마
 from ..dependencies import get_current_active_user
+from ..services import search_index
 
 router = APIRouter(
     # prefix="/memo",  # main.py에서 이미 "/api/v1/memo"로 설정되므로 제거했습니다.
@@ -25,6 +26,8 @@ def create_memo(
     # ORM 모델인 DBMemo를 사용하여 데이터베이스 객체를 생성합니다.
     db_memo = DBMemo(**memo.dict(), owner_id=current_user.id)
     db.add(db_memo)
+    db.flush()
+    search_index.index_memo(db, db_memo)
     db.commit()
     db.refresh(db_memo)
     return db_memo
@@ -54,6 +57,7 @@ def update_memo(
     
     for key, value in memo_update.dict(exclude_unset=True).items():
         setattr(db_memo, key, value)
+    search_index.index_memo(db, db_memo)
         
     db.commit()
     db.refresh(db_memo)
@@ -71,6 +75,7 @@ def delete_memo(
     if not db_memo:
         raise HTTPException(status_code=404, detail="Memo not found or access denied")
         
+    search_index.delete_documents(db, search_index.KIND_MEMO, [db_memo.id])
     db.delete(db_memo)
     db.commit()
     return {}
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
-from ..database import get_db
+from ..database import get_db, SessionLocal
 # Pydantic 스키마와의 이름 충돌을 피하기 위해 ORM 모델에 별칭(ORM) 지정
 from ..models import (
     Project as ORMProject, 
     ProjectMember as ORMProjectMember, 
     ChatMessage as ORMChatMessage, 
+    ChatSummary as ORMChatSummary,
+    GenerationJob as ORMGenerationJob,
     MindMapNode as ORMDatabaseMindMapNode, # ORM 클래스 이름 변경: Pydantic 스키마와 충돌 방지
     User as ORMUser
 )
@@ -20,14 +23,34 @@ from ..schemas import (
     MindMapData, 
     AIRecommendation, 
     ProjectUpdate,
-    ORMMindMapNode # Pydantic response model alias 임포트 (schemas.py에서 정의됨)
+    ORMMindMapNode, # Pydantic response model alias 임포트 (schemas.py에서 정의됨)
+    MindMapGraphNode,
+    MindMapGraphResult,
+    MindMapNeighbors,
+    MindMapDiff,
+    MindMapVersionInfo,
+    MindMapNodeBatchUpdate,
+    MindMapNodeBatchResult,
+    MindMapLayout,
+    GenerationJob as GenerationJobSchema
 )
 from ..dependencies import get_current_active_user
+from ..realtime import manager, project_room
+from ..fast_response import fast_json_response
 # 💡 [가정] services.ai_analyzer 모듈 임포트
-from ..services.ai_analyzer import analyze_chat_and_generate_map, recommend_map_improvements
+from ..services.ai_analyzer import arecommend_map_improvements
+from ..services.chat_summary import update_chat_summaries, build_chat_context
+from ..services.generation_jobs import submit_generation_job, find_active_generation_job, JOB_QUEUED
+from ..services.generation_lock import acquire_generation_lease
+from ..services import mindmap_analytics, mindmap_graph, mindmap_history, mindmap_layout, project_versions, projections, search_index
+from ..services.mindmap_store import diff_mindmap, patch_nodes
+from ..config import get_settings
 from typing import List, Optional
 from sqlalchemy.orm import joinedload
 from pydantic import ValidationError # 추가^^
+import uuid
+from ..utils import run_until_disconnect
+from ..services.single_flight import AsyncSingleFlight
 
 # ----------------------------------------------------
 # 💡 핵심 1: 멤버십 서비스/유틸리티 함수 (403 오류 해결의 핵심)
@@ -114,6 +137,8 @@ def create_project(
     # 생성자를 멤버 및 관리자로 추가
     db_member = ORMProjectMember(project_id=db_project.id, user_id=current_user.id, is_admin=True)
     db.add(db_member)
+    project_versions.bump_project_versions(db, db_project.id, project_versions.RESOURCE_MEMBERS)
+    search_index.index_project(db, db_project)
     db.commit()
         
     # 생성 후 프로젝트 멤버 정보까지 로드하여 반환
@@ -121,35 +146,46 @@ def create_project(
 
 @router.get("/", response_model=List[ProjectSchema])
 def list_projects(
+    request: Request,
     current_user: ORMUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """현재 사용자가 멤버로 참여하고 있는 모든 프로젝트 목록 조회 (멤버 정보 포함)"""
-    projects = db.query(ORMProject).join(ORMProjectMember).filter(
-        ORMProjectMember.user_id == current_user.id
-    ).order_by(desc(ORMProject.created_at)).options(
-        joinedload(ORMProject.members).joinedload(ORMProjectMember.user)
-    ).all()
-        
-    return projects
+    # 💡 빠른 응답 경로: 컬럼만 조회한 행을 검증 없이 인코딩합니다. (fast_response.py)
+    return fast_json_response(request, projections.project_rows(db, current_user.id))
 
 @router.get("/{project_id}", response_model=ProjectSchema)
 def get_project_details(
     project_id: int,
+    request: Request,
+    response: Response,
     current_user: ORMUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """특정 프로젝트 상세 정보 조회 (멤버 검증 포함)"""
+    """
+    특정 프로젝트 상세 정보 조회 (멤버 검증 포함)
+    ETag(프로젝트/멤버 버전 + 생성 중 여부)를 보내며, If-None-Match가 일치하면 멤버를 조회하지 않고 304를 반환합니다.
+    """
     verify_project_member(db, project_id, current_user.id)
-        
-    project = db.query(ORMProject).filter(ORMProject.id == project_id).options(
-        joinedload(ORMProject.members).joinedload(ORMProjectMember.user)
-    ).first()
-        
+
+    # 💡 버전을 데이터보다 먼저 읽습니다. (그 사이 쓰기가 있어도 ETag가 데이터보다 새 버전을 가리키지 않도록)
+    project = db.query(ORMProject).filter(ORMProject.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-        
-    return project
+
+    # is_generating은 lease 만료 시각에 따라 쓰기 없이도 바뀌므로 ETag에 포함합니다.
+    etag = project_versions.make_etag(
+        project_id, project_versions.RESOURCE_PROJECT,
+        project.version or 0, project.members_version or 0, int(project.is_generating)
+    )
+    cached = project_versions.not_modified(request, etag)
+    if cached is not None:
+        return cached
+    project_versions.set_etag(response, etag)
+
+    return db.query(ORMProject).filter(ORMProject.id == project_id).options(
+        joinedload(ORMProject.members).joinedload(ORMProjectMember.user)
+    ).first()
 
 @router.put("/{project_id}", response_model=ProjectSchema)
 def update_project(
@@ -165,8 +201,10 @@ def update_project(
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    if project_update.title is not None:
+    if project_update.title is not None and project_update.title != db_project.title:
         db_project.title = project_update.title
+        project_versions.bump_project_versions(db, project_id, project_versions.RESOURCE_PROJECT)
+        search_index.index_project(db, db_project)
         
     db.commit()
     db.refresh(db_project)
@@ -194,12 +232,19 @@ def delete_project(
         raise HTTPException(status_code=404, detail="Project not found")
 
     # 관련 데이터 삭제 (채팅, 노드, 멤버)
+    db.query(ORMGenerationJob).filter(ORMGenerationJob.project_id == project_id).delete(synchronize_session=False)
+    db.query(ORMChatSummary).filter(ORMChatSummary.project_id == project_id).delete(synchronize_session=False)
     db.query(ORMChatMessage).filter(ORMChatMessage.project_id == project_id).delete(synchronize_session=False)
+    mindmap_history.delete_project_versions(db, project_id)
+    mindmap_layout.delete_project_layouts(db, project_id)
+    mindmap_graph.delete_project_edges(db, project_id)
+    search_index.delete_project_documents(db, project_id)
     db.query(ORMDatabaseMindMapNode).filter(ORMDatabaseMindMapNode.project_id == project_id).delete(synchronize_session=False)
     db.query(ORMProjectMember).filter(ORMProjectMember.project_id == project_id).delete(synchronize_session=False)
         
     db.delete(db_project)
     db.commit()
+    mindmap_analytics.metrics_cache.discard_project(project_id)
         
     return
 
@@ -209,6 +254,7 @@ def post_chat_message( # 함수 이름 명확화 (generate_mindmap과의 충돌
     project_id: int,
     # 💡 Pydantic 스키마를 인수로 받도록 명확히 정의
     message_data: ChatMessageCreate, 
+    background_tasks: BackgroundTasks,
     # 💡 403 권한 검사를 Depends에 위임
     member: ORMProjectMember = Depends(verify_project_member_dependency), 
     current_user: ORMUser = Depends(get_current_active_user),
@@ -232,6 +278,8 @@ def post_chat_message( # 함수 이름 명확화 (generate_mindmap과의 충돌
             # 프로젝트 멤버도 함께 생성
             db_member = ORMProjectMember(project_id=project_id, user_id=user_id, is_admin=True)
             db.add(db_member)
+            project_versions.bump_project_versions(db, project_id, project_versions.RESOURCE_MEMBERS)
+            search_index.index_project(db, db_project)
             db.commit()
             
             print(f"INFO: Created default project (ID: {project_id}) and member (User ID: {user_id}).")
@@ -250,8 +298,11 @@ def post_chat_message( # 함수 이름 명확화 (generate_mindmap과의 충돌
         content=message_data.content 
     )
     db.add(db_message)
+    project_versions.bump_project_versions(db, project_id, project_versions.RESOURCE_CHAT)
     
     try:
+        db.flush()
+        search_index.index_chat(db, db_message)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -261,172 +312,245 @@ def post_chat_message( # 함수 이름 명확화 (generate_mindmap과의 충돌
         )
         
     db.refresh(db_message)
+
+    # 응답 후 프로젝트 룸 구독자에게 새 메시지를 푸시합니다.
+    background_tasks.add_task(
+        manager.publish,
+        project_room(project_id),
+        {
+            "type": "chat_message",
+            "project_id": project_id,
+            "message": ChatMessageSchema.model_validate(db_message).model_dump(mode="json"),
+        },
+    )
     return db_message
 
+# 채팅 기록 페이지 크기 (한 번의 요청으로 전송하는 최대 메시지 수)
+CHAT_PAGE_DEFAULT_LIMIT = 50
+CHAT_PAGE_MAX_LIMIT = 200
+
 @router.get("/{project_id}/chat", response_model=List[ChatMessageSchema])
 def get_chat_history(
     project_id: int,
+    request: Request,
+    before_id: Optional[int] = Query(None, ge=1, description="이 id보다 오래된 메시지를 조회 (이전 페이지)"),
+    after_id: Optional[int] = Query(None, ge=0, description="마지막으로 받은 메시지 id. 이후 새 메시지만 조회 (증분 폴링)"),
+    limit: Optional[int] = Query(None, ge=1, le=CHAT_PAGE_MAX_LIMIT, description=f"최대 메시지 수 (커서 사용 시 기본 {CHAT_PAGE_DEFAULT_LIMIT})"),
     current_user: ORMUser = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """프로젝트 채팅 기록 조회"""
-    # 프로젝트 존재 여부 확인
-    db_project = db.query(ORMProject).filter(ORMProject.id == project_id).first()
-    if not db_project:
+    """
+    프로젝트 채팅 기록 조회 (id 기반 커서 페이지네이션)
+
+    - 커서와 limit 모두 없음: 전체 채팅 기록 (기존 클라이언트 호환)
+    - 커서 없이 `limit`만: 가장 최근 `limit`개의 메시지
+    - `before_id`: 해당 id 이전의 메시지 `limit`개 (스크롤로 과거 기록 로드)
+    - `after_id`: 해당 id 이후의 새 메시지만 (폴링 클라이언트는 마지막으로 본 id를 전달)
+
+    결과는 항상 id 오름차순으로 반환됩니다.
+    채팅 버전 ETag를 보내며, If-None-Match가 일치하면 메시지를 조회하지 않고 304를 반환합니다.
+    """
+    if before_id is not None and after_id is not None:
+        raise HTTPException(status_code=400, detail="before_id and after_id cannot be used together.")
+
+    # 프로젝트 존재 여부 확인 (채팅 버전을 메시지보다 먼저 읽음)
+    chat_version = db.query(ORMProject.chat_version).filter(ORMProject.id == project_id).first()
+    if not chat_version:
         raise HTTPException(status_code=404, detail="Project not found")
 
-    chats = db.query(ORMChatMessage).filter(ORMChatMessage.project_id == project_id).order_by(ORMChatMessage.timestamp).all()
-    return chats
+    etag = project_versions.make_etag(project_id, project_versions.RESOURCE_CHAT, chat_version[0] or 0)
+    cached = project_versions.not_modified(request, etag)
+    if cached is not None:
+        return cached
+    headers = project_versions.etag_headers(etag)
+
+    # (project_id, id) 복합 인덱스를 타도록 id로만 필터/정렬합니다.
+    query = db.query(ORMChatMessage).filter(ORMChatMessage.project_id == project_id)
+
+    if before_id is None and after_id is None and limit is None:
+        # 💡 커서/limit 없는 기존 호출은 잘리지 않은 전체 기록을 받습니다.
+        chats = projections.chat_message_rows(query.order_by(ORMChatMessage.id))
+        return fast_json_response(request, chats, headers=headers)
+    if limit is None:
+        limit = CHAT_PAGE_DEFAULT_LIMIT
+
+    if after_id is not None:
+        # 증분 모드: 마지막으로 본 id 이후의 메시지를 오래된 순으로
+        chats = projections.chat_message_rows(
+            query.filter(ORMChatMessage.id > after_id).order_by(ORMChatMessage.id).limit(limit)
+        )
+        return fast_json_response(request, chats, headers=headers)
+
+    if before_id is not None:
+        query = query.filter(ORMChatMessage.id < before_id)
+
+    # 최신 메시지부터 limit개를 가져온 뒤 오름차순으로 뒤집어 반환
+    chats = projections.chat_message_rows(query.order_by(desc(ORMChatMessage.id)).limit(limit))
+    chats.reverse()
+    return fast_json_response(request, chats, headers=headers)
 
 # --- 핵심 기능: AI 분석 및 마인드맵 생성 ---
-@router.post("/{project_id}/generate", response_model=AIAnalysisResult)
+@router.post("/{project_id}/generate", response_model=GenerationJobSchema, status_code=status.HTTP_202_ACCEPTED)
 def generate_mindmap(
     project_id: int,
+    full_regeneration: bool = Query(False, description="True이면 새 채팅만 반영하지 않고 전체 채팅 기록으로 마인드맵을 새로 생성"),
     # 💡 [핵심 통합] 403 권한 검사를 Depends에 위임합니다.
     member: ORMProjectMember = Depends(verify_project_member_dependency), 
     current_user: ORMUser = Depends(get_current_active_user), # 토큰 검증은 여기서 이미 처리됨
     db: Session = Depends(get_db)
 ):
-    """채팅 기록을 기반으로 AI 마인드맵 생성/업데이트 요청"""
-    # 💡 [디버깅 추가] DB 연결 및 ORM 모델 접근 테스트
-    try:
-        # ORM 테스트: 프로젝트 ID {project_id}의 노드가 있는지 확인
-        # ORMDatabaseMindMapNode는 이 파일 상단에서 ORMMindMapNode의 별칭입니다.
-        test_node_count = db.query(ORMDatabaseMindMapNode).filter(
-            ORMDatabaseMindMapNode.project_id == project_id
-        ).count()
-        print(f"✅ DEBUG ROUTER: DB ORM 테스트 성공. Project {project_id}의 노드 개수: {test_node_count}")
+    """
+    채팅 기록을 기반으로 AI 마인드맵 생성/업데이트 요청
 
-    except Exception as e:
-        # 이 예외가 발생하면 DB 설정 문제
-        print(f"🚨🚨🚨 FATAL DB ERROR IN ROUTER (generate_mindmap): {e} 🚨🚨🚨")
-        db.rollback()
-        raise HTTPException(
-            status_code=500,
-            detail=f"Database connection or ORM query failed: {e}"
-        )
-    
-    # ----------------------------------------------------------------------
+    생성은 백그라운드 작업으로 실행되며, 202와 함께 작업 정보를 바로 반환합니다.
+    결과는 GET /jobs/{job_id}로 조회하거나 프로젝트 웹소켓의 generation_job 이벤트로 받습니다.
 
+    이미 같은 프로젝트의 생성 작업이 진행 중이면 새 작업을 만들지 않고 그 작업을 반환합니다(single-flight).
+    단, 진행 중인 작업이 증분 생성인데 전체 재생성을 요청한 경우에는 409를 반환합니다.
+    """
     db_project = db.query(ORMProject).filter(ORMProject.id == project_id).first()
     if not db_project:
         # verify_project_member_dependency를 통과했다면 발생 가능성이 낮지만, 안전을 위해 남겨둠
         raise HTTPException(status_code=404, detail="Project not found")
 
-    if db_project.is_generating:
+    # 💡 [AI 생성 중] 조건부 UPDATE로 lease를 원자적으로 획득 (동시 요청 중 하나만 성공, 만료된 lease는 회수)
+    # lease와 작업 행을 한 트랜잭션으로 커밋하여, 획득에 실패한 동시 요청이 진행 중인 작업을 찾을 수 있게 합니다.
+    lease_token = acquire_generation_lease(db, project_id, commit=False)
+    if lease_token is None:
+        db.rollback()
+        active_job = find_active_generation_job(db, project_id)
+        # 전체 재생성 작업은 증분 생성 요청도 충족하므로 공유합니다.
+        if active_job is not None and (active_job.full_regeneration or not full_regeneration):
+            print(f"✅ Project {project_id}: 진행 중인 생성 작업 {active_job.id} 공유")
+            return active_job
         raise HTTPException(status_code=409, detail="MindMap is already being generated.")
-    
-    # 💡 [AI 생성 중] 플래그 설정
-    db_project.is_generating = True
-    db.commit()
-        
-    chat_history = db.query(ORMChatMessage).filter(ORMChatMessage.project_id == project_id).order_by(ORMChatMessage.id).all()
-
-    # 🚨🚨🚨 디버깅 코드 추가 (필수) 🚨🚨🚨
-    print("-----------------------------------------")
-    print(f"✅✅ [DEBUG ROUTER] Project ID: {project_id}")
-    print(f"🚨🚨 [ROUTER LOG] chat_history length BEFORE AI call: {len(chat_history)}")
-    if len(chat_history) > 0:
-        print(f"🚨🚨 [ROUTER LOG] First Chat ID: {chat_history[0].id}, Content: {chat_history[0].content[:20]}...")
-    print("-----------------------------------------")
-    # 🚨🚨🚨 디버깅 코드 끝 🚨🚨🚨
-    
-    try:
-        last_processed_id = db_project.last_chat_id_processed or 0
-        
-        # last_processed_id = 0 
-    
-        # 💡 analyze_chat_and_generate_map 호출 (DB 세션 전달)
-        analysis_result: AIAnalysisResult = analyze_chat_and_generate_map(
-            project_id=project_id,
-            chat_history=chat_history,
-            last_processed_chat_id=last_processed_id, # ⬅️ 이제 0이 전달됨
-            db_session=db
-        )
-        
-        # 분석이 성공하고 유효한 데이터가 있을 때만 노드 업데이트
-        if analysis_result.is_success and analysis_result.mind_map_data and analysis_result.mind_map_data.nodes:
-            # 1. 기존 노드 삭제
-            db.query(ORMDatabaseMindMapNode).filter(ORMDatabaseMindMapNode.project_id == project_id).delete(synchronize_session=False)
-            
-            # 2. 새로운 노드 ORM 객체 생성 및 추가
-            new_nodes = []
-            for node_data in analysis_result.mind_map_data.nodes:
-                # 🚨 connections 필드가 JSON 컬럼임을 가정하고 Pydantic 객체를 to_dict() 또는 json.dumps로 변환해야 할 수 있습니다.
-                # 현재는 스키마/모델의 타입이 직접적으로 일치한다고 가정하고 처리합니다.
-                db_node = ORMDatabaseMindMapNode(
-                    project_id=project_id,
-                    id=node_data.id,
-                    node_type=node_data.node_type,
-                    title=node_data.title,
-                    description=node_data.description,
-                    connections=node_data.connections 
-                )
-                new_nodes.append(db_node)
-
-            db.add_all(new_nodes) 
-            
-            # 3. 프로젝트 상태 업데이트
-            db_project.last_chat_id_processed = analysis_result.last_chat_id
-            db_project.is_generating = False
-            db.commit()
-
-            # [수정] 아래 줄에 디버깅 코드 추가
-            chat_history = db.query(ORMChatMessage).filter(ORMChatMessage.project_id == project_id).order_by(ORMChatMessage.id).all()
-
-            # 🚨🚨🚨 디버깅 코드 추가 🚨🚨🚨
-            print(f"🚨🚨 [ROUTER LOG] chat_history length before AI call: {len(chat_history)}")
-            # 🚨🚨🚨 디버깅 코드 끝 🚨🚨🚨
-        else:
-            # 💡 [핵심 수정] AI 분석이 성공했으나 (is_success=True), 새로운 노드를 생성할 필요가 없거나 (채팅 없음) 
-            # 마인드맵 데이터를 반환하지 않은 경우입니다.
-            
-            # 🚨 [수정] is_success가 False인 경우에만 400 에러를 발생시키고, 
-            # is_success가 True인 경우는 정상 종료로 간주하여 200 OK를 반환하도록 수정합니다.
-            
-            db_project.is_generating = False
-            db.commit()
 
-            if not analysis_result.is_success:
-                # AI 분석 함수에서 실패(예: LLM 오류, 파싱 오류)를 명시적으로 반환한 경우
-                raise HTTPException(status_code=400, detail="AI analysis failed (is_success=False). Check server logs for detail.")
-            
-            # 새로운 채팅이 없어서 노드 업데이트를 하지 않은 경우 (analysis_result.nodes=[]), 정상 응답으로 간주합니다.
-            return analysis_result
-                
-    except ValidationError as e:
-        # Pydantic 스키마(AIAnalysisResult) 파싱 오류 처리
-        db.rollback()
-        db_project.is_generating = False
-        db.commit()
-        raise HTTPException(
-            status_code=500,
-            detail=f"AI response validation error. Check AI output format. Detail: {e}"
-        )
-    except Exception as e:
-        # 기타 오류 발생 시 플래그 해제 및 롤백
-        db.rollback()
-        db_project.is_generating = False
-        db.commit()
-        # 💡 GCP/Vertex AI 관련 오류가 여기서 포착됩니다.
-        raise HTTPException(status_code=500, detail=f"AI analysis failed due to internal error: {e}")
+    job = ORMGenerationJob(
+        id=uuid.uuid4().hex,
+        project_id=project_id,
+        requested_by=current_user.id,
+        status=JOB_QUEUED,
+        full_regeneration=full_regeneration,
+        lease_token=lease_token
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
 
-    return analysis_result
+    submit_generation_job(job)
+    return job
 
 # --- 마인드맵 조회 및 업데이트 ---
 @router.get("/{project_id}/mindmap", response_model=List[ORMMindMapNode])
 def get_mindmap_nodes(
     project_id: int,
+    request: Request,
+    version: Optional[int] = Query(None, ge=0, description="지정하면 해당 버전의 맵을 복원하여 반환"),
     # 💡 [핵심 통합] 403 권한 검사를 Depends에 위임합니다.
     current_user: ORMProjectMember = Depends(verify_project_member_dependency), 
     db: Session = Depends(get_db)
 ):
-    """현재 마인드맵 노드 전체 조회"""
-    verify_project_member(db, project_id, current_user.id)
-        
-    # 데이터베이스 쿼리에는 ORM 클래스를 사용
-    nodes = db.query(ORMDatabaseMindMapNode).filter(ORMDatabaseMindMapNode.project_id == project_id).all()
-    return nodes
+    """
+    현재(또는 지정한 버전의) 마인드맵 노드 전체 조회
+    마인드맵 버전 ETag를 보내며, If-None-Match가 일치하면 노드를 조회/복원하지 않고 304를 반환합니다.
+    """
+    if version is not None:
+        # 지난 버전은 바뀌지 않으므로 버전 번호만으로 ETag를 만듭니다.
+        etag = project_versions.make_etag(project_id, project_versions.RESOURCE_NODES, f"h{version}")
+        cached = project_versions.not_modified(request, etag)
+        if cached is not None:
+            return cached
+
+        data = mindmap_history.load_version(db, project_id, version)
+        if data is None:
+            raise HTTPException(status_code=404, detail="MindMap version not found")
+        # 복원한 노드에는 노드 버전이 없습니다.
+        nodes = [
+            projections.mindmap_node_dict(
+                node["id"], node["node_type"], node["title"], node.get("description"),
+                node.get("connections"), project_id, None
+            )
+            for node in data["nodes"]
+        ]
+        return fast_json_response(request, nodes, headers=project_versions.etag_headers(etag))
+
+    mindmap_version = db.query(ORMProject.mindmap_version).filter(ORMProject.id == project_id).first()
+    if not mindmap_version:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    etag = project_versions.make_etag(project_id, project_versions.RESOURCE_NODES, mindmap_version[0] or 0)
+    cached = project_versions.not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    # 💡 빠른 응답 경로: 노드가 수천 개여도 객체별 검증 없이 컬럼 행을 바로 인코딩합니다. (fast_response.py)
+    nodes = projections.mindmap_node_rows(db, project_id)
+    return fast_json_response(request, nodes, headers=project_versions.etag_headers(etag))
+
+@router.get("/{project_id}/mindmap/layout", response_model=MindMapLayout)
+def get_mindmap_layout(
+    project_id: int,
+    request: Request,
+    algorithm: str = Query(mindmap_layout.LAYOUT_RADIAL, pattern="^(radial|tree|force)$"),
+    version: Optional[int] = Query(None, ge=0, description="생략 시 현재 버전"),
+    current_user: ORMProjectMember = Depends(verify_project_member_dependency),
+    db: Session = Depends(get_db)
+):
+    """
+    마인드맵 노드 배치 좌표 (서버에서 계산하여 버전별로 저장)
+    처음 요청한 버전은 가장 가까운 이전 버전의 배치에서 바뀐 부분만 다시 계산합니다.
+    """
+    if version is None:
+        version = db.query(ORMProject.mindmap_version).filter(ORMProject.id == project_id).scalar()
+        if version is None:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+    # 버전별 배치는 바뀌지 않으므로 버전과 알고리즘만으로 ETag를 만듭니다.
+    etag = project_versions.make_etag(project_id, "layout", algorithm, version)
+    cached = project_versions.not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    layout = mindmap_layout.get_layout(db, project_id, algorithm, version)
+    if layout is None:
+        raise HTTPException(status_code=404, detail="MindMap version not found")
+
+    return fast_json_response(request, {
+        "project_id": project_id,
+        "version": layout.version,
+        "algorithm": layout.algorithm,
+        "base_version": layout.base_version,
+        "recomputed": layout.recomputed or 0,
+        "nodes": [{"id": node_id, "x": x, "y": y} for node_id, (x, y) in layout.positions.items()],
+    }, headers=project_versions.etag_headers(etag))
+
+@router.get("/{project_id}/mindmap/versions", response_model=List[MindMapVersionInfo])
+def list_mindmap_versions(
+    project_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = Query(None, description="이 버전보다 이전 버전만 조회 (페이지네이션)"),
+    current_user: ORMProjectMember = Depends(verify_project_member_dependency),
+    db: Session = Depends(get_db)
+):
+    """마인드맵 버전 이력 (최신순)"""
+    return mindmap_history.list_versions(db, project_id, limit=limit, before=before)
+
+@router.get("/{project_id}/mindmap/diff", response_model=MindMapDiff)
+def diff_mindmap_versions(
+    project_id: int,
+    from_version: int = Query(..., ge=0),
+    to_version: Optional[int] = Query(None, ge=0, description="생략 시 최신 버전"),
+    current_user: ORMProjectMember = Depends(verify_project_member_dependency),
+    db: Session = Depends(get_db)
+):
+    """두 버전 사이의 변경 사항 (각 버전은 가장 가까운 스냅샷에서 delta를 적용하여 복원)"""
+    if to_version is None:
+        to_version = db.query(ORMProject.mindmap_version).filter(ORMProject.id == project_id).scalar() or 0
+
+    diff = mindmap_history.diff_versions(db, project_id, from_version, to_version)
+    if diff is None:
+        raise HTTPException(status_code=404, detail="MindMap version not found")
+    return diff
 
 @router.put("/{project_id}/node/{node_id}", response_model=ORMMindMapNode)
 def update_mindmap_node(
@@ -438,8 +562,6 @@ def update_mindmap_node(
     db: Session = Depends(get_db)
 ):
     """마인드맵 노드 상세 정보 수정 (title, description)"""
-    verify_project_member(db, project_id, current_user.id)
-        
     db_project = db.query(ORMProject).filter(ORMProject.id == project_id).first()
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -459,44 +581,207 @@ def update_mindmap_node(
     # 💡 [수정] 불필요한 중복 노드 존재 여부 확인 제거
     # db_node가 이미 Not Found 에러를 처리하므로, 추가적인 검증은 필요 없습니다.
 
+    old_row = {"id": db_node.id, "node_type": db_node.node_type, "title": db_node.title,
+               "description": db_node.description, "connections": db_node.connections}
+
     if node_update.description is not None:
         db_node.description = node_update.description
     if node_update.title is not None:
         db_node.title = node_update.title
+
+    # 수동 수정도 버전으로 기록합니다. (간선은 바뀌지 않음)
+    diff = diff_mindmap([old_row], [], [db_node], [])
+    if diff.updated_nodes:
+        db_node.version = (db_node.version or 0) + 1
+    mindmap_history.record_version(db, project_id, diff, mindmap_history.SOURCE_EDIT, user_id=current_user.user_id)
+    # 검색 색인도 같은 트랜잭션에서 갱신합니다.
+    search_index.apply_node_diff(db, project_id, diff)
         
     db.commit()
     db.refresh(db_node)
     return db_node
 
-# --- AI 추천 기능 ---
-@router.post("/{project_id}/recommend", response_model=AIRecommendation)
-def get_ai_recommendation(
+@router.patch("/{project_id}/nodes", response_model=MindMapNodeBatchResult)
+def update_mindmap_nodes(
     project_id: int,
-    # 💡 [핵심 통합] 403 권한 검사를 Depends에 위임합니다.
-    current_user: ORMProjectMember = Depends(verify_project_member_dependency), 
+    batch: MindMapNodeBatchUpdate,
+    current_user: ORMProjectMember = Depends(verify_project_member_dependency),
     db: Session = Depends(get_db)
 ):
-    """마인드맵 기반 AI 개선 추천 (500자 이내)"""
-    verify_project_member(db, project_id, current_user.id)
-
+    """
+    여러 노드를 한 번에 수정합니다. (한 트랜잭션, 한 번의 커밋)
+    노드마다 version을 보내면 낙관적 동시성 검사를 하며, 버전이 다르거나 없는 노드는 conflicts로 보고하고 나머지는 적용합니다.
+    """
     db_project = db.query(ORMProject).filter(ORMProject.id == project_id).first()
     if not db_project:
         raise HTTPException(status_code=404, detail="Project not found")
-        
-    # 데이터베이스 쿼리에는 ORM 클래스를 사용
-    nodes = db.query(ORMDatabaseMindMapNode).filter(ORMDatabaseMindMapNode.project_id == project_id).all()
-    if not nodes:
-        raise HTTPException(status_code=400, detail="MindMap has not been generated yet. Cannot provide recommendation.")
 
-    chat_history = db.query(ORMChatMessage).filter(ORMChatMessage.project_id == project_id).order_by(ORMChatMessage.id).all()
-        
-    # 데이터를 딕셔너리로 변환하여 AI 서비스에 전달
-    map_data = {"nodes": [
-        {"id": n.id, "node_type": n.node_type, "title": n.title, "description": n.description, "connections": n.connections} 
-        for n in nodes
-    ]}
-
-    # 💡 recommend_map_improvements 호출
-    recommendation_text = recommend_map_improvements(map_data, chat_history)
+    if db_project.is_generating:
+        raise HTTPException(status_code=403, detail="Cannot modify node while map is generating.")
+
+    updated_ids, conflicts, diff = patch_nodes(db, project_id, batch.nodes)
+    version = mindmap_history.record_version(db, project_id, diff, mindmap_history.SOURCE_EDIT, user_id=current_user.user_id)
+    db.commit()
+
+    # 응답용으로 수정된 노드와 충돌 노드의 현재 상태를 한 번에 조회합니다.
+    lookup_ids = set(updated_ids) | {conflict["id"] for conflict in conflicts}
+    nodes = {
+        node.id: node
+        for node in db.query(ORMDatabaseMindMapNode).filter(
+            ORMDatabaseMindMapNode.project_id == project_id,
+            ORMDatabaseMindMapNode.id.in_(lookup_ids)
+        )
+    } if lookup_ids else {}
+
+    return MindMapNodeBatchResult(
+        updated=[nodes[node_id] for node_id in updated_ids if node_id in nodes],
+        conflicts=[{**conflict, "current": nodes.get(conflict["id"])} for conflict in conflicts],
+        version=version
+    )
+
+# --- 마인드맵 그래프 조회 (mindmap_edges + 재귀 CTE) ---
+# 전체 맵을 받지 않고도 큰 마인드맵의 일부만 탐색할 수 있습니다.
+def _graph_result(
+    db: Session,
+    project_id: int,
+    node_id: str,
+    direction: str,
+    max_depth: Optional[int]
+) -> MindMapGraphResult:
+    limit = get_settings().MINDMAP_MAX_TRAVERSAL_DEPTH
+    depth = min(max_depth or limit, limit)
+
+    result = mindmap_graph.traverse(db, project_id, node_id, direction=direction, max_depth=depth)
+    if result is None:
+        raise HTTPException(status_code=404, detail="MindMap Node not found")
+
+    return MindMapGraphResult(
+        root_id=node_id,
+        direction=direction,
+        max_depth=depth,
+        nodes=[
+            MindMapGraphNode(**ORMMindMapNode.model_validate(node).model_dump(), depth=node_depth)
+            for node, node_depth in result["nodes"]
+        ],
+        links=[{"source": source, "target": target} for source, target in result["edges"]]
+    )
+
+@router.get("/{project_id}/node/{node_id}/subtree", response_model=MindMapGraphResult)
+def get_node_subtree(
+    project_id: int,
+    node_id: str,
+    max_depth: Optional[int] = Query(None, ge=1, description="생략 시 서버 최대 깊이(MINDMAP_MAX_TRAVERSAL_DEPTH)"),
+    current_user: ORMProjectMember = Depends(verify_project_member_dependency),
+    db: Session = Depends(get_db)
+):
+    """노드와 그 하위 노드 전체(또는 max_depth 단계까지)"""
+    return _graph_result(db, project_id, node_id, mindmap_graph.DIRECTION_OUT, max_depth)
+
+@router.get("/{project_id}/node/{node_id}/ancestors", response_model=MindMapGraphResult)
+def get_node_ancestors(
+    project_id: int,
+    node_id: str,
+    max_depth: Optional[int] = Query(None, ge=1, description="생략 시 서버 최대 깊이(MINDMAP_MAX_TRAVERSAL_DEPTH)"),
+    current_user: ORMProjectMember = Depends(verify_project_member_dependency),
+    db: Session = Depends(get_db)
+):
+    """노드에서 상위 방향으로 도달하는 조상 노드 (depth 1이 부모)"""
+    return _graph_result(db, project_id, node_id, mindmap_graph.DIRECTION_IN, max_depth)
+
+@router.get("/{project_id}/node/{node_id}/traverse", response_model=MindMapGraphResult)
+def traverse_from_node(
+    project_id: int,
+    node_id: str,
+    direction: str = Query(mindmap_graph.DIRECTION_BOTH, pattern="^(out|in|both)$"),
+    max_depth: Optional[int] = Query(2, ge=1),
+    current_user: ORMProjectMember = Depends(verify_project_member_dependency),
+    db: Session = Depends(get_db)
+):
+    """깊이 제한 탐색: 노드에서 direction(out | in | both)으로 max_depth 단계 안에 있는 노드"""
+    return _graph_result(db, project_id, node_id, direction, max_depth)
+
+@router.get("/{project_id}/node/{node_id}/neighbors", response_model=MindMapNeighbors)
+def get_node_neighbors(
+    project_id: int,
+    node_id: str,
+    current_user: ORMProjectMember = Depends(verify_project_member_dependency),
+    db: Session = Depends(get_db)
+):
+    """노드와 직접 연결된 부모/자식 노드"""
+    result = mindmap_graph.neighbors(db, project_id, node_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="MindMap Node not found")
+
+    return MindMapNeighbors(
+        root_id=node_id,
+        parents=result["parents"],
+        children=result["children"],
+        links=[{"source": source, "target": target} for source, target in result["edges"]]
+    )
+
+# --- AI 추천 기능 ---
+# 같은 프로젝트의 동시 추천 요청은 하나의 계산(요약 갱신 + 모델 호출)을 공유합니다.
+_recommend_flights = AsyncSingleFlight()
+
+
+def _load_recommendation_inputs(project_id: int):
+    """
+    추천 입력(맵, 최근 채팅, 요약 컨텍스트)을 로드합니다.
+    공유 계산은 처음 요청한 클라이언트가 먼저 끊겨도 계속되어야 하므로 요청 세션 대신 자체 세션을 사용합니다.
+    """
+    db = SessionLocal()
+    try:
+        db_project = db.query(ORMProject).filter(ORMProject.id == project_id).first()
+        if not db_project:
+            raise HTTPException(status_code=404, detail="Project not found")
+
+        # 데이터베이스 쿼리에는 ORM 클래스를 사용
+        if not db.query(ORMDatabaseMindMapNode.id).filter(ORMDatabaseMindMapNode.project_id == project_id).first():
+            raise HTTPException(status_code=400, detail="MindMap has not been generated yet. Cannot provide recommendation.")
+
+        # 요약 갱신은 커밋을 포함하므로, 이벤트 루프에서 다시 조회되지 않도록 이후에 입력을 로드합니다.
+        update_chat_summaries(db, project_id)
+        chat_context = build_chat_context(db, project_id)
+
+        # 버전은 노드보다 먼저 읽습니다. (그래프 분석 캐시 키, services/mindmap_analytics.py)
+        map_version = db.query(ORMProject.mindmap_version).filter(ORMProject.id == project_id).scalar()
+        nodes = db.query(ORMDatabaseMindMapNode).filter(ORMDatabaseMindMapNode.project_id == project_id).all()
+        chat_history = db.query(ORMChatMessage).filter(ORMChatMessage.project_id == project_id).order_by(desc(ORMChatMessage.id)).limit(20).all()
+        chat_history.reverse()
+
+        # 데이터를 딕셔너리로 변환하여 AI 서비스에 전달
+        map_data = {"project_id": project_id, "version": map_version, "nodes": [
+            {"id": n.id, "node_type": n.node_type, "title": n.title, "description": n.description, "connections": n.connections} 
+            for n in nodes
+        ]}
+        return map_data, chat_history, chat_context
+    finally:
+        db.close()
+
+
+async def _compute_recommendation(project_id: int) -> str:
+    map_data, chat_history, chat_context = await run_in_threadpool(_load_recommendation_inputs, project_id)
+    return await arecommend_map_improvements(map_data, chat_history, chat_context)
+
+
+@router.post("/{project_id}/recommend", response_model=AIRecommendation)
+async def get_ai_recommendation(
+    project_id: int,
+    request: Request,
+    # 💡 [핵심 통합] 403 권한 검사를 Depends에 위임합니다.
+    current_user: ORMProjectMember = Depends(verify_project_member_dependency)
+):
+    """
+    마인드맵 기반 AI 개선 추천 (500자 이내)
+
+    DB 조회/요약 갱신은 스레드풀에서, 모델 호출은 이벤트 루프에서 비동기로 수행하므로
+    추천을 기다리는 동안 스레드풀 슬롯을 점유하지 않습니다. 클라이언트가 연결을 끊으면 모델 호출도 취소됩니다.
+    같은 프로젝트에 대한 동시 요청은 진행 중인 하나의 추천 결과를 공유합니다(single-flight).
+    """
+    # 💡 arecommend_map_improvements 호출 (비동기, 연결 종료 시 취소)
+    recommendation_text = await run_until_disconnect(
+        request,
+        _recommend_flights.do(("recommend", project_id), lambda: _compute_recommendation(project_id))
+    )
 
     return AIRecommendation(recommendation=recommendation_text)
@@ -0,0 +1,65 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..models import User as ORMUser
+from ..schemas import SearchHit, SearchResults
+from ..dependencies import get_current_active_user
+from ..services import search_index
+from .project import verify_project_member
+
+router = APIRouter(
+    prefix="/search",
+    tags=["7. Search"]
+)
+
+# 검색 결과 페이지 크기와 offset 상한 (깊은 페이지는 순위 계산 비용이 커지므로 제한)
+SEARCH_PAGE_DEFAULT_LIMIT = 20
+SEARCH_PAGE_MAX_LIMIT = 50
+SEARCH_MAX_OFFSET = 1000
+
+
+@router.get("", response_model=SearchResults)
+def search(
+    q: str = Query(..., min_length=1, max_length=200, description="검색어 (한글은 부분 문자열도 검색됩니다)"),
+    kind: Optional[List[str]] = Query(None, description="검색 대상 (chat, memo, node, project). 생략 시 전체"),
+    project_id: Optional[int] = Query(None, ge=1, description="지정하면 해당 프로젝트의 채팅/노드/제목만 검색"),
+    limit: int = Query(SEARCH_PAGE_DEFAULT_LIMIT, ge=1, le=SEARCH_PAGE_MAX_LIMIT),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    current_user: ORMUser = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    통합 검색: 내가 멤버인 프로젝트의 채팅 메시지, 마인드맵 노드(제목/설명), 프로젝트 제목과 내 메모
+
+    관련도 순(제목 일치 우선)으로 반환하며, 같으면 최근 수정된 순입니다.
+    다음 페이지가 있으면 next_offset을 함께 반환합니다.
+    """
+    kinds = list(dict.fromkeys(kind or []))
+    invalid = [value for value in kinds if value not in search_index.KINDS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid kind: {', '.join(invalid)}")
+    if project_id is not None:
+        verify_project_member(db, project_id, current_user.id)
+
+    results, has_more = search_index.search(
+        db, current_user.id, q, kinds=kinds or None, project_id=project_id, limit=limit, offset=offset
+    )
+    return SearchResults(
+        query=q,
+        items=[
+            SearchHit(
+                kind=document.kind,
+                id=document.ref_id,
+                project_id=document.project_id,
+                title=document.title,
+                snippet=search_index.make_snippet(document, q),
+                score=round(score, 6),
+                updated_at=document.updated_at,
+            )
+            for document, score in results
+        ],
+        next_offset=offset + limit if has_more else None,
+    )
@@ -15,6 +15,8 @@ from ..schemas import (
     SetOnlineStatusRequest # 🚨 새로 임포트됨
 )
 from ..dependencies import get_current_active_user
+from ..presence import friend_graph
+from ..services.project_versions import bump_user_projects
 
 router = APIRouter(prefix="/user", tags=["user"])
 
@@ -74,6 +76,7 @@ def add_friend_request(
         # 이미 요청이 있다면, 해당 요청을 accepted로 변경하고 새로 레코드 생성 없이 종료
         inverse_request.status = "accepted"
         db.commit()
+        friend_graph.invalidate(current_user.id, friend_to_add.id)
         # HTTP 200은 성공을 의미하며, body가 없어도 프론트에서 처리할 수 있도록 detail을 제공합니다.
         raise HTTPException(status_code=200, detail="Inverse request found and automatically accepted.")
 
@@ -158,6 +161,7 @@ def handle_friend_request_action(
         db.add(inverse_friendship)
         
         db.commit()
+        friend_graph.invalidate(current_user.id, friendship_record.user_id)
         
     elif action_data.action == "reject":
         # 거절 시, 해당 요청 레코드의 상태를 'rejected'로 변경 (또는 삭제)
@@ -225,6 +229,7 @@ def remove_friend(
         db.delete(inverse_record)
         
     db.commit()
+    friend_graph.invalidate(current_user.id, friend_id)
     
     return
 
@@ -240,7 +245,10 @@ def set_online_status(
     user_db = db.query(User).filter(User.id == current_user.id).first()
     
     if user_db:
-        user_db.is_online = set_status_data.is_online
+        if user_db.is_online != set_status_data.is_online:
+            user_db.is_online = set_status_data.is_online
+            # 프로젝트 멤버 목록에 접속 상태가 포함되므로 멤버 버전(ETag)을 갱신합니다.
+            bump_user_projects(db, user_db.id)
         db.commit()
         return
         
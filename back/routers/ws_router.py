@@ -1,31 +1,52 @@
+import asyncio
+
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query, Depends, status
 from typing import Optional
-from sqlalchemy.orm import Session
-from ..database import get_db
-from ..models import User
+from ..database import SessionLocal
+from ..models import User, ProjectMember
 # 🚨 앞서 정의한 ConnectionManager와 토큰 유틸리티 임포트
-from .realtime import manager
-from .security_utils import decode_token_for_ws # 🚨 security_utils.py 사용 가정
+from ..realtime import manager, project_room
+from ..presence import presence
+from ..collab import collab
+from ..security_utils import decode_token_for_ws
 
 router = APIRouter()
 
 # 의존성 주입: 토큰을 사용하여 DB에서 사용자 객체를 가져옵니다.
-async def get_user_from_token(token: str, db: Session = Depends(get_db)) -> Optional[User]:
+# 🚨 웹소켓은 오래 열려 있으므로 get_db 세션을 주입받지 않습니다. (소켓마다 풀 연결을 점유하게 됨)
+#    짧은 세션으로 조회한 뒤 바로 닫고, 이미 로드된 컬럼(id/email/friend_code)만 사용합니다.
+# 💡 동기 함수(def)이므로 FastAPI가 스레드풀에서 실행합니다. (핸드셰이크마다 DB 조회가 이벤트 루프를 막지 않음)
+def get_user_from_token(token: str) -> Optional[User]:
     """
     웹소켓 쿼리 파라미터로 받은 토큰을 검증하고 사용자 객체를 반환합니다.
     """
     email = decode_token_for_ws(token)
     if email is None:
         return None
-    
+
     # DB에서 사용자를 찾아 반환
-    user = db.query(User).filter(User.email == email).first()
-    return user
+    db = SessionLocal()
+    try:
+        return db.query(User).filter(User.email == email).first()
+    finally:
+        db.close()
+
+
+def is_project_member(project_id: int, user_id: int) -> bool:
+    """짧은 세션으로 프로젝트 멤버십만 확인합니다. (수신 루프에 들어가기 전에 세션을 반납)"""
+    db = SessionLocal()
+    try:
+        return db.query(ProjectMember.id).filter(
+            ProjectMember.project_id == project_id,
+            ProjectMember.user_id == user_id
+        ).first() is not None
+    finally:
+        db.close()
 
 
 @router.websocket("/ws/status")
 async def websocket_status_endpoint(
-    websocket: WebSocket, 
+    websocket: WebSocket,
     token: str = Query(..., description="JWT access token for authentication"),
     db_user: User = Depends(get_user_from_token) # 토큰을 검증하여 사용자 객체를 주입
 ):
@@ -36,49 +57,75 @@ async def websocket_status_endpoint(
         return
 
     user_email = db_user.email
-    
-    # 2. 연결 및 상태 브로드캐스트
-    await manager.connect(websocket, user_email)
-    
-    # 로그인 상태 브로드캐스트 (모든 클라이언트에게 이 사용자가 온라인이 되었음을 알림)
-    online_message = {
-        "type": "status_update",
-        "user_email": user_email,
-        "is_online": True,
-        "friend_code": db_user.friend_code # 친구 코드를 함께 전송하여 프론트엔드에서 매칭
-    }
-    # 브로드캐스트 시 자기 자신(user_email)은 제외 (자기 탭에는 이미 연결되었으므로)
-    await manager.broadcast(online_message, exclude_email=user_email)
+
+    # 2. 연결 및 상태 전달
+    connection = await manager.connect(websocket, user_email)
+
+    # 온라인 상태를 친구에게만 전달 (다음 presence tick에 다른 변경과 묶여 전송됨)
+    # 접속 상태는 상태 소켓 수로만 판단하므로, 이미 다른 상태 탭이 열려 있었다면 알리지 않습니다.
+    # (프로젝트 소켓만 열려 있던 사용자는 오프라인이었으므로 여기서 온라인이 됩니다.)
+    if manager.open_status(user_email):
+        presence.mark(db_user.id, user_email, True, db_user.friend_code)
 
     try:
         # 3. 연결 유지: 클라이언트로부터의 메시지를 기다림 (실제로는 비어 있을 수 있음)
         while True:
             # 이 라인을 실행하여 웹소켓 연결을 유지하고, 클라이언트의 종료 메시지를 대기합니다.
-            await websocket.receive_text() 
-            
+            await websocket.receive_text()
+
     except WebSocketDisconnect:
         # 4. 연결 끊김 (로그아웃 또는 탭 종료) 처리
-        manager.disconnect(user_email)
-        
-        # 오프라인 상태 브로드캐스트
-        offline_message = {
-            "type": "status_update",
-            "user_email": user_email,
-            "is_online": False,
-            "friend_code": db_user.friend_code
-        }
-        await manager.broadcast(offline_message)
-        
+        pass
+
     except Exception as e:
         # 기타 예외 처리 (예: DB 오류 등)
         print(f"WebSocket error for {user_email}: {e}")
-        manager.disconnect(user_email)
-        
-        # 오프라인 상태 브로드캐스트
-        offline_message = {
-            "type": "status_update",
-            "user_email": user_email,
-            "is_online": False,
-            "friend_code": db_user.friend_code
-        }
-        await manager.broadcast(offline_message)
+
+    finally:
+        manager.disconnect(connection)
+
+        # 마지막 상태 탭이 닫혔을 때만 오프라인 상태 전달 (프로젝트 소켓이 남아 있어도 오프라인)
+        if manager.close_status(user_email):
+            presence.mark(db_user.id, user_email, False, db_user.friend_code)
+
+
+@router.websocket("/ws/projects/{project_id}")
+async def websocket_project_endpoint(
+    websocket: WebSocket,
+    project_id: int,
+    token: str = Query(..., description="JWT access token for authentication"),
+    db_user: User = Depends(get_user_from_token)
+):
+    """
+    프로젝트 룸 웹소켓. 해당 프로젝트의 채팅/마인드맵 이벤트를 수신하고,
+    노드 편집 op(node_op)와 재동기화 요청(sync_request)을 보냅니다. (collab.py)
+    """
+    # 1. 사용자 인증 및 프로젝트 멤버십 검사
+    if db_user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    if not await asyncio.to_thread(is_project_member, project_id, db_user.id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    # 2. 연결 및 프로젝트 룸 구독
+    connection = await manager.connect(websocket, db_user.email)
+    manager.subscribe(connection, project_room(project_id))
+    collab.hello(connection, project_id)
+
+    try:
+        # 3. 클라이언트 메시지(공동 편집 op) 처리
+        while True:
+            text = await websocket.receive_text()
+            await collab.handle_message(connection, project_id, db_user.id, text)
+
+    except WebSocketDisconnect:
+        pass
+
+    except Exception as e:
+        print(f"Project WebSocket error for {db_user.email} (project {project_id}): {e}")
+
+    manager.disconnect(connection)
+    # 이 인스턴스의 마지막 연결이었다면 공동 편집 세션을 저장 후 제거합니다.
+    collab.release(project_id)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, model_validator
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional
 from datetime import datetime
 from fastapi import UploadFile # UploadFile 임포트
 
@@ -170,6 +170,7 @@ class MindMapNodeBase(BaseModel):
 
 class MindMapNode(MindMapNodeBase):
     project_id: int
+    version: Optional[int] = None # 노드 버전 (과거 맵 버전을 복원한 응답에는 없음)
 
     class Config:
         from_attributes = True
@@ -177,16 +178,133 @@ class MindMapNode(MindMapNodeBase):
 # routers/project.py에서 ORM 모델 이름 충돌을 피하기 위한 별칭
 ORMMindMapNode = MindMapNode
 
+# --- 마인드맵 노드 일괄 수정 스키마 (PATCH /projects/{id}/nodes) ---
+class MindMapNodePatch(BaseModel):
+    id: str
+    version: Optional[int] = None # 클라이언트가 알고 있는 노드 버전. 다르면 충돌로 보고 (생략 시 검사 안 함)
+    node_type: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    connections: Optional[List[MindMapNodeConnection]] = None # 주어지면 이 노드의 하위 연결 전체를 교체
+
+class MindMapNodeBatchUpdate(BaseModel):
+    nodes: List[MindMapNodePatch] = Field(..., min_length=1, max_length=500)
+
+class MindMapNodeConflict(BaseModel):
+    id: str
+    reason: str # version_mismatch | not_found
+    current: Optional[MindMapNode] = None # 서버의 현재 노드 (클라이언트 병합용)
+
+class MindMapNodeBatchResult(BaseModel):
+    updated: List[MindMapNode] = []
+    conflicts: List[MindMapNodeConflict] = []
+    version: Optional[int] = None # 적용 후 마인드맵 버전 (변경이 없으면 None)
+
+# --- 공동 편집 op (프로젝트 웹소켓, collab.py) ---
+class MindMapNodeOperation(BaseModel):
+    op_id: Optional[str] = None # 클라이언트가 정한 op ID (브로드캐스트에 그대로 포함되어 자신의 op 확인에 사용)
+    node_id: str
+    op: Literal["set_title", "set_description", "set_node_type", "add_connection", "remove_connection"]
+    value: Optional[str] = None # set_* op의 새 값
+    target_id: Optional[str] = None # *_connection op의 대상 노드
+
+class CollabSyncRequest(BaseModel):
+    since_seq: int = Field(0, ge=0) # 마지막으로 받은 이벤트의 seq
+    stream: Optional[str] = None # 그 seq가 속한 스트림 (collab_hello의 stream, 다르면 전체 재조회)
+
+# --- 마인드맵 그래프 조회 스키마 (services/mindmap_graph.py) ---
+class MindMapGraphNode(MindMapNode):
+    depth: int = 0 # 시작 노드로부터의 최단 단계 수
+
+class MindMapGraphResult(BaseModel):
+    root_id: str
+    direction: str # out(하위), in(상위), both
+    max_depth: int
+    nodes: List[MindMapGraphNode] = []
+    links: List[Dict[str, str]] = [] # 결과 노드들 사이의 간선 {"source", "target"}
+
+class MindMapNeighbors(BaseModel):
+    root_id: str
+    parents: List[MindMapNode] = []
+    children: List[MindMapNode] = []
+    links: List[Dict[str, str]] = []
+
 # --- AI 결과 스키마 ---
 class MindMapData(BaseModel):
     nodes: List[MindMapNodeBase] = []
     links: List[Dict[str, str]] = [] # Link는 nodes의 connections 정보로 프론트에서 생성할 수 있음
 
+class MindMapDiff(BaseModel):
+    """저장된 맵 대비 변경 사항. 클라이언트는 이것만으로 로컬 상태를 갱신할 수 있습니다."""
+    added_nodes: List[MindMapNodeBase] = []
+    updated_nodes: List[MindMapNodeBase] = []
+    removed_node_ids: List[str] = []
+    added_links: List[Dict[str, str]] = []
+    removed_links: List[Dict[str, str]] = []
+    unchanged_count: int = 0
+
+class MindMapVersionInfo(BaseModel):
+    version: int
+    kind: str # snapshot | delta
+    source: str # generation | edit
+    stats: Dict[str, int] = {}
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+# --- 마인드맵 배치 (GET /projects/{id}/mindmap/layout, services/mindmap_layout.py) ---
+class MindMapNodePosition(BaseModel):
+    id: str
+    x: float
+    y: float
+
+class MindMapLayout(BaseModel):
+    project_id: int
+    version: int
+    algorithm: str # radial | tree | force
+    base_version: Optional[int] = None # 증분 계산의 기준 버전 (처음부터 계산했으면 None)
+    recomputed: int = 0 # 새로 배치한 노드 수
+    nodes: List[MindMapNodePosition] = []
+
+# --- 통합 검색 스키마 (GET /search, services/search_index.py) ---
+class SearchHit(BaseModel):
+    kind: str # chat | memo | node | project
+    id: str # 원본 ID (채팅/메모/프로젝트는 숫자 문자열, 노드는 노드 ID)
+    project_id: Optional[int] = None # 메모는 None
+    title: Optional[str] = None
+    snippet: Optional[str] = None # 본문에서 검색어 주변
+    score: float = 0.0 # 클수록 관련도가 높음
+    updated_at: Optional[datetime] = None
+
+class SearchResults(BaseModel):
+    query: str
+    items: List[SearchHit] = []
+    next_offset: Optional[int] = None # 다음 페이지 offset (없으면 마지막 페이지)
+
 class AIAnalysisResult(BaseModel):
     is_success: bool
     last_chat_id: int
     mind_map_data: MindMapData
+    diff: Optional[MindMapDiff] = None # 저장 시 적용된 변경 사항 (generate_project_mindmap)
+    version: Optional[int] = None # 저장 후 마인드맵 버전 (변경이 없으면 None)
 
 class AIRecommendation(BaseModel):
     recommendation: str
 
+
+# --- 비동기 마인드맵 생성 작업 스키마 ---
+class GenerationJob(BaseModel):
+    id: str
+    project_id: int
+    status: str # queued, running, succeeded, failed
+    full_regeneration: bool = False
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[AIAnalysisResult] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
@@ -1,34 +1,36 @@
 # AI 모델과 관련된 로직이 포함된 파일입니다.
-import os
+import asyncio
+import copy
+import hashlib
 import json
-from typing import List, Dict, Any, Optional
+import time
+from typing import List, Dict, Any, Optional, Callable, Iterable, Set, Tuple
 from ..schemas import ChatMessage, AIAnalysisResult, MindMapData, MindMapNodeBase
 # DB 세션 타입을 정의하기 위해 ORM 모델을 import합니다.
-from ..models import MindMapNode as ORMMindMapNode
-
-import vertexai
-from vertexai.generative_models import GenerativeModel, GenerationConfig
+from ..models import MindMapNode as ORMMindMapNode, Project as ORMProject
+from ..config import get_settings
 
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session # 세션 타입 명시
 
-# 💡 [Vertex AI 설정]
-PROJECT_ID = os.getenv("GCP_PROJECT_ID", "minmap-476213") 
-REGION = os.getenv("GCP_REGION", "asia-northeast3") # 서울 리전
-# 🚨 [수정] gemini-1.5-pro 대신 광범위하게 사용 가능한 모델로 변경합니다.
-GEMINI_MODEL = "gemini-2.5-flash"
+from .llm_cache import llm_cache, make_cache_key, fingerprint
+from .llm_provider import get_llm_provider
+from .json_stream import JsonArrayItemParser
+from .mindmap_graph import collect_edges
+from . import mindmap_analytics
+
+# 💡 [LLM 제공자] 모델 호출은 services/llm_provider.py의 제공자(vertex | fake | record | replay)를 통해 이루어집니다.
+# Vertex AI 클라이언트는 첫 호출 시점에 한 번만 초기화되어 공유됩니다.
 
-# 💡 [Vertex AI Client 초기화]
-try:
-    vertexai.init(project=PROJECT_ID, location=REGION)
-    # GenerativeModel 인스턴스 생성
-    MODEL_CLIENT = GenerativeModel(model_name=GEMINI_MODEL) # ⬅️ 이제 gemini-2.5-flash를 사용합니다.
-    CLIENT = "Ready" 
-    print(f"✅ Vertex AI 모델 초기화 성공! (Model: {GEMINI_MODEL}, Project: {PROJECT_ID}, Region: {REGION})")
-except Exception as e:
-    print(f"❌ Vertex AI GenerativeModel 초기화 오류: {e}")
-    CLIENT = None
+# 💡 [LLM 응답 캐시] 프롬프트나 출력 스키마를 바꾸면 해당 버전을 올려 이전 캐시를 무효화하세요.
+FULL_PROMPT_VERSION = "full-v2"
+INCREMENTAL_PROMPT_VERSION = "incremental-v2"
+RECOMMEND_PROMPT_VERSION = "recommend-v2"
 
+# 호출 종류별 생성 설정 (캐시 키에도 포함됩니다)
+STRUCTURED_GENERATION_CONFIG = {"temperature": 0.7, "max_output_tokens": 4096}
+RECOMMEND_GENERATION_CONFIG = {"temperature": 0.7, "max_output_tokens": 1024} # 500자 이내를 위해 토큰을 넉넉히 설정
+SUMMARY_GENERATION_CONFIG = {"temperature": 0.3, "max_output_tokens": 512}
 
 # Node 및 Link 구조를 만들기 위한 헬퍼 함수
 def create_node(id: str, type: str, title: str, desc: str, connections: List[str] = None) -> Dict[str, Any]:
@@ -59,17 +61,142 @@ class MindMapDataOutput(BaseModel):
     links: List[Dict] = Field(default_factory=list, description="노드 간 연결")
 
 
-# === AI 추천 기능 ===
-def recommend_map_improvements(map_data: Dict[str, Any], chat_history: List[ChatMessage]) -> str:
+# === 캐시 키용 입력 정규화 ===
+def _chat_range(chat_history: List[ChatMessage]) -> Dict[str, int]:
+    """채팅은 수정되지 않으므로 ID 범위와 개수로 채팅 목록을 식별합니다."""
+    if not chat_history:
+        return {"first_id": 0, "last_id": 0, "count": 0}
+    return {"first_id": chat_history[0].id, "last_id": chat_history[-1].id, "count": len(chat_history)}
+
+
+def _as_node_dict(node: Any) -> Dict[str, Any]:
+    if isinstance(node, dict):
+        return node
+    return {
+        "id": node.id,
+        "node_type": node.node_type,
+        "title": node.title,
+        "description": node.description,
+        "connections": node.connections,
+    }
+
+
+def _node_set(nodes: List[Any]) -> str:
+    """노드 집합(ORM 객체 또는 dict)의 순서와 무관한 해시"""
+    return fingerprint(sorted((_as_node_dict(node) for node in nodes), key=lambda node: str(node.get("id"))))
+
+
+# === 큰 맵의 프롬프트 요약 (services/mindmap_analytics.py) ===
+class MapDigest:
     """
-    마인드맵을 기반으로 개선 사항을 추천하는 AI 함수. (500자 이내)
+    프롬프트에 자세히 넣을 중요 노드(중요도 순)와, 나머지 노드를 가장 가까운 중요 노드(anchor) 아래에 묶은 그룹.
+    anchor가 None인 그룹은 중요 노드와 연결되지 않은 노드입니다.
+    """
+    def __init__(self, nodes: List[Dict[str, Any]], groups: List[Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]],
+                 total: int, component_count: int):
+        self.nodes = nodes
+        self.groups = groups
+        self.total = total
+        self.component_count = component_count
+        self.node_ids = {node["id"] for node in nodes}
+
+    def connections(self, node: Dict[str, Any]) -> Tuple[List[str], int]:
+        """중요 노드 사이의 연결 대상과, 생략된(요약된 노드로의) 연결 수"""
+        targets = [conn.get("target_id") for conn in (node.get("connections") or []) if isinstance(conn, dict)]
+        shown = [target for target in targets if target in self.node_ids]
+        return shown, len(targets) - len(shown)
+
+    def peripheral_lines(self, with_ids: bool) -> str:
+        limit = get_settings().MINDMAP_PROMPT_GROUP_TITLES
+        lines = []
+        for anchor, members in self.groups:
+            head = f"{anchor['id']} ({anchor['title']}) 주변" if anchor else "다른 노드와 연결되지 않은 묶음"
+            shown = ", ".join(
+                f"{node['id']} {node['title']}" if with_ids else str(node["title"]) for node in members[:limit]
+            )
+            rest = len(members) - limit
+            lines.append(f"- {head} {len(members)}개: {shown}{f' 외 {rest}개' if rest > 0 else ''}")
+        return "\n".join(lines)
+
+
+def build_map_digest(
+    project_id: Optional[int],
+    map_version: Optional[int],
+    nodes: List[Dict[str, Any]],
+    focus_text: str = ""
+) -> Optional[MapDigest]:
+    """
+    맵이 MINDMAP_PROMPT_NODE_BUDGET보다 크면 그래프 중요도(버전별 캐시)로 프롬프트에 자세히 넣을 노드를 고릅니다.
+    core 노드와 focus_text(새 채팅 등)에 제목이 언급된 노드(최대 예산의 절반)는 항상 포함합니다.
+    맵이 작거나 분석을 사용할 수 없으면(SciPy 미설치) None을 반환하고, 호출 측은 맵 전체를 넣습니다.
     """
-    current_map_json = json.dumps(map_data, ensure_ascii=False, indent=2)
-    recent_chat_text = "\n".join([
+    budget = get_settings().MINDMAP_PROMPT_NODE_BUDGET
+    if budget <= 0 or len(nodes) <= budget:
+        return None
+
+    try:
+        metrics = mindmap_analytics.get_metrics(
+            project_id, map_version, [node["id"] for node in nodes], collect_edges(nodes, [])
+        )
+    except ImportError as e:
+        print(f"⚠️ 그래프 분석을 사용할 수 없어 맵 전체를 프롬프트에 넣습니다: {e}")
+        return None
+
+    focus = _normalize_title(focus_text)
+    mentioned = [
+        node["id"] for node in nodes
+        if len(_normalize_title(node.get("title"))) >= 2 and _normalize_title(node.get("title")) in focus
+    ]
+    mentioned.sort(key=lambda node_id: -metrics.salience[metrics.index[node_id]])
+    pinned = [node["id"] for node in nodes if node.get("node_type") == "core"] + mentioned[:budget // 2]
+
+    by_id = {node["id"]: node for node in nodes}
+    salient = mindmap_analytics.select_salient(metrics, budget, pinned)
+    groups = [
+        (by_id[anchor] if anchor else None, [by_id[node_id] for node_id in members])
+        for anchor, members in mindmap_analytics.peripheral_groups(metrics, salient)
+    ]
+    print(f"✅ 프롬프트 맵 요약: 노드 {len(nodes)}개 중 {len(salient)}개 포함, 나머지 {len(groups)}개 묶음으로 요약")
+    return MapDigest([by_id[node_id] for node_id in salient], groups, len(nodes), metrics.component_count)
+
+
+# === AI 추천 기능 ===
+RECOMMEND_UNAVAILABLE_MESSAGE = "Vertex AI Client가 초기화되지 않아 AI 분석을 수행할 수 없습니다."
+RECOMMEND_ERROR_MESSAGE = "AI 분석 서버에 문제가 발생했습니다. 잠시 후 다시 시도해 주세요."
+
+
+def _recommendation_request(
+    model_name: str,
+    map_data: Dict[str, Any],
+    chat_history: List[ChatMessage],
+    chat_context: Optional[str]
+) -> Tuple[str, str]:
+    """추천 프롬프트와 캐시 키를 만듭니다."""
+    recent_chats = chat_history[-20:]
+    recent_chat_text = chat_context or "\n".join([
         f"[{chat.user_id} - {chat.timestamp.strftime('%H:%M')}] {chat.content}" 
-        for chat in chat_history[-20:]
+        for chat in recent_chats
     ])
 
+    # 💡 큰 맵은 중요 노드만 JSON으로 넣고 나머지는 제목만 묶어서 요약합니다.
+    digest = build_map_digest(map_data.get("project_id"), map_data.get("version"), map_data["nodes"], recent_chat_text)
+    if digest is None:
+        current_map_json = json.dumps({"nodes": map_data["nodes"]}, ensure_ascii=False, indent=2)
+    else:
+        salient_nodes = []
+        for node in digest.nodes:
+            targets, omitted = digest.connections(node)
+            salient_nodes.append({
+                "id": node["id"], "node_type": node["node_type"], "title": node["title"], "description": node.get("description"),
+                "connections": [{"target_id": target} for target in targets],
+                **({"omitted_connections": omitted} if omitted else {}),
+            })
+        current_map_json = (
+            f"(전체 노드 {digest.total}개 중 중요도 상위 {len(digest.nodes)}개, 연결 요소 {digest.component_count}개)\n"
+            f"{json.dumps({'nodes': salient_nodes}, ensure_ascii=False, indent=2)}\n\n"
+            f"요약된 나머지 노드 (가까운 중요 노드 주변 제목):\n{digest.peripheral_lines(with_ids=False)}"
+        )
+
     prompt = f"""
 당신은 협업 프로젝트의 진행 상황을 분석하고 마인드맵 구조에 대한 구체적인 개선 사항을 추천하는 전문 AI입니다.
 사용자들이 채팅으로 논의한 내용과 현재 마인드맵 구조를 비교하여, 다음 중 하나 이상의 관점에서 500자 이내로 간결하고 명확하게 답변해야 합니다.
@@ -92,24 +219,448 @@ def recommend_map_improvements(map_data: Dict[str, Any], chat_history: List[Chat
 ---
 이 두 정보를 기반으로, 프로젝트 진행 및 마인드맵 개선을 위한 구체적인 추천 사항을 500자 이내로 제시해 주세요.
 """
-    
-    if not CLIENT:
-        return "Vertex AI Client가 초기화되지 않아 AI 분석을 수행할 수 없습니다."
+
+    cache_key = make_cache_key(
+        "recommendation", model_name, RECOMMEND_GENERATION_CONFIG, RECOMMEND_PROMPT_VERSION,
+        {
+            "nodes": _node_set(map_data.get("nodes", [])),
+            "chats": _chat_range(recent_chats),
+            "context": fingerprint(chat_context) if chat_context else None,
+        }
+    )
+    return prompt, cache_key
+
+
+def recommend_map_improvements(
+    map_data: Dict[str, Any],
+    chat_history: List[ChatMessage],
+    chat_context: Optional[str] = None
+) -> str:
+    """
+    마인드맵을 기반으로 개선 사항을 추천하는 AI 함수. (500자 이내)
+    chat_context(요약 + 최근 원본 채팅)가 주어지면 최근 채팅 20개 대신 사용합니다.
+    """
+    provider = get_llm_provider()
+    if not provider.available:
+        return RECOMMEND_UNAVAILABLE_MESSAGE
+
+    prompt, cache_key = _recommendation_request(provider.model_name, map_data, chat_history, chat_context)
+    if llm_cache is not None:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            print("✅ AI 추천 캐시 적중")
+            return cached
 
     try:
-        response = MODEL_CLIENT.generate_content(
-            contents=[prompt],
-            generation_config=GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=1024 # 500자 이내를 위해 토큰을 넉넉히 설정
-            )
-        )
+        response = provider.generate(prompt, RECOMMEND_GENERATION_CONFIG)
+        if llm_cache is not None and response.text:
+            llm_cache.set(cache_key, response.text, kind="recommendation")
         return response.text
 
         
     except Exception as e:
         print(f"Vertex AI 추천 API 요청 오류: {e}")
-        return "AI 분석 서버에 문제가 발생했습니다. 잠시 후 다시 시도해 주세요."
+        return RECOMMEND_ERROR_MESSAGE
+
+
+async def arecommend_map_improvements(
+    map_data: Dict[str, Any],
+    chat_history: List[ChatMessage],
+    chat_context: Optional[str] = None
+) -> str:
+    """
+    recommend_map_improvements의 비동기 버전. 이벤트 루프를 막지 않고 모델을 호출합니다.
+    LLM_TIMEOUT_SECONDS를 넘기면 오류 메시지를 반환하고, 호출 태스크가 취소되면 모델 호출도 취소됩니다.
+    """
+    provider = get_llm_provider()
+    # 최초 1회 Vertex AI 초기화는 블로킹이므로 스레드에서 확인합니다.
+    if not await asyncio.to_thread(lambda: provider.available):
+        return RECOMMEND_UNAVAILABLE_MESSAGE
+
+    # 🚨 큰 맵의 그래프 분석(PageRank/매개 중심성, 새 맵 버전마다 계산)과 프롬프트 직렬화는 CPU 작업이므로
+    #    이벤트 루프를 막지 않도록 스레드에서 수행합니다.
+    prompt, cache_key = await asyncio.to_thread(
+        _recommendation_request, provider.model_name, map_data, chat_history, chat_context
+    )
+    if llm_cache is not None:
+        # DB 계층을 사용하면 조회가 블로킹이므로 스레드에서 수행합니다.
+        cached = await asyncio.to_thread(llm_cache.get, cache_key) if llm_cache.persistent else llm_cache.get(cache_key)
+        if cached is not None:
+            print("✅ AI 추천 캐시 적중")
+            return cached
+
+    try:
+        response = await provider.agenerate(prompt, RECOMMEND_GENERATION_CONFIG)
+        if llm_cache is not None and response.text:
+            await asyncio.to_thread(llm_cache.set, cache_key, response.text, "recommendation")
+        return response.text
+    except asyncio.TimeoutError:
+        print("Vertex AI 추천 API 요청 시간 초과")
+        return RECOMMEND_ERROR_MESSAGE
+    except Exception as e:
+        print(f"Vertex AI 추천 API 요청 오류: {e}")
+        return RECOMMEND_ERROR_MESSAGE
+
+
+# 💡 증분(incremental) 생성을 위한 Pydantic 스키마: 기존 맵에 적용할 변경 사항만 반환
+class MindMapDeltaOutput(BaseModel):
+    added_nodes: List[MindMapNodeOutput] = Field(default_factory=list, description="새로 추가할 노드 목록")
+    updated_nodes: List[MindMapNodeOutput] = Field(default_factory=list, description="내용을 수정할 기존 노드 목록 (기존 ID 그대로 사용)")
+    removed_node_ids: List[str] = Field(default_factory=list, description="삭제할 기존 노드 ID 목록")
+
+
+def build_response_schema(output_model) -> Dict[str, Any]:
+    """Vertex AI response_schema로 전달할 JSON 스키마를 생성합니다."""
+    json_schema_dict = output_model.model_json_schema(
+        by_alias=True, 
+        # 💡 [핵심 수정] ref_template을 '#/defs/{model}'로 변경하여 
+        # Pydantic이 생성하는 $ref 참조 경로를 Vertex AI가 기대하는 경로와 일치시킵니다.
+        ref_template="#/defs/{model}" 
+    )
+    
+    # 💡 [재확인] Vertex AI는 'definitions' 대신 'defs' 키를 기대합니다.
+    if 'definitions' in json_schema_dict:
+        json_schema_dict['defs'] = json_schema_dict.pop('definitions')
+    return json_schema_dict
+
+
+def _generate_structured(
+    prompt: str,
+    output_model,
+    cache_kind: Optional[str] = None,
+    prompt_version: str = "",
+    cache_inputs: Optional[Dict[str, Any]] = None,
+    stream_key: Optional[str] = None,
+    on_item: Optional[Callable[[Dict[str, Any]], None]] = None
+):
+    """
+    프롬프트를 모델에 보내고, 응답 JSON을 output_model로 검증하여 반환합니다.
+    응답이 비어 있거나 파싱/검증에 실패하면 예외를 발생시킵니다. (원본 텍스트는 로그로 출력)
+
+    cache_kind와 cache_inputs(정규화된 입력)가 주어지면 검증된 응답을 LLM 캐시에 저장하고,
+    같은 키로 다시 호출되면 모델을 호출하지 않고 캐시된 응답을 반환합니다.
+
+    on_item이 주어지면 스트리밍으로 응답을 받으면서, 최상위 stream_key 배열의 원소(dict)가
+    완성될 때마다 on_item을 호출합니다. 반환값은 스트리밍 여부와 관계없이 전체 응답의 검증 결과입니다.
+    """
+    provider = get_llm_provider()
+    cache_key = None
+    if llm_cache is not None and cache_kind and cache_inputs is not None:
+        cache_key = make_cache_key(
+            cache_kind, provider.model_name,
+            {**STRUCTURED_GENERATION_CONFIG, "response_schema": output_model.__name__},
+            prompt_version, cache_inputs
+        )
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            print(f"✅ LLM 캐시 적중 ({cache_kind})")
+            if on_item is not None:
+                for item in cached.get(stream_key, []):
+                    _emit_item(on_item, copy.deepcopy(item))
+            # 호출 측이 노드 ID 등을 수정하므로 캐시된 값의 복사본으로 검증합니다.
+            return output_model.model_validate(copy.deepcopy(cached))
+
+    json_string = "INITIALIZATION_FAILED"
+    try:
+        if on_item is not None:
+            response_text = _stream_text(provider, prompt, output_model, stream_key, on_item)
+            finish_reason = "UNKNOWN"
+        else:
+            response = provider.generate(
+                prompt,
+                STRUCTURED_GENERATION_CONFIG,
+                response_schema=build_response_schema(output_model) # ⬅️ JSON 스키마 딕셔너리 전달
+            )
+            response_text, finish_reason = response.text, response.finish_reason
+
+        if not response_text:
+            # 텍스트가 없으면 안전 필터에 의해 차단되었을 가능성이 높습니다.
+            print(f"🚨🚨 모델 응답 실패: 텍스트가 비어있음. Finish Reason: {finish_reason}")
+            json_string = "MODEL_BLOCKED" 
+            raise ValueError("Model response was blocked or empty.")
+
+        # 💡 [핵심 추가] LLM이 반환한 JSON 원본 텍스트 강제 출력
+        json_string = response_text
+        print("💡💡💡 LLM 응답 원본 JSON 텍스트: 💡💡💡")
+        print(json_string)
+        print("-----------------------------------------")
+
+        json_string = json_string.strip()
+        if json_string.startswith("```json"):
+            json_string = json_string[7:]
+        if json_string.startswith("```"):
+            json_string = json_string[3:]
+        if json_string.endswith("```"):
+            json_string = json_string[:-3]
+        json_string = json_string.strip()
+
+        # JSON 파싱 및 Pydantic 모델로 유효성 검사
+        validated = output_model(**json.loads(json_string))
+        if cache_key is not None:
+            llm_cache.set(cache_key, validated.model_dump(mode="json"), kind=cache_kind)
+        return validated
+
+    except (json.JSONDecodeError, KeyError, ValueError) as e:
+        print(f"🚨 Vertex AI 응답 파싱 또는 Pydantic 유효성 검사 오류: {e}")
+        print(f"🚨🚨 JSON 디코딩 실패 원본 텍스트:\n--- START ---\n{json_string}\n--- END ---") 
+        raise
+    except Exception as e:
+        print(f"🚨🚨 최종 Vertex AI API 요청 오류 (예상치 못한 오류): {e}")
+        print(f"🚨🚨 마지막 파싱 시도 텍스트:\n--- LAST ATTEMPT ---\n{json_string}\n--- END ---") 
+        raise
+
+
+def _emit_item(on_item: Callable[[Dict[str, Any]], None], item: Dict[str, Any]):
+    """스트리밍 콜백 오류가 생성 자체를 실패시키지 않도록 합니다."""
+    try:
+        on_item(item)
+    except Exception as e:
+        print(f"⚠️ 스트리밍 노드 전달 오류: {e}")
+
+
+def _stream_text(provider, prompt: str, output_model, stream_key: str, on_item) -> str:
+    """스트리밍으로 응답을 받으며 완성된 배열 원소를 on_item으로 전달하고, 전체 응답 텍스트를 반환합니다."""
+    parser = JsonArrayItemParser(stream_key)
+    chunks = []
+    started = time.perf_counter()
+    first_item_at = None
+
+    for chunk in provider.generate_stream(
+        prompt,
+        STRUCTURED_GENERATION_CONFIG,
+        response_schema=build_response_schema(output_model)
+    ):
+        chunks.append(chunk)
+        for item in parser.feed(chunk):
+            if first_item_at is None:
+                first_item_at = time.perf_counter() - started
+            _emit_item(on_item, item)
+
+    if first_item_at is not None:
+        print(f"✅ 스트리밍 생성: 첫 노드 {first_item_at * 1000:.0f}ms, 전체 {(time.perf_counter() - started) * 1000:.0f}ms")
+    return "".join(chunks)
+
+
+def _normalize_title(title: Optional[str]) -> str:
+    return " ".join((title or "").split()).casefold()
+
+
+def stable_node_id(project_id: int, node_type: str, title: str, ordinal: int = 0) -> str:
+    """
+    내용(유형 + 정규화된 제목)과 위치(같은 내용을 가진 노드 중 순번)에서 파생한 노드 ID.
+    같은 맵을 다시 생성하면 같은 ID가 나오므로, 저장 시 바뀐 노드만 갱신할 수 있고 클라이언트 캐시도 유지됩니다.
+    """
+    source = f"{project_id}\x1f{node_type or ''}\x1f{_normalize_title(title)}\x1f{ordinal}"
+    return f"p{project_id}_{hashlib.sha1(source.encode('utf-8')).hexdigest()[:16]}"
+
+
+class NodeIdAssigner:
+    """
+    모델이 만든 노드 ID(예: 'major-1')를 안정적인 프로젝트 노드 ID로 변환합니다.
+
+    - reuse_existing=True (전체 생성): 같은 내용 키(유형, 제목, 순번)를 가진 기존 노드의 ID를 그대로 재사용합니다.
+      (이전 형식의 ID로 저장된 노드도 내용이 같으면 ID가 유지됩니다.)
+    - reuse_existing=False (증분 생성): 기존 노드 ID는 그대로 두고(keep_ids), 추가 노드는 기존 노드와 겹치지 않는 순번으로 ID를 만듭니다.
+
+    같은 모델 ID는 항상 같은 ID로 변환되므로, 스트리밍 중 전달한 노드와 최종 노드의 ID가 일치합니다.
+    """
+    def __init__(self, project_id: int, existing_nodes: Iterable[Any] = (), reuse_existing: bool = True):
+        self.project_id = project_id
+        self.mapping: Dict[str, str] = {}
+        self.keep_ids: Set[str] = set()
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._existing: Dict[Tuple[str, str, int], str] = {}
+        self._used: Set[str] = set()
+
+        existing_counts: Dict[Tuple[str, str], int] = {}
+        for node in existing_nodes:
+            key = (node.node_type or "", _normalize_title(node.title))
+            ordinal = existing_counts.get(key, 0)
+            existing_counts[key] = ordinal + 1
+            if reuse_existing:
+                self._existing[key + (ordinal,)] = node.id
+            else:
+                self.keep_ids.add(node.id)
+
+        if not reuse_existing:
+            self._counts = existing_counts
+            self._used = set(self.keep_ids)
+
+    def assign(self, model_id: str, node_type: str, title: str) -> str:
+        """모델 노드 ID에 대한 프로젝트 노드 ID를 반환합니다. (처음 보는 ID이면 새로 할당)"""
+        if model_id in self.keep_ids:
+            return model_id
+        if model_id in self.mapping:
+            return self.mapping[model_id]
+
+        key = (node_type or "", _normalize_title(title))
+        while True:
+            ordinal = self._counts.get(key, 0)
+            self._counts[key] = ordinal + 1
+            new_id = self._existing.get(key + (ordinal,)) or stable_node_id(self.project_id, node_type, title, ordinal)
+            if new_id not in self._used:
+                break
+
+        self._used.add(new_id)
+        self.mapping[model_id] = new_id
+        return new_id
+
+    def resolve(self, model_id: Optional[str]) -> Optional[str]:
+        """이미 할당된(또는 유지되는 기존) ID로 변환합니다. 아직 모르는 ID이면 None."""
+        if model_id in self.keep_ids:
+            return model_id
+        return self.mapping.get(model_id)
+
+    def apply(self, nodes: List[MindMapNodeOutput], links: List[Dict]) -> Dict[str, str]:
+        """노드 ID를 변환하고, connections/links의 참조도 함께 갱신합니다. (모델 ID -> 새 ID 매핑 반환)"""
+        for node in nodes:
+            node.id = self.assign(node.id, node.node_type, node.title)
+
+        # connections의 target_id를 새 ID로 일괄 업데이트
+        for node in nodes:
+            for conn in node.connections:
+                if conn.get("target_id") in self.mapping:
+                    conn["target_id"] = self.mapping[conn["target_id"]]
+
+        # links의 source/target도 새 ID로 업데이트
+        for link in links:
+            if link.get("source") in self.mapping:
+                link["source"] = self.mapping[link["source"]]
+            if link.get("target") in self.mapping:
+                link["target"] = self.mapping[link["target"]]
+
+        print(f"✅ 노드 ID 변환 완료: {len(self.mapping)}개 노드")
+        return self.mapping
+
+
+def summarize_map_compact(existing_nodes: List[ORMMindMapNode]) -> str:
+    """
+    증분 생성 프롬프트용 기존 마인드맵 요약.
+    노드마다 한 줄 (ID | 유형 | 제목 | 연결 대상)만 포함하고 설명은 생략합니다.
+    """
+    lines = []
+    for node in existing_nodes:
+        targets = ",".join(
+            conn.get("target_id", "") for conn in (node.connections or []) if isinstance(conn, dict)
+        )
+        line = f"{node.id} | {node.node_type} | {node.title}"
+        if targets:
+            line += f" | -> {targets}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def summarize_map_digest(digest: MapDigest) -> str:
+    """
+    큰 맵의 증분 생성 프롬프트용 요약. 중요 노드는 summarize_map_compact와 같은 한 줄 형식(중요 노드 사이의 연결만)으로,
+    나머지는 가까운 중요 노드 주변으로 묶어 ID와 제목 일부만 나열합니다.
+    """
+    lines = [f"(전체 노드 {digest.total}개 중 중요도 상위 {len(digest.nodes)}개만 자세히 표시)"]
+    for node in digest.nodes:
+        targets, omitted = digest.connections(node)
+        line = f"{node['id']} | {node['node_type']} | {node['title']}"
+        if targets or omitted:
+            line += " | -> " + ",".join(targets + ([f"(+{omitted})"] if omitted else []))
+        lines.append(line)
+    lines.append("")
+    lines.append("[요약된 기존 노드] ('외 n개'는 생략된 기존 노드이므로 같은 내용의 노드를 새로 추가하지 마세요):")
+    lines.append(digest.peripheral_lines(with_ids=True))
+    return "\n".join(lines)
+
+
+def apply_map_delta(existing_nodes: List[ORMMindMapNode], delta: MindMapDeltaOutput) -> List[Dict[str, Any]]:
+    """
+    기존 노드 목록에 모델이 반환한 변경 사항(추가/수정/삭제)을 적용한 전체 노드 목록을 반환합니다.
+    존재하지 않는 노드에 대한 수정/삭제는 무시합니다.
+    """
+    merged: Dict[str, Dict[str, Any]] = {
+        node.id: {
+            "id": node.id,
+            "node_type": node.node_type,
+            "title": node.title,
+            "description": node.description,
+            "connections": list(node.connections or []),
+        }
+        for node in existing_nodes
+    }
+
+    for node in delta.updated_nodes:
+        if node.id not in merged:
+            print(f"⚠️ 존재하지 않는 노드 수정 요청 무시: {node.id}")
+            continue
+        current = merged[node.id]
+        current["node_type"] = node.node_type or current["node_type"]
+        current["title"] = node.title or current["title"]
+        if node.description is not None:
+            current["description"] = node.description
+        if node.connections:
+            current["connections"] = node.connections
+
+    removed_ids = {node_id for node_id in delta.removed_node_ids if node_id in merged}
+    for node_id in removed_ids:
+        del merged[node_id]
+
+    for node in delta.added_nodes:
+        merged[node.id] = node.model_dump(mode='json')
+
+    # 삭제된 노드를 가리키는 연결 제거
+    for node in merged.values():
+        node["connections"] = [
+            conn for conn in node["connections"] if conn.get("target_id") not in removed_ids
+        ]
+
+    print(f"✅ 증분 변경 적용: +{len(delta.added_nodes)} ~{len(delta.updated_nodes)} -{len(removed_ids)}")
+    return list(merged.values())
+
+
+def _to_mind_map_data(nodes: List[Dict[str, Any]], links: List[Dict]) -> MindMapData:
+    """
+    schemas.py의 MindMapData 구조에 맞게 변환합니다.
+    connections와 links를 하나의 간선 집합으로 정리하여(존재하지 않는 노드/중복 제거) 양쪽에 같은 내용으로 채웁니다.
+    이 간선은 저장 시 mindmap_edges 테이블에도 기록됩니다.
+    """
+    edges = collect_edges(nodes, links)
+    outgoing: Dict[str, List[Dict[str, str]]] = {}
+    for source, target in edges:
+        outgoing.setdefault(source, []).append({"target_id": target})
+
+    converted_nodes = []
+    for node_dict in nodes:
+        node_dict = dict(node_dict)
+        node_dict["connections"] = outgoing.get(node_dict["id"], [])
+        converted_nodes.append(node_dict)
+
+    return MindMapData(
+        nodes=converted_nodes,
+        links=[{"source": source, "target": target} for source, target in edges]
+    )
+
+
+# === 채팅 요약 (services/chat_summary.py에서 사용) ===
+def summarize_chat_segment(segment_text: str, is_rollup: bool = False) -> Optional[str]:
+    """
+    채팅 구간(또는 하위 요약 여러 개)을 짧은 요약문으로 만듭니다.
+    모델을 사용할 수 없거나 오류가 발생하면 None을 반환합니다.
+    """
+    source = "여러 개의 대화 요약" if is_rollup else "대화 기록"
+    prompt = f"""
+다음은 협업 프로젝트의 {source}입니다. 이후 마인드맵 생성에 사용할 수 있도록
+논의된 주제, 결정 사항, 아이디어, 미해결 질문을 빠짐없이 담아 한국어로 10줄 이내로 요약하세요.
+요약문만 반환하고 다른 설명은 포함하지 마세요.
+
+---
+{segment_text}
+"""
+    provider = get_llm_provider()
+    if not provider.available:
+        return None
+
+    try:
+        response = provider.generate(prompt, SUMMARY_GENERATION_CONFIG)
+        return response.text.strip() if response.text else None
+    except Exception as e:
+        print(f"Vertex AI 채팅 요약 요청 오류: {e}")
+        return None
 
 
 # === 실제 AI 분석 및 마인드맵 생성 함수 ===
@@ -117,56 +668,183 @@ def analyze_chat_and_generate_map(
     project_id: int, 
     chat_history: List[ChatMessage], 
     last_processed_chat_id: int,
-    db_session: Session
+    existing_nodes: List[ORMMindMapNode],
+    map_version: Optional[int] = None,
+    incremental: bool = True,
+    chat_context: Optional[str] = None,
+    on_node: Optional[Callable[[Dict[str, Any]], None]] = None
 ) -> AIAnalysisResult:
     """
     채팅 기록을 분석하여 Vertex AI를 통해 마인드맵 구조를 생성하고 반환합니다.
+
+    existing_nodes/map_version은 호출 측이 미리 로드한 기존 마인드맵과 그 버전(그래프 분석 캐시 키)입니다.
+    (이 함수는 DB에 접근하지 않으므로, 호출 측이 LLM 호출 전에 읽기 트랜잭션을 끝낼 수 있습니다.)
+    incremental=True이고 기존 마인드맵이 있으면, last_processed_chat_id 이후의 새 채팅과
+    기존 맵 요약만 모델에 보내고 반환된 변경 사항(추가/수정/삭제)을 기존 맵에 적용합니다.
+    그 외에는 전체 채팅 기록으로 마인드맵을 새로 생성합니다.
+    chat_context(요약 + 최근 원본 채팅, services/chat_summary.build_chat_context)가 주어지면
+    전체 생성 시 원본 채팅 전체 대신 사용합니다.
+    on_node가 주어지면 응답을 스트리밍으로 받으며, 새 노드가 완성될 때마다 (프로젝트 고유 ID로 변환된) 노드 dict를 전달합니다.
     """
-    # # 💡 [임시 디버깅 코드 시작] 
-    # try:
-    #     if CLIENT:
-    #         # 아주 간단한 API 호출을 시도합니다.
-    #         test_response = MODEL_CLIENT.generate_content(
-    #             contents=["Hello, Gemini. What is the capital of France?"],
-    #             generation_config=GenerationConfig(max_output_tokens=10)
-    #         )
-    #         print(f"✅ DEBUG: Basic API Call Success. Response: {test_response.text}")
-    #     else:
-    #         print("❌ DEBUG: CLIENT is None.")
-    # except Exception as e:
-    #     # 이 에러가 서버 로그에 출력되어야 합니다.
-    #     print(f"🚨🚨🚨 DEBUG FATAL API ERROR DURING SIMPLE TEST: {e} 🚨🚨🚨")
-    # # 💡 [임시 디버깅 코드 끝]
-    
     # 1. 새로 분석할 채팅 기록 필터링
     new_chat_history = [chat for chat in chat_history if chat.id > (last_processed_chat_id or 0)]
-
-    # if not new_chat_history:
-    #     print("새로 분석할 채팅이 없습니다.")
-    #     return AIAnalysisResult(
-    #         is_success=True,
-    #         last_chat_id=last_processed_chat_id,
-    #         mind_map_data=MindMapData(nodes=[], links=[]) 
-    #     )
-
-    # 새로운 채팅이 없어도 전체 채팅 기록을 사용하여 LLM을 호출하도록 new_chat_text를 구성합니다.
-    # 💡 [수정] new_chat_text를 전체 chat_history로 구성 (강제 호출 목적)
-    new_chat_text = "\n".join([f"[{chat.user_id}] {chat.content}" for chat in chat_history])
     last_chat_id = chat_history[-1].id if chat_history else (last_processed_chat_id or 0)
 
+    if incremental and existing_nodes:
+        if not new_chat_history:
+            print("새로 분석할 채팅이 없습니다.")
+            return AIAnalysisResult(
+                is_success=True,
+                last_chat_id=last_processed_chat_id,
+                mind_map_data=MindMapData(nodes=[], links=[]) 
+            )
+        return _generate_incremental(project_id, new_chat_history, existing_nodes, last_chat_id, on_node, map_version)
+
+    return _generate_full(project_id, chat_history, existing_nodes, last_chat_id, chat_context, on_node, map_version)
+
+
+def _node_streamer(
+    assigner: NodeIdAssigner,
+    on_node: Optional[Callable[[Dict[str, Any]], None]]
+) -> Optional[Callable[[Dict[str, Any]], None]]:
+    """
+    스트리밍으로 받은 원본 노드를 최종 노드와 같은 ID로 변환해 on_node로 전달하는 콜백을 만듭니다.
+    아직 도착하지 않은 노드를 가리키는 연결은 생략됩니다. (최종 맵은 mindmap_updated로 전달)
+    """
+    if on_node is None:
+        return None
+
+    def on_item(item: Dict[str, Any]):
+        node = MindMapNodeOutput.model_validate(item)
+        node.id = assigner.assign(node.id, node.node_type, node.title)
+        connections = []
+        for conn in node.connections:
+            target_id = assigner.resolve(conn.get("target_id"))
+            if target_id:
+                connections.append({"target_id": target_id})
+        node.connections = connections
+        on_node(node.model_dump(mode="json"))
+
+    return on_item
+
+
+def _generate_incremental(
+    project_id: int,
+    new_chat_history: List[ChatMessage],
+    existing_nodes: List[ORMMindMapNode],
+    last_chat_id: int,
+    on_node: Optional[Callable[[Dict[str, Any]], None]] = None,
+    map_version: Optional[int] = None
+) -> AIAnalysisResult:
+    """새 채팅과 기존 맵 요약만으로 변경 사항을 생성해 기존 맵에 적용합니다. (큰 맵은 중요 노드 위주로 요약)"""
+    new_chat_text = "\n".join([f"[{chat.user_id}] {chat.content}" for chat in new_chat_history])
+    print(f"🚨🚨 증분 생성: 새 채팅 {len(new_chat_history)}개, 기존 노드 {len(existing_nodes)}개")
+    digest = build_map_digest(project_id, map_version, [_as_node_dict(node) for node in existing_nodes], new_chat_text)
+
+    prompt = f"""
+당신은 사용자들의 대화를 분석하여 기존 마인드맵(MindMap)을 갱신하는 전문 AI입니다.
+아래 [기존 마인드맵]은 이전 대화로 이미 만들어진 맵이고, [새 채팅 내용]은 그 이후에 추가된 대화입니다.
+**새 채팅 내용을 반영하는 데 필요한 변경 사항만** JSON으로 반환하세요.
+
+**🚨 [강조] 요청된 JSON 스키마를 완벽히 준수하고, JSON 앞뒤에 다른 텍스트를 포함하지 마세요.**
+
+**[기존 마인드맵] (ID | 유형 | 제목 | 연결 대상):**
+{summarize_map_digest(digest) if digest else summarize_map_compact(existing_nodes)}
+
+**[새 채팅 내용]:**
+{new_chat_text}
+
+**마인드맵 계층 구조:**
+1. 'core': 대화의 가장 중심적인 목표 또는 주제
+2. 'major': 핵심 주제를 이루는 주요 구성 요소 또는 단계
+3. 'minor': 대주제를 상세화하는 세부 항목 또는 아이디어
+
+**제약 조건:**
+- added_nodes: 새로 필요한 노드. ID는 기존 ID와 겹치지 않는 짧은 문자열(예: "minor-7")로 지정하세요.
+- updated_nodes: 제목/설명/유형이 바뀌어야 하는 기존 노드. ID는 기존 ID를 그대로 사용하세요.
+- removed_node_ids: 새 대화로 인해 더 이상 유효하지 않은 기존 노드의 ID.
+- connections의 target_id는 기존 노드 ID 또는 added_nodes의 ID여야 합니다.
+- 변경이 필요 없으면 세 목록을 모두 비워서 반환하세요.
+"""
+
+    if not get_llm_provider().available:
+        return AIAnalysisResult(
+            is_success=False, 
+            last_chat_id=last_chat_id, 
+            mind_map_data=MindMapData(nodes=[], links=[])
+        )
+
+    try:
+        assigner = NodeIdAssigner(project_id, existing_nodes, reuse_existing=False)
+        delta: MindMapDeltaOutput = _generate_structured(
+            prompt, MindMapDeltaOutput,
+            cache_kind="mindmap_incremental",
+            prompt_version=INCREMENTAL_PROMPT_VERSION,
+            cache_inputs={
+                "project_id": project_id,
+                "chats": _chat_range(new_chat_history),
+                "nodes": _node_set(existing_nodes),
+            },
+            stream_key="added_nodes",
+            on_item=_node_streamer(assigner, on_node)
+        )
+
+        # 새 노드 ID만 안정적인 프로젝트 노드 ID로 변환 (기존 노드를 가리키는 연결은 유지)
+        id_mapping = assigner.apply(delta.added_nodes, [])
+        for node in delta.updated_nodes:
+            for conn in node.connections:
+                if conn.get("target_id") in id_mapping:
+                    conn["target_id"] = id_mapping[conn["target_id"]]
+
+        merged_nodes = apply_map_delta(existing_nodes, delta)
+        links = [
+            {"source": node["id"], "target": conn["target_id"]}
+            for node in merged_nodes
+            for conn in node["connections"]
+            if conn.get("target_id")
+        ]
+
+        return AIAnalysisResult(
+            is_success=True,
+            last_chat_id=last_chat_id,
+            mind_map_data=_to_mind_map_data(merged_nodes, links)
+        )
+    except Exception:
+        return AIAnalysisResult(
+            is_success=False, 
+            last_chat_id=last_chat_id, 
+            mind_map_data=MindMapData(nodes=[], links=[])
+        )
+
+
+def _generate_full(
+    project_id: int,
+    chat_history: List[ChatMessage],
+    existing_nodes: List[ORMMindMapNode],
+    last_chat_id: int,
+    chat_context: Optional[str] = None,
+    on_node: Optional[Callable[[Dict[str, Any]], None]] = None,
+    map_version: Optional[int] = None
+) -> AIAnalysisResult:
+    """전체 채팅 기록(또는 요약 컨텍스트)으로 마인드맵을 새로 생성합니다."""
+    chat_text = chat_context or "\n".join([f"[{chat.user_id}] {chat.content}" for chat in chat_history])
+
     # 🚨🚨🚨 디버깅을 위한 코드 추가 🚨🚨🚨
-    print(f"🚨🚨 New Chat Text Content:\n{new_chat_text}\n🚨🚨 End of New Chat Text") 
+    print(f"🚨🚨 Chat Text Content:\n{chat_text}\n🚨🚨 End of Chat Text") 
     # 🚨🚨🚨 디버깅 코드 끝 🚨🚨🚨
-
-    # 3. 기존 마인드맵 정보 로드
-    existing_nodes = db_session.query(ORMMindMapNode).filter(
-        ORMMindMapNode.project_id == project_id
-    ).all()
     
-    existing_map_info = "\n".join([
-        f"- ID: {node.id}, Title: {node.title}, Description: {node.description}" 
-        for node in existing_nodes
-    ]) if existing_nodes else "기존 마인드맵 정보 없음."
+    digest = build_map_digest(project_id, map_version, [_as_node_dict(node) for node in existing_nodes], chat_text)
+    if digest is not None:
+        existing_map_info = "\n".join(
+            [f"(전체 노드 {digest.total}개 중 중요도 상위 {len(digest.nodes)}개)"]
+            + [f"- ID: {node['id']}, Title: {node['title']}, Description: {node.get('description')}" for node in digest.nodes]
+            + ["요약된 나머지 노드 (가까운 중요 노드 주변 제목):", digest.peripheral_lines(with_ids=False)]
+        )
+    else:
+        existing_map_info = "\n".join([
+            f"- ID: {node.id}, Title: {node.title}, Description: {node.description}" 
+            for node in existing_nodes
+        ]) if existing_nodes else "기존 마인드맵 정보 없음."
 
     # JSON 스키마 예시를 프롬프트에 포함
     prompt = f"""
@@ -176,7 +854,7 @@ def analyze_chat_and_generate_map(
 **🚨 [강조] 당신의 유일한 임무는 요청된 JSON 스키마를 완벽히 준수하는 것입니다. JSON 마크다운 블록(```json)이나 다른 설명 텍스트를 JSON 앞뒤에 절대 포함하지 마세요.**
 
 **[채팅 내용] (이것이 마인드맵의 근거가 됩니다):**
-{new_chat_text}
+{chat_text}
 
 **마인드맵 계층 구조:**
 1. '핵심 주제' (core): 대화의 가장 중심적인 목표 또는 주제 (예: "점심 메뉴 리스트")
@@ -188,7 +866,6 @@ def analyze_chat_and_generate_map(
 - 노드 ID는 고유한 문자열이어야 합니다.
 - connections 필드는 노드 간의 관계를 나타내며, 반드시 존재하는 노드의 ID를 가리켜야 합니다.
 - **[핵심]** **위 채팅 내용을 분석하여 마인드맵 노드를 적극적으로 생성해야 합니다. 특히, core 노드는 반드시 "점심 메뉴 리스트"와 같이 대화 주제를 반영해야 합니다.**
-- 기존 마인드맵 정보가 있다면 업데이트를 고려해야 하지만, 현재는 새로 생성하는 데 집중해주세요.
 - **[핵심]** **위 [채팅 내용] 섹션에 실제 대화 내용이 있다면, 당신은 무조건 그 내용을 기반으로 마인드맵을 생성해야 합니다. "분석할 대화 내용 없음"과 같은 기본 템플릿을 반환해서는 절대 안 됩니다.**
 - **[핵심]** **core 노드의 `title`은 채팅 내용의 핵심 주제 (예: "점심 메뉴 리스트")를 반영해야 합니다.**
 - 기존 마인드맵 정보가 있다면 업데이트를 고려해야 하지만, 현재는 새로 생성하는 데 집중해주세요.
@@ -201,14 +878,14 @@ def analyze_chat_and_generate_map(
     "nodes": [
         {{
             "id": "core-1",
-            "node_type": "core",  // 💡 [수정] 응답 예시의 '핵심 주제'를 실제 node_type인 'core'로 수정
+            "node_type": "core",
             "title": "프로젝트 목표",
             "description": "프로젝트의 전반적인 목표 설명",
             "connections": [{{"target_id": "major-1"}}]
         }},
         {{
             "id": "major-1",
-            "node_type": "major", // 💡 [수정] 응답 예시의 '대주제'를 실제 node_type인 'major'로 수정
+            "node_type": "major",
             "title": "첫 번째 주요 단계",
             "description": "상세 설명",
             "connections": [{{"target_id": "core-1"}}, {{"target_id": "minor-1"}}]
@@ -220,17 +897,11 @@ def analyze_chat_and_generate_map(
     ]
 }}
 
----
-새로 업데이트된 채팅 기록:
-{new_chat_text}
-
 ---
 위 채팅 내용을 분석하여 마인드맵 JSON을 생성해주세요.
 """
-    # 💡 [추가] 변수 선언: 어떤 예외가 발생하든 이 변수를 사용 가능하도록 설정
-    json_string = "INITIALIZATION_FAILED" # 기본값 설정
     
-    if not CLIENT:
+    if not get_llm_provider().available:
         return AIAnalysisResult(
             is_success=False, 
             last_chat_id=last_chat_id, 
@@ -238,149 +909,33 @@ def analyze_chat_and_generate_map(
         )
 
     try:
-        json_schema_dict = MindMapDataOutput.model_json_schema(
-            by_alias=True, 
-            # 💡 [핵심 수정] ref_template을 '#/defs/{model}'로 변경하여 
-            # Pydantic이 생성하는 $ref 참조 경로를 Vertex AI가 기대하는 경로와 일치시킵니다.
-            ref_template="#/defs/{model}" 
+        assigner = NodeIdAssigner(project_id, existing_nodes, reuse_existing=True)
+        validated_data: MindMapDataOutput = _generate_structured(
+            prompt, MindMapDataOutput,
+            cache_kind="mindmap_full",
+            prompt_version=FULL_PROMPT_VERSION,
+            cache_inputs={
+                "project_id": project_id,
+                "chats": _chat_range(chat_history),
+                "context": fingerprint(chat_context) if chat_context else None,
+                "nodes": _node_set(existing_nodes),
+            },
+            stream_key="nodes",
+            on_item=_node_streamer(assigner, on_node)
         )
-        
-        # 💡 [재확인] Vertex AI는 'definitions' 대신 'defs' 키를 기대합니다.
-        # Pydantic이 ref_template을 '#/defs'로 설정했으므로, 
-        # 이제 root 스키마의 정의 키도 'defs'로 변경합니다. (이전 단계에서 했던 로직 재활용)
-        if 'definitions' in json_schema_dict:
-            json_schema_dict['defs'] = json_schema_dict.pop('definitions')
-        # 만약 'definitions'이 없다면, Pydantic v2는 이미 'defs'를 사용하고 있을 수 있으나, 
-        # 안전을 위해 키를 명시적으로 확인합니다.
-
-
-        response = MODEL_CLIENT.generate_content(
-            contents=[prompt],
-            generation_config=GenerationConfig(
-                temperature=0.7,
-                response_mime_type="application/json",
-                response_schema=json_schema_dict, # ⬅️ JSON 스키마 딕셔너리 전달
-                max_output_tokens=4096
-            )
-        )
-        
-        # 💡 [핵심 추가] LLM이 반환한 JSON 원본 텍스트 강제 출력
-        json_string = response.text
-        print("💡💡💡 LLM 응답 원본 JSON 텍스트: 💡💡💡")
-        print(json_string)
-        print("-----------------------------------------")
-        
-        # 2. JSON 파싱 및 데이터 유효성 검증
 
-        if not response.text:
-            # 텍스트가 없으면 안전 필터에 의해 차단되었을 가능성이 높습니다.
-            reason = response.candidates[0].finish_reason.name if response.candidates else "UNKNOWN"
-            print(f"🚨🚨 모델 응답 실패: 텍스트가 비어있음. Finish Reason: {reason}")
-            
-            # 모델 응답 객체 전체를 출력하여 안전 필터 정보를 파악합니다.
-            print(f"🚨🚨 응답 객체 전문:\n{response}") 
-            
-            # 텍스트가 없으므로 json_string을 'MODEL_BLOCKED'로 설정하고 실패 반환 로직으로 이동합니다.
-            json_string = "MODEL_BLOCKED" 
-            
-            # 인위적으로 오류를 발생시켜 아래의 상세 로깅 블록으로 이동시킵니다.
-            raise ValueError("Model response was blocked or empty.")
-    
-        # 2. 응답 텍스트를 파싱
-        # 💡 [수정] response.text를 바로 할당
-        json_string = response.text
-        
-        json_string = json_string.strip()
-        if json_string.startswith("```json"):
-            json_string = json_string[7:]
-        if json_string.startswith("```"):
-            json_string = json_string[3:]
-        if json_string.endswith("```"):
-            json_string = json_string[:-3]
-        json_string = json_string.strip()
-        
-        map_json = json.loads(json_string)
+        # 💡 내용/위치 기반의 안정적인 프로젝트 노드 ID로 변환 (같은 내용의 기존 노드는 ID 유지)
+        assigner.apply(validated_data.nodes, validated_data.links)
 
-        # 2. Pydantic 모델로 유효성 검사
-        validated_data = MindMapDataOutput(**map_json)
-        
-        # 💡💡💡 [핵심 추가] 프로젝트별 고유 ID 생성 시작 💡💡💡
-        import time
-        timestamp = int(time.time() * 1000)  # 밀리초 타임스탬프로 고유성 보장
-        
-        # 기존 ID -> 새 ID 매핑 테이블
-        id_mapping = {}
-        
-        # 1단계: 모든 노드의 ID를 프로젝트별 고유 ID로 변환
-        for node in validated_data.nodes:
-            old_id = node.id
-            new_id = f"p{project_id}_{old_id}_{timestamp}"
-            id_mapping[old_id] = new_id
-            node.id = new_id
-            
-            # 각 노드의 connections도 새 ID로 업데이트
-            for conn in node.connections:
-                old_target = conn.get("target_id")
-                if old_target:
-                    # 아직 매핑이 안 된 경우를 대비해 나중에 처리
-                    conn["_old_target"] = old_target
-        
-        # 2단계: connections의 target_id를 새 ID로 일괄 업데이트
-        for node in validated_data.nodes:
-            for conn in node.connections:
-                if "_old_target" in conn:
-                    old_target = conn.pop("_old_target")
-                    if old_target in id_mapping:
-                        conn["target_id"] = id_mapping[old_target]
-        
-        # 3단계: links의 source/target도 새 ID로 업데이트
-        for link in validated_data.links:
-            if link.get("source") in id_mapping:
-                link["source"] = id_mapping[link["source"]]
-            if link.get("target") in id_mapping:
-                link["target"] = id_mapping[link["target"]]
-        
-        print(f"✅ 노드 ID 변환 완료: {len(id_mapping)}개 노드")
-        print(f"   예시: {list(id_mapping.items())[:2]}")
-        # 💡💡💡 [ID 변환 로직 끝] 💡💡💡
-        
-        # 3. schemas.py의 MindMapData 구조에 맞게 변환하여 반환
-        # 🚨 [핵심 수정] validated_data.nodes 리스트의 각 Pydantic 객체를 .model_dump()를 사용하여
-        # 원시 딕셔너리(DB/ORM 모델이 기대하는 형태)로 변환합니다.
-        
-        # MindMapNodeOutput 객체의 리스트를 일반 딕셔너리의 리스트로 변환
-        converted_nodes = []
-        for node in validated_data.nodes:
-            node_dict = node.model_dump(mode='json')
-            # 💡 [핵심 수정] DB ORM에 저장되기 전에 connections 필드를 제거
-            if 'connections' in node_dict:
-                del node_dict['connections'] 
-            
-            converted_nodes.append(node_dict)
-
-        mind_map_data = MindMapData(
-            nodes=converted_nodes, # connections가 제거된 딕셔너리 리스트 사용
-            links=validated_data.links 
-        )
-                
         return AIAnalysisResult(
             is_success=True,
             last_chat_id=last_chat_id,
-            mind_map_data=mind_map_data
-        )
-
-    except (json.JSONDecodeError, KeyError, ValueError) as e:
-        print(f"🚨 Vertex AI 응답 파싱 또는 Pydantic 유효성 검사 오류: {e}")
-        # 💡 [수정] 이제 json_string이 외부에서 선언되어 안전하게 접근 가능
-        print(f"🚨🚨 JSON 디코딩 실패 원본 텍스트:\n--- START ---\n{json_string}\n--- END ---") 
-        return AIAnalysisResult(
-            is_success=False, 
-            last_chat_id=last_chat_id, 
-            mind_map_data=MindMapData(nodes=[], links=[])
+            mind_map_data=_to_mind_map_data(
+                [node.model_dump(mode='json') for node in validated_data.nodes],
+                validated_data.links
+            )
         )
-    except Exception as e:
-        print(f"🚨🚨 최종 Vertex AI API 요청 오류 (예상치 못한 오류): {e}")
-        print(f"🚨🚨 마지막 파싱 시도 텍스트:\n--- LAST ATTEMPT ---\n{json_string}\n--- END ---") 
+    except Exception:
         return AIAnalysisResult(
             is_success=False, 
             last_chat_id=last_chat_id, 
@@ -0,0 +1,184 @@
+# 프로젝트별 계층형 채팅 요약 저장소입니다.
+#
+# - level 0: 원본 채팅 WINDOW_SIZE개를 요약
+# - level N: level N-1 요약 ROLLUP_FANOUT개를 다시 요약
+#
+# AI 프롬프트는 원본 채팅 전체 대신 build_chat_context()가 만드는
+# "상위 요약 + 최근 원본 채팅" 컨텍스트를 사용하므로, 프로젝트가 길어져도 프롬프트 크기가 제한됩니다.
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import ChatMessage as ORMChatMessage, ChatSummary as ORMChatSummary
+from .ai_analyzer import summarize_chat_segment
+
+# level 0 요약 하나가 대표하는 원본 채팅 수
+WINDOW_SIZE = 50
+# 상위 요약 하나가 묶는 하위 요약 수
+ROLLUP_FANOUT = 5
+# 한 번의 갱신에서 만드는 최대 level 0 요약 수 (오래된 대형 프로젝트의 첫 갱신 시 LLM 호출 폭주 방지)
+MAX_WINDOWS_PER_UPDATE = 20
+# 컨텍스트에 포함할 최근 원본 채팅 수 (아직 요약되지 않은 마지막 구간 전체를 담을 수 있는 크기)
+RECENT_RAW_MESSAGES = WINDOW_SIZE
+
+
+def _format_chat(chat: ORMChatMessage) -> str:
+    return f"[{chat.user_id}] {chat.content}"
+
+
+def update_chat_summaries(db: Session, project_id: int) -> int:
+    """
+    아직 요약되지 않은 채팅 중 꽉 찬 구간을 요약하고, 필요한 상위 요약을 만듭니다.
+    새로 만든 요약 개수를 반환합니다.
+    """
+    created = 0
+
+    # 1. level 0: 마지막 요약 이후의 원본 채팅을 WINDOW_SIZE 단위로 요약
+    last_end = db.query(ORMChatSummary.end_chat_id).filter(
+        ORMChatSummary.project_id == project_id,
+        ORMChatSummary.level == 0
+    ).order_by(ORMChatSummary.end_chat_id.desc()).limit(1).scalar() or 0
+
+    for _ in range(MAX_WINDOWS_PER_UPDATE):
+        window = db.query(ORMChatMessage).filter(
+            ORMChatMessage.project_id == project_id,
+            ORMChatMessage.id > last_end
+        ).order_by(ORMChatMessage.id).limit(WINDOW_SIZE).all()
+
+        # 구간이 다 차지 않은 채팅은 최근 원본 채팅으로 그대로 사용합니다.
+        if len(window) < WINDOW_SIZE:
+            break
+
+        segment_text = "\n".join(_format_chat(chat) for chat in window)
+        start_id, end_id = window[0].id, window[-1].id
+        # LLM 호출 동안 DB 연결을 붙잡지 않도록 읽기 트랜잭션을 먼저 끝냅니다.
+        db.commit()
+
+        content = summarize_chat_segment(segment_text)
+        if content is None:
+            break
+
+        db.add(ORMChatSummary(
+            project_id=project_id,
+            level=0,
+            start_chat_id=start_id,
+            end_chat_id=end_id,
+            message_count=WINDOW_SIZE,
+            content=content
+        ))
+        db.commit()
+        created += 1
+        last_end = end_id
+
+    # 2. level N: 상위 요약에 아직 포함되지 않은 하위 요약을 ROLLUP_FANOUT개씩 묶어 요약
+    level = 0
+    while True:
+        upper_end = db.query(ORMChatSummary.end_chat_id).filter(
+            ORMChatSummary.project_id == project_id,
+            ORMChatSummary.level == level + 1
+        ).order_by(ORMChatSummary.end_chat_id.desc()).limit(1).scalar() or 0
+
+        pending = db.query(ORMChatSummary).filter(
+            ORMChatSummary.project_id == project_id,
+            ORMChatSummary.level == level,
+            ORMChatSummary.end_chat_id > upper_end
+        ).order_by(ORMChatSummary.end_chat_id).all()
+
+        if len(pending) < ROLLUP_FANOUT:
+            if not db.query(ORMChatSummary.id).filter(
+                ORMChatSummary.project_id == project_id,
+                ORMChatSummary.level == level + 1
+            ).first():
+                break
+            level += 1
+            continue
+
+        groups = [
+            (
+                "\n\n".join(summary.content for summary in group),
+                group[0].start_chat_id,
+                group[-1].end_chat_id,
+                sum(summary.message_count or 0 for summary in group),
+            )
+            for group in (
+                pending[start:start + ROLLUP_FANOUT]
+                for start in range(0, len(pending) - ROLLUP_FANOUT + 1, ROLLUP_FANOUT)
+            )
+        ]
+        db.commit()
+
+        for segment_text, start_id, end_id, message_count in groups:
+            content = summarize_chat_segment(segment_text, is_rollup=True)
+            if content is None:
+                return created
+
+            db.add(ORMChatSummary(
+                project_id=project_id,
+                level=level + 1,
+                start_chat_id=start_id,
+                end_chat_id=end_id,
+                message_count=message_count,
+                content=content
+            ))
+            db.commit()
+            created += 1
+
+        level += 1
+
+    if created:
+        print(f"✅ Project {project_id}: 채팅 요약 {created}개 생성")
+    return created
+
+
+def _covering_summaries(db: Session, project_id: int) -> List[ORMChatSummary]:
+    """
+    채팅 구간을 겹치지 않게 덮는 가장 상위 수준의 요약 목록을 시간 순으로 반환합니다.
+    (수준마다 최대 ROLLUP_FANOUT-1개의 요약만 남으므로 개수가 로그 규모로 제한됩니다.)
+    """
+    summaries = db.query(ORMChatSummary).filter(
+        ORMChatSummary.project_id == project_id
+    ).order_by(ORMChatSummary.level.desc(), ORMChatSummary.end_chat_id).all()
+
+    selected: List[ORMChatSummary] = []
+    covered_until = 0
+    for summary in summaries:
+        # 상위 수준부터 순회하므로, 이미 선택된 상위 요약이 덮은 구간은 건너뜁니다.
+        if summary.end_chat_id <= covered_until:
+            continue
+        selected.append(summary)
+        covered_until = max(covered_until, summary.end_chat_id)
+
+    return sorted(selected, key=lambda summary: summary.start_chat_id)
+
+
+def build_chat_context(db: Session, project_id: int, recent_limit: int = RECENT_RAW_MESSAGES) -> Optional[str]:
+    """
+    프롬프트용 채팅 컨텍스트를 만듭니다: 이전 대화 요약 + 최근 원본 채팅.
+    요약이 하나도 없으면 None을 반환합니다. (호출 측은 원본 채팅을 그대로 사용)
+    """
+    summaries = _covering_summaries(db, project_id)
+    if not summaries:
+        return None
+
+    summarized_until = summaries[-1].end_chat_id
+    recent = db.query(ORMChatMessage).filter(
+        ORMChatMessage.project_id == project_id,
+        ORMChatMessage.id > summarized_until
+    ).order_by(ORMChatMessage.id.desc()).limit(recent_limit + 1).all()
+    # recent_limit개보다 많으면 요약과 최근 대화 사이에 생략된 채팅이 있음
+    has_gap = len(recent) > recent_limit
+    recent = recent[:recent_limit]
+    recent.reverse()
+
+    lines = ["[이전 대화 요약]"]
+    for summary in summaries:
+        lines.append(f"- (채팅 #{summary.start_chat_id}~#{summary.end_chat_id}) {summary.content}")
+
+    if recent:
+        lines.append("")
+        lines.append("[최근 대화]")
+        if has_gap:
+            lines.append("(...중간 대화 일부 생략...)")
+        lines.extend(_format_chat(chat) for chat in recent)
+
+    return "\n".join(lines)
@@ -0,0 +1,315 @@
+# 비동기 마인드맵 생성 작업을 처리하는 서비스입니다.
+#
+# POST /projects/{id}/generate는 작업(GenerationJob)만 만들고 202로 바로 응답합니다.
+# 실제 생성(LLM 호출)은 요청 스레드풀과 분리된 전용 워커 풀에서 실행되며,
+# 진행 상태는 GET /jobs/{id}로 조회하거나 프로젝트 웹소켓(generation_job 이벤트)으로 받을 수 있습니다.
+# 생성 중에는 완성된 노드가 mindmap_node 이벤트로 하나씩 전달되고, 최종 맵은 마지막에 한 번 저장됩니다(mindmap_updated).
+# 저장은 기존 맵과의 diff만 반영하며, 적용된 diff는 작업 결과와 mindmap_updated 이벤트에 포함됩니다.
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import SessionLocal
+from ..models import (
+    Project as ORMProject,
+    ChatMessage as ORMChatMessage,
+    MindMapNode as ORMMindMapNode,
+    GenerationJob as ORMGenerationJob,
+)
+from ..schemas import AIAnalysisResult, GenerationJob as GenerationJobSchema
+from ..realtime import manager, project_room
+from .ai_analyzer import analyze_chat_and_generate_map
+from .chat_summary import update_chat_summaries, build_chat_context
+from .mindmap_store import save_mindmap
+from .mindmap_history import record_version, SOURCE_GENERATION
+from .project_versions import bump_project_versions, RESOURCE_PROJECT
+from .mindmap_layout import get_layout
+from .generation_lock import (
+    LeaseHeartbeat,
+    LeaseLostError,
+    QueuedLeaseKeeper,
+    renew_generation_lease,
+    release_generation_lease,
+)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+_executor = ThreadPoolExecutor(
+    max_workers=get_settings().GENERATION_WORKERS,
+    thread_name_prefix="mindmap-generation"
+)
+# 이 프로세스의 워커 풀에 등록되어 아직 끝나지 않은 작업 {job_id: Future} (종료 시 취소된 작업을 실패 처리)
+_pending_jobs: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+# 워커를 기다리는 동안 작업의 lease를 연장합니다. (대기가 길어도 만료/회수되지 않도록)
+_queued_leases = QueuedLeaseKeeper()
+
+
+class GenerationError(Exception):
+    """AI 분석이 실패(is_success=False)한 경우"""
+    pass
+
+
+def submit_generation_job(job: ORMGenerationJob):
+    """작업을 전용 워커 풀에 등록하고, 시작될 때까지 작업의 lease를 연장합니다."""
+    job_id = job.id
+    if job.lease_token:
+        _queued_leases.track(job_id, job.project_id, job.lease_token)
+    future = _executor.submit(run_generation_job, job_id)
+    with _pending_lock:
+        _pending_jobs[job_id] = future
+    future.add_done_callback(lambda _: _forget_job(job_id))
+
+
+def _forget_job(job_id: str):
+    _queued_leases.untrack(job_id)
+    with _pending_lock:
+        _pending_jobs.pop(job_id, None)
+
+
+def shutdown_generation_workers():
+    """
+    앱 종료 시 대기 중인 작업을 취소합니다. (실행 중인 작업은 끝까지 수행)
+    🚨 취소된 작업은 실행되지 않으므로, queued로 남아 폴링이 끝나지 않도록 실패로 기록하고 lease를 해제합니다.
+    """
+    with _pending_lock:
+        pending = list(_pending_jobs.items())
+    cancelled = [job_id for job_id, future in pending if future.cancel()]
+    _executor.shutdown(wait=False, cancel_futures=True)
+    if cancelled:
+        fail_queued_jobs(cancelled, "Server shut down before the job started")
+
+
+def fail_queued_jobs(job_ids: List[str], reason: str):
+    """아직 시작하지 않은(queued) 작업들을 실패로 기록하고 lease를 해제합니다."""
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        jobs = db.query(ORMGenerationJob).filter(
+            ORMGenerationJob.id.in_(job_ids),
+            ORMGenerationJob.status == JOB_QUEUED
+        ).all()
+        for job in jobs:
+            job.status = JOB_FAILED
+            job.error = reason
+            job.finished_at = datetime.utcnow()
+            if job.lease_token:
+                release_generation_lease(db, job.project_id, job.lease_token)
+        db.commit()
+        for job in jobs:
+            print(f"⚠️ Generation job {job.id} failed: {reason}")
+            _publish_job(job)
+    except Exception as e:
+        db.rollback()
+        print(f"🚨 Failed to mark cancelled generation jobs: {e}")
+    finally:
+        db.close()
+
+
+def find_active_generation_job(db: Session, project_id: int) -> Optional[ORMGenerationJob]:
+    """현재 유효한 생성 lease를 보유한 (대기/실행 중) 작업을 반환합니다. 없으면 None."""
+    return db.query(ORMGenerationJob).join(
+        ORMProject, ORMProject.id == ORMGenerationJob.project_id
+    ).filter(
+        ORMGenerationJob.project_id == project_id,
+        ORMGenerationJob.status.in_([JOB_QUEUED, JOB_RUNNING]),
+        ORMGenerationJob.lease_token == ORMProject.generation_lease_owner,
+        ORMProject.generation_lease_expires_at > datetime.utcnow()
+    ).first()
+
+
+def fail_orphaned_job(db: Session, job: ORMGenerationJob) -> ORMGenerationJob:
+    """
+    대기/실행 중인데 lease가 더 이상 유효하지 않은 작업을 실패로 기록합니다.
+    대기 중에는 QueuedLeaseKeeper, 실행 중에는 LeaseHeartbeat가 lease를 연장하므로,
+    lease가 만료/회수되었다면 작업을 맡은 프로세스가 죽은 것이며 작업은 끝나지 않습니다.
+    """
+    if job.status not in (JOB_QUEUED, JOB_RUNNING):
+        return job
+
+    lease_valid = db.query(ORMProject.id).filter(
+        ORMProject.id == job.project_id,
+        ORMProject.generation_lease_owner == job.lease_token,
+        ORMProject.generation_lease_expires_at > datetime.utcnow()
+    ).first() is not None
+    if job.lease_token and lease_valid:
+        return job
+
+    updated = db.query(ORMGenerationJob).filter(
+        ORMGenerationJob.id == job.id,
+        ORMGenerationJob.status.in_([JOB_QUEUED, JOB_RUNNING])
+    ).update({
+        ORMGenerationJob.status: JOB_FAILED,
+        ORMGenerationJob.error: "Generation worker stopped before the job finished (lease expired)",
+        ORMGenerationJob.finished_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+    db.refresh(job)
+    if updated:
+        print(f"⚠️ Generation job {job.id} marked failed: lease expired without a live worker")
+        _publish_job(job)
+    return job
+
+
+def _publish_job(job: ORMGenerationJob):
+    """작업 상태 변경을 프로젝트 룸에 푸시합니다."""
+    manager.publish_threadsafe(
+        project_room(job.project_id),
+        {
+            "type": "generation_job",
+            "project_id": job.project_id,
+            "job": GenerationJobSchema.model_validate(job).model_dump(mode="json"),
+        },
+    )
+
+
+def _node_publisher(job: ORMGenerationJob) -> Callable[[Dict[str, Any]], None]:
+    """스트리밍으로 완성된 노드를 프로젝트 룸에 mindmap_node 이벤트로 푸시하는 콜백"""
+    def publish(node: Dict[str, Any]):
+        manager.publish_threadsafe(
+            project_room(job.project_id),
+            {"type": "mindmap_node", "project_id": job.project_id, "job_id": job.id, "node": node},
+        )
+    return publish
+
+
+def generate_project_mindmap(
+    db: Session,
+    project_id: int,
+    full_regeneration: bool = False,
+    heartbeat: Optional[LeaseHeartbeat] = None,
+    on_node: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> AIAnalysisResult:
+    """
+    채팅 기록을 분석하여 프로젝트 마인드맵을 생성/갱신하고 저장합니다.
+    AI 분석이 실패하면 GenerationError를, 저장 전에 lease를 잃었으면 LeaseLostError를 발생시킵니다.
+    on_node가 주어지면 생성 중 완성된 새 노드를 하나씩 전달하고, 저장은 마지막에 한 번만 합니다.
+    """
+    db_project = db.query(ORMProject).filter(ORMProject.id == project_id).first()
+    if not db_project:
+        raise GenerationError("Project not found")
+
+    chat_history = db.query(ORMChatMessage).filter(ORMChatMessage.project_id == project_id).order_by(ORMChatMessage.id).all()
+    print(f"🚨🚨 [GENERATION JOB] Project {project_id}: chat_history length BEFORE AI call: {len(chat_history)}")
+
+    last_processed_id = db_project.last_chat_id_processed or 0
+
+    # 오래된 채팅은 계층형 요약으로 대체하여 프롬프트 크기를 제한합니다.
+    update_chat_summaries(db, project_id)
+    chat_context = build_chat_context(db, project_id)
+
+    # 기존 마인드맵과 버전(그래프 분석 캐시 키)을 읽은 뒤, LLM 호출 동안 DB 연결을 붙잡지 않도록 읽기 트랜잭션을 끝냅니다.
+    # (작업 세션은 expire_on_commit=False라서 로드한 객체를 다시 조회하지 않습니다.)
+    map_version = db.query(ORMProject.mindmap_version).filter(ORMProject.id == project_id).scalar()
+    existing_nodes = db.query(ORMMindMapNode).filter(ORMMindMapNode.project_id == project_id).all()
+    db.commit()
+
+    analysis_result: AIAnalysisResult = analyze_chat_and_generate_map(
+        project_id=project_id,
+        chat_history=chat_history,
+        last_processed_chat_id=last_processed_id,
+        existing_nodes=existing_nodes,
+        map_version=map_version,
+        incremental=not full_regeneration,
+        chat_context=chat_context,
+        on_node=on_node
+    )
+
+    if not analysis_result.is_success:
+        # AI 분석 함수에서 실패(예: LLM 오류, 파싱 오류)를 명시적으로 반환한 경우
+        raise GenerationError("AI analysis failed (is_success=False). Check server logs for detail.")
+
+    # 새로운 채팅이 없어서 노드 업데이트를 하지 않은 경우 (analysis_result.nodes=[]), 정상 결과로 간주합니다.
+    if not analysis_result.mind_map_data.nodes:
+        return analysis_result
+
+    # lease를 잃은 작업이 다른 작업의 결과를 덮어쓰지 않도록 저장 직전에 확인/연장합니다.
+    if heartbeat is not None:
+        heartbeat.check()
+        if not renew_generation_lease(db, project_id, heartbeat.token):
+            raise LeaseLostError(f"Generation lease for project {project_id} was lost")
+
+    # 1. 저장된 맵과 비교하여 바뀐 노드/간선만 반영 (한 트랜잭션)
+    analysis_result.diff = save_mindmap(db, project_id, analysis_result.mind_map_data)
+    analysis_result.version = record_version(db, project_id, analysis_result.diff, SOURCE_GENERATION)
+
+    # 2. 프로젝트 상태 업데이트
+    if db_project.last_chat_id_processed != analysis_result.last_chat_id:
+        db_project.last_chat_id_processed = analysis_result.last_chat_id
+        bump_project_versions(db, project_id, RESOURCE_PROJECT)
+    db.commit()
+
+    # 클라이언트가 이벤트를 받고 바로 배치를 요청할 수 있도록 기본 알고리즘 배치를 미리 계산합니다. (바뀐 부분만)
+    layout_algorithm = get_settings().MINDMAP_LAYOUT_PRECOMPUTE
+    if analysis_result.version is not None and layout_algorithm:
+        try:
+            get_layout(db, project_id, layout_algorithm, analysis_result.version)
+        except Exception as e:
+            db.rollback()
+            print(f"🚨 Project {project_id} 배치 미리 계산 실패: {e}")
+
+    # 프로젝트 룸 구독자에게 갱신된 마인드맵을 푸시합니다.
+    manager.publish_threadsafe(
+        project_room(project_id),
+        {
+            "type": "mindmap_updated",
+            "project_id": project_id,
+            "last_chat_id": analysis_result.last_chat_id,
+            "mind_map_data": analysis_result.mind_map_data.model_dump(mode="json"),
+            "diff": analysis_result.diff.model_dump(mode="json"),
+            "version": analysis_result.version,
+        },
+    )
+    return analysis_result
+
+
+def run_generation_job(job_id: str):
+    """워커 스레드에서 생성 작업 하나를 실행합니다."""
+    # LLM 호출 전에 커밋해도 로드한 객체를 다시 조회하지 않도록 expire_on_commit=False
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        job = db.query(ORMGenerationJob).filter(ORMGenerationJob.id == job_id).first()
+        if job is None:
+            print(f"🚨 Generation job {job_id} not found")
+            return
+
+        job.status = JOB_RUNNING
+        job.started_at = datetime.utcnow()
+        db.commit()
+        _publish_job(job)
+
+        # 이제부터는 LeaseHeartbeat가 lease를 연장합니다.
+        _queued_leases.untrack(job_id)
+        try:
+            # 대기 중 연장에 실패했다면(DB 오류 등) lease가 만료되어 다른 요청이 회수했을 수 있습니다.
+            if not job.lease_token or not renew_generation_lease(db, job.project_id, job.lease_token):
+                raise LeaseLostError(f"Generation lease for project {job.project_id} expired before the job started")
+
+            with LeaseHeartbeat(job.project_id, job.lease_token) as heartbeat:
+                result = generate_project_mindmap(
+                    db, job.project_id, job.full_regeneration,
+                    heartbeat=heartbeat,
+                    on_node=_node_publisher(job) if get_settings().GENERATION_STREAM_NODES else None
+                )
+            job.status = JOB_SUCCEEDED
+            job.result = result.model_dump(mode="json")
+        except Exception as e:
+            db.rollback()
+            print(f"🚨 Generation job {job_id} failed: {e}")
+            job.status = JOB_FAILED
+            job.error = str(e)
+
+        # 생성 lease 해제 (이미 다른 작업이 회수한 lease라면 아무것도 바꾸지 않음)
+        if job.lease_token:
+            release_generation_lease(db, job.project_id, job.lease_token)
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        _publish_job(job)
+    finally:
+        db.close()
@@ -0,0 +1,192 @@
+# 프로젝트별 마인드맵 생성 lease(임대) 잠금입니다.
+#
+# 예전의 is_generating 플래그는 "읽고 → 별도 커밋으로 설정"하는 방식이라
+# 동시에 들어온 두 요청이 모두 통과할 수 있었고, 워커가 죽으면 True로 영원히 남았습니다.
+#
+# lease는 하나의 조건부 UPDATE로 획득합니다:
+#   UPDATE projects SET owner=:token, expires_at=:now+ttl
+#   WHERE id=:pid AND (owner IS NULL OR expires_at < :now)
+# 영향받은 행이 1개일 때만 획득에 성공하며, 만료된 lease는 다음 요청이 자동으로 회수합니다.
+# 작업 중에는 LeaseHeartbeat가, 워커를 기다리는(queued) 동안에는 QueuedLeaseKeeper가 주기적으로 만료 시간을 연장합니다.
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..database import SessionLocal
+from ..models import Project as ORMProject
+
+
+def _lease_ttl() -> timedelta:
+    return timedelta(seconds=get_settings().GENERATION_LEASE_SECONDS)
+
+
+def acquire_generation_lease(db: Session, project_id: int, commit: bool = True) -> Optional[str]:
+    """
+    프로젝트 생성 lease를 원자적으로 획득합니다.
+    성공하면 소유자 토큰을, 이미 다른 작업이 유효한 lease를 갖고 있으면 None을 반환합니다.
+
+    commit=False이면 커밋하지 않으므로, 호출 측이 같은 트랜잭션에서 작업 행을 추가한 뒤 함께 커밋할 수 있습니다.
+    (커밋 전까지 행 잠금이 유지되어, 동시에 획득에 실패한 요청은 커밋된 작업 행을 보게 됩니다.)
+    """
+    token = uuid.uuid4().hex
+    now = datetime.utcnow()
+    updated = db.query(ORMProject).filter(
+        ORMProject.id == project_id,
+        or_(
+            ORMProject.generation_lease_owner.is_(None),
+            ORMProject.generation_lease_expires_at.is_(None),
+            ORMProject.generation_lease_expires_at < now
+        )
+    ).update({
+        ORMProject.generation_lease_owner: token,
+        ORMProject.generation_lease_expires_at: now + _lease_ttl()
+    }, synchronize_session=False)
+    if commit:
+        db.commit()
+    return token if updated == 1 else None
+
+
+def renew_generation_lease(db: Session, project_id: int, token: str) -> bool:
+    """
+    소유 중인 lease의 만료 시간을 연장합니다.
+    lease를 잃었으면(만료 후 다른 작업이 회수) False를 반환합니다.
+    """
+    updated = db.query(ORMProject).filter(
+        ORMProject.id == project_id,
+        ORMProject.generation_lease_owner == token
+    ).update({
+        ORMProject.generation_lease_expires_at: datetime.utcnow() + _lease_ttl()
+    }, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+def release_generation_lease(db: Session, project_id: int, token: str) -> bool:
+    """소유 중인 lease를 해제합니다. 다른 작업의 lease는 건드리지 않습니다."""
+    updated = db.query(ORMProject).filter(
+        ORMProject.id == project_id,
+        ORMProject.generation_lease_owner == token
+    ).update({
+        ORMProject.generation_lease_owner: None,
+        ORMProject.generation_lease_expires_at: None
+    }, synchronize_session=False)
+    db.commit()
+    return updated == 1
+
+
+class LeaseLostError(Exception):
+    """작업 도중 lease를 잃은 경우 (다른 작업이 만료된 lease를 회수)"""
+    pass
+
+
+class LeaseHeartbeat:
+    """
+    별도 스레드에서 lease를 TTL/3 주기로 연장합니다.
+    연장에 실패하면 lost가 True가 되며, 작업은 결과를 저장하기 전에 check()로 확인해야 합니다.
+
+    사용 예:
+        with LeaseHeartbeat(project_id, token) as heartbeat:
+            ... LLM 호출 ...
+            heartbeat.check()
+            ... 결과 저장 ...
+    """
+    def __init__(self, project_id: int, token: str, interval_seconds: Optional[float] = None):
+        self.project_id = project_id
+        self.token = token
+        self.interval_seconds = interval_seconds or max(get_settings().GENERATION_LEASE_SECONDS / 3, 1.0)
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        # 작업 세션과 별개의 세션을 사용합니다. (Session은 스레드 간 공유 불가)
+        db = SessionLocal()
+        try:
+            while not self._stop.wait(self.interval_seconds):
+                try:
+                    if not renew_generation_lease(db, self.project_id, self.token):
+                        self.lost = True
+                        print(f"🚨 Project {self.project_id}: generation lease lost")
+                        return
+                except Exception as e:
+                    # 일시적인 DB 오류는 다음 주기에 재시도합니다. (만료 전까지는 lease 유효)
+                    db.rollback()
+                    print(f"🚨 Project {self.project_id}: lease renewal error: {e}")
+        finally:
+            db.close()
+
+    def check(self):
+        """lease를 잃었으면 LeaseLostError를 발생시킵니다."""
+        if self.lost:
+            raise LeaseLostError(f"Generation lease for project {self.project_id} was lost")
+
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"generation-lease-{self.project_id}",
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return False
+
+
+class QueuedLeaseKeeper:
+    """
+    워커를 기다리는(queued) 작업들의 lease를 하나의 스레드에서 TTL/3 주기로 연장합니다.
+
+    lease는 요청 시점(202 응답 전)에 획득하므로, 워커가 모두 바쁘면 작업이 시작되기 전에 만료되어
+    다른 요청이 회수할 수 있습니다. 작업이 시작되면 untrack()하고 LeaseHeartbeat가 이어받습니다.
+    프로세스가 죽으면 연장도 멈추므로, 남은 lease는 TTL 후 다음 요청이 회수합니다.
+    """
+    def __init__(self, interval_seconds: Optional[float] = None):
+        self.interval_seconds = interval_seconds or max(get_settings().GENERATION_LEASE_SECONDS / 3, 1.0)
+        # {key(작업 ID): (project_id, token)}
+        self._leases: Dict[str, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def track(self, key: str, project_id: int, token: str):
+        with self._lock:
+            self._leases[key] = (project_id, token)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="generation-queued-leases", daemon=True)
+                self._thread.start()
+
+    def untrack(self, key: str):
+        with self._lock:
+            self._leases.pop(key, None)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval_seconds)
+            with self._lock:
+                leases = list(self._leases.items())
+            if not leases:
+                continue
+
+            db = SessionLocal()
+            try:
+                for key, (project_id, token) in leases:
+                    try:
+                        if not renew_generation_lease(db, project_id, token):
+                            # 이미 회수된 lease는 더 연장하지 않습니다. (작업은 시작 시 실패로 끝남)
+                            self.untrack(key)
+                            print(f"🚨 Project {project_id}: queued generation lease lost")
+                    except Exception as e:
+                        # 일시적인 DB 오류는 다음 주기에 재시도합니다. (만료 전까지는 lease 유효)
+                        db.rollback()
+                        print(f"🚨 Project {project_id}: queued lease renewal error: {e}")
+            finally:
+                db.close()
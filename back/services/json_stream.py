@@ -0,0 +1,77 @@
+# 스트리밍 LLM 응답용 증분 JSON 파서입니다.
+#
+# 모델이 {"nodes": [{...}, {...}, ...], "links": [...]} 같은 JSON을 조각(chunk) 단위로 보내는 동안,
+# 지정한 최상위 배열(예: "nodes")의 원소 객체가 닫히는 즉시 하나씩 꺼내 줍니다.
+# 전체 응답의 최종 검증은 호출 측이 기존처럼 완성된 텍스트로 수행합니다.
+import json
+from typing import Any, List, Optional
+
+
+class JsonArrayItemParser:
+    """
+    최상위 객체의 array_key 배열에 들어 있는 객체 원소를 완성되는 순서대로 반환합니다.
+
+    parser = JsonArrayItemParser("nodes")
+    for chunk in stream:
+        for item in parser.feed(chunk):
+            ...
+    """
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None  # 최상위 객체에서 마지막으로 읽은 문자열 (배열 직전이면 키)
+        self._array_depth: Optional[int] = None  # 대상 배열 안쪽의 깊이
+        self._item_start: Optional[int] = None
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        """조각을 추가하고, 이번 조각으로 완성된 원소 목록을 반환합니다."""
+        self._text += chunk
+        text = self._text
+        items = []
+
+        for index in range(self._pos, len(text)):
+            char = text[index]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1:index]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char in "{[":
+                if (
+                    char == "[" and self._depth == 1 and not self._done
+                    and self._array_depth is None and self._last_key == self.array_key
+                ):
+                    self._array_depth = self._depth + 1
+                elif char == "{" and self._array_depth is not None and self._depth == self._array_depth:
+                    self._item_start = index
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if char == "}" and self._item_start is not None and self._depth == self._array_depth:
+                    try:
+                        items.append(json.loads(text[self._item_start:index + 1]))
+                    except ValueError:
+                        pass
+                    self._item_start = None
+                elif char == "]" and self._array_depth is not None and self._depth == self._array_depth - 1:
+                    self._array_depth = None
+                    self._done = True
+
+        self._pos = len(text)
+        return items
@@ -0,0 +1,155 @@
+# LLM 응답 캐시입니다.
+#
+# 같은 입력으로 모델을 반복 호출하는 경우(생성 버튼 더블클릭, 바뀌지 않은 맵에 대한 추천 재요청 등)
+# 토큰을 쓰지 않고 바로 응답하기 위해 사용합니다.
+#
+# - 키: 모델 이름 + 생성 설정 + 프롬프트 템플릿 버전 + 정규화된 입력(채팅 ID 범위, 노드 집합 등)의 SHA-256
+# - 1차: 프로세스 메모리 LRU (TTL)
+# - 2차(선택): DB llm_cache_entries 테이블 (TTL, 재시작/여러 인스턴스 간 공유)
+#
+# 프롬프트나 출력 스키마를 바꾸면 ai_analyzer의 *_PROMPT_VERSION을 올려 이전 캐시를 무효화해야 합니다.
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from ..config import get_settings
+from ..database import SessionLocal
+from ..models import LLMCacheEntry as ORMLLMCacheEntry
+
+
+def fingerprint(value: Any) -> str:
+    """JSON으로 표현 가능한 값을 정규화(키 정렬)하여 해시합니다."""
+    canonical = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(
+    kind: str,
+    model_name: str,
+    generation_config: Dict[str, Any],
+    prompt_version: str,
+    inputs: Dict[str, Any]
+) -> str:
+    """캐시 키를 만듭니다. 구성 요소 중 하나라도 바뀌면 다른 키가 됩니다."""
+    return fingerprint({
+        "kind": kind,
+        "model": model_name,
+        "config": generation_config,
+        "prompt_version": prompt_version,
+        "inputs": inputs,
+    })
+
+
+class LLMResponseCache:
+    """
+    메모리 LRU + 선택적 DB 계층으로 구성된 LLM 응답 캐시.
+    값은 JSON으로 직렬화 가능한 데이터(파싱된 모델 출력 dict 또는 텍스트)여야 합니다.
+    여러 워커 스레드에서 동시에 사용할 수 있습니다.
+    """
+    def __init__(self, max_entries: int = 256, ttl_seconds: int = 3600, persistent: bool = False):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+
+        # key -> (만료 시각(monotonic), 값)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """캐시된 값을 반환합니다. 없거나 만료되었으면 None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        value = self._get_persistent(key) if self.persistent else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._put_memory(key, value)
+        return value
+
+    def set(self, key: str, value: Any, kind: str = ""):
+        """값을 캐시에 저장합니다."""
+        with self._lock:
+            self._put_memory(key, value)
+        if self.persistent:
+            self._set_persistent(key, value, kind)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "persistent": self.persistent,
+            }
+
+    def _put_memory(self, key: str, value: Any):
+        # 호출 측에서 _lock을 잡고 있어야 합니다.
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_persistent(self, key: str) -> Optional[Any]:
+        db = SessionLocal()
+        try:
+            entry = db.query(ORMLLMCacheEntry).filter(ORMLLMCacheEntry.key == key).first()
+            if entry is None:
+                return None
+            if entry.expires_at is not None and entry.expires_at <= datetime.utcnow():
+                db.delete(entry)
+                db.commit()
+                return None
+            return entry.value
+        except Exception as e:
+            # 캐시 오류로 실제 호출이 실패하지 않도록 미스로 처리합니다.
+            db.rollback()
+            print(f"⚠️ LLM 캐시 조회 오류: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _set_persistent(self, key: str, value: Any, kind: str):
+        db = SessionLocal()
+        try:
+            db.merge(ORMLLMCacheEntry(
+                key=key,
+                kind=kind,
+                value=value,
+                created_at=datetime.utcnow(),
+                expires_at=datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+            ))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ LLM 캐시 저장 오류: {e}")
+        finally:
+            db.close()
+
+
+_settings = get_settings()
+llm_cache: Optional[LLMResponseCache] = LLMResponseCache(
+    max_entries=_settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=_settings.LLM_CACHE_TTL_SECONDS,
+    persistent=_settings.LLM_CACHE_PERSISTENT
+) if _settings.LLM_CACHE_ENABLED else None
@@ -0,0 +1,573 @@
+# LLM 호출 제공자(provider) 계층입니다.
+#
+# ai_analyzer와 routers/ai.py는 Vertex AI SDK를 직접 쓰지 않고 get_llm_provider()가 돌려주는
+# 제공자를 통해 모델을 호출합니다. LLM_PROVIDER 설정으로 구현을 바꿀 수 있습니다.
+#
+# - vertex: 실제 Vertex AI Gemini (기본값)
+# - fake:   네트워크 없이 결정적인(같은 프롬프트 → 같은 응답) 가짜 응답. 지연 시간/응답 크기 설정 가능
+# - record: Vertex AI를 호출하고 응답을 LLM_RECORDINGS_DIR에 파일로 저장
+# - replay: 저장된 응답만 반환 (녹화되지 않은 요청은 오류)
+#
+# fake/replay를 사용하면 자격 증명 없이도 생성/추천 경로를 오프라인에서 재현 가능하게 부하 테스트할 수 있습니다.
+#
+# get_llm_provider()가 돌려주는 제공자는 LimitedProvider로 감싸져 있어, 프로세스 전체의 동시 LLM 호출 수가
+# LLM_MAX_CONCURRENCY로 제한되고 비동기 호출(agenerate)에는 LLM_TIMEOUT_SECONDS 타임아웃이 적용됩니다.
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from ..config import get_settings, setup_gcp_credentials
+
+
+class LLMResponse:
+    """제공자 공통 응답. 차단/빈 응답이면 text가 빈 문자열입니다."""
+    def __init__(self, text: str, finish_reason: str = "STOP"):
+        self.text = text
+        self.finish_reason = finish_reason
+
+
+class LLMProviderError(Exception):
+    """제공자 호출 실패 (초기화 실패, 녹화되지 않은 요청 등)"""
+    pass
+
+
+class LLMProvider:
+    """
+    모델 호출 인터페이스.
+    generation_config는 temperature, max_output_tokens 등 Vertex GenerationConfig 인자와 같은 이름을 사용하고,
+    response_schema(JSON 스키마 dict)가 주어지면 JSON 텍스트를 반환해야 합니다.
+    """
+    name = "base"
+    model_name = ""
+
+    @property
+    def available(self) -> bool:
+        return True
+
+    def generate(
+        self,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        raise NotImplementedError
+
+    def generate_stream(
+        self,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """응답 텍스트를 조각 단위로 반환합니다. 스트리밍을 지원하지 않는 제공자는 한 번에 반환합니다."""
+        response = self.generate(prompt, generation_config, response_schema)
+        if response.text:
+            yield response.text
+
+    async def agenerate(
+        self,
+        prompt: str,
+        generation_config: Dict[str, Any],
+        response_schema: Optional[Dict[str, Any]] = None
+    ) -> LLMResponse:
+        """이벤트 루프를 막지 않는 호출. 네이티브 비동기 API가 없는 제공자는 스레드에서 실행합니다."""
+        return await asyncio.to_thread(self.generate, prompt, generation_config, response_schema)
+
+
+class VertexProvider(LLMProvider):
+    """Vertex AI Gemini. 첫 호출(또는 available 확인) 시점에 초기화합니다."""
+    name = "vertex"
+
+    def __init__(self, model_name: str, project_id: str, region: str):
+        self.model_name = model_name
+        self.project_id = project_id
+        self.region = region
+        self._model = None
+        self._init_error: Optional[Exception] = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is not None or self._init_error is not None:
+            return self._model
+        with self._lock:
+            if self._model is None and self._init_error is None:
+                try:
+                    # 무거운 SDK import와 인증 파일 작성은 첫 사용 시점에 한 번만 수행합니다.
+                    setup_gcp_credentials()
+                    import vertexai
+                    from vertexai.generative_models import GenerativeModel
+
+                    vertexai.init(project=self.project_id, location=self.region)
+                    self._model = GenerativeModel(model_name=self.model_name)
+                    print(f"✅ Vertex AI 모델 초기화 성공! (Model: {self.model_name}, Project: {self.project_id}, Region: {self.region})")
+                except Exception as e:
+                    print(f"❌ Vertex AI GenerativeModel 초기화 오류: {e}")
+                    self._init_error = e
+        return self._model
+
+    @property
+    def available(self) -> bool:
+        return self._get_model() is not None
+
+    def _generation_config(self, generation_config, response_schema):
+        from vertexai.generative_models import GenerationConfig
+
+        config = dict(generation_config)
+        if response_schema is not None:
+            config["response_mime_type"] = "application/json"
+            config["response_schema"] = response_schema
+        return GenerationConfig(**config)
+
+    def _require_model(self):
+        model = self._get_model()
+        if model is None:
+            raise LLMProviderError(f"Vertex AI client is not initialized: {self._init_error}")
+        return model
+
+    def generate(self, prompt, generation_config, response_schema=None) -> LLMResponse:
+        model = self._require_model()
+        response = model.generate_content(
+            contents=[prompt],
+            generation_config=self._generation_config(generation_config, response_schema)
+        )
+        return self._to_response(response)
+
+    async def agenerate(self, prompt, generation_config, response_schema=None) -> LLMResponse:
+        # 모델 초기화(최초 1회, 블로킹)는 스레드에서, 호출은 SDK의 네이티브 비동기 API로 수행합니다.
+        model = self._model or await asyncio.to_thread(self._require_model)
+        response = await model.generate_content_async(
+            contents=[prompt],
+            generation_config=self._generation_config(generation_config, response_schema)
+        )
+        return self._to_response(response)
+
+    def _to_response(self, response) -> LLMResponse:
+        finish_reason = response.candidates[0].finish_reason.name if response.candidates else "UNKNOWN"
+        try:
+            text = response.text or ""
+        except ValueError:
+            # 안전 필터 등으로 차단되면 response.text 접근 시 ValueError가 발생합니다.
+            print(f"🚨🚨 응답 객체 전문:\n{response}")
+            text = ""
+        return LLMResponse(text, finish_reason)
+
+    def generate_stream(self, prompt, generation_config, response_schema=None) -> Iterator[str]:
+        model = self._require_model()
+        responses = model.generate_content(
+            contents=[prompt],
+            generation_config=self._generation_config(generation_config, response_schema),
+            stream=True
+        )
+        for response in responses:
+            try:
+                text = response.text
+            except ValueError:
+                # 차단된 조각 등 텍스트가 없는 응답은 건너뜁니다.
+                continue
+            if text:
+                yield text
+
+
+class FakeProvider(LLMProvider):
+    """
+    네트워크 호출 없이 프롬프트 해시로 시드를 정해 항상 같은 응답을 만드는 가짜 제공자.
+    latency_seconds만큼 대기하고, 마인드맵 응답은 node_count개, 텍스트 응답은 text_chars자 길이입니다.
+    """
+    name = "fake"
+
+    # 스트리밍 시 조각 크기(문자 수)와 첫 조각까지의 지연 비율
+    STREAM_CHUNK_CHARS = 64
+    FIRST_CHUNK_LATENCY_RATIO = 0.1
+
+    def __init__(self, latency_seconds: float = 0.0, node_count: int = 12, text_chars: int = 400):
+        self.model_name = f"fake-{node_count}n-{text_chars}c"
+        self.latency_seconds = latency_seconds
+        self.node_count = max(node_count, 1)
+        self.text_chars = text_chars
+
+    def generate(self, prompt, generation_config, response_schema=None) -> LLMResponse:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        return self._respond(prompt, response_schema)
+
+    async def agenerate(self, prompt, generation_config, response_schema=None) -> LLMResponse:
+        if self.latency_seconds:
+            await asyncio.sleep(self.latency_seconds)
+        return self._respond(prompt, response_schema)
+
+    def generate_stream(self, prompt, generation_config, response_schema=None) -> Iterator[str]:
+        """전체 지연 시간 중 일부 후 첫 조각을 보내고, 나머지 시간 동안 조각을 나눠 보냅니다."""
+        text = self._respond(prompt, response_schema).text
+        chunks = [text[start:start + self.STREAM_CHUNK_CHARS] for start in range(0, len(text), self.STREAM_CHUNK_CHARS)]
+        if not chunks:
+            return
+
+        first_delay = self.latency_seconds * self.FIRST_CHUNK_LATENCY_RATIO
+        rest_delay = (self.latency_seconds - first_delay) / max(len(chunks) - 1, 1)
+        for index, chunk in enumerate(chunks):
+            delay = first_delay if index == 0 else rest_delay
+            if delay:
+                time.sleep(delay)
+            yield chunk
+
+    def _respond(self, prompt, response_schema) -> LLMResponse:
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        if response_schema is None:
+            return LLMResponse(self._text(rng, self.text_chars))
+
+        schema_name = response_schema.get("title")
+        if schema_name == "MindMapDataOutput":
+            nodes = self._nodes(rng, self.node_count, prefix="")
+            payload = {
+                "nodes": nodes,
+                "links": [
+                    {"source": node["id"], "target": conn["target_id"]}
+                    for node in nodes for conn in node["connections"]
+                ],
+            }
+        elif schema_name == "MindMapDeltaOutput":
+            payload = {
+                "added_nodes": self._nodes(rng, max(self.node_count // 4, 1), prefix="new-", with_core=False),
+                "updated_nodes": [],
+                "removed_node_ids": [],
+            }
+        else:
+            payload = self._from_schema(rng, response_schema, response_schema.get("defs", response_schema.get("$defs", {})))
+        return LLMResponse(json.dumps(payload, ensure_ascii=False))
+
+    def _text(self, rng: random.Random, length: int) -> str:
+        words = ["프로젝트", "일정", "기능", "디자인", "회의", "아이디어", "검토", "배포", "테스트", "문서"]
+        text = ""
+        while len(text) < length:
+            text += rng.choice(words) + " "
+        return text[:length].strip()
+
+    def _nodes(self, rng: random.Random, count: int, prefix: str, with_core: bool = True) -> List[Dict[str, Any]]:
+        """core 1개 → major 여러 개 → minor로 이어지는 트리 모양 노드 목록"""
+        nodes: List[Dict[str, Any]] = []
+        majors: List[Dict[str, Any]] = []
+        for index in range(count):
+            if index == 0 and with_core:
+                node_type = "core"
+            elif len(majors) < max(count // 4, 1):
+                node_type = "major"
+            else:
+                node_type = "minor"
+            node = {
+                "id": f"{prefix}{node_type}-{index + 1}",
+                "node_type": node_type,
+                "title": self._text(rng, 12),
+                "description": self._text(rng, 60),
+                "connections": [],
+            }
+            if node_type == "major":
+                if with_core:
+                    nodes[0]["connections"].append({"target_id": node["id"]})
+                majors.append(node)
+            elif node_type == "minor":
+                rng.choice(majors)["connections"].append({"target_id": node["id"]})
+            nodes.append(node)
+        return nodes
+
+    def _from_schema(self, rng: random.Random, schema: Dict[str, Any], defs: Dict[str, Any], depth: int = 0) -> Any:
+        """그 외 스키마는 JSON 스키마를 따라 값을 채웁니다."""
+        if "$ref" in schema:
+            schema = defs.get(schema["$ref"].rsplit("/", 1)[-1], {})
+        if "anyOf" in schema:
+            schema = next((option for option in schema["anyOf"] if option.get("type") != "null"), {})
+
+        schema_type = schema.get("type", "object")
+        if schema_type == "object":
+            return {
+                key: self._from_schema(rng, value, defs, depth + 1)
+                for key, value in schema.get("properties", {}).items()
+            }
+        if schema_type == "array":
+            size = 0 if depth > 4 else rng.randint(3, 5)
+            return [self._from_schema(rng, schema.get("items", {}), defs, depth + 1) for _ in range(size)]
+        if schema_type == "integer":
+            return rng.randint(0, 100)
+        if schema_type == "number":
+            return round(rng.random() * 100, 2)
+        if schema_type == "boolean":
+            return rng.random() < 0.5
+        return self._text(rng, 20)
+
+
+class RecordReplayProvider(LLMProvider):
+    """
+    요청(모델/설정/스키마/프롬프트)의 해시를 파일 이름으로 응답을 저장하거나 재생합니다.
+    record 모드는 inner 제공자를 호출해 저장하고, replay 모드는 저장된 응답만 반환합니다.
+    """
+    def __init__(self, mode: str, recordings_dir: str, model_name: str, inner: Optional[LLMProvider] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown record/replay mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("record mode requires an inner provider")
+        self.name = mode
+        self.mode = mode
+        self.recordings_dir = recordings_dir
+        self.model_name = model_name
+        self.inner = inner
+        os.makedirs(recordings_dir, exist_ok=True)
+
+    @property
+    def available(self) -> bool:
+        return self.mode == "replay" or self.inner.available
+
+    def _path(self, prompt, generation_config, response_schema) -> str:
+        key = hashlib.sha256(json.dumps(
+            {
+                "model": self.model_name,
+                "config": generation_config,
+                "schema": response_schema,
+                "prompt": prompt,
+            },
+            ensure_ascii=False, sort_keys=True, default=str
+        ).encode("utf-8")).hexdigest()
+        return os.path.join(self.recordings_dir, f"{key}.json")
+
+    def _load(self, path: str) -> Dict[str, Any]:
+        if not os.path.exists(path):
+            raise LLMProviderError(f"No recorded response for this request ({os.path.basename(path)})")
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self, path: str, text: str, finish_reason: str, chunks: Optional[List[str]] = None):
+        recorded = {"model": self.model_name, "finish_reason": finish_reason, "text": text}
+        if chunks is not None:
+            recorded["chunks"] = chunks
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(recorded, f, ensure_ascii=False, indent=2)
+
+    def generate(self, prompt, generation_config, response_schema=None) -> LLMResponse:
+        path = self._path(prompt, generation_config, response_schema)
+
+        if self.mode == "replay":
+            recorded = self._load(path)
+            return LLMResponse(recorded["text"], recorded.get("finish_reason", "STOP"))
+
+        response = self.inner.generate(prompt, generation_config, response_schema)
+        self._save(path, response.text, response.finish_reason)
+        return response
+
+    async def agenerate(self, prompt, generation_config, response_schema=None) -> LLMResponse:
+        path = self._path(prompt, generation_config, response_schema)
+
+        if self.mode == "replay":
+            recorded = self._load(path)
+            return LLMResponse(recorded["text"], recorded.get("finish_reason", "STOP"))
+
+        response = await self.inner.agenerate(prompt, generation_config, response_schema)
+        self._save(path, response.text, response.finish_reason)
+        return response
+
+    def generate_stream(self, prompt, generation_config, response_schema=None) -> Iterator[str]:
+        # 스트리밍 응답은 같은 요청의 일반 응답과 같은 파일을 사용하고, 녹화된 조각 경계를 그대로 재생합니다.
+        path = self._path(prompt, generation_config, response_schema)
+
+        if self.mode == "replay":
+            recorded = self._load(path)
+            yield from recorded.get("chunks") or [recorded["text"]]
+            return
+
+        chunks = []
+        for chunk in self.inner.generate_stream(prompt, generation_config, response_schema):
+            chunks.append(chunk)
+            yield chunk
+        self._save(path, "".join(chunks), "STOP", chunks)
+
+
+class _SlotWaiter:
+    """슬롯을 기다리는 호출 하나. 스레드 호출은 event, 비동기 호출은 (loop, future)로 깨웁니다."""
+    __slots__ = ("event", "loop", "future", "granted")
+
+    def __init__(self, event=None, loop=None, future=None):
+        self.event = event
+        self.loop = loop
+        self.future = future
+        self.granted = False
+
+
+class LLMConcurrencyLimiter:
+    """
+    워커 스레드(동기 호출)와 이벤트 루프(비동기 호출)가 함께 쓰는 전역 동시 호출 제한.
+
+    슬롯이 없으면 스레드/비동기 호출 구분 없이 하나의 FIFO 대기열에 줄을 서고, 슬롯이 반납되면
+    가장 오래 기다린 호출에게 바로 넘깁니다. (새로 도착한 호출이 오래 기다린 호출을 앞지르지 않음)
+    비동기 대기는 future로 깨우므로 스레드를 점유하거나 폴링하지 않으며, 취소되면 슬롯을 잡지 않은 채 종료됩니다.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._waiters: Deque[_SlotWaiter] = deque()
+        self.in_flight = 0
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _try_acquire(self) -> bool:
+        # 대기 중인 호출이 있으면 빈 슬롯이 있어도 새 호출은 줄을 섭니다. (_lock 보유 상태에서 호출)
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        with self._lock:
+            if self._try_acquire():
+                return
+            waiter = _SlotWaiter(event=threading.Event())
+            self._waiters.append(waiter)
+        waiter.event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire():
+                return
+            waiter = _SlotWaiter(loop=loop, future=loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._waiters.remove(waiter)
+            if granted:
+                # 취소와 동시에 슬롯을 넘겨받았으면 다음 대기자에게 돌려줍니다.
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                # 슬롯은 in_flight를 줄이지 않고 그대로 다음 대기자에게 넘깁니다.
+                if waiter.event is not None:
+                    waiter.event.set()
+                    return
+                try:
+                    waiter.loop.call_soon_threadsafe(_grant_slot, waiter.future)
+                    return
+                except RuntimeError:
+                    # 대기자의 이벤트 루프가 이미 닫힘
+                    continue
+            self.in_flight -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"max_concurrency": self.max_concurrency, "in_flight": self.in_flight, "waiting": len(self._waiters)}
+
+
+def _grant_slot(future: asyncio.Future):
+    # 대기자의 이벤트 루프에서 실행됩니다. 이미 취소된 future면 acquire_async의 취소 처리가 슬롯을 반납합니다.
+    if not future.done():
+        future.set_result(None)
+
+
+class LimitedProvider(LLMProvider):
+    """다른 제공자를 감싸 전역 동시 호출 제한과 비동기 호출 타임아웃을 적용합니다."""
+    def __init__(self, inner: LLMProvider, limiter: LLMConcurrencyLimiter, timeout_seconds: Optional[float] = None):
+        self.inner = inner
+        self.limiter = limiter
+        self.timeout_seconds = timeout_seconds
+        self.name = inner.name
+        self.model_name = inner.model_name
+
+    @property
+    def available(self) -> bool:
+        return self.inner.available
+
+    def generate(self, prompt, generation_config, response_schema=None) -> LLMResponse:
+        self.limiter.acquire()
+        try:
+            return self.inner.generate(prompt, generation_config, response_schema)
+        finally:
+            self.limiter.release()
+
+    def generate_stream(self, prompt, generation_config, response_schema=None) -> Iterator[str]:
+        self.limiter.acquire()
+        try:
+            yield from self.inner.generate_stream(prompt, generation_config, response_schema)
+        finally:
+            self.limiter.release()
+
+    async def agenerate(self, prompt, generation_config, response_schema=None, timeout_seconds: Optional[float] = None) -> LLMResponse:
+        """
+        슬롯 대기 시간을 포함해 timeout_seconds(기본 LLM_TIMEOUT_SECONDS) 안에 끝나지 않으면 asyncio.TimeoutError.
+        호출 측 태스크가 취소되면(클라이언트 연결 종료 등) 진행 중인 모델 호출도 함께 취소됩니다.
+        """
+        async def call():
+            await self.limiter.acquire_async()
+            try:
+                return await self.inner.agenerate(prompt, generation_config, response_schema)
+            finally:
+                self.limiter.release()
+
+        return await asyncio.wait_for(call(), timeout=timeout_seconds or self.timeout_seconds)
+
+
+_provider: Optional[LLMProvider] = None
+_provider_lock = threading.Lock()
+_limiter = LLMConcurrencyLimiter(get_settings().LLM_MAX_CONCURRENCY)
+
+
+def create_llm_provider(kind: Optional[str] = None) -> LLMProvider:
+    """설정(LLM_PROVIDER 등)에 따라 새 제공자를 만듭니다."""
+    settings = get_settings()
+    kind = (kind or settings.LLM_PROVIDER).lower()
+
+    if kind == "fake":
+        return FakeProvider(
+            latency_seconds=settings.LLM_FAKE_LATENCY_SECONDS,
+            node_count=settings.LLM_FAKE_NODE_COUNT,
+            text_chars=settings.LLM_FAKE_TEXT_CHARS
+        )
+
+    vertex = VertexProvider(
+        model_name=settings.LLM_MODEL,
+        project_id=os.getenv("GCP_PROJECT_ID", "minmap-476213"),
+        region=os.getenv("GCP_REGION", "asia-northeast3") # 서울 리전
+    )
+    if kind in ("record", "replay"):
+        return RecordReplayProvider(
+            mode=kind,
+            recordings_dir=settings.LLM_RECORDINGS_DIR,
+            model_name=settings.LLM_MODEL,
+            inner=vertex if kind == "record" else None
+        )
+    if kind != "vertex":
+        print(f"⚠️ Unknown LLM_PROVIDER '{kind}', falling back to vertex")
+    return vertex
+
+
+def get_llm_provider() -> LLMProvider:
+    """프로세스 전체에서 공유하는 제공자를 반환합니다."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = LimitedProvider(create_llm_provider(), _limiter, get_settings().LLM_TIMEOUT_SECONDS)
+                print(f"✅ LLM provider: {_provider.name} ({_provider.model_name})")
+    return _provider
+
+
+def set_llm_provider(provider: LLMProvider):
+    """공유 제공자를 교체합니다. (벤치마크 스크립트 등에서 사용)"""
+    global _provider
+    _provider = LimitedProvider(provider, _limiter, get_settings().LLM_TIMEOUT_SECONDS)
+
+
+def llm_limiter_stats() -> Dict[str, int]:
+    """현재 진행/대기 중인 LLM 호출 수"""
+    return _limiter.stats()
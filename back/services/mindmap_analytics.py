@@ -0,0 +1,283 @@
+# 마인드맵 그래프 분석 (중요도 지표)
+#
+# AI 프롬프트에 맵 전체를 넣지 않도록, 노드별 중요도를 희소 행렬(SciPy) 연산으로 계산합니다.
+#   - degree:      들어오는/나가는 간선 수
+#   - pagerank:    간선을 거꾸로(하위 -> 상위) 따라가는 PageRank. 하위 트리가 큰 상위 노드일수록 높습니다.
+#   - betweenness: 방향을 무시한 최단 경로 매개 중심성. 여러 출발 노드를 열로 묶어 BFS/역전파를
+#                  희소 행렬 x 밀집 행렬 곱으로 한 번에 진행합니다. (큰 맵은 출발 노드를 표본 추출한 근사값)
+#   - component:   방향을 무시한 연결 요소 번호
+# 결과는 (프로젝트, 마인드맵 버전)별로 메모리 LRU에 캐시되므로 맵이 바뀌지 않으면 다시 계산하지 않습니다.
+# 프롬프트 구성(services/ai_analyzer.py)은 select_salient/peripheral_groups로 중요한 노드만 자세히 넣고
+# 나머지는 가까운 중요 노드 아래에 묶어 요약합니다.
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..config import get_settings
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_TOLERANCE = 1.0e-8
+PAGERANK_MAX_ITERATIONS = 100
+BETWEENNESS_BATCH = 32  # 한 번에 BFS를 진행하는 출발 노드 수 (메모리 = 노드 수 x BATCH x 20 bytes)
+
+# 중요도 = 정규화한 지표의 가중합
+SALIENCE_WEIGHTS = {"pagerank": 0.45, "betweenness": 0.35, "degree": 0.2}
+
+
+class GraphMetrics:
+    """노드별 지표 배열 (node_ids 순서). 방향을 무시한 인접 리스트(CSR)도 함께 보관합니다."""
+
+    def __init__(self, node_ids, signature, edge_count, in_degree, out_degree, pagerank, betweenness,
+                 component, component_count, salience, indptr, indices):
+        self.node_ids: List[str] = node_ids
+        self.index: Dict[str, int] = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.signature = signature # 입력 (노드 수, 간선 수). 캐시 항목이 같은 그래프에서 계산되었는지 확인하는 데 사용
+        self.edge_count = edge_count
+        self.in_degree = in_degree
+        self.out_degree = out_degree
+        self.pagerank = pagerank
+        self.betweenness = betweenness
+        self.component = component
+        self.component_count = component_count
+        self.salience = salience
+        self._indptr = indptr
+        self._indices = indices
+
+    def neighbors(self, i: int):
+        return self._indices[self._indptr[i]:self._indptr[i + 1]]
+
+    def ranking(self) -> List[int]:
+        """중요도 내림차순 노드 인덱스 (같으면 ID 순)"""
+        return sorted(range(len(self.node_ids)), key=lambda i: (-self.salience[i], self.node_ids[i]))
+
+    def node_metrics(self, node_id: str) -> Optional[Dict[str, float]]:
+        i = self.index.get(node_id)
+        if i is None:
+            return None
+        return {
+            "in_degree": int(self.in_degree[i]),
+            "out_degree": int(self.out_degree[i]),
+            "pagerank": float(self.pagerank[i]),
+            "betweenness": float(self.betweenness[i]),
+            "component": int(self.component[i]),
+            "salience": float(self.salience[i]),
+        }
+
+
+def _pagerank(np, matrix, n: int):
+    """matrix[i, j] = 1 이면 i -> j. 나가는 간선이 없는 노드의 점수는 전체에 고르게 나눕니다."""
+    out_degree = np.asarray(matrix.sum(axis=1)).ravel()
+    dangling = out_degree == 0
+    inverse = np.where(dangling, 0.0, 1.0 / np.where(dangling, 1.0, out_degree))
+    transposed = matrix.T.tocsr()
+    rank = np.full(n, 1.0 / n)
+    for _ in range(PAGERANK_MAX_ITERATIONS):
+        spread = transposed @ (rank * inverse)
+        updated = PAGERANK_DAMPING * (spread + rank[dangling].sum() / n) + (1.0 - PAGERANK_DAMPING) / n
+        if np.abs(updated - rank).sum() < PAGERANK_TOLERANCE:
+            return updated
+        rank = updated
+    return rank
+
+
+def _betweenness(np, undirected, n: int, samples: int):
+    """
+    Brandes 알고리즘을 출발 노드 BATCH개씩 열로 묶어 행렬 연산으로 수행합니다.
+    sigma(최단 경로 수)와 dist(단계)는 (노드 x 출발 노드) 밀집 행렬이고, 한 단계 전진/역전파가 희소 행렬 곱 한 번입니다.
+    노드가 samples보다 많으면 출발 노드를 고정 시드로 표본 추출하고 n / samples 배로 보정합니다. (0 이하면 항상 전체)
+    """
+    if 0 < samples < n:
+        sources = np.sort(np.random.default_rng(0).choice(n, size=samples, replace=False))
+    else:
+        sources = np.arange(n)
+    scores = np.zeros(n)
+
+    for start in range(0, len(sources), BETWEENNESS_BATCH):
+        batch = sources[start:start + BETWEENNESS_BATCH]
+        columns = np.arange(len(batch))
+        sigma = np.zeros((n, len(batch)))
+        dist = np.full((n, len(batch)), -1, dtype=np.int32)
+        sigma[batch, columns] = 1.0
+        dist[batch, columns] = 0
+
+        frontier = sigma.copy()
+        level = 0
+        while True:
+            reached = undirected @ frontier
+            new = (reached > 0) & (dist < 0)
+            if not new.any():
+                break
+            level += 1
+            dist[new] = level
+            sigma[new] = reached[new]
+            frontier = np.where(new, sigma, 0.0)
+
+        safe_sigma = np.where(sigma > 0, sigma, 1.0)
+        delta = np.zeros((n, len(batch)))
+        for depth in range(level, 0, -1):
+            coefficient = np.where(dist == depth, (1.0 + delta) / safe_sigma, 0.0)
+            delta += np.where(dist == depth - 1, sigma * (undirected @ coefficient), 0.0)
+        delta[batch, columns] = 0.0
+        scores += delta.sum(axis=1)
+
+    # 방향을 무시하므로 각 쌍이 두 번 세어짐 / 표본 보정 / (n-1)(n-2)/2 로 정규화
+    scores *= 0.5 * n / len(sources)
+    if n > 2:
+        scores /= (n - 1) * (n - 2) / 2.0
+    return scores
+
+
+def compute_metrics(node_ids: Sequence[str], edges: Iterable[Tuple[str, str]],
+                    betweenness_samples: Optional[int] = None) -> GraphMetrics:
+    """
+    노드 ID 목록과 (source, target) 간선으로 지표를 계산합니다.
+    존재하지 않는 노드를 가리키는 간선, 자기 자신으로의 간선, 중복 간선은 무시합니다.
+    """
+    import numpy as np
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components
+
+    if betweenness_samples is None:
+        betweenness_samples = get_settings().MINDMAP_ANALYTICS_BETWEENNESS_SAMPLES
+
+    node_ids = list(node_ids)
+    edges = list(edges)
+    signature = (len(node_ids), len(edges))
+    n = len(node_ids)
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    pairs = {(index[source], index[target]) for source, target in edges
+             if source in index and target in index and source != target}
+    if n == 0:
+        empty = np.zeros(0)
+        return GraphMetrics([], signature, 0, empty, empty, empty, empty, empty.astype(np.int32), 0, empty,
+                            np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32))
+
+    src = np.fromiter((source for source, _ in pairs), dtype=np.int32, count=len(pairs))
+    dst = np.fromiter((target for _, target in pairs), dtype=np.int32, count=len(pairs))
+    directed = sparse.csr_matrix((np.ones(len(pairs)), (src, dst)), shape=(n, n))
+    undirected = ((directed + directed.T) > 0).astype(np.float64).tocsr()
+
+    out_degree = np.diff(directed.indptr)
+    in_degree = np.diff(directed.tocsc().indptr)
+    component_count, component = connected_components(undirected, directed=False)
+    # 하위 -> 상위 방향으로 점수가 흐르도록 뒤집은 그래프의 PageRank
+    pagerank = _pagerank(np, directed.T.tocsr(), n)
+    betweenness = _betweenness(np, undirected, n, betweenness_samples)
+
+    degree = (in_degree + out_degree).astype(np.float64)
+    salience = np.zeros(n)
+    for name, values in (("pagerank", pagerank), ("betweenness", betweenness), ("degree", degree)):
+        peak = values.max()
+        if peak > 0:
+            salience += SALIENCE_WEIGHTS[name] * values / peak
+
+    return GraphMetrics(
+        node_ids, signature, len(pairs), in_degree, out_degree, pagerank, betweenness,
+        component, int(component_count), salience, undirected.indptr, undirected.indices
+    )
+
+
+# === 버전별 캐시 ===
+class _MetricsCache:
+    """(프로젝트, 마인드맵 버전) -> GraphMetrics 메모리 LRU. 여러 워커 스레드에서 동시에 사용할 수 있습니다."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, int], GraphMetrics]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[GraphMetrics]:
+        with self._lock:
+            metrics = self._entries.get(key)
+            if metrics is not None:
+                self._entries.move_to_end(key)
+            return metrics
+
+    def set(self, key, metrics: GraphMetrics):
+        with self._lock:
+            self._entries[key] = metrics
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard_project(self, project_id: int):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == project_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+metrics_cache = _MetricsCache(get_settings().MINDMAP_ANALYTICS_CACHE_SIZE)
+
+
+def get_metrics(project_id: int, version: Optional[int], node_ids: Sequence[str],
+                edges: Sequence[Tuple[str, str]]) -> GraphMetrics:
+    """
+    버전의 지표를 캐시에서 꺼내거나 계산합니다. version이 None이면 캐시를 사용하지 않습니다.
+    버전을 읽은 뒤 노드를 읽는 사이에 맵이 바뀌었을 수 있으므로, 노드/간선 수가 다르면 다시 계산하고 캐시는 그대로 둡니다.
+    """
+    key = (project_id, version)
+    metrics = metrics_cache.get(key) if version is not None else None
+    if metrics is not None:
+        if metrics.signature == (len(node_ids), len(edges)):
+            return metrics
+        return compute_metrics(node_ids, edges)
+
+    metrics = compute_metrics(node_ids, edges)
+    if version is not None:
+        metrics_cache.set(key, metrics)
+    return metrics
+
+
+# === 프롬프트용 노드 선택 ===
+def select_salient(metrics: GraphMetrics, budget: int, pinned: Iterable[str] = ()) -> List[str]:
+    """
+    pinned 노드(맵에 있는 것만)를 먼저, 나머지는 중요도 순으로 채워 최대 budget개(pinned가 더 많으면 pinned 전체)를 고릅니다.
+    결과는 중요도 순입니다.
+    """
+    chosen = {metrics.index[node_id] for node_id in pinned if node_id in metrics.index}
+    for i in metrics.ranking():
+        if len(chosen) >= budget:
+            break
+        chosen.add(i)
+    return [metrics.node_ids[i] for i in sorted(chosen, key=lambda i: (-metrics.salience[i], metrics.node_ids[i]))]
+
+
+def peripheral_groups(metrics: GraphMetrics, salient: Sequence[str]) -> List[Tuple[Optional[str], List[str]]]:
+    """
+    선택되지 않은 노드를 (방향을 무시하고) 가장 가까운 선택 노드 아래에 묶습니다.
+    선택 노드가 없는 연결 요소의 노드는 anchor None 그룹(요소마다 하나)으로 묶습니다.
+    그룹은 anchor의 중요도 순, 그룹 안의 노드는 중요도 순입니다.
+    """
+    anchor = [-1] * len(metrics.node_ids)
+    queue = deque()
+    for node_id in salient:
+        i = metrics.index[node_id]
+        anchor[i] = i
+        queue.append(i)
+    while queue:
+        i = queue.popleft()
+        for j in metrics.neighbors(i):
+            if anchor[j] < 0:
+                anchor[j] = anchor[i]
+                queue.append(j)
+
+    salient_set = {metrics.index[node_id] for node_id in salient}
+    groups: Dict[Tuple[int, int], List[int]] = {}
+    for i in metrics.ranking():
+        if i in salient_set:
+            continue
+        key = (0, anchor[i]) if anchor[i] >= 0 else (1, int(metrics.component[i]))
+        groups.setdefault(key, []).append(i)
+
+    result = []
+    for node_id in salient:
+        members = groups.get((0, metrics.index[node_id]))
+        if members:
+            result.append((node_id, [metrics.node_ids[i] for i in members]))
+    for key in sorted(key for key in groups if key[0] == 1):
+        result.append((None, [metrics.node_ids[i] for i in groups[key]]))
+    return result
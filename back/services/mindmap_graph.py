@@ -0,0 +1,178 @@
+# 마인드맵 그래프 조회 서비스
+#
+# 노드 간 연결은 mindmap_edges 테이블(source -> target, 상위 -> 하위)에 정규화되어 저장됩니다.
+# 하위 트리/조상/깊이 제한 탐색은 재귀 CTE 하나로 DB에서 처리하므로,
+# 큰 맵에서도 전체 노드를 읽어 connections JSON을 파싱할 필요가 없습니다.
+#
+#   WITH RECURSIVE reach(node_id, depth) AS (
+#       SELECT id, 0 FROM mindmap_nodes WHERE project_id = :pid AND id = :start
+#       UNION
+#       SELECT e.target_id, r.depth + 1 FROM mindmap_edges e JOIN reach r ON e.source_id = r.node_id
+#       WHERE e.project_id = :pid AND r.depth < :max_depth
+#   )
+#   SELECT node_id, MIN(depth) FROM reach GROUP BY node_id
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Integer, case, func, literal_column, or_, select
+from sqlalchemy.orm import Session
+
+from ..models import MindMapEdge as ORMMindMapEdge, MindMapNode as ORMMindMapNode
+
+DIRECTION_OUT = "out"    # 하위 방향 (source -> target)
+DIRECTION_IN = "in"      # 상위 방향 (target -> source)
+DIRECTION_BOTH = "both"  # 방향 무시
+DIRECTIONS = (DIRECTION_OUT, DIRECTION_IN, DIRECTION_BOTH)
+
+
+def collect_edges(nodes: Iterable[Dict], links: Iterable[Dict]) -> List[Tuple[str, str]]:
+    """
+    노드의 connections와 links에서 (source, target) 간선 목록을 만듭니다.
+    존재하지 않는 노드를 가리키는 간선, 자기 자신으로의 간선, 중복은 제거합니다. (처음 나온 순서 유지)
+    """
+    nodes = list(nodes)
+    node_ids = {node["id"] for node in nodes}
+    edges: Dict[Tuple[str, str], None] = {}
+
+    def add(source, target):
+        if source in node_ids and target in node_ids and source != target:
+            edges.setdefault((source, target), None)
+
+    for link in links:
+        if isinstance(link, dict):
+            add(link.get("source"), link.get("target"))
+    for node in nodes:
+        for conn in node.get("connections") or []:
+            if isinstance(conn, dict):
+                add(node["id"], conn.get("target_id"))
+    return list(edges)
+
+
+def add_project_edges(db: Session, project_id: int, edges: Iterable[Tuple[str, str]]):
+    """간선을 일괄 추가합니다. 커밋은 호출 측(노드 저장과 같은 트랜잭션)에서 합니다."""
+    db.bulk_insert_mappings(ORMMindMapEdge, [
+        {"project_id": project_id, "source_id": source, "target_id": target}
+        for source, target in edges
+    ])
+
+
+def delete_project_edges(db: Session, project_id: int):
+    """프로젝트의 간선을 모두 삭제합니다. (노드를 삭제하기 전에 호출)"""
+    db.query(ORMMindMapEdge).filter(ORMMindMapEdge.project_id == project_id).delete(synchronize_session=False)
+
+
+def _reach_cte(project_id: int, start_id: str, direction: str, max_depth: int):
+    """start_id에서 direction으로 max_depth까지 도달 가능한 (node_id, depth) 재귀 CTE"""
+    nodes = ORMMindMapNode.__table__
+    edges = ORMMindMapEdge.__table__
+
+    reach = select(
+        nodes.c.id.label("node_id"),
+        literal_column("0", Integer).label("depth")
+    ).where(
+        nodes.c.project_id == project_id,
+        nodes.c.id == start_id
+    ).cte("reach", recursive=True)
+
+    if direction == DIRECTION_OUT:
+        next_id, join_on = edges.c.target_id, edges.c.source_id == reach.c.node_id
+    elif direction == DIRECTION_IN:
+        next_id, join_on = edges.c.source_id, edges.c.target_id == reach.c.node_id
+    else:
+        # 한 번의 재귀 참조로 양방향을 처리합니다. (PostgreSQL은 재귀 항에서 CTE를 한 번만 참조할 수 있음)
+        next_id = case((edges.c.source_id == reach.c.node_id, edges.c.target_id), else_=edges.c.source_id)
+        join_on = or_(edges.c.source_id == reach.c.node_id, edges.c.target_id == reach.c.node_id)
+
+    step = select(
+        next_id.label("node_id"),
+        (reach.c.depth + 1).label("depth")
+    ).select_from(
+        edges.join(reach, join_on)
+    ).where(
+        edges.c.project_id == project_id,
+        reach.c.depth < max_depth
+    )
+    # UNION(중복 제거)과 깊이 제한으로 순환이 있어도 종료됩니다.
+    return reach.union(step)
+
+
+def traverse(
+    db: Session,
+    project_id: int,
+    start_id: str,
+    direction: str = DIRECTION_OUT,
+    max_depth: int = 1,
+    include_start: bool = True
+) -> Optional[Dict]:
+    """
+    start_id에서 direction으로 max_depth 단계까지 도달하는 노드와 그 사이의 간선을 반환합니다.
+    각 노드의 depth는 시작 노드로부터의 최단 단계 수입니다. 시작 노드가 없으면 None을 반환합니다.
+
+    반환: {"root_id", "nodes": [(ORMMindMapNode, depth), ...], "edges": [(source, target), ...]}
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Unknown direction: {direction}")
+
+    reach = _reach_cte(project_id, start_id, direction, max_depth)
+    depths = select(
+        reach.c.node_id,
+        func.min(reach.c.depth).label("depth")
+    ).group_by(reach.c.node_id).subquery("depths")
+
+    rows = db.query(ORMMindMapNode, depths.c.depth).join(
+        depths, ORMMindMapNode.id == depths.c.node_id
+    ).filter(
+        ORMMindMapNode.project_id == project_id
+    ).order_by(depths.c.depth, ORMMindMapNode.id).all()
+    if not rows:
+        return None
+
+    node_ids: Set[str] = {node.id for node, _ in rows}
+    edges = db.query(ORMMindMapEdge.source_id, ORMMindMapEdge.target_id).filter(
+        ORMMindMapEdge.project_id == project_id,
+        ORMMindMapEdge.source_id.in_(node_ids),
+        ORMMindMapEdge.target_id.in_(node_ids)
+    ).order_by(ORMMindMapEdge.id).all()
+
+    if not include_start:
+        rows = [(node, depth) for node, depth in rows if node.id != start_id]
+    return {
+        "root_id": start_id,
+        "nodes": rows,
+        "edges": [(source, target) for source, target in edges],
+    }
+
+
+def neighbors(db: Session, project_id: int, node_id: str) -> Optional[Dict]:
+    """
+    노드와 직접 연결된 노드를 반환합니다. 노드가 없으면 None을 반환합니다.
+
+    반환: {"root_id", "parents": [ORMMindMapNode], "children": [ORMMindMapNode], "edges": [(source, target), ...]}
+    """
+    exists = db.query(ORMMindMapNode.id).filter(
+        ORMMindMapNode.project_id == project_id,
+        ORMMindMapNode.id == node_id
+    ).first()
+    if not exists:
+        return None
+
+    edges = db.query(ORMMindMapEdge.source_id, ORMMindMapEdge.target_id).filter(
+        ORMMindMapEdge.project_id == project_id,
+        or_(ORMMindMapEdge.source_id == node_id, ORMMindMapEdge.target_id == node_id)
+    ).order_by(ORMMindMapEdge.id).all()
+
+    parent_ids = [source for source, target in edges if target == node_id]
+    child_ids = [target for source, target in edges if source == node_id]
+    by_id = {
+        node.id: node
+        for node in db.query(ORMMindMapNode).filter(
+            ORMMindMapNode.project_id == project_id,
+            ORMMindMapNode.id.in_(set(parent_ids + child_ids))
+        ).all()
+    } if edges else {}
+
+    return {
+        "root_id": node_id,
+        "parents": [by_id[parent_id] for parent_id in parent_ids if parent_id in by_id],
+        "children": [by_id[child_id] for child_id in child_ids if child_id in by_id],
+        "edges": [(source, target) for source, target in edges],
+    }
@@ -0,0 +1,189 @@
+# 마인드맵 버전 이력
+#
+# 생성과 수동 수정으로 맵이 바뀔 때마다 버전을 하나 기록합니다.
+#   - delta: 이전 버전 대비 변경 사항(MindMapDiff)만 저장 -> 저장량은 변경 규모에 비례
+#   - snapshot: MINDMAP_SNAPSHOT_INTERVAL 버전마다(그리고 프로젝트의 첫 기록 시) 전체 맵 저장
+# 버전 N의 맵은 N 이하의 가장 가까운 snapshot에서 시작해 (snapshot, N] 구간의 delta를 순서대로 적용하여 복원합니다.
+# 버전 0은 빈 맵입니다.
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import (
+    Project as ORMProject,
+    MindMapNode as ORMMindMapNode,
+    MindMapEdge as ORMMindMapEdge,
+    MindMapVersion as ORMMindMapVersion,
+)
+from ..schemas import MindMapDiff
+from .mindmap_store import diff_mindmap, node_row
+
+VERSION_SNAPSHOT = "snapshot"
+VERSION_DELTA = "delta"
+
+SOURCE_GENERATION = "generation"
+SOURCE_EDIT = "edit"
+
+
+class MindMapState:
+    """복원 중인 맵 상태 (노드 id -> 노드 dict, 순서가 유지되는 간선 목록)"""
+    def __init__(self, nodes: Optional[List[Dict]] = None, links: Optional[List[Dict]] = None):
+        self.nodes: Dict[str, Dict] = {node["id"]: node for node in (nodes or [])}
+        self.edges: Dict[Tuple[str, str], None] = dict.fromkeys(
+            (link["source"], link["target"]) for link in (links or [])
+        )
+
+    def apply(self, diff: Dict):
+        """MindMapDiff(dict)를 적용합니다."""
+        for node_id in diff.get("removed_node_ids", []):
+            self.nodes.pop(node_id, None)
+        for node in diff.get("added_nodes", []) + diff.get("updated_nodes", []):
+            self.nodes[node["id"]] = node
+        for link in diff.get("removed_links", []):
+            self.edges.pop((link["source"], link["target"]), None)
+        for link in diff.get("added_links", []):
+            self.edges[(link["source"], link["target"])] = None
+
+    def to_data(self) -> Dict:
+        return {
+            "nodes": list(self.nodes.values()),
+            "links": [{"source": source, "target": target} for source, target in self.edges],
+        }
+
+
+def is_empty_diff(diff: MindMapDiff) -> bool:
+    return not (
+        diff.added_nodes or diff.updated_nodes or diff.removed_node_ids
+        or diff.added_links or diff.removed_links
+    )
+
+
+def _next_version(db: Session, project_id: int) -> int:
+    """
+    프로젝트 마인드맵 버전을 원자적으로 1 증가시키고 새 버전을 반환합니다.
+    UPDATE가 프로젝트 행을 잠그므로, 커밋 전까지 같은 프로젝트의 다른 기록은 기다립니다.
+    """
+    db.query(ORMProject).filter(ORMProject.id == project_id).update(
+        {ORMProject.mindmap_version: func.coalesce(ORMProject.mindmap_version, 0) + 1},
+        synchronize_session=False
+    )
+    return db.query(ORMProject.mindmap_version).filter(ORMProject.id == project_id).scalar()
+
+
+def _current_state(db: Session, project_id: int) -> Dict:
+    """저장된 현재 맵 전체 (snapshot용)"""
+    nodes = db.query(ORMMindMapNode).populate_existing().filter(
+        ORMMindMapNode.project_id == project_id
+    ).order_by(ORMMindMapNode.id).all()
+    edges = db.query(ORMMindMapEdge.source_id, ORMMindMapEdge.target_id).filter(
+        ORMMindMapEdge.project_id == project_id
+    ).order_by(ORMMindMapEdge.id).all()
+    return {
+        "nodes": [node_row(node) for node in nodes],
+        "links": [{"source": source, "target": target} for source, target in edges],
+    }
+
+
+def record_version(
+    db: Session,
+    project_id: int,
+    diff: MindMapDiff,
+    source: str,
+    user_id: Optional[int] = None
+) -> Optional[int]:
+    """
+    이미 적용된 변경(diff)을 새 버전으로 기록하고 버전 번호를 반환합니다. 변경이 없으면 기록하지 않고 None을 반환합니다.
+    커밋은 호출 측(맵 변경과 같은 트랜잭션)에서 합니다.
+    """
+    if is_empty_diff(diff):
+        return None
+
+    db.flush()
+    version = _next_version(db, project_id)
+    last_snapshot = db.query(ORMMindMapVersion.version).filter(
+        ORMMindMapVersion.project_id == project_id,
+        ORMMindMapVersion.kind == VERSION_SNAPSHOT
+    ).order_by(ORMMindMapVersion.version.desc()).first()
+
+    # 스냅샷이 없으면(이력 기능 이전에 만든 맵 포함) 현재 맵 전체를 기준으로 남깁니다.
+    if last_snapshot is None or version - last_snapshot[0] >= get_settings().MINDMAP_SNAPSHOT_INTERVAL:
+        kind, data = VERSION_SNAPSHOT, _current_state(db, project_id)
+    else:
+        kind, data = VERSION_DELTA, diff.model_dump(mode="json")
+
+    db.add(ORMMindMapVersion(
+        project_id=project_id,
+        version=version,
+        kind=kind,
+        source=source,
+        data=data,
+        stats={
+            "added": len(diff.added_nodes),
+            "updated": len(diff.updated_nodes),
+            "removed": len(diff.removed_node_ids),
+            "links_added": len(diff.added_links),
+            "links_removed": len(diff.removed_links),
+        },
+        created_by=user_id,
+    ))
+    return version
+
+
+def load_version(db: Session, project_id: int, version: int) -> Optional[Dict]:
+    """
+    버전 version의 맵({"nodes", "links"})을 복원합니다. 버전 0은 빈 맵이고, 없는 버전이면 None을 반환합니다.
+    """
+    if version == 0:
+        return MindMapState().to_data()
+
+    exists = db.query(ORMMindMapVersion.id).filter(
+        ORMMindMapVersion.project_id == project_id,
+        ORMMindMapVersion.version == version
+    ).first()
+    if not exists:
+        return None
+
+    base = db.query(ORMMindMapVersion).filter(
+        ORMMindMapVersion.project_id == project_id,
+        ORMMindMapVersion.kind == VERSION_SNAPSHOT,
+        ORMMindMapVersion.version <= version
+    ).order_by(ORMMindMapVersion.version.desc()).first()
+    if base is None:
+        return None
+
+    state = MindMapState(base.data.get("nodes"), base.data.get("links"))
+    deltas = db.query(ORMMindMapVersion.data).filter(
+        ORMMindMapVersion.project_id == project_id,
+        ORMMindMapVersion.kind == VERSION_DELTA,
+        ORMMindMapVersion.version > base.version,
+        ORMMindMapVersion.version <= version
+    ).order_by(ORMMindMapVersion.version).all()
+    for (delta,) in deltas:
+        state.apply(delta)
+    return state.to_data()
+
+
+def diff_versions(db: Session, project_id: int, from_version: int, to_version: int) -> Optional[MindMapDiff]:
+    """두 버전의 맵을 복원하여 비교합니다. 어느 한쪽 버전이 없으면 None을 반환합니다."""
+    old = load_version(db, project_id, from_version)
+    new = load_version(db, project_id, to_version)
+    if old is None or new is None:
+        return None
+    return diff_mindmap(
+        old["nodes"], [(link["source"], link["target"]) for link in old["links"]],
+        new["nodes"], [(link["source"], link["target"]) for link in new["links"]]
+    )
+
+
+def list_versions(db: Session, project_id: int, limit: int = 50, before: Optional[int] = None) -> List[ORMMindMapVersion]:
+    """최신 버전부터 반환합니다. before가 주어지면 그보다 작은 버전만 (커서 페이지네이션)"""
+    query = db.query(ORMMindMapVersion).filter(ORMMindMapVersion.project_id == project_id)
+    if before is not None:
+        query = query.filter(ORMMindMapVersion.version < before)
+    return query.order_by(ORMMindMapVersion.version.desc()).limit(limit).all()
+
+
+def delete_project_versions(db: Session, project_id: int):
+    db.query(ORMMindMapVersion).filter(ORMMindMapVersion.project_id == project_id).delete(synchronize_session=False)
@@ -0,0 +1,394 @@
+# 마인드맵 서버 측 배치(레이아웃)
+#
+# 클라이언트가 맵을 열 때마다 직접 배치를 계산하지 않도록, 서버가 맵 버전별 노드 좌표를 계산하여 저장합니다.
+#   - tree:   위에서 아래로 층을 나누는 트리 배치
+#   - radial: 루트를 중심으로 깊이마다 고리에 놓는 방사형 배치
+#   - force:  NumPy로 벡터화한 force-directed(Fruchterman-Reingold) 배치 (큰 맵용, radial 배치에서 시작)
+#
+# tree/radial은 간선 그래프의 신장 트리에서 "하위 트리 너비(잎 수)와 형제 사이의 오프셋"을 구해 좌표를 정합니다.
+# ⚠️ 노드 하나만 추가되어도 그 오른쪽(radial은 이후 각도)의 하위 트리가 모두 평행 이동하므로 좌표 대부분이 바뀝니다.
+#    그래서 tree/radial은 매번 처음부터 계산합니다. (신장 트리, 너비 계산, 배치 모두 O(노드 수)라 3000개에서 약 20ms)
+#    이전 트리 정보를 재사용하는 증분 계산도 해 보았으나, 바뀐 노드를 찾는 비용 때문에 오히려 느렸습니다.
+#    저장된 배치가 있으면 다시 계산하지 않으므로, 이 비용은 맵 버전마다 한 번입니다.
+# force는 반복 비용이 커서(3000개에서 수 초) 이전 버전의 좌표에서 시작하여 자식 목록이 바뀐 노드와 그 이웃만 움직입니다.
+import math
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import (
+    Project as ORMProject,
+    MindMapNode as ORMMindMapNode,
+    MindMapEdge as ORMMindMapEdge,
+    MindMapLayout as ORMMindMapLayout,
+)
+from . import mindmap_history
+
+LAYOUT_RADIAL = "radial"
+LAYOUT_TREE = "tree"
+LAYOUT_FORCE = "force"
+LAYOUT_ALGORITHMS = (LAYOUT_RADIAL, LAYOUT_TREE, LAYOUT_FORCE)
+
+# 좌표 단위 (클라이언트가 그대로 그릴 수 있는 크기)
+LEVEL_GAP = 160.0      # tree: 층 간격
+SIBLING_GAP = 120.0    # tree: 잎 노드 간격
+RING_GAP = 180.0       # radial: 고리 간격
+FORCE_DISTANCE = 120.0 # force: 이상적인 간선 길이
+FORCE_GRAVITY = 0.02   # force: 연결되지 않은 요소가 멀어지지 않도록 중심으로 당기는 힘
+FORCE_CHUNK = 512      # force: 반발력을 계산할 때 한 번에 처리하는 행 수 (메모리 = CHUNK x 노드 수 x 12 bytes)
+
+# 가상 루트: 여러 루트(또는 순환으로만 이루어진 요소)를 하나의 트리로 묶습니다. (노드 id는 빈 문자열이 아님)
+_ROOT = ""
+
+Positions = Dict[str, List[float]]
+Tree = Dict[str, List]
+
+
+def spanning_tree(
+    node_ids: Sequence[str],
+    edges: Sequence[Tuple[str, str]]
+) -> Tuple[Dict[str, str], Dict[str, List[str]], Dict[str, int]]:
+    """
+    간선 그래프에서 결정적인 신장 트리를 만듭니다. (여러 부모나 순환이 있어도 BFS로 처음 도달한 부모만 사용)
+    반환: parent {노드: 부모 (루트는 _ROOT)}, children {노드: [자식] (_ROOT 포함, 간선 순서)}, depth {노드: 깊이}
+    """
+    known = set(node_ids)
+    out: Dict[str, List[str]] = {node_id: [] for node_id in node_ids}
+    has_parent = set()
+    for source, target in edges:
+        if source in known and target in known and source != target:
+            out[source].append(target)
+            has_parent.add(target)
+
+    parent: Dict[str, str] = {}
+    children: Dict[str, List[str]] = {_ROOT: []}
+    depth: Dict[str, int] = {_ROOT: -1}
+
+    def visit(root: str):
+        parent[root] = _ROOT
+        children[_ROOT].append(root)
+        children[root] = []
+        depth[root] = 0
+        queue = deque([root])
+        while queue:
+            node = queue.popleft()
+            for child in out[node]:
+                if child not in parent:
+                    parent[child] = node
+                    children[node].append(child)
+                    children[child] = []
+                    depth[child] = depth[node] + 1
+                    queue.append(child)
+
+    for node_id in node_ids:
+        if node_id not in has_parent and node_id not in parent:
+            visit(node_id)
+    # 순환으로만 이루어진 요소 (들어오는 간선이 없는 노드가 없음)
+    for node_id in node_ids:
+        if node_id not in parent:
+            visit(node_id)
+    return parent, children, depth
+
+
+def changed_nodes(children: Dict[str, List[str]], previous_tree: Optional[Tree]) -> Set[str]:
+    """이전 배치 대비 새로 생겼거나 자식 목록(순서 포함)이 바뀐 노드 (_ROOT 포함). 이전 배치가 없으면 전체"""
+    if previous_tree is None:
+        return set(children)
+
+    previous_children: Dict[str, List[str]] = {}
+    # 형제 사이의 오프셋은 순서대로 증가하므로 오프셋 순으로 정렬하면 이전 자식 순서가 복원됩니다.
+    for node_id, (parent_id, _, offset) in sorted(previous_tree.items(), key=lambda item: item[1][2]):
+        if parent_id is not None:
+            previous_children.setdefault(parent_id, []).append(node_id)
+
+    return {
+        node_id for node_id, kids in children.items()
+        if node_id not in previous_tree or previous_children.get(node_id, []) != kids
+    }
+
+
+def tree_allocation(
+    parent: Dict[str, str],
+    children: Dict[str, List[str]],
+    depth: Dict[str, int]
+) -> Tree:
+    """
+    노드마다 하위 트리 너비(잎 수)와 부모 안에서의 오프셋을 계산합니다.
+    반환: {노드: [부모, 너비, 오프셋]}
+    """
+    widths: Dict[str, int] = {}
+    offsets: Dict[str, int] = {}
+    # 깊은 노드부터 (자식 너비가 먼저 정해지도록)
+    for node_id in sorted(children, key=lambda node: depth[node], reverse=True):
+        cursor = 0
+        for child in children[node_id]:
+            offsets[child] = cursor
+            cursor += widths[child]
+        widths[node_id] = cursor or 1
+
+    return {
+        node_id: [parent.get(node_id), widths[node_id], offsets.get(node_id, 0)]
+        for node_id in children
+    }
+
+
+def _preorder(children: Dict[str, List[str]]) -> List[str]:
+    order, queue = [], deque(children[_ROOT])
+    while queue:
+        node_id = queue.popleft()
+        order.append(node_id)
+        queue.extend(children[node_id])
+    return order
+
+
+def place(tree: Tree, children: Dict[str, List[str]], depth: Dict[str, int], algorithm: str) -> Positions:
+    """너비/오프셋으로 tree 또는 radial 좌표를 계산합니다. (O(노드 수)의 단순 연산)"""
+    total = tree[_ROOT][1]
+    # 루트가 하나면 중심에, 여럿이면 첫 번째 고리에 놓습니다.
+    ring_offset = 0 if len(children[_ROOT]) == 1 else 1
+    left = {_ROOT: 0}
+    positions: Positions = {}
+    for node_id in _preorder(children):
+        parent_id, width, offset = tree[node_id]
+        left[node_id] = left[parent_id] + offset
+        center = left[node_id] + width / 2
+        if algorithm == LAYOUT_TREE:
+            x, y = (center - total / 2) * SIBLING_GAP, depth[node_id] * LEVEL_GAP
+        else:
+            angle = 2 * math.pi * center / total
+            radius = (depth[node_id] + ring_offset) * RING_GAP
+            x, y = radius * math.cos(angle), radius * math.sin(angle)
+        positions[node_id] = [round(x, 1) + 0.0, round(y, 1) + 0.0] # -0.0 제거
+    return positions
+
+
+def force_layout(
+    node_ids: Sequence[str],
+    edges: Sequence[Tuple[str, str]],
+    initial: Positions,
+    movable: Optional[Set[str]],
+    iterations: int
+) -> Positions:
+    """
+    Fruchterman-Reingold 배치. movable이 주어지면 그 노드만 움직이고 나머지는 고정합니다.
+    반발력은 (움직이는 노드 x 전체 노드) 쌍을 FORCE_CHUNK 행씩 나눠 벡터 연산으로 계산합니다. (반복당 O(k x n))
+    """
+    import numpy as np
+
+    if not node_ids:
+        return {}
+    index = {node_id: i for i, node_id in enumerate(node_ids)}
+    pos = np.array([initial[node_id] for node_id in node_ids], dtype=np.float64)
+    pairs = [(index[source], index[target]) for source, target in edges
+             if source in index and target in index and source != target]
+    src = np.array([source for source, _ in pairs], dtype=np.intp)
+    dst = np.array([target for _, target in pairs], dtype=np.intp)
+
+    moving = np.arange(len(node_ids)) if movable is None else np.array(sorted(index[n] for n in movable if n in index), dtype=np.intp)
+    if len(moving) == 0 or len(node_ids) < 2 or iterations <= 0:
+        return {node_id: list(initial[node_id]) for node_id in node_ids}
+
+    k2 = FORCE_DISTANCE * FORCE_DISTANCE
+    # 시작 온도: 간선 하나 길이만큼. 초기 좌표(radial 또는 이전 버전)의 구조를 크게 흐트러뜨리지 않습니다.
+    temperature = FORCE_DISTANCE
+    cooling = temperature / iterations
+    disp = np.empty((len(moving), 2))
+    for _ in range(iterations):
+        # 반발력: k^2 / d (방향 벡터 delta / d^2 * k^2). x/y를 나눠 2차원 float32 배열로 계산합니다.
+        xs, ys = pos[:, 0].astype(np.float32), pos[:, 1].astype(np.float32)
+        for start in range(0, len(moving), FORCE_CHUNK):
+            rows = moving[start:start + FORCE_CHUNK]
+            dx = xs[rows, None] - xs[None, :]
+            dy = ys[rows, None] - ys[None, :]
+            inv = dx * dx
+            inv += dy * dy
+            np.maximum(inv, 1e-2, out=inv) # 자기 자신은 dx, dy가 0이라 힘도 0
+            np.divide(k2, inv, out=inv)
+            disp[start:start + len(rows), 0] = np.einsum("ij,ij->i", dx, inv)
+            disp[start:start + len(rows), 1] = np.einsum("ij,ij->i", dy, inv)
+
+        # 인력: d^2 / k (간선 방향)
+        if len(pairs):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt(np.einsum("ij,ij->i", delta, delta))[:, None]
+            pull = delta * dist / FORCE_DISTANCE
+            attraction = np.zeros_like(pos)
+            np.add.at(attraction, src, -pull)
+            np.add.at(attraction, dst, pull)
+            disp += attraction[moving]
+        disp -= FORCE_GRAVITY * pos[moving]
+
+        # 온도만큼만 이동
+        length = np.sqrt(np.einsum("ij,ij->i", disp, disp))[:, None]
+        np.maximum(length, 1e-9, out=length)
+        pos[moving] += disp / length * np.minimum(length, temperature)
+        temperature = max(temperature - cooling, 1.0)
+
+    return {node_id: [round(float(x), 1), round(float(y), 1)] for node_id, (x, y) in zip(node_ids, pos)}
+
+
+def _seed_new_nodes(order: List[str], parent: Dict[str, str], base: Positions, fallback: Positions) -> Positions:
+    """이전 좌표가 없는 노드를 부모 근처(골든 앵글로 분산)에 놓습니다. 부모도 새 노드이면 먼저 놓인 부모를 기준으로 합니다."""
+    positions = dict(base)
+    golden = math.pi * (3 - math.sqrt(5))
+    for i, node_id in enumerate(order):
+        if node_id in positions:
+            continue
+        anchor = positions.get(parent[node_id]) if parent[node_id] != _ROOT else None
+        if anchor is None:
+            positions[node_id] = list(fallback[node_id])
+            continue
+        angle = golden * (i + 1)
+        positions[node_id] = [anchor[0] + FORCE_DISTANCE * math.cos(angle), anchor[1] + FORCE_DISTANCE * math.sin(angle)]
+    return positions
+
+
+def compute_layout(
+    algorithm: str,
+    node_ids: Sequence[str],
+    edges: Sequence[Tuple[str, str]],
+    previous_positions: Optional[Positions] = None,
+    previous_tree: Optional[Tree] = None
+) -> Tuple[Positions, Tree, int]:
+    """
+    배치를 계산합니다. force는 이전 버전의 결과(previous_*)가 있으면 바뀐 부분만 다시 움직입니다.
+    반환: (좌표, 신장 트리 정보, 새로 배치한 노드 수 - tree/radial은 이전 버전 대비 좌표가 바뀐 노드 수)
+    """
+    settings = get_settings()
+    parent, children, depth = spanning_tree(node_ids, edges)
+    tree = tree_allocation(parent, children, depth)
+
+    if algorithm != LAYOUT_FORCE:
+        positions = place(tree, children, depth, algorithm)
+        if previous_positions is None:
+            return positions, tree, len(positions)
+        moved = sum(1 for node_id, xy in positions.items() if previous_positions.get(node_id) != xy)
+        return positions, tree, moved
+
+    seed = place(tree, children, depth, LAYOUT_RADIAL)
+    changed = changed_nodes(children, previous_tree)
+    if previous_positions is None:
+        positions = force_layout(node_ids, edges, seed, None, settings.MINDMAP_LAYOUT_FORCE_ITERATIONS)
+        return positions, tree, len(node_ids)
+
+    kept = {node_id: previous_positions[node_id] for node_id in node_ids if node_id in previous_positions}
+    # 움직일 노드: 새 노드, 자식 목록이 바뀐 노드, 그리고 그 이웃 (조상 전체는 움직이지 않음)
+    movable = {node_id for node_id in node_ids if node_id not in kept} | (changed - {_ROOT})
+    neighbors = set()
+    for source, target in edges:
+        if source in movable:
+            neighbors.add(target)
+        if target in movable:
+            neighbors.add(source)
+    movable |= neighbors & set(node_ids)
+
+    initial = _seed_new_nodes(_preorder(children), parent, kept, seed)
+    if not movable:
+        return {node_id: initial[node_id] for node_id in node_ids}, tree, 0
+    # 바뀐 부분이 맵의 절반을 넘으면 전체를 다시 다듬습니다.
+    if len(movable) * 2 > len(node_ids):
+        movable = None
+    positions = force_layout(node_ids, edges, initial, movable, settings.MINDMAP_LAYOUT_FORCE_REFINE_ITERATIONS)
+    return positions, tree, len(node_ids) if movable is None else len(movable)
+
+
+# --- 저장/조회 ---
+def _current_graph(db: Session, project_id: int) -> Tuple[List[str], List[Tuple[str, str]]]:
+    node_ids = [node_id for (node_id,) in db.query(ORMMindMapNode.id).filter(
+        ORMMindMapNode.project_id == project_id
+    ).order_by(ORMMindMapNode.id)]
+    edges = db.query(ORMMindMapEdge.source_id, ORMMindMapEdge.target_id).filter(
+        ORMMindMapEdge.project_id == project_id
+    ).order_by(ORMMindMapEdge.id).all()
+    return node_ids, [(source, target) for source, target in edges]
+
+
+def _find_layout(db: Session, project_id: int, algorithm: str, version: int) -> Optional[ORMMindMapLayout]:
+    return db.query(ORMMindMapLayout).filter(
+        ORMMindMapLayout.project_id == project_id,
+        ORMMindMapLayout.algorithm == algorithm,
+        ORMMindMapLayout.version == version
+    ).first()
+
+
+def _prune_layouts(db: Session, project_id: int, algorithm: str):
+    """알고리즘별로 최근 MINDMAP_LAYOUT_KEEP_VERSIONS개 버전의 배치만 남깁니다."""
+    keep = db.query(ORMMindMapLayout.version).filter(
+        ORMMindMapLayout.project_id == project_id,
+        ORMMindMapLayout.algorithm == algorithm
+    ).order_by(ORMMindMapLayout.version.desc()).offset(get_settings().MINDMAP_LAYOUT_KEEP_VERSIONS - 1).limit(1).scalar()
+    if keep is not None:
+        db.query(ORMMindMapLayout).filter(
+            ORMMindMapLayout.project_id == project_id,
+            ORMMindMapLayout.algorithm == algorithm,
+            ORMMindMapLayout.version < keep
+        ).delete(synchronize_session=False)
+
+
+def get_layout(db: Session, project_id: int, algorithm: str, version: Optional[int] = None) -> Optional[ORMMindMapLayout]:
+    """
+    버전(생략 시 현재 버전)의 배치를 반환합니다. 저장된 배치가 없으면 가장 가까운 이전 버전의 배치를 기준으로
+    바뀐 부분만 계산하여 저장합니다. 프로젝트나 버전이 없으면 None을 반환합니다.
+    """
+    current = db.query(ORMProject.mindmap_version).filter(ORMProject.id == project_id).scalar()
+    if current is None:
+        return None
+    if version is None:
+        version = current
+
+    layout = _find_layout(db, project_id, algorithm, version)
+    if layout is not None:
+        return layout
+
+    if version == current:
+        node_ids, edges = _current_graph(db, project_id)
+    else:
+        data = mindmap_history.load_version(db, project_id, version)
+        if data is None:
+            return None
+        node_ids = sorted(node["id"] for node in data["nodes"])
+        edges = [(link["source"], link["target"]) for link in data["links"]]
+
+    previous = db.query(ORMMindMapLayout).filter(
+        ORMMindMapLayout.project_id == project_id,
+        ORMMindMapLayout.algorithm == algorithm,
+        ORMMindMapLayout.version < version
+    ).order_by(ORMMindMapLayout.version.desc()).first()
+
+    positions, tree, recomputed = compute_layout(
+        algorithm, node_ids, edges,
+        previous.positions if previous else None,
+        previous.tree if previous else None
+    )
+    layout = ORMMindMapLayout(
+        project_id=project_id,
+        version=version,
+        algorithm=algorithm,
+        positions=positions,
+        tree=tree,
+        base_version=previous.version if previous else None,
+        recomputed=recomputed,
+    )
+
+    # 그래프를 읽는 동안 맵이 바뀌었으면 버전과 좌표가 맞지 않을 수 있으므로 저장하지 않습니다.
+    if version == current and db.query(ORMProject.mindmap_version).filter(ORMProject.id == project_id).scalar() != current:
+        return layout
+
+    db.add(layout)
+    try:
+        _prune_layouts(db, project_id, algorithm)
+        db.commit()
+    except IntegrityError:
+        # 다른 요청이 같은 버전의 배치를 먼저 저장함
+        db.rollback()
+        return _find_layout(db, project_id, algorithm, version)
+    print(f"✅ Project {project_id} 배치 계산 ({algorithm}, v{version}): 노드 {len(node_ids)}개 중 {recomputed}개 재배치"
+          f"{f' (기준 v{previous.version})' if previous else ''}")
+    return layout
+
+
+def delete_project_layouts(db: Session, project_id: int):
+    db.query(ORMMindMapLayout).filter(ORMMindMapLayout.project_id == project_id).delete(synchronize_session=False)
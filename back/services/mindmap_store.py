@@ -0,0 +1,261 @@
+# 마인드맵 저장 (diff 기반)
+#
+# 생성 결과로 프로젝트의 노드를 전부 지우고 다시 넣는 대신, 저장된 맵과 비교하여
+# 추가/수정/삭제된 노드와 간선만 한 트랜잭션 안에서 일괄 반영합니다.
+# 노드 ID는 내용/위치에서 파생되므로(ai_analyzer.stable_node_id) 바뀌지 않은 노드는 그대로 남습니다.
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import MindMapEdge as ORMMindMapEdge, MindMapNode as ORMMindMapNode
+from ..schemas import MindMapData, MindMapDiff, MindMapNodeBase, MindMapNodePatch
+from .mindmap_graph import add_project_edges
+from . import search_index
+
+# 노드 비교/저장 대상 필드 (id, project_id 제외)
+NODE_FIELDS = ("node_type", "title", "description", "connections")
+
+# SQLite의 바인드 변수 제한을 넘지 않도록 다중 행 INSERT를 나눕니다.
+UPSERT_BATCH_SIZE = 500
+
+
+def node_row(node: Any) -> Dict[str, Any]:
+    """ORM 노드 또는 MindMapNodeBase를 비교 가능한 dict로 변환합니다."""
+    if isinstance(node, MindMapNodeBase):
+        node = node.model_dump(mode="json")
+    elif not isinstance(node, dict):
+        node = {"id": node.id, **{field: getattr(node, field) for field in NODE_FIELDS}}
+    return {
+        "id": node["id"],
+        "node_type": node.get("node_type"),
+        "title": node.get("title"),
+        "description": node.get("description"),
+        "connections": [
+            {"target_id": conn["target_id"]}
+            for conn in (node.get("connections") or [])
+            if isinstance(conn, dict) and conn.get("target_id")
+        ],
+    }
+
+
+def diff_mindmap(
+    old_nodes: Iterable[Any],
+    old_edges: Iterable[Tuple[str, str]],
+    new_nodes: Iterable[Any],
+    new_edges: Iterable[Tuple[str, str]]
+) -> MindMapDiff:
+    """두 맵(노드 + 간선)을 비교합니다. 노드는 ORM 객체, MindMapNodeBase, dict 모두 받습니다."""
+    old_rows = {row["id"]: row for row in map(node_row, old_nodes)}
+    new_rows = {row["id"]: row for row in map(node_row, new_nodes)}
+
+    added = [row for node_id, row in new_rows.items() if node_id not in old_rows]
+    updated = [
+        row for node_id, row in new_rows.items()
+        if node_id in old_rows and row != old_rows[node_id]
+    ]
+    removed = [node_id for node_id in old_rows if node_id not in new_rows]
+
+    old_edge_set = list(dict.fromkeys(old_edges))
+    new_edge_set = list(dict.fromkeys(new_edges))
+    old_lookup, new_lookup = set(old_edge_set), set(new_edge_set)
+
+    return MindMapDiff(
+        added_nodes=added,
+        updated_nodes=updated,
+        removed_node_ids=removed,
+        added_links=[{"source": s, "target": t} for s, t in new_edge_set if (s, t) not in old_lookup],
+        removed_links=[{"source": s, "target": t} for s, t in old_edge_set if (s, t) not in new_lookup],
+        unchanged_count=len(new_rows) - len(added) - len(updated),
+    )
+
+
+def _upsert_nodes(
+    db: Session,
+    project_id: int,
+    inserted: List[Dict],
+    updated: List[Dict],
+    old_versions: Dict[str, int]
+):
+    """
+    노드를 일괄 upsert합니다. 수정되는 노드는 version이 1 증가합니다.
+    PostgreSQL/SQLite에서는 INSERT ... ON CONFLICT (id) DO UPDATE 한 문장으로 처리하고,
+    그 외 DB에서는 diff 결과대로 bulk insert/update를 실행합니다.
+    """
+    inserted = [{**row, "project_id": project_id, "version": 1} for row in inserted]
+    updated = [{**row, "project_id": project_id} for row in updated]
+    if not inserted and not updated:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        db.bulk_insert_mappings(ORMMindMapNode, inserted)
+        db.bulk_update_mappings(ORMMindMapNode, [
+            {**row, "version": (old_versions.get(row["id"]) or 0) + 1} for row in updated
+        ])
+        return
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table = ORMMindMapNode.__table__
+    rows = inserted + [{**row, "version": 1} for row in updated]
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = insert(table).values(rows[start:start + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={
+                **{field: stmt.excluded[field] for field in NODE_FIELDS},
+                "version": func.coalesce(table.c.version, 0) + 1,
+            }
+        )
+        db.execute(stmt)
+
+
+def save_mindmap(db: Session, project_id: int, map_data: MindMapData) -> MindMapDiff:
+    """
+    저장된 맵과 map_data를 비교하여 변경된 노드/간선만 반영하고 diff를 반환합니다.
+    커밋은 호출 측에서 합니다. (프로젝트 상태 갱신과 같은 트랜잭션)
+    """
+    # 생성 중(LLM 호출 동안) 수정된 내용도 비교하도록 세션에 로드된 객체를 DB 값으로 새로 고칩니다.
+    old_nodes = db.query(ORMMindMapNode).populate_existing().filter(ORMMindMapNode.project_id == project_id).all()
+    old_edge_ids = {
+        (source, target): edge_id
+        for edge_id, source, target in db.query(
+            ORMMindMapEdge.id, ORMMindMapEdge.source_id, ORMMindMapEdge.target_id
+        ).filter(ORMMindMapEdge.project_id == project_id).order_by(ORMMindMapEdge.id)
+    }
+    new_edges = [(link["source"], link["target"]) for link in map_data.links]
+
+    diff = diff_mindmap(old_nodes, old_edge_ids, map_data.nodes, new_edges)
+
+    # 1. 사라진 간선 -> 사라진 노드 순으로 삭제 (간선이 노드를 참조)
+    #    새 간선은 새 맵의 노드만 가리키므로, 삭제되는 노드의 간선은 모두 removed_links에 포함됩니다.
+    removed_edge_ids = [old_edge_ids[(link["source"], link["target"])] for link in diff.removed_links]
+    if removed_edge_ids:
+        db.query(ORMMindMapEdge).filter(ORMMindMapEdge.id.in_(removed_edge_ids)).delete(synchronize_session=False)
+    if diff.removed_node_ids:
+        db.query(ORMMindMapNode).filter(
+            ORMMindMapNode.project_id == project_id,
+            ORMMindMapNode.id.in_(diff.removed_node_ids)
+        ).delete(synchronize_session=False)
+
+    # 2. 추가/수정된 노드 upsert
+    _upsert_nodes(
+        db, project_id,
+        [node.model_dump(mode="json") for node in diff.added_nodes],
+        [node.model_dump(mode="json") for node in diff.updated_nodes],
+        {node.id: node.version for node in old_nodes}
+    )
+
+    # 3. 새 간선 추가
+    add_project_edges(db, project_id, [(link["source"], link["target"]) for link in diff.added_links])
+
+    # 4. 검색 색인 갱신
+    search_index.apply_node_diff(db, project_id, diff)
+
+    print(
+        f"✅ Project {project_id} 마인드맵 저장: +{len(diff.added_nodes)} ~{len(diff.updated_nodes)} "
+        f"-{len(diff.removed_node_ids)} (유지 {diff.unchanged_count}), "
+        f"간선 +{len(diff.added_links)} -{len(diff.removed_links)}"
+    )
+    return diff
+
+
+def patch_nodes(
+    db: Session,
+    project_id: int,
+    patches: List[MindMapNodePatch]
+) -> Tuple[List[str], List[Dict[str, Any]], MindMapDiff]:
+    """
+    여러 노드의 수정 사항을 한 트랜잭션에서 적용합니다. (커밋은 호출 측)
+
+    노드마다 "UPDATE ... SET version = version + 1 WHERE id = :id AND version = :version" 조건부 UPDATE로
+    적용하므로, 요청한 버전(생략 시 방금 읽은 버전)과 현재 버전이 다르면 그 노드만 충돌로 보고하고 나머지는 적용합니다.
+    connections가 주어진 노드는 하위 간선(mindmap_edges)도 함께 교체합니다.
+
+    반환: (수정된 노드 ID 목록, 충돌 목록 [{"id", "reason"}], 적용된 변경 MindMapDiff)
+    """
+    patch_ids = list(dict.fromkeys(patch.id for patch in patches))
+    # 노드 id -> (현재 버전, 현재 내용). 같은 요청에 같은 노드가 여러 번 있으면 앞의 패치를 적용한 상태를 기준으로 합니다.
+    current: Dict[str, Tuple[int, Dict[str, Any]]] = {
+        node.id: (node.version, node_row(node))
+        for node in db.query(ORMMindMapNode).populate_existing().filter(
+            ORMMindMapNode.project_id == project_id,
+            ORMMindMapNode.id.in_(patch_ids)
+        )
+    }
+    original = {node_id: row for node_id, (_, row) in current.items()}
+    project_node_ids = None  # 연결 대상 검증용 (connections 수정이 있을 때만 조회)
+
+    conflicts: List[Dict[str, Any]] = []
+    changed: Dict[str, Dict[str, Any]] = {}
+    connections_changed = set()
+
+    for patch in patches:
+        if patch.id not in current:
+            conflicts.append({"id": patch.id, "reason": "not_found"})
+            continue
+        version, row = current[patch.id]
+        if patch.version is not None and patch.version != version:
+            conflicts.append({"id": patch.id, "reason": "version_mismatch"})
+            continue
+
+        values = {
+            field: getattr(patch, field)
+            for field in ("node_type", "title", "description")
+            if getattr(patch, field) is not None
+        }
+        if patch.connections is not None:
+            if project_node_ids is None:
+                project_node_ids = {
+                    node_id for (node_id,) in db.query(ORMMindMapNode.id).filter(ORMMindMapNode.project_id == project_id)
+                }
+            targets = dict.fromkeys(
+                conn.target_id for conn in patch.connections
+                if conn.target_id in project_node_ids and conn.target_id != patch.id
+            )
+            values["connections"] = [{"target_id": target} for target in targets]
+
+        new_row = {**row, **values}
+        if new_row == row:
+            continue
+
+        updated = db.query(ORMMindMapNode).filter(
+            ORMMindMapNode.project_id == project_id,
+            ORMMindMapNode.id == patch.id,
+            ORMMindMapNode.version == version
+        ).update({**values, "version": ORMMindMapNode.version + 1}, synchronize_session=False)
+        if updated != 1:
+            # 읽은 뒤 다른 요청(또는 생성 작업)이 먼저 수정한 경우
+            conflicts.append({"id": patch.id, "reason": "version_mismatch"})
+            continue
+
+        current[patch.id] = (version + 1, new_row)
+        changed[patch.id] = new_row
+        if "connections" in values:
+            connections_changed.add(patch.id)
+
+    def edges(rows: Dict[str, Dict[str, Any]]):
+        return [
+            (node_id, conn["target_id"])
+            for node_id in connections_changed
+            for conn in rows[node_id]["connections"]
+        ]
+
+    diff = diff_mindmap(
+        [original[node_id] for node_id in changed], edges(original),
+        list(changed.values()), edges(changed)
+    )
+    for link in diff.removed_links:
+        db.query(ORMMindMapEdge).filter(
+            ORMMindMapEdge.project_id == project_id,
+            ORMMindMapEdge.source_id == link["source"],
+            ORMMindMapEdge.target_id == link["target"]
+        ).delete(synchronize_session=False)
+    add_project_edges(db, project_id, [(link["source"], link["target"]) for link in diff.added_links])
+    search_index.apply_node_diff(db, project_id, diff)
+
+    return list(changed), conflicts, diff
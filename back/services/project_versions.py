@@ -0,0 +1,95 @@
+# 프로젝트/리소스별 버전 카운터와 ETag (조건부 GET)
+#
+# 프로젝트 행에 리소스별 버전을 두고, 쓰기마다 같은 트랜잭션에서 1씩 증가시킵니다.
+#   - project: 프로젝트 자체 정보 (제목, 마지막 처리 채팅 id)
+#   - members: 멤버 목록과 멤버의 사용자 정보 (이름, 프로필 사진, 접속 상태)
+#   - chat:    채팅 메시지
+#   - nodes:   마인드맵 (mindmap_version, mindmap_history.record_version에서 증가)
+# GET 응답에 이 버전으로 만든 강한 ETag를 붙이고, If-None-Match가 일치하면
+# 응답 데이터를 조회하지 않고 프로젝트 행 한 번(기본 키) 조회만으로 304를 반환합니다.
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..fast_response import ENCODING_ETAG_SUFFIXES
+from ..models import Project as ORMProject, ProjectMember as ORMProjectMember
+
+RESOURCE_PROJECT = "project"
+RESOURCE_MEMBERS = "members"
+RESOURCE_CHAT = "chat"
+RESOURCE_NODES = "nodes"
+
+_VERSION_COLUMNS = {
+    RESOURCE_PROJECT: ORMProject.version,
+    RESOURCE_MEMBERS: ORMProject.members_version,
+    RESOURCE_CHAT: ORMProject.chat_version,
+    RESOURCE_NODES: ORMProject.mindmap_version,
+}
+
+# 클라이언트가 매번 재검증하도록 합니다. (사용자별 데이터이므로 공유 캐시 금지)
+CACHE_CONTROL = "private, no-cache"
+
+
+def _increments(resources):
+    return {_VERSION_COLUMNS[resource]: func.coalesce(_VERSION_COLUMNS[resource], 0) + 1 for resource in resources}
+
+
+def bump_project_versions(db: Session, project_id: int, *resources: str):
+    """
+    프로젝트의 리소스 버전을 원자적으로 1씩 증가시킵니다. (커밋은 호출 측, 데이터 변경과 같은 트랜잭션)
+    """
+    db.query(ORMProject).filter(ORMProject.id == project_id).update(
+        _increments(resources), synchronize_session=False
+    )
+
+
+def bump_user_projects(db: Session, user_id: int):
+    """사용자 정보(이름, 프로필 사진, 접속 상태)가 바뀌면 그 사용자가 속한 모든 프로젝트의 멤버 버전을 증가시킵니다."""
+    member_projects = db.query(ORMProjectMember.project_id).filter(ORMProjectMember.user_id == user_id)
+    db.query(ORMProject).filter(ORMProject.id.in_(member_projects.scalar_subquery())).update(
+        _increments([RESOURCE_MEMBERS]), synchronize_session=False
+    )
+
+
+def make_etag(project_id: int, resource: str, *parts) -> str:
+    """강한 ETag: "p{project_id}-{resource}-{part}.{part}..." """
+    return '"p{}-{}-{}"'.format(project_id, resource, ".".join(str(part) for part in parts))
+
+
+def _strip_etag(candidate: str) -> str:
+    """W/ 접두사와 압축 인코딩 접미사(fast_response.py)를 제거합니다."""
+    candidate = candidate.strip().removeprefix("W/")
+    for suffix in ENCODING_ETAG_SUFFIXES.values():
+        if candidate.endswith(suffix + '"'):
+            return candidate[:-len(suffix) - 1] + '"'
+    return candidate
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match가 etag와 일치하는지 확인합니다. (목록, *, W/ 접두사, 인코딩 접미사 허용 - RFC 9110 약한 비교)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_strip_etag(candidate) == etag for candidate in header.split(","))
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """일치하면 304 응답을, 아니면 None을 반환합니다."""
+    if etag_matches(request, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=etag_headers(etag)
+        )
+    return None
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def set_etag(response: Response, etag: str):
+    response.headers.update(etag_headers(etag))
@@ -0,0 +1,123 @@
+# 빠른 응답 경로(fast_response.py)용 컬럼 조회
+#
+# ORM 객체 대신 응답에 필요한 컬럼만 조회하여 응답 스키마의 JSON 출력과 같은 모양(필드 이름과 순서)의 dict를 만듭니다.
+# 응답 스키마(schemas.py)를 바꾸면 여기도 함께 바꿔야 합니다.
+#   - mindmap_node_dict  -> schemas.MindMapNode
+#   - chat_message_rows  -> schemas.ChatMessage
+#   - project_rows       -> schemas.Project (members -> ProjectMemberSchema -> User)
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Query, Session
+
+from ..models import (
+    Project as ORMProject,
+    ProjectMember as ORMProjectMember,
+    ChatMessage as ORMChatMessage,
+    MindMapNode as ORMMindMapNode,
+    User as ORMUser,
+)
+
+
+def mindmap_node_dict(
+    node_id: str,
+    node_type: str,
+    title: str,
+    description: Optional[str],
+    connections: Optional[List[Dict[str, Any]]],
+    project_id: int,
+    version: Optional[int]
+) -> Dict[str, Any]:
+    return {
+        "id": node_id,
+        "node_type": node_type,
+        "title": title,
+        "description": description,
+        # 스키마(MindMapNodeConnection)처럼 target_id만 남깁니다.
+        "connections": [{"target_id": conn["target_id"]} for conn in (connections or [])],
+        "project_id": project_id,
+        "version": version,
+    }
+
+
+def mindmap_node_rows(db: Session, project_id: int) -> List[Dict[str, Any]]:
+    """프로젝트의 현재 마인드맵 노드 전체"""
+    rows = db.query(
+        ORMMindMapNode.id,
+        ORMMindMapNode.node_type,
+        ORMMindMapNode.title,
+        ORMMindMapNode.description,
+        ORMMindMapNode.connections,
+        ORMMindMapNode.project_id,
+        ORMMindMapNode.version,
+    ).filter(ORMMindMapNode.project_id == project_id).all()
+    return [mindmap_node_dict(*row) for row in rows]
+
+
+def chat_message_rows(query: Query) -> List[Dict[str, Any]]:
+    """ORMChatMessage 쿼리(필터/정렬/limit 포함)를 응답 컬럼만 조회하도록 바꿔 실행합니다."""
+    return [
+        dict(row._mapping)
+        for row in query.with_entities(
+            ORMChatMessage.content,
+            ORMChatMessage.id,
+            ORMChatMessage.user_id,
+            ORMChatMessage.project_id,
+            ORMChatMessage.timestamp,
+        )
+    ]
+
+
+def project_rows(db: Session, user_id: int) -> List[Dict[str, Any]]:
+    """사용자가 멤버인 프로젝트 목록 (최신순, 멤버와 멤버의 사용자 정보 포함). 프로젝트 1번 + 멤버 1번 조회"""
+    projects = db.query(
+        ORMProject.id,
+        ORMProject.title,
+        ORMProject.created_at,
+        ORMProject.generation_lease_owner,
+        ORMProject.generation_lease_expires_at,
+        ORMProject.last_chat_id_processed,
+    ).join(ORMProjectMember).filter(
+        ORMProjectMember.user_id == user_id
+    ).order_by(desc(ORMProject.created_at)).all()
+    if not projects:
+        return []
+
+    members: Dict[int, List[Dict[str, Any]]] = {project.id: [] for project in projects}
+    member_rows = db.query(
+        ORMProjectMember.project_id,
+        ORMProjectMember.user_id,
+        ORMProjectMember.is_admin,
+        ORMUser.email,
+        ORMUser.name,
+        ORMUser.friend_code,
+        ORMUser.is_online,
+        ORMUser.profile_image_url,
+    ).join(ORMUser, ORMUser.id == ORMProjectMember.user_id).filter(
+        ORMProjectMember.project_id.in_(members.keys())
+    ).order_by(ORMProjectMember.id)
+    for row in member_rows:
+        members[row.project_id].append({
+            "user_id": row.user_id,
+            "is_admin": bool(row.is_admin),
+            "user": {
+                "id": row.user_id,
+                "email": row.email,
+                "name": row.name,
+                "friend_code": row.friend_code,
+                "is_online": row.is_online,
+                "profile_image_url": row.profile_image_url,
+            },
+        })
+
+    return [
+        {
+            "title": project.title,
+            "id": project.id,
+            "created_at": project.created_at,
+            "is_generating": ORMProject.lease_active(project.generation_lease_owner, project.generation_lease_expires_at),
+            "last_chat_id_processed": project.last_chat_id_processed,
+            "members": members[project.id],
+        }
+        for project in projects
+    ]
@@ -0,0 +1,412 @@
+# 통합 검색 색인 (채팅 메시지, 메모, 마인드맵 노드, 프로젝트 제목)
+#
+# 검색 대상마다 search_documents 행 하나를 두고, 원본을 쓰는 곳에서 같은 트랜잭션으로 갱신합니다.
+#   - 채팅: routers/project.py post_chat_message
+#   - 메모: routers/memo.py
+#   - 노드: mindmap_store.save_mindmap / patch_nodes (생성 작업, 일괄 수정, 공동 편집 모두 이 두 함수를 거칩니다)
+#   - 프로젝트: 생성/제목 수정/삭제
+#
+# 한국어는 띄어쓰기 단위가 검색어와 잘 맞지 않으므로(예: "회의록을" / "회의록") 한글/한자/가나 연속 구간을
+# 2-gram으로 나눈 토큰 텍스트(*_tokens)를 색인합니다. 검색어도 같은 방식으로 나누어 인접한 2-gram 구(phrase)로 찾습니다.
+#   - SQLite(개발):     FTS5 외부 콘텐츠 테이블 search_fts + 트리거로 search_documents와 동기화, bm25 순위
+#   - PostgreSQL(운영): tsvector 식 GIN 인덱스('simple' 설정, 제목 가중치 A), pg_trgm 제목 인덱스로 오타/부분 일치 보완
+#   - 그 외:            토큰 텍스트 LIKE 검색 (순위 없음, 최신순)
+# 인덱스/트리거는 python -m back.migrate에서 생성하며, 기존 데이터는 처음 한 번 색인합니다.
+#   python -m back.services.search_index   # 전체 재색인
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, column, desc, func, literal_column, or_, table
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import (
+    SearchDocument as ORMSearchDocument,
+    ProjectMember as ORMProjectMember,
+    Project as ORMProject,
+    ChatMessage as ORMChatMessage,
+    Memo as ORMMemo,
+    MindMapNode as ORMMindMapNode,
+)
+
+KIND_CHAT = "chat"
+KIND_MEMO = "memo"
+KIND_NODE = "node"
+KIND_PROJECT = "project"
+KINDS = (KIND_CHAT, KIND_MEMO, KIND_NODE, KIND_PROJECT)
+
+BACKEND_FTS5 = "fts5"
+BACKEND_POSTGRES = "postgres"
+BACKEND_LIKE = "like"
+
+TITLE_WEIGHT = 4.0       # FTS5 bm25 제목 컬럼 가중치 (본문 1.0)
+MAX_QUERY_TERMS = 8      # 검색어에서 사용하는 최대 단어 수
+UPSERT_BATCH_SIZE = 500  # SQLite 바인드 변수 제한을 넘지 않도록 다중 행 INSERT를 나눕니다.
+REINDEX_BATCH_SIZE = 1000
+
+# 한글(자모/호환 자모/음절), 가나, 한자
+_CJK = "\u1100-\u11ff\u3130-\u318f\uac00-\ud7a3\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff"
+_TERM = re.compile(rf"[{_CJK}]+|[^\W_{_CJK}]+")
+_CJK_RUN = re.compile(rf"[{_CJK}]+")
+
+_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5("
+    "title_tokens, body_tokens, content='search_documents', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+    "INSERT INTO search_fts(rowid, title_tokens, body_tokens) VALUES (new.id, new.title_tokens, new.body_tokens); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title_tokens, body_tokens) VALUES ('delete', old.id, old.title_tokens, old.body_tokens); END",
+    "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+    "INSERT INTO search_fts(search_fts, rowid, title_tokens, body_tokens) VALUES ('delete', old.id, old.title_tokens, old.body_tokens); "
+    "INSERT INTO search_fts(rowid, title_tokens, body_tokens) VALUES (new.id, new.title_tokens, new.body_tokens); END",
+)
+
+# 검색 쿼리의 식과 같아야 인덱스를 사용합니다. (_pg_vector)
+_PG_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_tsv ON search_documents USING GIN ("
+    "(setweight(to_tsvector('simple'::regconfig, title_tokens), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, body_tokens), 'B')))",
+)
+_PG_TRGM_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_search_documents_title_trgm ON search_documents USING GIN (lower(title) gin_trgm_ops)",
+)
+
+
+# === 토큰화 ===
+def _terms(text: Optional[str]) -> List[str]:
+    """NFKC 정규화 + 소문자화 후 단어로 나눕니다. 한글/한자/가나 연속 구간은 다른 문자와 분리됩니다. (예: "API설계" -> api, 설계)"""
+    return _TERM.findall(unicodedata.normalize("NFKC", text or "").casefold())
+
+
+def _bigrams(term: str) -> List[str]:
+    return [term[i:i + 2] for i in range(len(term) - 1)]
+
+
+def tokenize(text: Optional[str]) -> str:
+    """색인용 토큰 텍스트. 한글 등은 2-gram (회의록 -> 회의 의록), 그 외 단어는 그대로 공백으로 잇습니다."""
+    tokens: List[str] = []
+    for term in _terms(text):
+        if len(term) > 1 and _CJK_RUN.fullmatch(term):
+            tokens.extend(_bigrams(term))
+        else:
+            tokens.append(term)
+    return " ".join(tokens)
+
+
+def parse_query(query: str) -> List[Tuple[str, List[str]]]:
+    """
+    검색어를 (종류, 토큰) 목록으로 바꿉니다. 모든 항목이 일치해야 합니다. (AND)
+      - ("phrase", [2-gram...]): 두 글자 이상의 한글 등 -> 인접한 2-gram 구
+      - ("prefix", [단어]):      그 외 단어와 한 글자 한글 -> 접두어 일치 (입력 중 검색)
+    """
+    parsed = []
+    for term in list(dict.fromkeys(_terms(query)))[:MAX_QUERY_TERMS]:
+        if len(term) > 1 and _CJK_RUN.fullmatch(term):
+            parsed.append(("phrase", _bigrams(term)))
+        else:
+            parsed.append(("prefix", [term]))
+    return parsed
+
+
+def _fts5_match(parsed) -> str:
+    # 토큰은 문자/숫자로만 이루어져 있으므로 큰따옴표로 감싸도 안전합니다.
+    return " AND ".join(
+        f'"{" ".join(tokens)}"' + ("*" if kind == "prefix" else "") for kind, tokens in parsed
+    )
+
+
+def _pg_tsquery(parsed) -> str:
+    return " & ".join(
+        f"'{tokens[0]}':*" if kind == "prefix" else "(" + " <-> ".join(f"'{token}'" for token in tokens) + ")"
+        for kind, tokens in parsed
+    )
+
+
+# === 색인 갱신 ===
+def chat_document(message: Any) -> Dict[str, Any]:
+    return {"kind": KIND_CHAT, "ref_id": str(message.id), "project_id": message.project_id,
+            "owner_id": None, "title": None, "body": message.content}
+
+
+def memo_document(memo: Any) -> Dict[str, Any]:
+    return {"kind": KIND_MEMO, "ref_id": str(memo.id), "project_id": None,
+            "owner_id": memo.owner_id, "title": memo.title, "body": memo.content}
+
+
+def project_document(project: Any) -> Dict[str, Any]:
+    return {"kind": KIND_PROJECT, "ref_id": str(project.id), "project_id": project.id,
+            "owner_id": None, "title": project.title, "body": None}
+
+
+def node_document(project_id: int, node: Dict[str, Any]) -> Dict[str, Any]:
+    return {"kind": KIND_NODE, "ref_id": node["id"], "project_id": project_id,
+            "owner_id": None, "title": node.get("title"), "body": node.get("description")}
+
+
+def upsert_documents(db: Session, documents: Iterable[Dict[str, Any]]):
+    """
+    문서를 (kind, ref_id) 기준으로 일괄 upsert합니다. 커밋은 호출 측(원본 쓰기와 같은 트랜잭션)에서 합니다.
+    PostgreSQL/SQLite에서는 INSERT ... ON CONFLICT DO UPDATE, 그 외 DB에서는 삭제 후 다시 넣습니다.
+    """
+    # 같은 문서가 여러 번 있으면 마지막 것만 (ON CONFLICT는 한 문장에서 같은 행을 두 번 갱신할 수 없음)
+    rows = list({
+        (doc["kind"], doc["ref_id"]): {
+            **doc,
+            "title_tokens": tokenize(doc.get("title")),
+            "body_tokens": tokenize(doc.get("body")),
+        }
+        for doc in documents
+    }.values())
+    if not rows:
+        return
+
+    dialect = db.get_bind().dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        for kind in {row["kind"] for row in rows}:
+            delete_documents(db, kind, [row["ref_id"] for row in rows if row["kind"] == kind])
+        db.bulk_insert_mappings(ORMSearchDocument, rows)
+        return
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    table_ = ORMSearchDocument.__table__
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = insert(table_).values(rows[start:start + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table_.c.kind, table_.c.ref_id],
+            set_={
+                **{field: stmt.excluded[field] for field in
+                   ("project_id", "owner_id", "title", "body", "title_tokens", "body_tokens")},
+                "updated_at": func.now(),
+            }
+        )
+        db.execute(stmt)
+
+
+def delete_documents(db: Session, kind: str, ref_ids: Iterable[Any]):
+    ref_ids = [str(ref_id) for ref_id in ref_ids]
+    for start in range(0, len(ref_ids), UPSERT_BATCH_SIZE):
+        db.query(ORMSearchDocument).filter(
+            ORMSearchDocument.kind == kind,
+            ORMSearchDocument.ref_id.in_(ref_ids[start:start + UPSERT_BATCH_SIZE])
+        ).delete(synchronize_session=False)
+
+
+def delete_project_documents(db: Session, project_id: int):
+    """프로젝트의 문서(프로젝트 자체, 채팅, 노드)를 모두 삭제합니다. (프로젝트를 삭제하기 전에 호출)"""
+    db.query(ORMSearchDocument).filter(ORMSearchDocument.project_id == project_id).delete(synchronize_session=False)
+
+
+def index_chat(db: Session, message: Any):
+    """새 채팅 메시지를 색인합니다. (message.id가 필요하므로 flush 후 호출)"""
+    upsert_documents(db, [chat_document(message)])
+
+
+def index_memo(db: Session, memo: Any):
+    upsert_documents(db, [memo_document(memo)])
+
+
+def index_project(db: Session, project: Any):
+    upsert_documents(db, [project_document(project)])
+
+
+def apply_node_diff(db: Session, project_id: int, diff: Any):
+    """마인드맵 저장/수정 결과(MindMapDiff)의 추가/수정 노드를 색인하고 삭제된 노드를 색인에서 뺍니다."""
+    upsert_documents(db, [
+        node_document(project_id, node.model_dump(mode="json"))
+        for node in list(diff.added_nodes) + list(diff.updated_nodes)
+    ])
+    if diff.removed_node_ids:
+        delete_documents(db, KIND_NODE, diff.removed_node_ids)
+
+
+def reindex_all(db: Session) -> int:
+    """모든 원본에서 색인을 다시 만듭니다. (커밋 포함) 색인한 문서 수를 반환합니다."""
+    db.query(ORMSearchDocument).delete(synchronize_session=False)
+    sources = (
+        (db.query(ORMProject.id, ORMProject.title), project_document),
+        (db.query(ORMChatMessage.id, ORMChatMessage.project_id, ORMChatMessage.content), chat_document),
+        (db.query(ORMMemo.id, ORMMemo.owner_id, ORMMemo.title, ORMMemo.content), memo_document),
+        (db.query(ORMMindMapNode.id, ORMMindMapNode.project_id, ORMMindMapNode.title, ORMMindMapNode.description),
+         lambda row: node_document(row.project_id, {"id": row.id, "title": row.title, "description": row.description})),
+    )
+    count = 0
+    for query, to_document in sources:
+        batch = []
+        for row in query.yield_per(REINDEX_BATCH_SIZE):
+            batch.append(to_document(row))
+            if len(batch) >= REINDEX_BATCH_SIZE:
+                upsert_documents(db, batch)
+                count += len(batch)
+                batch = []
+        upsert_documents(db, batch)
+        count += len(batch)
+    db.commit()
+    print(f"✅ 검색 색인 재구성: 문서 {count}개")
+    return count
+
+
+# === 인덱스 생성 (python -m back.migrate) ===
+def create_search_indexes(engine):
+    """DB 종류에 맞는 전문 검색 인덱스를 만듭니다. 이미 있으면 건너뜁니다."""
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        try:
+            with engine.begin() as conn:
+                existed = conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = 'search_fts'").first()
+                for statement in _SQLITE_DDL:
+                    conn.exec_driver_sql(statement)
+                if not existed:
+                    # 테이블보다 먼저 있던 문서를 FTS 색인에 채웁니다.
+                    conn.exec_driver_sql("INSERT INTO search_fts(search_fts) VALUES ('rebuild')")
+        except OperationalError as e:
+            print(f"⚠️ SQLite FTS5를 사용할 수 없어 LIKE 검색을 사용합니다: {e}")
+    elif dialect == "postgresql":
+        with engine.begin() as conn:
+            for statement in _PG_DDL:
+                conn.exec_driver_sql(statement)
+        if get_settings().SEARCH_PG_TRIGRAM:
+            try:
+                with engine.begin() as conn:
+                    for statement in _PG_TRGM_DDL:
+                        conn.exec_driver_sql(statement)
+            except (OperationalError, ProgrammingError) as e:
+                print(f"⚠️ pg_trgm 인덱스를 만들 수 없어 제목 유사도 검색을 사용하지 않습니다: {e}")
+    _backend_cache.clear()
+
+
+def backfill_if_empty(db: Session):
+    """색인이 비어 있고 원본 데이터가 있으면 전체를 색인합니다. (검색 기능 도입 전 데이터)"""
+    if db.query(ORMSearchDocument.id).first() is not None:
+        return
+    if any(db.query(model.id).first() is not None for model in (ORMProject, ORMMemo)):
+        reindex_all(db)
+
+
+# === 검색 ===
+_backend_cache: Dict[str, Tuple[str, bool]] = {}
+
+
+def _backend(db: Session) -> Tuple[str, bool]:
+    """(백엔드, pg_trgm 사용 여부). 엔진마다 처음 한 번 확인합니다."""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _backend_cache:
+        dialect = bind.dialect.name
+        if dialect == "sqlite":
+            has_fts = db.execute(
+                table("sqlite_master", column("name")).select().where(column("name") == "search_fts")
+            ).first() is not None
+            _backend_cache[key] = (BACKEND_FTS5 if has_fts else BACKEND_LIKE, False)
+        elif dialect == "postgresql":
+            has_trgm = get_settings().SEARCH_PG_TRIGRAM and db.execute(
+                table("pg_extension", column("extname")).select().where(column("extname") == "pg_trgm")
+            ).first() is not None
+            _backend_cache[key] = (BACKEND_POSTGRES, bool(has_trgm))
+        else:
+            _backend_cache[key] = (BACKEND_LIKE, False)
+    return _backend_cache[key]
+
+
+def _pg_vector():
+    simple = literal_column("'simple'::regconfig")
+    return func.setweight(func.to_tsvector(simple, ORMSearchDocument.title_tokens), literal_column("'A'")).op("||")(
+        func.setweight(func.to_tsvector(simple, ORMSearchDocument.body_tokens), literal_column("'B'"))
+    )
+
+
+def _scope(db: Session, user_id: int, project_id: Optional[int]):
+    """사용자가 멤버인 프로젝트의 문서 + 사용자의 메모 (project_id가 주어지면 그 프로젝트만)"""
+    if project_id is not None:
+        return ORMSearchDocument.project_id == project_id
+    member_projects = db.query(ORMProjectMember.project_id).filter(ORMProjectMember.user_id == user_id)
+    return or_(
+        ORMSearchDocument.project_id.in_(member_projects.scalar_subquery()),
+        and_(ORMSearchDocument.kind == KIND_MEMO, ORMSearchDocument.owner_id == user_id),
+    )
+
+
+def search(
+    db: Session,
+    user_id: int,
+    query: str,
+    kinds: Optional[List[str]] = None,
+    project_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0
+) -> Tuple[List[Tuple[ORMSearchDocument, float]], bool]:
+    """
+    사용자가 볼 수 있는 문서에서 검색합니다. (프로젝트 멤버십 확인은 호출 측)
+    반환: ([(문서, 점수)], 다음 페이지 존재 여부). 점수는 클수록 관련도가 높습니다. (백엔드마다 척도가 다름)
+    """
+    parsed = parse_query(query)
+    if not parsed:
+        return [], False
+
+    backend, use_trigram = _backend(db)
+    filters = [_scope(db, user_id, project_id)]
+    if kinds:
+        filters.append(ORMSearchDocument.kind.in_(kinds))
+
+    if backend == BACKEND_FTS5:
+        fts = table("search_fts", column("rowid"))
+        rank = func.bm25(literal_column("search_fts"), TITLE_WEIGHT, 1.0)
+        rows = db.query(ORMSearchDocument, (-rank).label("score")).join(
+            fts, fts.c.rowid == ORMSearchDocument.id
+        ).filter(literal_column("search_fts").op("MATCH")(_fts5_match(parsed)), *filters).order_by(
+            rank, desc(ORMSearchDocument.updated_at), desc(ORMSearchDocument.id)
+        )
+    elif backend == BACKEND_POSTGRES:
+        vector = _pg_vector()
+        tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), _pg_tsquery(parsed))
+        score = func.ts_rank_cd(vector, tsquery)
+        match = vector.op("@@")(tsquery)
+        if use_trigram:
+            # 제목 trigram 유사도로 오타/띄어쓰기가 다른 제목도 찾고 순위를 보정합니다.
+            normalized = unicodedata.normalize("NFKC", query).casefold().strip()
+            title = func.lower(ORMSearchDocument.title)
+            score = score + func.coalesce(func.similarity(title, normalized), 0.0)
+            match = or_(match, title.op("%")(normalized))
+        rows = db.query(ORMSearchDocument, score.label("score")).filter(match, *filters).order_by(
+            desc(score), desc(ORMSearchDocument.updated_at), desc(ORMSearchDocument.id)
+        )
+    else:
+        tokens = ORMSearchDocument.title_tokens + " " + ORMSearchDocument.body_tokens
+        for _, parts in parsed:
+            filters.append(tokens.like(f"%{' '.join(parts)}%"))
+        rows = db.query(ORMSearchDocument, literal_column("0.0").label("score")).filter(*filters).order_by(
+            desc(ORMSearchDocument.updated_at), desc(ORMSearchDocument.id)
+        )
+
+    results = [(document, float(score or 0.0)) for document, score in rows.offset(offset).limit(limit + 1)]
+    return results[:limit], len(results) > limit
+
+
+def make_snippet(document: ORMSearchDocument, query: str) -> Optional[str]:
+    """본문(없으면 제목)에서 검색어가 처음 나오는 부분 주변을 SEARCH_SNIPPET_CHARS 길이로 잘라 반환합니다."""
+    text = document.body or document.title
+    if not text:
+        return None
+    length = get_settings().SEARCH_SNIPPET_CHARS
+    lowered = text.casefold()
+    positions = [position for position in (lowered.find(term) for term in _terms(query)) if position >= 0]
+    start = max(0, min(positions) - length // 3) if positions else 0
+    snippet = text[start:start + length]
+    return ("…" if start > 0 else "") + snippet + ("…" if start + length < len(text) else "")
+
+
+if __name__ == "__main__":
+    from ..database import SessionLocal, engine
+
+    create_search_indexes(engine)
+    session = SessionLocal()
+    try:
+        reindex_all(session)
+    finally:
+        session.close()
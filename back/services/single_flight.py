@@ -0,0 +1,55 @@
+# 비동기 single-flight: 같은 키로 동시에 들어온 요청들이 하나의 진행 중인 계산을 기다리고 결과를 공유합니다.
+#
+# 이벤트 루프(프로세스) 단위로 동작합니다. 여러 워커/인스턴스 간 공유가 필요한 작업은
+# 마인드맵 생성처럼 DB lease를 사용하세요. (services/generation_lock.py)
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    flights = AsyncSingleFlight()
+    result = await flights.do(("recommend", project_id), lambda: compute(project_id))
+
+    - 계산 중 같은 키로 호출하면 새로 계산하지 않고 진행 중인 결과(또는 예외)를 함께 받습니다.
+    - 기다리던 호출 하나가 취소되어도 다른 호출이 남아 있으면 계산은 계속됩니다.
+    - 마지막으로 기다리던 호출까지 취소되면 계산도 취소합니다.
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.started = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task, key=key, call=call: self._forget(key, call))
+            self.started += 1
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            # shield: 이 호출이 취소되어도 공유 계산 자체는 취소되지 않도록 합니다.
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._calls), "started": self.started, "shared": self.shared}
@@ -0,0 +1,126 @@
+# 테스트 공통 설정: 임시 SQLite DB, 결정적 LLM(fake), 짧은 presence tick으로 앱을 띄웁니다.
+#
+# 💡 back 모듈은 import 시점에 설정/엔진을 만들므로, 환경 변수는 어떤 back 모듈보다 먼저 설정해야 합니다.
+import itertools
+import os
+import tempfile
+from types import SimpleNamespace
+
+import anyio
+import pytest
+
+_DB_DIR = tempfile.mkdtemp(prefix="mindmap-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["REALTIME_BROKER"] = "memory"
+os.environ["PRESENCE_TICK_SECONDS"] = "0.05"
+os.environ["COLLAB_FLUSH_SECONDS"] = "0.05"
+
+_ids = itertools.count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """시작/종료 이벤트까지 실행되는 TestClient. 모든 요청과 웹소켓이 하나의 이벤트 루프를 공유합니다."""
+    from fastapi.testclient import TestClient
+
+    from back.main import app
+    from back.migrate import run_migrations
+
+    run_migrations()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db(client):
+    from back.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """테스트마다 겹치지 않는 사용자를 만듭니다. (headers: Bearer 토큰, token: 웹소켓 쿼리용)"""
+    from back import models
+    from back.security import create_access_token
+
+    def _make_user(name: str = "user"):
+        number = next(_ids)
+        user = models.User(
+            name=f"{name}{number}",
+            email=f"{name}{number}@example.com",
+            hashed_password="x",
+            friend_code=f"T{number:06d}",
+        )
+        db.add(user)
+        db.commit()
+        token = create_access_token({"sub": user.email})
+        return SimpleNamespace(
+            id=user.id,
+            email=user.email,
+            friend_code=user.friend_code,
+            token=token,
+            headers={"Authorization": f"Bearer {token}"},
+        )
+
+    return _make_user
+
+
+@pytest.fixture
+def make_project(client, db):
+    """owner가 만든 프로젝트에 members를 추가하고 프로젝트 id를 반환합니다."""
+    from back import models
+
+    def _make_project(owner, *members, title: str = "테스트 프로젝트"):
+        response = client.post("/api/v1/projects/", json={"title": title}, headers=owner.headers)
+        assert response.status_code == 201, response.text
+        project_id = response.json()["id"]
+        for member in members:
+            db.add(models.ProjectMember(project_id=project_id, user_id=member.id))
+        db.commit()
+        return project_id
+
+    return _make_project
+
+
+@pytest.fixture
+def befriend(db):
+    from back import models
+
+    def _befriend(user, friend):
+        db.add(models.Friendship(user_id=user.id, friend_id=friend.id, status="accepted"))
+        db.commit()
+
+    return _befriend
+
+
+def _receive_event(ws, event_type: str, timeout: float = 2.0):
+    """
+    웹소켓에서 event_type 메시지가 올 때까지 다른 메시지는 건너뛰며 기다립니다.
+    시간 안에 오지 않으면 None을 반환합니다.
+    """
+    import json
+
+    async def receive():
+        with anyio.move_on_after(timeout):
+            while True:
+                message = await ws._send_rx.receive()
+                if message["type"] != "websocket.send":
+                    return None
+                data = json.loads(message["text"])
+                if data.get("type") == event_type:
+                    return data
+        return None
+
+    return ws.portal.call(receive)
+
+
+@pytest.fixture
+def receive_event():
+    return _receive_event
@@ -0,0 +1,24 @@
+# 채팅 기록 페이지네이션 테스트: id 커서(before_id/after_id)로 페이지를 나누고, 커서가 없으면 전체 기록을 반환합니다.
+
+
+def test_chat_history_keyset_pages_and_incremental_polling(client, make_user, make_project):
+    owner = make_user("owner")
+    project_id = make_project(owner)
+    url = f"/api/v1/projects/{project_id}/chat"
+    ids = [
+        client.post(url, json={"content": f"메시지 {n}"}, headers=owner.headers).json()["id"]
+        for n in range(5)
+    ]
+
+    def page(**params):
+        response = client.get(url, params=params, headers=owner.headers)
+        assert response.status_code == 200, response.text
+        return [message["id"] for message in response.json()]
+
+    assert page() == ids
+    assert page(limit=2) == ids[3:]
+    assert page(before_id=ids[3], limit=2) == ids[1:3]
+    assert page(before_id=ids[1], limit=2) == ids[:1]
+    assert page(after_id=ids[2]) == ids[3:]
+    assert page(after_id=ids[-1]) == []
+    assert client.get(url, params={"before_id": ids[3], "after_id": ids[1]}, headers=owner.headers).status_code == 400
@@ -0,0 +1,37 @@
+# 공동 편집 테스트: op는 스트림별 seq로 브로드캐스트되고, sync_request로 놓친 이벤트를 재전송받습니다.
+from back import models
+from back.schemas import MindMapData
+from back.services.ai_analyzer import stable_node_id
+from back.services.mindmap_store import save_mindmap
+
+
+def test_node_ops_are_sequenced_replayed_and_saved(client, db, make_user, make_project, receive_event):
+    owner = make_user("owner")
+    project_id = make_project(owner)
+    node_id = stable_node_id(project_id, "core", "출시 계획")
+    save_mindmap(db, project_id, MindMapData(nodes=[{"id": node_id, "node_type": "core", "title": "출시 계획"}]))
+    db.commit()
+
+    with client.websocket_connect(f"/api/v1/ws/projects/{project_id}?token={owner.token}") as ws:
+        hello = receive_event(ws, "collab_hello")
+        stream, seq = hello["stream"], hello["seq"]
+
+        ws.send_json({"type": "node_op", "op_id": "op-1", "node_id": node_id, "op": "set_title", "value": "출시 일정"})
+        event = receive_event(ws, "node_op")
+        assert (event["op_id"], event["stream"], event["seq"]) == ("op-1", stream, seq + 1)
+
+        # 같은 스트림: 놓친 이벤트를 그대로 재전송
+        ws.send_json({"type": "sync_request", "stream": stream, "since_seq": seq})
+        replayed = receive_event(ws, "node_op")
+        assert (replayed["op_id"], replayed["seq"]) == ("op-1", seq + 1)
+
+        # 다른 스트림의 seq는 재전송할 수 없으므로 전체 재조회를 요청합니다.
+        ws.send_json({"type": "sync_request", "stream": "another-stream", "since_seq": seq})
+        resync = receive_event(ws, "collab_resync_required")
+        assert (resync["stream"], resync["seq"]) == (stream, seq + 1)
+
+        ws.send_json({"type": "sync_request", "stream": stream, "since_seq": -1})
+        assert receive_event(ws, "collab_error")["reason"] == "invalid_sync_request"
+
+    db.expire_all()
+    assert db.get(models.MindMapNode, node_id).title == "출시 일정"
@@ -0,0 +1,24 @@
+# 조건부 GET 테스트: 리소스 버전 ETag가 같으면 304, 쓰기로 버전이 오르면 새 ETag와 함께 200을 반환합니다.
+
+
+def test_conditional_get_returns_304_until_the_resource_changes(client, make_user, make_project):
+    owner = make_user("owner")
+    project_id = make_project(owner, title="ETag 프로젝트")
+
+    for url, change in (
+        (f"/api/v1/projects/{project_id}", lambda: client.put(
+            f"/api/v1/projects/{project_id}", json={"title": "바뀐 제목"}, headers=owner.headers)),
+        (f"/api/v1/projects/{project_id}/chat", lambda: client.post(
+            f"/api/v1/projects/{project_id}/chat", json={"content": "새 메시지"}, headers=owner.headers)),
+    ):
+        first = client.get(url, headers=owner.headers)
+        assert first.status_code == 200, first.text
+        etag = first.headers["etag"]
+
+        cached = client.get(url, headers={**owner.headers, "If-None-Match": etag})
+        assert cached.status_code == 304 and cached.content == b""
+
+        assert change().status_code in (200, 201)
+        fresh = client.get(url, headers={**owner.headers, "If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.headers["etag"] != etag
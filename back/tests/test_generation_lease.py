@@ -0,0 +1,118 @@
+# 생성 lease 동시성 테스트: 동시 요청 중 하나만 lease/작업을 만들고, 작업이 끝나면 lease가 해제됩니다.
+# (큰 스레드 수나 PostgreSQL에서의 반복 체크는 benchmarks/generation_lease_stress.py)
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from back import models
+from back.database import SessionLocal
+from back.services.llm_provider import get_llm_provider
+from back.services.generation_lock import (
+    QueuedLeaseKeeper,
+    acquire_generation_lease,
+    release_generation_lease,
+    renew_generation_lease,
+)
+
+CONCURRENT_REQUESTS = 8
+
+
+def _race(project_id: int, threads: int) -> list:
+    """threads개의 스레드가 동시에 lease 획득을 시도하고, 획득한 토큰 목록을 반환합니다."""
+    barrier = threading.Barrier(threads)
+
+    def attempt(_):
+        db = SessionLocal()
+        try:
+            barrier.wait()
+            return acquire_generation_lease(db, project_id)
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return [token for token in pool.map(attempt, range(threads)) if token is not None]
+
+
+def _lease_owner(project_id: int):
+    db = SessionLocal()
+    try:
+        return db.query(models.Project.generation_lease_owner).filter(models.Project.id == project_id).scalar()
+    finally:
+        db.close()
+
+
+def test_one_lease_holder_and_expired_lease_is_reclaimed(client, db, make_user, make_project):
+    project_id = make_project(make_user("owner"))
+
+    winners = _race(project_id, CONCURRENT_REQUESTS)
+    assert len(winners) == 1
+
+    # 워커 crash 시뮬레이션: 해제 없이 lease 만료
+    db.query(models.Project).filter(models.Project.id == project_id).update(
+        {models.Project.generation_lease_expires_at: datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False
+    )
+    db.commit()
+
+    reclaimed = _race(project_id, CONCURRENT_REQUESTS)
+    assert len(reclaimed) == 1
+    # 이전 소유자는 더 이상 연장/해제할 수 없습니다.
+    assert not renew_generation_lease(db, project_id, winners[0])
+    assert not release_generation_lease(db, project_id, winners[0])
+    assert release_generation_lease(db, project_id, reclaimed[0])
+
+
+def test_concurrent_generate_requests_share_one_job_and_release_the_lease(client, db, make_user, make_project, monkeypatch):
+    # 모든 요청이 작업 진행 중에 도착하도록 모델 응답을 늦춥니다. (바로 끝나면 다음 요청이 새 lease를 정상적으로 획득)
+    monkeypatch.setattr(get_llm_provider().inner, "latency_seconds", 1.0)
+    owner = make_user("owner")
+    project_id = make_project(owner)
+    db.add_all([models.ChatMessage(project_id=project_id, user_id=owner.id, content=f"일정과 담당자 논의 {n}") for n in range(3)])
+    db.commit()
+
+    barrier = threading.Barrier(CONCURRENT_REQUESTS)
+
+    def request(_):
+        barrier.wait()
+        return client.post(f"/api/v1/projects/{project_id}/generate", headers=owner.headers)
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_REQUESTS) as pool:
+        responses = list(pool.map(request, range(CONCURRENT_REQUESTS)))
+
+    # 하나가 작업을 만들고, 나머지는 같은 작업을 공유(202)하거나 충돌(409)로 응답합니다.
+    assert {response.status_code for response in responses} <= {202, 409}
+    job_ids = {response.json()["id"] for response in responses if response.status_code == 202}
+    assert len(job_ids) == 1
+    assert db.query(models.GenerationJob).filter(models.GenerationJob.project_id == project_id).count() == 1
+
+    job_id = job_ids.pop()
+    deadline = time.monotonic() + 30
+    job = client.get(f"/api/v1/jobs/{job_id}", headers=owner.headers).json()
+    while job["status"] not in ("succeeded", "failed") and time.monotonic() < deadline:
+        time.sleep(0.05)
+        job = client.get(f"/api/v1/jobs/{job_id}", headers=owner.headers).json()
+    assert job["status"] == "succeeded", job
+
+    assert _lease_owner(project_id) is None
+    response = client.post(f"/api/v1/projects/{project_id}/generate", headers=owner.headers)
+    assert response.status_code == 202 and response.json()["id"] != job_id
+
+
+def test_queued_lease_is_renewed_past_its_ttl(client, db, make_user, make_project):
+    project_id = make_project(make_user("owner"))
+    token = acquire_generation_lease(db, project_id)
+    # 곧 만료될 lease (워커를 기다리는 동안 TTL이 지나는 상황)
+    db.query(models.Project).filter(models.Project.id == project_id).update(
+        {models.Project.generation_lease_expires_at: datetime.utcnow() + timedelta(seconds=0.2)}, synchronize_session=False
+    )
+    db.commit()
+
+    keeper = QueuedLeaseKeeper(interval_seconds=0.05)
+    keeper.track("job", project_id, token)
+    try:
+        time.sleep(0.4)
+        assert _race(project_id, 4) == []
+        assert _lease_owner(project_id) == token
+    finally:
+        keeper.untrack("job")
+        release_generation_lease(db, project_id, token)
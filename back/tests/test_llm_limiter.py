@@ -0,0 +1,93 @@
+# LLM 동시 호출 제한 테스트 (FIFO 순서, 스레드/비동기 호출 공유, 취소 시 슬롯 반납)
+import asyncio
+import threading
+
+from back.services.llm_provider import LLMConcurrencyLimiter
+
+
+def test_waiters_are_served_in_arrival_order():
+    async def scenario():
+        limiter = LLMConcurrencyLimiter(1)
+        await limiter.acquire_async()
+        order = []
+
+        async def waiter(name):
+            await limiter.acquire_async()
+            order.append(name)
+            limiter.release()
+
+        tasks = []
+        for name in ("first", "second", "third"):
+            tasks.append(asyncio.create_task(waiter(name)))
+            await asyncio.sleep(0)
+        assert limiter.stats()["waiting"] == 3
+
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["first", "second", "third"]
+    assert stats == {"max_concurrency": 1, "in_flight": 0, "waiting": 0}
+
+
+def test_thread_callers_share_the_queue_with_async_callers():
+    async def scenario():
+        limiter = LLMConcurrencyLimiter(1)
+        await limiter.acquire_async()
+        order = []
+
+        def thread_caller():
+            limiter.acquire()
+            order.append("thread")
+            limiter.release()
+
+        thread = threading.Thread(target=thread_caller)
+        thread.start()
+        while limiter.stats()["waiting"] < 1:
+            await asyncio.sleep(0.001)
+
+        async def async_caller():
+            await limiter.acquire_async()
+            order.append("async")
+            limiter.release()
+
+        task = asyncio.create_task(async_caller())
+        await asyncio.sleep(0)
+        limiter.release()
+        await task
+        await asyncio.to_thread(thread.join)
+        return order, limiter.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["thread", "async"]
+    assert stats["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_hold_a_slot():
+    async def scenario():
+        limiter = LLMConcurrencyLimiter(1)
+        await limiter.acquire_async()
+
+        with_timeout = asyncio.create_task(asyncio.wait_for(limiter.acquire_async(), timeout=0.01))
+        try:
+            await with_timeout
+        except asyncio.TimeoutError:
+            pass
+        assert limiter.stats()["waiting"] == 0
+
+        # 슬롯을 넘겨받는 순간 취소된 경우에도 슬롯이 다음 대기자에게 돌아가야 합니다.
+        racing = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0)
+        limiter.release()
+        racing.cancel()
+        try:
+            await racing
+        except asyncio.CancelledError:
+            pass
+
+        await asyncio.wait_for(limiter.acquire_async(), timeout=1)
+        limiter.release()
+        return limiter.stats()
+
+    assert asyncio.run(scenario())["in_flight"] == 0
@@ -0,0 +1,40 @@
+# 마인드맵 버전 이력 테스트: 수정마다 버전이 쌓이고, 지난 버전 복원(?version=)과 버전 간 diff를 제공합니다.
+from back.schemas import MindMapData
+from back.services import mindmap_history
+from back.services.ai_analyzer import stable_node_id
+from back.services.mindmap_store import save_mindmap
+
+
+def test_edits_are_versioned_and_old_versions_can_be_restored_and_diffed(client, db, make_user, make_project):
+    owner = make_user("owner")
+    project_id = make_project(owner)
+
+    core_id = stable_node_id(project_id, "core", "출시 계획")
+    data = MindMapData(nodes=[{"id": core_id, "node_type": "core", "title": "출시 계획", "connections": []}])
+    diff = save_mindmap(db, project_id, data)
+    assert mindmap_history.record_version(db, project_id, diff, mindmap_history.SOURCE_GENERATION) == 1
+    db.commit()
+
+    base = f"/api/v1/projects/{project_id}/mindmap"
+    response = client.patch(f"/api/v1/projects/{project_id}/nodes", headers=owner.headers,
+                            json={"nodes": [{"id": core_id, "version": 1, "title": "출시 일정"}]})
+    assert response.status_code == 200, response.text
+    assert response.json()["version"] == 2
+
+    current = client.get(base, headers=owner.headers)
+    assert current.status_code == 200, current.text
+    assert [node["title"] for node in current.json()] == ["출시 일정"]
+
+    restored = client.get(base, params={"version": 1}, headers=owner.headers)
+    assert [node["title"] for node in restored.json()] == ["출시 계획"]
+    assert client.get(base, params={"version": 99}, headers=owner.headers).status_code == 404
+
+    diff = client.get(f"{base}/diff", params={"from_version": 1}, headers=owner.headers).json()
+    assert [(node["id"], node["title"]) for node in diff["updated_nodes"]] == [(core_id, "출시 일정")]
+    assert diff["added_nodes"] == [] and diff["removed_node_ids"] == []
+
+    versions = client.get(f"{base}/versions", headers=owner.headers).json()
+    assert [(v["version"], v["source"], v["created_by"]) for v in versions] == [
+        (2, mindmap_history.SOURCE_EDIT, owner.id),
+        (1, mindmap_history.SOURCE_GENERATION, None),
+    ]
@@ -0,0 +1,70 @@
+# 마인드맵 diff 저장 테스트: 안정적인 노드 ID로 다시 저장하면 바뀐 노드/간선만 반영됩니다.
+from back import models
+from back.schemas import MindMapData
+from back.services.ai_analyzer import stable_node_id
+from back.services.mindmap_store import save_mindmap
+
+
+def _map(project_id, titles, links):
+    """titles: {키: (유형, 제목, 설명)}, links: [(상위 키, 하위 키)]"""
+    ids = {key: stable_node_id(project_id, node_type, title) for key, (node_type, title, _) in titles.items()}
+    nodes = [
+        {"id": ids[key], "node_type": node_type, "title": title, "description": description,
+         "connections": [{"target_id": ids[target]} for source, target in links if source == key]}
+        for key, (node_type, title, description) in titles.items()
+    ]
+    return ids, MindMapData(
+        nodes=nodes, links=[{"source": ids[source], "target": ids[target]} for source, target in links]
+    )
+
+
+def _stored(db, project_id):
+    nodes = {
+        node.id: node.version
+        for node in db.query(models.MindMapNode).populate_existing().filter(models.MindMapNode.project_id == project_id)
+    }
+    edges = {
+        (source, target)
+        for source, target in db.query(models.MindMapEdge.source_id, models.MindMapEdge.target_id).filter(
+            models.MindMapEdge.project_id == project_id
+        )
+    }
+    return nodes, edges
+
+
+def test_resaving_a_map_applies_only_the_changed_nodes_and_edges(client, db, make_user, make_project):
+    project_id = make_project(make_user("owner"))
+    titles = {
+        "core": ("core", "출시 계획", ""),
+        "design": ("major", "디자인", "시안 검토"),
+        "dev": ("major", "개발", "API 구현"),
+    }
+    ids, first = _map(project_id, titles, [("core", "design"), ("core", "dev")])
+    save_mindmap(db, project_id, first)
+    db.commit()
+
+    # 같은 맵을 다시 저장하면 아무것도 바뀌지 않습니다.
+    diff = save_mindmap(db, project_id, first)
+    db.commit()
+    assert (diff.added_nodes, diff.updated_nodes, diff.removed_node_ids, diff.added_links, diff.removed_links) == ([], [], [], [], [])
+    assert diff.unchanged_count == 3
+
+    # 설명 수정 1개, 노드 추가 1개, 노드 삭제 1개 (core는 하위 연결이 바뀌어 수정으로 집계)
+    titles["design"] = ("major", "디자인", "시안 확정")
+    titles["qa"] = ("major", "QA", "")
+    del titles["dev"]
+    new_ids, second = _map(project_id, titles, [("core", "design"), ("core", "qa")])
+    ids.update(new_ids)
+    diff = save_mindmap(db, project_id, second)
+    db.commit()
+
+    assert [node.id for node in diff.added_nodes] == [ids["qa"]]
+    assert sorted(node.id for node in diff.updated_nodes) == sorted([ids["core"], ids["design"]])
+    assert diff.removed_node_ids == [ids["dev"]]
+    assert diff.added_links == [{"source": ids["core"], "target": ids["qa"]}]
+    assert diff.removed_links == [{"source": ids["core"], "target": ids["dev"]}]
+    assert diff.unchanged_count == 0
+
+    nodes, edges = _stored(db, project_id)
+    assert nodes == {ids["core"]: 2, ids["design"]: 2, ids["qa"]: 1}
+    assert edges == {(ids["core"], ids["design"]), (ids["core"], ids["qa"])}
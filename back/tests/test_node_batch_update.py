@@ -0,0 +1,37 @@
+# 노드 일괄 수정(PATCH) 테스트: 노드별 낙관적 동시성 검사로 충돌한 노드만 보고하고 나머지는 적용합니다.
+from back.schemas import MindMapData
+from back.services.ai_analyzer import stable_node_id
+from back.services.mindmap_store import save_mindmap
+
+
+def test_batch_patch_applies_current_versions_and_reports_conflicts(client, db, make_user, make_project):
+    owner = make_user("owner")
+    project_id = make_project(owner)
+    design, dev = stable_node_id(project_id, "major", "디자인"), stable_node_id(project_id, "major", "개발")
+    save_mindmap(db, project_id, MindMapData(nodes=[
+        {"id": design, "node_type": "major", "title": "디자인"},
+        {"id": dev, "node_type": "major", "title": "개발"},
+    ]))
+    db.commit()
+
+    url = f"/api/v1/projects/{project_id}/nodes"
+    # 다른 클라이언트가 먼저 개발 노드를 수정해 버전 2가 됩니다.
+    assert client.patch(url, headers=owner.headers, json={"nodes": [{"id": dev, "version": 1, "title": "백엔드"}]}).status_code == 200
+
+    response = client.patch(url, headers=owner.headers, json={"nodes": [
+        {"id": design, "version": 1, "title": "UI 디자인"},
+        {"id": dev, "version": 1, "title": "개발 일정"},
+        {"id": "missing-node", "version": 1, "title": "없음"},
+    ]})
+    assert response.status_code == 200, response.text
+    result = response.json()
+
+    assert [(node["id"], node["title"], node["version"]) for node in result["updated"]] == [(design, "UI 디자인", 2)]
+    conflicts = {conflict["id"]: conflict for conflict in result["conflicts"]}
+    assert conflicts[dev]["reason"] == "version_mismatch"
+    # 충돌 노드는 클라이언트가 병합할 수 있도록 서버의 현재 상태를 함께 보냅니다.
+    assert (conflicts[dev]["current"]["title"], conflicts[dev]["current"]["version"]) == ("백엔드", 2)
+    assert conflicts["missing-node"] == {"id": "missing-node", "reason": "not_found", "current": None}
+
+    titles = {node["id"]: node["title"] for node in client.get(f"/api/v1/projects/{project_id}/mindmap", headers=owner.headers).json()}
+    assert titles == {design: "UI 디자인", dev: "백엔드"}
@@ -0,0 +1,97 @@
+# 친구 범위 접속 상태(presence) 테스트: 접속 상태는 상태 소켓(/ws/status) 수로만 판단합니다.
+import asyncio
+
+from back import presence as presence_module
+from back.presence import FriendGraphCache, PresenceAggregator
+
+
+def _status_url(user):
+    return f"/api/v1/ws/status?token={user.token}"
+
+
+def _project_url(project_id, user):
+    return f"/api/v1/ws/projects/{project_id}?token={user.token}"
+
+
+def test_status_socket_after_project_socket_announces_online(client, make_user, make_project, befriend, receive_event):
+    alice, bob = make_user("alice"), make_user("bob")
+    befriend(alice, bob)
+    project_id = make_project(alice)
+
+    with client.websocket_connect(_status_url(bob)) as bob_status:
+        with client.websocket_connect(_project_url(project_id, alice)):
+            # 프로젝트 소켓만으로는 온라인이 아닙니다.
+            assert receive_event(bob_status, "presence_diff", timeout=0.3) is None
+
+            with client.websocket_connect(_status_url(alice)):
+                diff = receive_event(bob_status, "presence_diff")
+                assert diff["changes"] == [{"user_email": alice.email, "is_online": True, "friend_code": alice.friend_code}]
+
+
+def test_closing_status_socket_announces_offline_while_project_socket_stays_open(
+    client, make_user, make_project, befriend, receive_event
+):
+    alice, bob = make_user("alice"), make_user("bob")
+    befriend(alice, bob)
+    project_id = make_project(alice)
+
+    with client.websocket_connect(_status_url(bob)) as bob_status:
+        with client.websocket_connect(_status_url(alice)):
+            assert receive_event(bob_status, "presence_diff")["changes"][0]["is_online"] is True
+
+            with client.websocket_connect(_project_url(project_id, alice)):
+                pass
+            # 프로젝트 소켓을 닫아도 상태 소켓이 열려 있으므로 변화가 없습니다.
+            assert receive_event(bob_status, "presence_diff", timeout=0.3) is None
+        assert receive_event(bob_status, "presence_diff")["changes"][0]["is_online"] is False
+
+        with client.websocket_connect(_project_url(project_id, alice)):
+            with client.websocket_connect(_status_url(alice)):
+                assert receive_event(bob_status, "presence_diff")["changes"][0]["is_online"] is True
+            diff = receive_event(bob_status, "presence_diff")
+            assert diff["changes"] == [{"user_email": alice.email, "is_online": False, "friend_code": alice.friend_code}]
+
+
+class StaticFriendGraph(FriendGraphCache):
+    def __init__(self, friends):
+        super().__init__()
+        self.friends = friends
+
+    def get_friend_emails(self, user_id):
+        return self.friends
+
+
+def test_offline_is_not_announced_while_another_node_has_a_status_socket(monkeypatch):
+    published = []
+
+    async def publish(room, message, exclude_email=None, coalesce_key=None):
+        published.append((room, message))
+
+    monkeypatch.setattr(presence_module.manager, "publish", publish)
+
+    async def scenario():
+        node = PresenceAggregator(StaticFriendGraph({"bob@example.com"}), tick_seconds=60)
+        other_node = "other-node"
+
+        node.mark(1, "alice@example.com", True)
+        await node.flush()
+        # 다른 노드에도 alice의 상태 탭이 열렸습니다.
+        node.on_node_message({"node": other_node, "online": ["alice@example.com"]})
+        node.mark(1, "alice@example.com", False)
+        await node.flush()
+        assert len(published) == 1
+
+        # 다른 노드의 마지막 상태 탭도 닫히면, 그 노드의 소식 이후 이 노드가 다시 온라인/오프라인을 판단합니다.
+        node.mark(1, "alice@example.com", True)
+        await node.flush()
+        assert len(published) == 1
+        node.on_node_message({"node": other_node, "sync": True, "online": []})
+        node.mark(1, "alice@example.com", False)
+        await node.flush()
+        await node.stop()
+
+    asyncio.run(scenario())
+    assert [message["changes"] for _, message in published] == [
+        [{"user_email": "alice@example.com", "is_online": True, "friend_code": None}],
+        [{"user_email": "alice@example.com", "is_online": False, "friend_code": None}],
+    ]
@@ -0,0 +1,217 @@
+# 실시간 브로커 왕복 테스트 (FakeRedis로 두 노드 시뮬레이션, Postgres NOTIFY frame 분할/재조립, 잘못된 frame, 재연결)
+#
+# 실행 (저장소 루트에서):
+#   python -m pytest -q back/tests
+import asyncio
+import json
+import random
+import socket
+from types import SimpleNamespace
+
+from back import realtime_broker
+from back.realtime import ConnectionManager, project_room
+from back.realtime_broker import FakeRedis, PostgresBroker, RedisBroker
+
+# Postgres NOTIFY payload 한도 (8000 bytes 미만)
+NOTIFY_LIMIT_BYTES = 8000
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def _settle():
+    # 브로커 reader 태스크와 연결 writer 태스크가 처리할 시간을 줍니다.
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_fake_redis_round_trip_reaches_every_node():
+    async def scenario():
+        server = FakeRedis()
+        received = {"a": [], "b": []}
+        brokers = {name: RedisBroker(server) for name in received}
+        for name, broker in brokers.items():
+            async def handler(room, payload, name=name):
+                received[name].append((room, payload))
+            await broker.start(handler)
+
+        await brokers["a"].publish("project:1", "안녕하세요")
+        await _settle()
+        for broker in brokers.values():
+            await broker.stop()
+        return received
+
+    received = asyncio.run(scenario())
+    assert received == {"a": [("project:1", "안녕하세요")], "b": [("project:1", "안녕하세요")]}
+
+
+def test_connection_managers_on_different_nodes_share_rooms():
+    async def scenario():
+        server = FakeRedis()
+        node_a = ConnectionManager(broker=RedisBroker(server))
+        node_b = ConnectionManager(broker=RedisBroker(server))
+        await node_a.start()
+        await node_b.start()
+
+        socket = FakeWebSocket()
+        connection = await node_b.connect(socket, "b@example.com")
+        node_b.subscribe(connection, project_room(1))
+
+        await node_a.publish(project_room(1), {"type": "chat", "content": "다른 노드에서 보냄"})
+        await node_a.publish(project_room(2), {"type": "chat", "content": "구독하지 않은 룸"})
+        await _settle()
+
+        node_b.disconnect(connection)
+        await node_a.stop()
+        await node_b.stop()
+        return socket.sent
+
+    assert asyncio.run(scenario()) == [{"type": "chat", "content": "다른 노드에서 보냄"}]
+
+
+def _collect_frames(broker: PostgresBroker, frames):
+    async def scenario():
+        received = []
+
+        async def handler(room, payload):
+            received.append((room, payload))
+
+        broker._handler = handler
+        for frame in frames:
+            broker._on_notify(frame)
+        await _settle()
+        return received
+
+    return asyncio.run(scenario())
+
+
+def test_postgres_frames_fit_notify_limit_for_multibyte_payloads():
+    broker = PostgresBroker(engine=None)
+    rng = random.Random(0)
+    payload = json.dumps({
+        "type": "mindmap",
+        "nodes": [{"title": "".join(chr(0xAC00 + rng.randrange(11172)) for _ in range(40)), "quote": '"\\'} for _ in range(500)],
+    }, ensure_ascii=False)
+
+    frames = broker.build_frames("project:1", payload)
+    assert len(frames) > 1
+    assert all(len(frame.encode("utf-8")) < NOTIFY_LIMIT_BYTES for frame in frames)
+
+    # 작은 이벤트는 한 frame으로 보냅니다.
+    assert len(broker.build_frames("project:1", "작은 이벤트")) == 1
+
+    shuffled = list(frames)
+    random.Random(1).shuffle(shuffled)
+    assert _collect_frames(broker, shuffled) == [("project:1", payload)]
+    assert broker._partials == {}
+
+
+def test_postgres_incomplete_messages_are_evicted(monkeypatch):
+    broker = PostgresBroker(engine=None)
+    clock = [1000.0]
+    monkeypatch.setattr(realtime_broker.time, "monotonic", lambda: clock[0])
+
+    lost = broker.build_frames("project:1", "가" * 10000)
+    assert _collect_frames(broker, lost[:-1]) == []
+    assert len(broker._partials) == 1
+
+    clock[0] += PostgresBroker.PARTIAL_TTL_SECONDS + 1
+    delivered = broker.build_frames("project:2", "나" * 10000)
+    assert _collect_frames(broker, delivered) == [("project:2", "나" * 10000)]
+    assert broker._partials == {}
+
+
+def test_postgres_malformed_frames_are_dropped():
+    broker = PostgresBroker(engine=None)
+    good = broker.build_frames("project:1", "정상 이벤트")
+    chunked = broker.build_frames("project:2", "다" * 10000)
+    malformed = [
+        "not json",
+        json.dumps({"id": "x", "i": 0, "n": 1, "d": "not json"}),
+        json.dumps({"id": "x", "i": 0, "n": 1, "d": json.dumps({"payload": "room 없음"})}),
+        json.dumps({"id": "y", "i": 5, "n": 2, "d": "AAAA"}),
+        json.dumps({"id": "z", "i": 0, "n": 2, "d": "@@"}),
+        json.dumps({"id": "z", "i": 1, "n": 2, "d": "@@"}),
+        json.dumps([1, 2]),
+    ]
+    assert _collect_frames(broker, malformed + good + chunked) == [("project:1", "정상 이벤트"), ("project:2", "다" * 10000)]
+
+
+class FakeListenConnection:
+    """psycopg2 LISTEN 연결 대용. socketpair의 한쪽 fd로 읽기 이벤트를 흉내 냅니다."""
+
+    def __init__(self):
+        self.reader, self.writer = socket.socketpair()
+        self.notifies = []
+        self.broken = False
+
+    def fileno(self):
+        return self.reader.fileno()
+
+    def notify(self, payload: str):
+        self.notifies.append(SimpleNamespace(payload=payload))
+        self.writer.send(b"x")
+
+    def poll(self):
+        self.reader.recv(1024)
+        if self.broken:
+            raise ConnectionError("server closed the connection unexpectedly")
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+
+def test_postgres_listener_resubscribes_after_connection_loss(monkeypatch):
+    async def scenario():
+        broker = PostgresBroker(engine=None)
+        broker.RECONNECT_MIN_SECONDS = 0.01
+        opened = []
+
+        def open_listen_connection():
+            if len(opened) == 1:
+                # 첫 재연결 시도는 실패합니다.
+                opened.append(None)
+                raise ConnectionError("database is starting up")
+            connection = FakeListenConnection()
+            opened.append(connection)
+            return connection
+
+        monkeypatch.setattr(broker, "_open_listen_connection", open_listen_connection)
+        received = []
+
+        async def handler(room, payload):
+            received.append((room, payload))
+
+        await broker.start(handler)
+        first = opened[0]
+        first.notify(broker.build_frames("project:1", "끊기기 전")[0])
+        await asyncio.sleep(0.01)
+
+        first.broken = True
+        first.writer.send(b"x")
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(opened) == 3 and broker._listen_connection is opened[2]:
+                break
+
+        opened[2].notify(broker.build_frames("project:1", "다시 연결된 후")[0])
+        await asyncio.sleep(0.01)
+        await broker.stop()
+        return received, opened
+
+    received, opened = asyncio.run(scenario())
+    assert received == [("project:1", "끊기기 전"), ("project:1", "다시 연결된 후")]
+    assert opened[1] is None
+    assert opened[0].reader.fileno() == -1
@@ -0,0 +1,100 @@
+# AI 추천 single-flight 테스트: 동시 요청은 하나의 모델 호출을 공유하고, 모든 클라이언트가 끊기면 계산을 취소합니다.
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from back.routers import project as project_router
+from back.schemas import MindMapData
+from back.services.ai_analyzer import stable_node_id
+from back.services.llm_provider import get_llm_provider
+from back.services.mindmap_store import save_mindmap
+from back.services.single_flight import AsyncSingleFlight
+from back.utils import run_until_disconnect
+
+CONCURRENT_REQUESTS = 4
+
+
+def test_concurrent_recommend_requests_share_one_model_call(client, db, make_user, make_project, monkeypatch):
+    owner = make_user("owner")
+    project_id = make_project(owner)
+    save_mindmap(db, project_id, MindMapData(nodes=[
+        {"id": stable_node_id(project_id, "core", "출시 계획"), "node_type": "core", "title": "출시 계획"}
+    ]))
+    db.commit()
+
+    provider = get_llm_provider().inner
+    calls = []
+    agenerate = provider.agenerate
+
+    async def counting_agenerate(*args, **kwargs):
+        calls.append(args[0])
+        return await agenerate(*args, **kwargs)
+
+    # 모든 요청이 계산 중에 도착하도록 모델 응답을 늦춥니다.
+    monkeypatch.setattr(provider, "latency_seconds", 0.5)
+    monkeypatch.setattr(provider, "agenerate", counting_agenerate)
+    before = project_router._recommend_flights.stats()
+
+    barrier = threading.Barrier(CONCURRENT_REQUESTS)
+
+    def request(_):
+        barrier.wait()
+        return client.post(f"/api/v1/projects/{project_id}/recommend", headers=owner.headers)
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_REQUESTS) as pool:
+        responses = list(pool.map(request, range(CONCURRENT_REQUESTS)))
+
+    assert [response.status_code for response in responses] == [200] * CONCURRENT_REQUESTS, responses[0].text
+    assert len({response.json()["recommendation"] for response in responses}) == 1
+    assert len(calls) == 1
+    after = project_router._recommend_flights.stats()
+    assert after["started"] - before["started"] == 1
+    assert after["shared"] - before["shared"] == CONCURRENT_REQUESTS - 1
+
+
+class FakeRequest:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+def test_shared_computation_is_cancelled_only_after_every_client_disconnects():
+    async def scenario():
+        flights = AsyncSingleFlight()
+        cancelled = asyncio.Event()
+
+        async def compute():
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first, second = FakeRequest(), FakeRequest()
+        waiters = [
+            asyncio.ensure_future(run_until_disconnect(request, flights.do("key", compute), poll_seconds=0.01))
+            for request in (first, second)
+        ]
+        await asyncio.sleep(0.05)
+
+        first.disconnected = True
+        with pytest.raises(HTTPException) as exc_info:
+            await waiters[0]
+        assert exc_info.value.status_code == 499
+        # 다른 클라이언트가 아직 기다리므로 계산은 계속됩니다.
+        await asyncio.sleep(0.05)
+        assert not cancelled.is_set() and flights.stats()["in_flight"] == 1
+
+        second.disconnected = True
+        with pytest.raises(HTTPException):
+            await waiters[1]
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        await asyncio.sleep(0)
+        assert flights.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
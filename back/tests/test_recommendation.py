@@ -0,0 +1,34 @@
+# AI 추천 프롬프트 테스트: 큰 맵의 그래프 분석은 이벤트 루프 밖에서 수행합니다.
+import asyncio
+import threading
+
+from back.config import get_settings
+from back.services import ai_analyzer, mindmap_analytics
+
+
+def test_large_map_digest_is_computed_off_the_event_loop(monkeypatch):
+    threads = []
+    get_metrics = mindmap_analytics.get_metrics
+
+    def recording_get_metrics(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return get_metrics(*args, **kwargs)
+
+    monkeypatch.setattr(mindmap_analytics, "get_metrics", recording_get_metrics)
+
+    size = get_settings().MINDMAP_PROMPT_NODE_BUDGET * 2
+    nodes = [
+        {"id": f"n{i}", "node_type": "core" if i == 0 else "sub", "title": f"주제 {i}", "description": "",
+         "connections": [{"target_id": f"n{(i - 1) // 2}"}] if i else []}
+        for i in range(size)
+    ]
+
+    async def scenario():
+        recommendation = await ai_analyzer.arecommend_map_improvements(
+            {"project_id": None, "version": None, "nodes": nodes}, [], "최근 채팅 요약"
+        )
+        return threading.current_thread(), recommendation
+
+    loop_thread, recommendation = asyncio.run(scenario())
+    assert recommendation
+    assert threads and all(thread is not loop_thread for thread in threads)
@@ -0,0 +1,31 @@
+# 검색 색인 테스트: 노드 단건 수정(PUT)과 일괄 수정(PATCH) 모두 같은 트랜잭션에서 색인을 갱신합니다.
+from back.schemas import MindMapData
+from back.services.ai_analyzer import stable_node_id
+from back.services.mindmap_store import save_mindmap
+
+
+def test_put_and_patch_node_edits_are_searchable(client, db, make_user, make_project):
+    owner = make_user("owner")
+    project_id = make_project(owner)
+    node_id = stable_node_id(project_id, "major", "기획안")
+    save_mindmap(db, project_id, MindMapData(nodes=[{"id": node_id, "node_type": "major", "title": "기획안"}]))
+    db.commit()
+
+    def search(q):
+        response = client.get("/api/v1/search", params={"q": q, "kind": "node", "project_id": project_id}, headers=owner.headers)
+        assert response.status_code == 200, response.text
+        return [item["id"] for item in response.json()["items"]]
+
+    assert search("기획안") == [node_id]
+
+    response = client.put(f"/api/v1/projects/{project_id}/node/{node_id}", headers=owner.headers,
+                          json={"id": node_id, "node_type": "major", "title": "예산표"})
+    assert response.status_code == 200, response.text
+    assert search("예산표") == [node_id]
+    assert search("기획안") == []
+
+    response = client.patch(f"/api/v1/projects/{project_id}/nodes", headers=owner.headers,
+                            json={"nodes": [{"id": node_id, "title": "회고록"}]})
+    assert response.status_code == 200, response.text
+    assert search("회고록") == [node_id]
+    assert search("예산표") == []
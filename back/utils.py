@@ -1,8 +1,9 @@
+import asyncio
 import random
 import string
 import os
 import shutil
-from fastapi import UploadFile
+from fastapi import HTTPException, Request, UploadFile
 
 # 🚨 추가됨: 설정 상수 정의
 UPLOAD_FOLDER = "uploaded_images"
@@ -60,3 +61,22 @@ async def save_profile_image(file: UploadFile, user_id: int) -> str:
     image_url = f"/{UPLOAD_FOLDER}/profiles/{unique_filename}"
     
     return image_url
+
+
+async def run_until_disconnect(request: Request, awaitable, poll_seconds: float = 0.5):
+    """
+    awaitable을 실행하면서 클라이언트 연결을 주기적으로 확인합니다.
+    결과를 기다리는 중 연결이 끊기면 작업(LLM 호출 등)을 취소하고 499를 발생시킵니다.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_seconds)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                print("⚠️ 클라이언트 연결 종료: 진행 중인 작업을 취소합니다.")
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
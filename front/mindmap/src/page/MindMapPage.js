@@ -546,7 +546,25 @@ const App = () => {
                 throw new Error(`API 호출 실패: HTTP ${response.status} - ${errorText.substring(0, 50)}...`);
             }
 
-            const result = await response.json(); 
+            // 💡 생성은 백그라운드 작업으로 실행되므로, 작업이 끝날 때까지 상태를 조회합니다.
+            let job = await response.json();
+            const jobURL = `${BACKEND_BASE_URL}${API_VERSION_PREFIX}/jobs/${job.id}`;
+            while (job.status === 'queued' || job.status === 'running') {
+                await new Promise(resolve => setTimeout(resolve, 1500));
+                const jobResponse = await fetch(jobURL, {
+                    headers: { 'Authorization': `Bearer ${authToken}` }
+                });
+                if (!jobResponse.ok) {
+                    throw new Error(`작업 상태 조회 실패: HTTP ${jobResponse.status}`);
+                }
+                job = await jobResponse.json();
+            }
+
+            if (job.status !== 'succeeded') {
+                throw new Error(`백엔드 분석 실패: ${job.error || 'AI 분석 실패'}`);
+            }
+
+            const result = job.result;
             console.log('🔍 백엔드 응답 전체:', result);
 
             // 💡 2. 백엔드 응답이 성공인지 먼저 확인